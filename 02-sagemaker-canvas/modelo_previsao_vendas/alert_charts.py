@@ -0,0 +1,736 @@
+#!/usr/bin/env python3
+"""
+Gráficos de alerta em lote (por produto e por categoria) com índice HTML
+
+A partir das trajetórias de previsão (ID_PRODUTO, DIA ou HORIZONTE,
+PREVISAO_ESTOQUE e, se houver, INTERVALO_INFERIOR/INTERVALO_SUPERIOR e
+CATEGORIA) gera:
+- um gráfico por produto: trajetória prevista sobre as zonas de alerta do
+  produto (limiares do AlertEngine ou do catálogo) e a faixa do intervalo
+- um gráfico por categoria: distribuição dos produtos por nível atual e
+  produtos por nível em cada dia do horizonte
+- index.html estático, por categoria, com os produtos em ordem de prioridade
+
+Desempenho (milhares de produtos por noite):
+- os dados de todos os gráficos saem de uma única ordenação (produto, dia),
+  sem groupby por produto; os trabalhos vão em lotes para um pool de processos
+- cada worker monta as figuras uma única vez (backend Agg, não interativo) e,
+  a cada gráfico, só troca os dados dos artistas e salva
+- cada gráfico tem um hash do conteúdo (dados, limiares, títulos, formato e
+  versão do template); os que não mudaram desde a última execução não são
+  redesenhados (graficos.json no diretório de saída)
+
+PNG usa matplotlib (opcional). Sem matplotlib, ou com --formato svg, os
+gráficos são SVG montados direto de templates de texto.
+
+Cores: 03-resultados/visualizacoes/paleta_de_cores.md
+
+Uso:
+    python alert_charts.py ../../03-resultados/previsoes_estoque.csv -o graficos
+    python alert_charts.py trajetorias.parquet -o graficos --catalogo ../../01-Dados/catalogo_produtos --workers 8
+"""
+import argparse
+import hashlib
+import html
+import importlib.util
+import json
+import math
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from alerting import ALERT_LEVELS, AlertEngine
+from product_catalog import load_catalog
+
+# Paleta de 03-resultados/visualizacoes/paleta_de_cores.md
+COLORS = {
+    'NORMAL': '#10B981',
+    'ALERTA': '#F59E0B',
+    'CRITICO': '#EF4444',
+    'grade': '#E5E7EB',
+    'texto': '#374151'
+}
+LEVEL_COLORS = [COLORS[level] for level in ALERT_LEVELS]
+FORMATS = ('auto', 'png', 'svg')
+# Mudar ao alterar o desenho: invalida os gráficos em cache
+TEMPLATE_VERSION = 1
+CACHE_MANIFEST = 'graficos.json'
+INDEX_FILE = 'index.html'
+BATCH_SIZE = 64
+MAX_TICKS = 12
+WITHOUT_CATEGORY = 'Sem categoria'
+
+
+def matplotlib_available() -> bool:
+    return importlib.util.find_spec('matplotlib') is not None
+
+
+def resolve_format(formato: str) -> str:
+    """'auto': PNG com matplotlib instalado, senão SVG"""
+    if formato == 'auto':
+        return 'png' if matplotlib_available() else 'svg'
+    if formato == 'png' and not matplotlib_available():
+        raise ImportError("matplotlib não instalado: use --formato svg")
+    if formato not in FORMATS:
+        raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATS)})")
+    return formato
+
+
+def slugify(text: str) -> str:
+    """Nome de arquivo estável para uma categoria"""
+    slug = re.sub(r'[^0-9A-Za-z]+', '_', text).strip('_').lower() or 'categoria'
+    return f"{slug[:40]}-{hashlib.blake2b(text.encode(), digest_size=3).hexdigest()}"
+
+
+def tick_positions(n: int) -> np.ndarray:
+    """Índices dos rótulos do eixo x (no máximo MAX_TICKS)"""
+    return np.arange(0, n, max(1, math.ceil(n / MAX_TICKS)))
+
+
+def nice_ticks(ymax: float, n: int = 4) -> np.ndarray:
+    """Marcas 0..topo em passos 1, 2, 2,5 ou 5 x 10^k (o topo cobre ymax)"""
+    raw = max(ymax, 1e-9) / n
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    return np.arange(0, math.ceil(ymax / step - 1e-9) + 1) * step
+
+
+def widen(x: np.ndarray, *columns: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Um único ponto vira um segmento (faixas e áreas precisam de largura)"""
+    if len(x) != 1:
+        return (x,) + columns
+    return (np.array([x[0] - 0.4, x[0] + 0.4]),) + tuple(np.repeat(c, 2, axis=0) for c in columns)
+
+
+def build_jobs(df: pd.DataFrame, engine: Optional[AlertEngine] = None, catalog=None,
+               estoque_col: str = 'PREVISAO_ESTOQUE',
+               date_format: str = '%d/%m/%Y') -> Tuple[List[Dict[str, Any]], pd.DataFrame]:
+    """
+    Trabalhos de desenho (um dict de arrays por gráfico) a partir das trajetórias
+
+    Returns:
+        (trabalhos, produtos): produtos tem uma linha por produto, em ordem de
+        prioridade, com CATEGORIA, nível atual, dias até ruptura e o gráfico
+    """
+    engine = engine or AlertEngine(catalog=catalog)
+    catalog = catalog if catalog is not None else engine.catalog
+
+    if 'DIA' in df.columns:
+        dates = df['DIA']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, format=date_format, errors='coerce')
+        valid = dates.notna().to_numpy()
+        days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+    elif 'HORIZONTE' in df.columns:
+        valid = df['HORIZONTE'].notna().to_numpy()
+        days = df['HORIZONTE'].fillna(0).to_numpy().astype(np.int64)
+    else:
+        raise ValueError("As trajetórias precisam de DIA ou HORIZONTE")
+
+    estoque = df[estoque_col].to_numpy(dtype=float)
+    valid = valid & ~np.isnan(estoque)
+    produtos = df['ID_PRODUTO'].to_numpy()
+    if 'CATEGORIA' in df.columns:
+        categorias = df['CATEGORIA'].to_numpy(dtype=object)
+    elif catalog is not None and 'CATEGORIA' in catalog.columns:
+        categorias = np.asarray(catalog.lookup(produtos, 'CATEGORIA'), dtype=object)
+    else:
+        categorias = None
+    has_interval = {'INTERVALO_INFERIOR', 'INTERVALO_SUPERIOR'} <= set(df.columns)
+    low = df['INTERVALO_INFERIOR'].to_numpy(dtype=float) if has_interval else None
+    high = df['INTERVALO_SUPERIOR'].to_numpy(dtype=float) if has_interval else None
+
+    # Uma ordenação (produto, dia) para todos os gráficos
+    order = np.flatnonzero(valid)
+    order = order[np.lexsort((days[order], produtos[order]))]
+    produtos, days, estoque = produtos[order], days[order], estoque[order]
+    categorias = categorias[order] if categorias is not None else None
+    if has_interval:
+        low, high = low[order], high[order]
+
+    critico, alerta = engine.row_thresholds(produtos, categorias, n=len(produtos))
+    levels = engine.codes_for(estoque, critico, alerta)
+
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    if 'DIA' in df.columns:
+        day_labels = pd.to_datetime(unique_days.astype('datetime64[D]')).strftime('%d/%m').to_numpy()
+    else:
+        day_labels = np.array([f"+{h}d" for h in unique_days])
+    x_all = (days - (unique_days[0] if len(unique_days) else 0)).astype(float)
+
+    starts = np.flatnonzero(np.r_[True, produtos[1:] != produtos[:-1]]) if len(produtos) else \
+        np.array([], dtype=np.int64)
+    ends = np.r_[starts[1:], len(produtos)]
+    product_ids = produtos[starts]
+    product_categories = np.where(pd.isna(categorias[starts]), WITHOUT_CATEGORY, categorias[starts]) \
+        if categorias is not None else np.full(len(starts), WITHOUT_CATEGORY, dtype=object)
+
+    # Prioridade, nível atual e ruptura (mesma regra do alerting.py)
+    trajectories = pd.DataFrame({'ID_PRODUTO': produtos, 'DIA': days.astype('datetime64[D]'),
+                                 estoque_col: estoque})
+    if categorias is not None:
+        trajectories['CATEGORIA'] = categorias
+    priorities = engine.evaluate_trajectories(trajectories, estoque_col=estoque_col,
+                                              categoria_col='CATEGORIA' if categorias is not None else None)
+    rank = pd.Series(np.arange(len(priorities)), index=priorities['ID_PRODUTO'])
+    summary = priorities.set_index('ID_PRODUTO').reindex(product_ids)
+    nivel_atual = summary['NIVEL_ATUAL'].astype(str).to_numpy()
+    prioridade = summary['PRIORIDADE'].to_numpy()
+    ruptura = summary['DIAS_ATE_RUPTURA'].to_numpy(dtype=float)
+
+    jobs = []
+    charts = []
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        produto_id = product_ids[i]
+        nome = f"produtos/{produto_id}"
+        subtitulo = f"{nivel_atual[i]} · prioridade {prioridade[i]}"
+        if np.isfinite(ruptura[i]):
+            subtitulo += f" · ruptura em {ruptura[i]:g} dias"
+        job = {
+            'tipo': 'produto',
+            'nome': nome,
+            'titulo': f"Produto {produto_id} · {product_categories[i]}",
+            'subtitulo': subtitulo,
+            'x': x_all[start:end],
+            'rotulos': day_labels[day_index[start:end]].tolist(),
+            'estoque': estoque[start:end],
+            'niveis': levels[start:end],
+            'critico': float(critico[start]),
+            'alerta': float(alerta[start])
+        }
+        if has_interval:
+            job['inferior'] = low[start:end]
+            job['superior'] = high[start:end]
+        jobs.append(job)
+        charts.append(nome)
+
+    # Categorias: produtos por nível atual e, em cada dia, produtos por nível
+    cat_codes, cat_names = pd.factorize(product_categories, sort=True)
+    row_codes = np.repeat(cat_codes, ends - starts)
+    current = np.bincount(cat_codes * 3 + levels[starts], minlength=len(cat_names) * 3).reshape(-1, 3)
+    per_day = np.bincount((row_codes * len(unique_days) + day_index) * 3 + levels,
+                          minlength=len(cat_names) * len(unique_days) * 3).reshape(len(cat_names), -1, 3)
+    for code, categoria in enumerate(cat_names):
+        present = per_day[code].sum(axis=1) > 0
+        jobs.append({
+            'tipo': 'categoria',
+            'nome': f"categorias/{slugify(str(categoria))}",
+            'titulo': f"{categoria} · {int(current[code].sum())} produtos",
+            'atual': current[code],
+            'x': (unique_days[present] - unique_days[0]).astype(float),
+            'rotulos': day_labels[present].tolist(),
+            'por_dia': per_day[code][present]
+        })
+
+    produtos_table = pd.DataFrame({
+        'ID_PRODUTO': product_ids,
+        'CATEGORIA': product_categories,
+        'NIVEL_ATUAL': nivel_atual,
+        'DIAS_ATE_RUPTURA': ruptura,
+        'PRIORIDADE': prioridade,
+        'ACAO': summary['ACAO'].to_numpy(),
+        'GRAFICO': charts,
+        'GRAFICO_CATEGORIA': [f"categorias/{slugify(str(c))}" for c in product_categories]
+    })
+    produtos_table['_ordem'] = rank.reindex(product_ids).to_numpy()
+    produtos_table = produtos_table.sort_values('_ordem').drop(columns='_ordem').reset_index(drop=True)
+    return jobs, produtos_table
+
+
+def chart_hash(job: Dict[str, Any], formato: str, dpi: int) -> str:
+    """Hash do conteúdo do gráfico (dados, textos, formato e versão do template)"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{TEMPLATE_VERSION}|{formato}|{dpi}".encode())
+    for key in sorted(job):
+        value = job[key]
+        digest.update(key.encode())
+        if isinstance(value, np.ndarray):
+            digest.update(str(value.dtype).encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+class MatplotlibRenderer:
+    """
+    PNG com matplotlib (Agg): figuras montadas uma vez, dados trocados por gráfico
+    """
+
+    def __init__(self, dpi: int = 100):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.colors import to_rgba_array
+        from matplotlib.figure import Figure
+        from matplotlib.patches import Polygon, Rectangle
+
+        self.dpi = dpi
+        self._Polygon = Polygon
+        self._level_rgba = to_rgba_array(LEVEL_COLORS)
+
+        # Produto: zonas, faixa do intervalo, trajetória, pontos e limiares
+        fig = Figure(figsize=(8, 3.2))
+        FigureCanvasAgg(fig)
+        fig.subplots_adjust(left=0.08, right=0.98, top=0.86, bottom=0.12)
+        ax = fig.add_subplot(1, 1, 1)
+        self._style(ax)
+        zones = []
+        for color in LEVEL_COLORS:
+            zone = Rectangle((0, 0), 1, 0, transform=ax.get_yaxis_transform(),
+                             facecolor=color, alpha=0.12, linewidth=0)
+            ax.add_patch(zone)
+            zones.append(zone)
+        band = Polygon(np.zeros((2, 2)), closed=True, facecolor=COLORS['texto'], alpha=0.15, linewidth=0)
+        ax.add_patch(band)
+        line, = ax.plot([], [], color=COLORS['texto'], linewidth=1.8)
+        points = ax.scatter([], [], s=24, zorder=3, edgecolors='white', linewidths=0.8)
+        limits = [ax.axhline(0, color=COLORS[level], linestyle='--', linewidth=0.8) for level in ('CRITICO', 'ALERTA')]
+        ax.set_ylabel('Estoque previsto')
+        self.product = {
+            'fig': fig, 'ax': ax, 'zones': zones, 'band': band, 'line': line, 'points': points, 'limits': limits,
+            'title': fig.text(0.01, 0.97, '', ha='left', va='top', fontsize=11, color=COLORS['texto']),
+            'subtitle': fig.text(0.99, 0.97, '', ha='right', va='top', fontsize=9, color=COLORS['texto'])
+        }
+
+        # Categoria: barras por nível atual e área empilhada por dia
+        fig = Figure(figsize=(8, 3.2))
+        FigureCanvasAgg(fig)
+        fig.subplots_adjust(left=0.07, right=0.98, top=0.86, bottom=0.12, wspace=0.25)
+        grid = fig.add_gridspec(1, 2, width_ratios=[1, 2.4])
+        bars_ax = fig.add_subplot(grid[0])
+        area_ax = fig.add_subplot(grid[1])
+        for ax in (bars_ax, area_ax):
+            self._style(ax)
+        bars = bars_ax.bar(range(len(ALERT_LEVELS)), [0] * len(ALERT_LEVELS), color=LEVEL_COLORS)
+        bars_ax.set_xticks(range(len(ALERT_LEVELS)))
+        bars_ax.set_xticklabels(ALERT_LEVELS)
+        bars_ax.set_xlim(-0.6, len(ALERT_LEVELS) - 0.4)
+        labels = [bars_ax.text(i, 0, '', ha='center', va='bottom', fontsize=9, color=COLORS['texto'])
+                  for i in range(len(ALERT_LEVELS))]
+        # Empilhamento: CRITICO embaixo
+        areas = {}
+        for level in (2, 1, 0):
+            areas[level] = Polygon(np.zeros((2, 2)), closed=True, facecolor=LEVEL_COLORS[level],
+                                   alpha=0.85, linewidth=0)
+            area_ax.add_patch(areas[level])
+        area_ax.set_ylabel('Produtos')
+        self.category = {
+            'fig': fig, 'bars_ax': bars_ax, 'area_ax': area_ax, 'bars': list(bars), 'labels': labels, 'areas': areas,
+            'title': fig.text(0.01, 0.97, '', ha='left', va='top', fontsize=11, color=COLORS['texto'])
+        }
+
+    @staticmethod
+    def _style(ax):
+        ax.set_autoscale_on(False)
+        ax.grid(True, color=COLORS['grade'], linewidth=0.8)
+        ax.set_axisbelow(True)
+        ax.tick_params(colors=COLORS['texto'], labelsize=8)
+        for spine in ax.spines.values():
+            spine.set_color(COLORS['grade'])
+
+    @staticmethod
+    def _ticks(ax, x: np.ndarray, labels: List[str]):
+        ticks = tick_positions(len(x))
+        ax.set_xticks(x[ticks])
+        ax.set_xticklabels([labels[i] for i in ticks])
+
+    def render(self, job: Dict[str, Any], path: str):
+        if job['tipo'] == 'produto':
+            self._render_product(job)
+            fig = self.product['fig']
+        else:
+            self._render_category(job)
+            fig = self.category['fig']
+        fig.savefig(path, dpi=self.dpi, format='png', facecolor='white')
+
+    def _render_product(self, job: Dict[str, Any]):
+        t = self.product
+        x, y, niveis = job['x'], job['estoque'], job['niveis']
+        critico, alerta = job['critico'], job['alerta']
+        top = max(float(y.max()), float(job['superior'].max()) if 'superior' in job else 0.0, alerta) * 1.15 + 1
+
+        # Zonas: NORMAL acima do alerta, ALERTA entre os limiares, CRITICO até o crítico
+        for zone, (bottom, upper) in zip(t['zones'], ((alerta, top), (critico, alerta), (0, critico))):
+            zone.set_y(bottom)
+            zone.set_height(max(upper - bottom, 0))
+        if 'superior' in job:
+            bx, blow, bhigh = widen(x, job['inferior'], job['superior'])
+            t['band'].set_xy(np.column_stack([np.r_[bx, bx[::-1]], np.r_[blow, bhigh[::-1]]]))
+            t['band'].set_visible(True)
+        else:
+            t['band'].set_visible(False)
+        t['line'].set_data(x, y)
+        t['points'].set_offsets(np.column_stack([x, y]))
+        t['points'].set_facecolor(self._level_rgba[niveis])
+        for limit, value in zip(t['limits'], (critico, alerta)):
+            limit.set_ydata([value, value])
+
+        ax = t['ax']
+        ax.set_xlim(x.min() - 0.5, x.max() + 0.5)
+        ax.set_ylim(0, top)
+        self._ticks(ax, x, job['rotulos'])
+        t['title'].set_text(job['titulo'])
+        t['subtitle'].set_text(job['subtitulo'])
+
+    def _render_category(self, job: Dict[str, Any]):
+        t = self.category
+        atual = job['atual']
+        for i, (bar, label) in enumerate(zip(t['bars'], t['labels'])):
+            bar.set_height(atual[i])
+            label.set_position((i, atual[i]))
+            label.set_text(str(int(atual[i])))
+        t['bars_ax'].set_ylim(0, max(int(atual.max()), 1) * 1.2)
+
+        x, por_dia = job['x'], job['por_dia']
+        if len(x):
+            x, por_dia = widen(x, por_dia)
+            order = [2, 1, 0]
+            stacked = np.cumsum(por_dia[:, order], axis=1)
+            below = np.column_stack([np.zeros(len(x)), stacked[:, :-1]])
+            for k, level in enumerate(order):
+                t['areas'][level].set_xy(np.column_stack([np.r_[x, x[::-1]],
+                                                          np.r_[stacked[:, k], below[::-1, k]]]))
+            t['area_ax'].set_xlim(x.min(), x.max())
+            t['area_ax'].set_ylim(0, max(int(stacked[:, -1].max()), 1) * 1.1)
+            self._ticks(t['area_ax'], job['x'], job['rotulos'])
+        else:
+            for area in t['areas'].values():
+                area.set_xy(np.zeros((2, 2)))
+        t['title'].set_text(job['titulo'])
+
+
+class SvgRenderer:
+    """
+    SVG direto de templates de texto (sem dependências)
+    """
+    WIDTH, HEIGHT = 800, 320
+    HEADER = ('<svg xmlns="http://www.w3.org/2000/svg" width="{w}" height="{h}" viewBox="0 0 {w} {h}" '
+              'font-family="sans-serif" font-size="11" fill="{texto}">\n'
+              '<rect width="{w}" height="{h}" fill="#FFFFFF"/>\n')
+    RECT = ('<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" '
+            'fill="{cor}" fill-opacity="{opacidade}"/>\n')
+    LINE = ('<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
+            'stroke="{cor}" stroke-width="{largura}"{extra}/>\n')
+    POLYGON = '<polygon points="{pontos}" fill="{cor}" fill-opacity="{opacidade}"/>\n'
+    POLYLINE = '<polyline points="{pontos}" fill="none" stroke="{cor}" stroke-width="1.8"/>\n'
+    CIRCLE = '<circle cx="{x:.1f}" cy="{y:.1f}" r="3.5" fill="{cor}" stroke="#FFFFFF"/>\n'
+    TEXT = '<text x="{x:.1f}" y="{y:.1f}" text-anchor="{ancora}"{extra}>{texto}</text>\n'
+    FOOTER = '</svg>\n'
+
+    def __init__(self, dpi: int = 100):
+        self.header = self.HEADER.format(w=self.WIDTH, h=self.HEIGHT, texto=COLORS['texto'])
+
+    @staticmethod
+    def _points(x: np.ndarray, y: np.ndarray) -> str:
+        return ' '.join(f"{a:.1f},{b:.1f}" for a, b in zip(x.tolist(), y.tolist()))
+
+    def _axes(self, parts: List[str], left: float, right: float, top: float, bottom: float,
+              ymax: float, x_px: np.ndarray, labels: List[str]):
+        """Grade horizontal, rótulos do eixo y e do eixo x"""
+        for value in nice_ticks(ymax):
+            if value > ymax:
+                break
+            y = bottom - value / ymax * (bottom - top)
+            parts.append(self.LINE.format(x1=left, y1=y, x2=right, y2=y, cor=COLORS['grade'], largura=0.8, extra=''))
+            parts.append(self.TEXT.format(x=left - 6, y=y + 4, ancora='end', extra=' font-size="9"',
+                                          texto=f"{value:g}"))
+        for i in tick_positions(len(x_px)):
+            parts.append(self.TEXT.format(x=x_px[i], y=bottom + 16, ancora='middle', extra=' font-size="9"',
+                                          texto=html.escape(labels[i])))
+
+    def render(self, job: Dict[str, Any], path: str):
+        parts = [self.header]
+        if job['tipo'] == 'produto':
+            self._render_product(job, parts)
+        else:
+            self._render_category(job, parts)
+        parts.append(self.FOOTER)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+
+    def _render_product(self, job: Dict[str, Any], parts: List[str]):
+        left, right, top, bottom = 56.0, self.WIDTH - 16.0, 40.0, self.HEIGHT - 32.0
+        x, y, niveis = job['x'], job['estoque'], job['niveis']
+        critico, alerta = job['critico'], job['alerta']
+        ymax = max(float(y.max()), float(job['superior'].max()) if 'superior' in job else 0.0, alerta) * 1.15 + 1
+        xmin, xmax = x.min() - 0.5, x.max() + 0.5
+
+        def sx(values):
+            return left + (np.asarray(values, dtype=float) - xmin) / (xmax - xmin) * (right - left)
+
+        def sy(values):
+            return bottom - np.clip(np.asarray(values, dtype=float), 0, ymax) / ymax * (bottom - top)
+
+        for level, (low, high) in zip(ALERT_LEVELS, ((alerta, ymax), (critico, alerta), (0, critico))):
+            y_top, y_bottom = float(sy(high)), float(sy(low))
+            parts.append(self.RECT.format(x=left, y=y_top, w=right - left, h=max(y_bottom - y_top, 0),
+                                          cor=COLORS[level], opacidade=0.12))
+        x_px = sx(x)
+        self._axes(parts, left, right, top, bottom, ymax, x_px, job['rotulos'])
+        if 'superior' in job:
+            bx, blow, bhigh = widen(x, job['inferior'], job['superior'])
+            parts.append(self.POLYGON.format(pontos=self._points(sx(np.r_[bx, bx[::-1]]),
+                                                                 sy(np.r_[blow, bhigh[::-1]])),
+                                             cor=COLORS['texto'], opacidade=0.15))
+        for level, value in (('CRITICO', critico), ('ALERTA', alerta)):
+            y_line = float(sy(value))
+            parts.append(self.LINE.format(x1=left, y1=y_line, x2=right, y2=y_line, cor=COLORS[level], largura=0.8,
+                                          extra=' stroke-dasharray="4 3"'))
+        y_px = sy(y)
+        parts.append(self.POLYLINE.format(pontos=self._points(x_px, y_px), cor=COLORS['texto']))
+        for a, b, level in zip(x_px.tolist(), y_px.tolist(), niveis.tolist()):
+            parts.append(self.CIRCLE.format(x=a, y=b, cor=LEVEL_COLORS[level]))
+        parts.append(self.TEXT.format(x=8, y=20, ancora='start', extra=' font-size="13"',
+                                      texto=html.escape(job['titulo'])))
+        parts.append(self.TEXT.format(x=self.WIDTH - 8, y=20, ancora='end', extra='',
+                                      texto=html.escape(job['subtitulo'])))
+
+    def _render_category(self, job: Dict[str, Any], parts: List[str]):
+        top, bottom = 40.0, self.HEIGHT - 32.0
+        atual = job['atual']
+        left, right = 56.0, 250.0
+        ymax = max(int(atual.max()), 1) * 1.2
+        slot = (right - left) / len(ALERT_LEVELS)
+        self._axes(parts, left, right, top, bottom, ymax, np.array([]), [])
+        for i, level in enumerate(ALERT_LEVELS):
+            height = atual[i] / ymax * (bottom - top)
+            x = left + slot * i + slot * 0.15
+            parts.append(self.RECT.format(x=x, y=bottom - height, w=slot * 0.7, h=height, cor=COLORS[level],
+                                          opacidade=1))
+            parts.append(self.TEXT.format(x=x + slot * 0.35, y=bottom - height - 4, ancora='middle',
+                                          extra=' font-size="9"', texto=int(atual[i])))
+            parts.append(self.TEXT.format(x=x + slot * 0.35, y=bottom + 16, ancora='middle',
+                                          extra=' font-size="9"', texto=level))
+
+        x, por_dia = job['x'], job['por_dia']
+        if len(x):
+            left, right = 310.0, self.WIDTH - 16.0
+            wx, wpor_dia = widen(x, por_dia)
+            order = [2, 1, 0]
+            stacked = np.cumsum(wpor_dia[:, order], axis=1)
+            below = np.column_stack([np.zeros(len(wx)), stacked[:, :-1]])
+            ymax = max(int(stacked[:, -1].max()), 1) * 1.1
+            xmin, xmax = wx.min(), wx.max()
+            span = (xmax - xmin) or 1.0
+
+            def sx(values):
+                return left + (np.asarray(values, dtype=float) - xmin) / span * (right - left)
+
+            def sy(values):
+                return bottom - np.asarray(values, dtype=float) / ymax * (bottom - top)
+
+            self._axes(parts, left, right, top, bottom, ymax, sx(x), job['rotulos'])
+            for k, level in enumerate(order):
+                parts.append(self.POLYGON.format(
+                    pontos=self._points(sx(np.r_[wx, wx[::-1]]), sy(np.r_[stacked[:, k], below[::-1, k]])),
+                    cor=LEVEL_COLORS[level], opacidade=0.85))
+        parts.append(self.TEXT.format(x=8, y=20, ancora='start', extra=' font-size="13"',
+                                      texto=html.escape(job['titulo'])))
+
+
+def make_renderer(formato: str, dpi: int = 100):
+    return MatplotlibRenderer(dpi) if formato == 'png' else SvgRenderer(dpi)
+
+
+# Estado de cada worker do pool: o renderer (e suas figuras) é montado uma vez
+_RENDERER = None
+_OUTPUT = None
+
+
+def _init_worker(output_dir: str, formato: str, dpi: int):
+    global _RENDERER, _OUTPUT
+    _RENDERER = make_renderer(formato, dpi)
+    _OUTPUT = (Path(output_dir), formato)
+
+
+def _render_batch(jobs: List[Dict[str, Any]]) -> List[Tuple[str, Optional[str]]]:
+    """Desenha um lote; (nome, erro) por gráfico, erro None quando deu certo"""
+    output_dir, formato = _OUTPUT
+    done = []
+    for job in jobs:
+        path = output_dir / f"{job['nome']}.{formato}"
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            _RENDERER.render(job, str(tmp_path))
+            # Troca atômica: o índice nunca aponta para um arquivo pela metade
+            os.replace(tmp_path, path)
+            done.append((job['nome'], None))
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            done.append((job['nome'], str(e)))
+    return done
+
+
+class AlertChartPipeline:
+    """
+    Desenho incremental dos gráficos de alerta em um diretório de saída
+    """
+
+    def __init__(self, output_dir: str, formato: str = 'auto', dpi: int = 100, workers: Optional[int] = None):
+        """
+        Args:
+            output_dir: Diretório dos gráficos, do índice e do cache (graficos.json)
+            formato: 'png' (matplotlib), 'svg' ou 'auto' (png se houver matplotlib)
+            dpi: Resolução dos PNG
+            workers: Processos de desenho (padrão: número de CPUs)
+        """
+        self.output_dir = Path(output_dir)
+        self.formato = resolve_format(formato)
+        self.dpi = dpi
+        self.workers = max(1, workers or os.cpu_count() or 1)
+
+    def load_cache(self) -> Dict[str, str]:
+        path = self.output_dir / CACHE_MANIFEST
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f).get('graficos', {})
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save_cache(self, hashes: Dict[str, str]):
+        path = self.output_dir / CACHE_MANIFEST
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'versao': TEMPLATE_VERSION, 'formato': self.formato, 'graficos': hashes}, f)
+        os.replace(tmp_path, path)
+
+    def path_for(self, nome: str) -> Path:
+        return self.output_dir / f"{nome}.{self.formato}"
+
+    def render(self, jobs: List[Dict[str, Any]], force: bool = False) -> Dict[str, Any]:
+        """
+        Desenha os gráficos novos ou alterados
+
+        Returns:
+            total, desenhados, em_cache, erros (nome -> mensagem) e hashes (nome -> hash)
+        """
+        for folder in ('produtos', 'categorias'):
+            (self.output_dir / folder).mkdir(parents=True, exist_ok=True)
+        previous = {} if force else self.load_cache()
+        hashes = {job['nome']: chart_hash(job, self.formato, self.dpi) for job in jobs}
+        pending = [job for job in jobs
+                   if previous.get(job['nome']) != hashes[job['nome']] or not self.path_for(job['nome']).exists()]
+
+        errors = {}
+        if pending:
+            workers = min(self.workers, math.ceil(len(pending) / BATCH_SIZE))
+            size = max(1, min(BATCH_SIZE, math.ceil(len(pending) / (workers * 4))))
+            batches = [pending[i:i + size] for i in range(0, len(pending), size)]
+            initargs = (str(self.output_dir), self.formato, self.dpi)
+            if workers <= 1:
+                _init_worker(*initargs)
+                results = map(_render_batch, batches)
+                for done in results:
+                    errors.update({nome: erro for nome, erro in done if erro})
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+                    for done in pool.map(_render_batch, batches):
+                        errors.update({nome: erro for nome, erro in done if erro})
+
+        # Gráficos de produtos/categorias que saíram das trajetórias
+        for nome in set(previous) - set(hashes):
+            self.path_for(nome).unlink(missing_ok=True)
+        for nome in errors:
+            hashes.pop(nome)
+        self.save_cache(hashes)
+        return {
+            'total': len(jobs),
+            'desenhados': len(pending) - len(errors),
+            'em_cache': len(jobs) - len(pending),
+            'erros': errors,
+            'hashes': hashes
+        }
+
+    def write_index(self, produtos: pd.DataFrame, hashes: Dict[str, str]) -> Path:
+        """index.html estático: resumo, uma seção por categoria e produtos por prioridade"""
+        def img(nome, alt):
+            # ?v=hash: o navegador recarrega só os gráficos que mudaram
+            return (f'<img src="{html.escape(nome)}.{self.formato}?v={hashes.get(nome, "")[:8]}" '
+                    f'alt="{html.escape(alt)}" loading="lazy">')
+
+        counts = produtos['NIVEL_ATUAL'].astype(str).value_counts()
+        categories = sorted(produtos['CATEGORIA'].astype(str).unique())
+        parts = [
+            '<!DOCTYPE html>\n<html lang="pt-BR">\n<head>\n<meta charset="utf-8">\n',
+            '<title>Alertas de estoque</title>\n<style>\n',
+            f"body{{font-family:sans-serif;color:{COLORS['texto']};margin:24px}}\n",
+            'figure{display:inline-block;margin:6px;width:400px}img{width:100%}\n',
+            'figcaption{font-size:12px}section>img{width:800px;max-width:100%}\n',
+            ''.join(f".{level}{{border-left:4px solid {COLORS[level]};padding-left:6px}}\n" for level in ALERT_LEVELS),
+            '</style>\n</head>\n<body>\n',
+            '<h1>Alertas de estoque</h1>\n',
+            f"<p>{len(produtos)} produtos · " + ' · '.join(
+                f'<span class="{level}">{level}: {int(counts.get(level, 0))}</span>' for level in ALERT_LEVELS[::-1])
+            + f" · gerado em {datetime.now().strftime('%d/%m/%Y %H:%M')}</p>\n",
+            '<nav>' + ' | '.join(f'<a href="#{slugify(c)}">{html.escape(c)}</a>' for c in categories) + '</nav>\n'
+        ]
+        for categoria, group in produtos.groupby(produtos['CATEGORIA'].astype(str), sort=True):
+            parts.append(f'<section id="{slugify(categoria)}">\n<h2>{html.escape(categoria)}</h2>\n')
+            parts.append(img(group['GRAFICO_CATEGORIA'].iloc[0], categoria) + '\n')
+            for row in group.itertuples(index=False):
+                acao = '' if row.PRIORIDADE == 0 else f" · {row.ACAO}"
+                parts.append(f'<figure class="{row.NIVEL_ATUAL}">{img(row.GRAFICO, f"Produto {row.ID_PRODUTO}")}'
+                             f'<figcaption>Produto {row.ID_PRODUTO} · {row.NIVEL_ATUAL}{html.escape(acao)}'
+                             '</figcaption></figure>\n')
+            parts.append('</section>\n')
+        parts.append('</body>\n</html>\n')
+
+        path = self.output_dir / INDEX_FILE
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+        os.replace(tmp_path, path)
+        return path
+
+    def run(self, df: pd.DataFrame, engine: Optional[AlertEngine] = None, catalog=None,
+            force: bool = False) -> Dict[str, Any]:
+        """Trabalhos, gráficos alterados e índice a partir das trajetórias"""
+        jobs, produtos = build_jobs(df, engine, catalog)
+        stats = self.render(jobs, force=force)
+        stats['indice'] = str(self.write_index(produtos, stats['hashes']))
+        stats['produtos'] = produtos
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gráficos de alerta por produto e categoria com índice HTML')
+    parser.add_argument('input', help='Trajetórias (ID_PRODUTO, DIA ou HORIZONTE, PREVISAO_ESTOQUE; '
+                                      'INTERVALO_INFERIOR/SUPERIOR e CATEGORIA opcionais); CSV ou Parquet')
+    parser.add_argument('--output', '-o', default='graficos', help='Diretório de saída (padrão: graficos)')
+    parser.add_argument('--catalogo', help='Catálogo de produtos (CATEGORIA e limiares CRITICO/ALERTA)')
+    parser.add_argument('--formato', choices=FORMATS, default='auto',
+                        help='png (matplotlib), svg ou auto (png se houver matplotlib)')
+    parser.add_argument('--dpi', type=int, default=100, help='Resolução dos PNG (padrão: 100)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Processos de desenho (padrão: número de CPUs)')
+    parser.add_argument('--force', action='store_true', help='Redesenha tudo, ignorando o cache')
+    args = parser.parse_args()
+
+    try:
+        start = time.perf_counter()
+        df = pd.read_parquet(args.input) if args.input.endswith('.parquet') else \
+            pd.read_csv(args.input, encoding='utf-8-sig')
+        catalog = load_catalog(args.catalogo) if args.catalogo else None
+        pipeline = AlertChartPipeline(args.output, args.formato, args.dpi, args.workers)
+        stats = pipeline.run(df, catalog=catalog, force=args.force)
+
+        print(f"\n🖼️  {stats['total']} gráficos ({pipeline.formato}): {stats['desenhados']} desenhados, "
+              f"{stats['em_cache']} sem mudanças ({time.perf_counter() - start:.2f}s, {pipeline.workers} workers)")
+        for nome, erro in list(stats['erros'].items())[:10]:
+            print(f"   ❌ {nome}: {erro}")
+        print(f"📄 Índice: {stats['indice']}")
+        return 1 if stats['erros'] else 0
+    except Exception as e:
+        print(f"\n❌ Erro: {str(e)}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
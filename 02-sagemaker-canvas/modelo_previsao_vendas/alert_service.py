@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Serviço incremental de alertas orientado a eventos
+
+Mantém em memória o estado de cada produto (último estoque, consumos recentes,
+última previsão e nível de alerta atual) e processa um fluxo de leituras
+(ID_PRODUTO, DIA, QUANTIDADE_ESTOQUE, FLAG_PROMOCAO). A cada evento apenas o
+produto afetado é reprevisto, e um alerta é emitido somente quando o nível
+muda (ex.: NORMAL -> ALERTA, ALERTA -> CRITICO, CRITICO -> NORMAL após reposição).
+
+Fontes de eventos:
+- arquivo CSV (com cabeçalho), opcionalmente acompanhando novas linhas (--follow)
+- fila local (queue.Queue), para integração em processo
+
+Uso:
+    python alert_service.py eventos.csv --follow --output alertas.jsonl
+"""
+import argparse
+import json
+import queue
+import sys
+import time
+from collections import deque
+from datetime import date
+from typing import Callable, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from alerting import ALERT_LEVELS, RECOMMENDATIONS, AlertEngine
+from model_predictor import ModelPredictor
+
+Event = Tuple[int, str, float, int]
+
+
+class ProductState:
+    """Estado incremental de um produto"""
+
+    __slots__ = ('last_day', 'last_stock', 'lags', 'base_demand', 'critico', 'alerta',
+                 'forecast', 'level', 'dias_ate_ruptura')
+
+    def __init__(self, base_demand: float, critico: float, alerta: float, max_lags: int):
+        self.last_day = None
+        self.last_stock = None
+        self.lags = deque(maxlen=max_lags)
+        self.base_demand = base_demand
+        self.critico = critico
+        self.alerta = alerta
+        self.forecast = None
+        self.level = 0
+        self.dias_ate_ruptura = None
+
+
+class IncrementalAlertService:
+    """
+    Reavaliação de alertas evento a evento, com custo O(1) por leitura
+    """
+
+    def __init__(self, predictor: Optional[ModelPredictor] = None,
+                 alert_engine: Optional[AlertEngine] = None, max_lags: int = 7):
+        """
+        Args:
+            predictor: Preditor com a demanda base por produto e fator de promoção
+            alert_engine: Limiares de alerta (por produto/categoria ou padrão)
+            max_lags: Número de consumos diários recentes usados na previsão
+        """
+        self.predictor = predictor or ModelPredictor()
+        self.alert_engine = alert_engine or self.predictor.alert_engine
+        self.max_lags = max_lags
+        self.promo_factor = float(self.predictor.params['fator_promocao'])
+        self.states: Dict[int, ProductState] = {}
+        self._day_cache: Dict[str, int] = {}
+
+        self.events = 0
+        self.alerts = 0
+        self.discarded = 0
+        self.rejected = 0
+
+    def _state(self, produto_id: int) -> ProductState:
+        state = self.states.get(produto_id)
+        if state is None:
+            # Demanda base e limiares do produto são buscados uma única vez
+            ids = [produto_id]
+            critico, alerta = self.alert_engine.row_thresholds(ids, n=1)
+            state = ProductState(float(self.predictor.demanda_base(ids)[0]),
+                                 float(critico[0]), float(alerta[0]), self.max_lags)
+            self.states[produto_id] = state
+        return state
+
+    def _day(self, dia: str) -> int:
+        """Converte dd/mm/aaaa (ou aaaa-mm-dd) em número do dia, com cache"""
+        day = self._day_cache.get(dia)
+        if day is None:
+            if '/' in dia:
+                d, m, y = dia.split('/')
+            else:
+                y, m, d = dia[:10].split('-')
+            day = self._day_cache[dia] = date(int(y), int(m), int(d)).toordinal()
+        return day
+
+    def process(self, produto_id: int, dia: str, estoque: float, flag_promocao: int) -> Optional[Dict]:
+        """
+        Processa uma leitura de estoque
+
+        Returns:
+            Alerta (dict) se o nível do produto mudou; None caso contrário
+        """
+        day = self._day(dia)
+        self.events += 1
+        state = self._state(produto_id)
+
+        if state.last_day is not None:
+            if day < state.last_day:
+                # Leitura atrasada: o estado já reflete uma data posterior
+                self.discarded += 1
+                return None
+            if day > state.last_day and estoque <= state.last_stock:
+                consumo = (state.last_stock - estoque) / (day - state.last_day)
+                state.lags.append(consumo / self.promo_factor if flag_promocao else consumo)
+
+        state.last_day = day
+        state.last_stock = estoque
+
+        # Previsão do próximo dia só para este produto
+        base = sum(state.lags) / len(state.lags) if state.lags else state.base_demand
+        demanda = base * self.promo_factor if flag_promocao else base
+        forecast = estoque - demanda if estoque > demanda else 0.0
+        state.forecast = forecast
+        state.dias_ate_ruptura = estoque / demanda if demanda > 0 else None
+
+        level = AlertEngine.code_for(forecast, state.critico, state.alerta)
+        if level == state.level:
+            return None
+
+        previous, state.level = state.level, level
+        self.alerts += 1
+        return {
+            'produto_id': produto_id,
+            'dia': dia,
+            'nivel_anterior': str(ALERT_LEVELS[previous]),
+            'nivel': str(ALERT_LEVELS[level]),
+            'estoque_atual': estoque,
+            'estoque_previsto': round(forecast, 1),
+            'demanda_prevista': round(demanda, 1),
+            'dias_ate_ruptura': round(state.dias_ate_ruptura, 1) if state.dias_ate_ruptura is not None else None,
+            'recommendation': str(RECOMMENDATIONS[level])
+        }
+
+    def run(self, events: Iterable[Event], sink: TextIO) -> Dict:
+        """Consome o fluxo de eventos e escreve os alertas em JSON lines"""
+        start = time.perf_counter()
+        for produto_id, dia, estoque, flag in events:
+            try:
+                alert = self.process(produto_id, dia, estoque, flag)
+            except ValueError as e:
+                # Data inválida: o evento é rejeitado e o fluxo continua
+                self.reject(f"{produto_id},{dia},{estoque},{flag}", e)
+                continue
+            if alert is not None:
+                sink.write(json.dumps(alert, ensure_ascii=False) + '\n')
+                sink.flush()
+        return self.stats(time.perf_counter() - start)
+
+    def reject(self, line: str, error: Exception):
+        """Conta (e avisa em stderr) uma linha que não pôde ser interpretada"""
+        self.rejected += 1
+        print(f"⚠️  Linha rejeitada ({error}): {line.strip()!r}", file=sys.stderr)
+
+    def stats(self, elapsed: float = 0.0) -> Dict:
+        return {
+            'eventos': self.events,
+            'alertas': self.alerts,
+            'descartados': self.discarded,
+            'rejeitados': self.rejected,
+            'produtos': len(self.states),
+            'eventos_por_segundo': round(self.events / elapsed, 1) if elapsed > 0 else None
+        }
+
+    def snapshot(self) -> Dict[int, Dict]:
+        """Estado atual por produto (nível, última previsão e estoque)"""
+        return {
+            produto_id: {
+                'nivel': str(ALERT_LEVELS[state.level]),
+                'estoque_atual': state.last_stock,
+                'estoque_previsto': state.forecast,
+                'dias_ate_ruptura': state.dias_ate_ruptura
+            }
+            for produto_id, state in self.states.items()
+        }
+
+
+def tail_csv(path: str, follow: bool = False, poll_interval: float = 0.2,
+             on_reject: Optional[Callable[[str, Exception], None]] = None) -> Iterator[Event]:
+    """
+    Lê eventos de um CSV com cabeçalho ID_PRODUTO, DIA, QUANTIDADE_ESTOQUE, FLAG_PROMOCAO
+    (colunas em qualquer ordem); com follow=True aguarda novas linhas como `tail -f`.
+    Linhas malformadas são passadas a on_reject (ex.: IncrementalAlertService.reject)
+    e a leitura continua.
+    """
+    with open(path, encoding='utf-8-sig') as f:
+        header = f.readline().strip().split(',')
+        idx = [header.index(col) for col in ('ID_PRODUTO', 'DIA', 'QUANTIDADE_ESTOQUE', 'FLAG_PROMOCAO')]
+        pending = ''
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+                continue
+            line, pending = pending + line, ''
+            if follow and not line.endswith('\n'):
+                # Linha ainda sendo escrita: guarda o trecho e espera o restante
+                pending = line
+                continue
+            if not line.strip():
+                continue
+            fields = line.rstrip('\r\n').split(',')
+            try:
+                event = int(fields[idx[0]]), fields[idx[1]], float(fields[idx[2]]), int(fields[idx[3]])
+            except (ValueError, IndexError) as e:
+                if on_reject is not None:
+                    on_reject(line, e)
+                continue
+            yield event
+
+
+def queue_events(events: 'queue.Queue') -> Iterator[Event]:
+    """Consome eventos de uma fila local até receber None"""
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield event
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serviço incremental de alertas de estoque')
+    parser.add_argument('events', help='CSV de eventos (ID_PRODUTO, DIA, QUANTIDADE_ESTOQUE, FLAG_PROMOCAO)')
+    parser.add_argument('--follow', '-f', action='store_true', help='Acompanha novas linhas do arquivo')
+    parser.add_argument('--output', '-o', help='Arquivo JSON lines de alertas (padrão: stdout)')
+    parser.add_argument('--model', help='Arquivo JSON de parâmetros do modelo')
+    args = parser.parse_args()
+
+    service = IncrementalAlertService(ModelPredictor(args.model))
+    sink = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    try:
+        stats = service.run(tail_csv(args.events, follow=args.follow, on_reject=service.reject), sink)
+        print(json.dumps(stats, ensure_ascii=False), file=sys.stderr)
+    except KeyboardInterrupt:
+        print(json.dumps(service.stats(), ensure_ascii=False), file=sys.stderr)
+    finally:
+        if args.output:
+            sink.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
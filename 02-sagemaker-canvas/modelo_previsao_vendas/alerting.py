@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Motor de alertas vetorizado para tabelas de previsão de estoque
+
+Funcionalidades:
+- Nível de alerta (NORMAL/ALERTA/CRITICO) por limiares vetorizados,
+  configuráveis por produto, por categoria ou pelo catálogo de produtos
+- Dias até ruptura a partir das trajetórias de previsão (ex.: 7 dias por produto)
+- Lista priorizada por produto (PRIORIDADE 1/2/3, como em padroes_identificados.md)
+- Resumo de alertas equivalente a EstoquePredictionClient.get_alerts_summary,
+  opcionalmente por categoria, região ou outro nível (hierarchy.py)
+
+Todas as operações usam arrays ordenados por (produto, dia); não há laços
+Python por produto ou por registro.
+
+Uso:
+    python alerting.py ../../03-resultados/previsoes_estoque.csv --output alertas.csv
+"""
+import argparse
+import sys
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from product_catalog import load_catalog
+
+# Faixas de estoque previsto (mesmas de DataValidator.generate_summary)
+ALERT_THRESHOLDS = {'critico': 20, 'alerta': 50}
+ALERT_LEVELS = np.array(['NORMAL', 'ALERTA', 'CRITICO'])
+RECOMMENDATIONS = np.array(['Monitorar diariamente', 'Reabastecer em 24h', 'Reabastecer URGENTE'])
+
+# Dtypes prontos: from_codes com categories= revalida as categorias a cada chamada
+ALERT_LEVEL_DTYPE = pd.CategoricalDtype(ALERT_LEVELS)
+RECOMMENDATION_DTYPE = pd.CategoricalDtype(RECOMMENDATIONS)
+PRIORITY_ACTIONS = {
+    1: 'Reabastecer URGENTE',
+    2: 'Reabastecer em 24h',
+    3: 'Monitorar diariamente',
+    0: 'Sem ação'
+}
+
+
+class AlertEngine:
+    """
+    Classificação de alertas e priorização sobre tabelas colunares
+    """
+
+    def __init__(
+        self,
+        critico: float = ALERT_THRESHOLDS['critico'],
+        alerta: float = ALERT_THRESHOLDS['alerta'],
+        product_thresholds: Optional[pd.DataFrame] = None,
+        category_thresholds: Optional[pd.DataFrame] = None,
+        urgent_days: float = 7,
+        catalog=None
+    ):
+        """
+        Args:
+            critico: Estoque previsto até este valor é CRITICO
+            alerta: Estoque previsto até este valor é ALERTA
+            product_thresholds: DataFrame ID_PRODUTO, CRITICO, ALERTA (sobrepõe categoria)
+            category_thresholds: DataFrame CATEGORIA, CRITICO, ALERTA
+            urgent_days: Ruptura prevista até este número de dias eleva a prioridade
+            catalog: ProductCatalog (product_catalog.py); CRITICO/ALERTA do catálogo valem como
+                limiares por produto e CATEGORIA resolve a categoria quando ela não é informada
+        """
+        self.critico = float(critico)
+        self.alerta = float(alerta)
+        self.urgent_days = float(urgent_days)
+
+        self.catalog = catalog
+        self._product_ids = np.array([], dtype=np.int64)
+        if product_thresholds is None and catalog is not None and {'CRITICO', 'ALERTA'} <= set(catalog.columns):
+            product_thresholds = catalog.frame(['CRITICO', 'ALERTA']).dropna()
+        if product_thresholds is not None and len(product_thresholds):
+            table = product_thresholds.sort_values('ID_PRODUTO')
+            self._product_ids = table['ID_PRODUTO'].to_numpy(dtype=np.int64)
+            self._product_limits = table[['CRITICO', 'ALERTA']].to_numpy(dtype=float)
+
+        self._category_limits = None
+        if category_thresholds is not None and len(category_thresholds):
+            self._category_limits = category_thresholds.set_index('CATEGORIA')[['CRITICO', 'ALERTA']].astype(float)
+
+    def row_thresholds(
+        self,
+        produto_ids: Optional[np.ndarray],
+        categorias: Optional[np.ndarray] = None,
+        n: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Limiares (critico, alerta) de cada linha: produto > categoria > padrão"""
+        n = n if n is not None else len(produto_ids)
+        critico = np.full(n, self.critico)
+        alerta = np.full(n, self.alerta)
+
+        if (self._category_limits is not None and categorias is None and produto_ids is not None
+                and self.catalog is not None and 'CATEGORIA' in self.catalog.columns):
+            categorias = np.asarray(self.catalog.lookup(produto_ids, 'CATEGORIA'), dtype=object)
+
+        if self._category_limits is not None and categorias is not None:
+            codes = self._category_limits.index.get_indexer(np.asarray(categorias))
+            found = codes >= 0
+            critico[found] = self._category_limits['CRITICO'].to_numpy()[codes[found]]
+            alerta[found] = self._category_limits['ALERTA'].to_numpy()[codes[found]]
+
+        if len(self._product_ids) and produto_ids is not None:
+            ids = np.asarray(produto_ids, dtype=np.int64)
+            pos = np.clip(np.searchsorted(self._product_ids, ids), 0, len(self._product_ids) - 1)
+            found = self._product_ids[pos] == ids
+            critico[found] = self._product_limits[pos[found], 0]
+            alerta[found] = self._product_limits[pos[found], 1]
+
+        return critico, alerta
+
+    def level_codes(
+        self,
+        estoque: np.ndarray,
+        produto_ids: Optional[np.ndarray] = None,
+        categorias: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Código do nível por linha: 0 = NORMAL, 1 = ALERTA, 2 = CRITICO"""
+        estoque = np.asarray(estoque, dtype=float)
+        critico, alerta = self.thresholds(produto_ids, categorias, n=len(estoque))
+        return self.codes_for(estoque, critico, alerta)
+
+    def thresholds(
+        self,
+        produto_ids: Optional[np.ndarray] = None,
+        categorias: Optional[np.ndarray] = None,
+        n: Optional[int] = None
+    ):
+        """Limiares (critico, alerta): escalares sem limites por produto/categoria, senão por linha"""
+        if not len(self._product_ids) and self._category_limits is None:
+            return self.critico, self.alerta
+        return self.row_thresholds(produto_ids, categorias, n=n)
+
+    @staticmethod
+    def codes_for(estoque: np.ndarray, critico, alerta) -> np.ndarray:
+        """Código do nível para limiares já resolvidos (ver thresholds)"""
+        return (estoque <= alerta).astype(np.int8) + (estoque <= critico).astype(np.int8)
+
+    @staticmethod
+    def code_for(estoque: float, critico: float, alerta: float) -> int:
+        """Versão escalar de codes_for (mesmos limites <=), para um evento por vez"""
+        return int(estoque <= alerta) + int(estoque <= critico)
+
+    def classify(
+        self,
+        df: pd.DataFrame,
+        estoque_col: str = 'PREVISAO_ESTOQUE',
+        produto_col: str = 'ID_PRODUTO',
+        categoria_col: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Adiciona NIVEL_ALERTA e RECOMENDACAO a uma tabela de previsões"""
+        codes = self.level_codes(
+            df[estoque_col].to_numpy(),
+            df[produto_col].to_numpy() if produto_col in df.columns else None,
+            df[categoria_col].to_numpy() if categoria_col and categoria_col in df.columns else None
+        )
+        result = df.copy()
+        # Categóricos a partir dos códigos: sem materializar milhões de strings
+        result['NIVEL_ALERTA'] = pd.Categorical.from_codes(codes, dtype=ALERT_LEVEL_DTYPE)
+        result['RECOMENDACAO'] = pd.Categorical.from_codes(codes, dtype=RECOMMENDATION_DTYPE)
+        return result
+
+    def evaluate_trajectories(
+        self,
+        df: pd.DataFrame,
+        estoque_col: str = 'PREVISAO_ESTOQUE',
+        produto_col: str = 'ID_PRODUTO',
+        dia_col: str = 'DIA',
+        categoria_col: Optional[str] = None,
+        date_format: str = '%d/%m/%Y'
+    ) -> pd.DataFrame:
+        """
+        Avalia as trajetórias de previsão de cada produto
+
+        Returns:
+            DataFrame com uma linha por produto: estoque atual previsto, nível
+            atual e pior nível no horizonte, tendência diária, dias até ruptura,
+            prioridade (1 a 3, 0 = sem ação) e ação recomendada
+        """
+        dates = df[dia_col]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, format=date_format, errors='coerce')
+        days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+        produtos = df[produto_col].to_numpy()
+        codes, uniques = pd.factorize(produtos, sort=True)
+        estoque = df[estoque_col].to_numpy(dtype=float)
+        categorias = df[categoria_col].to_numpy() if categoria_col and categoria_col in df.columns else None
+
+        # Ordena por (produto, dia) com uma chave int64 única
+        offset = days - days.min() if len(days) else days
+        order = np.argsort(codes.astype(np.int64) * (int(offset.max()) + 1 if len(days) else 1) + offset)
+        codes, days, estoque = codes[order], days[order], estoque[order]
+        produtos = np.asarray(produtos)[order]
+        levels = self.level_codes(
+            estoque,
+            produtos if np.issubdtype(produtos.dtype, np.integer) else None,
+            categorias[order] if categorias is not None else None
+        )
+
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=int)
+        ends = np.r_[starts[1:], len(codes)] - 1
+
+        first_value, last_value = estoque[starts], estoque[ends]
+        first_day, last_day = days[starts], days[ends]
+        span = (last_day - first_day).astype(float)
+
+        # Primeiro dia com estoque previsto zerado (ruptura dentro do horizonte)
+        no_rupture = np.iinfo(np.int64).max
+        rupture_day = np.minimum.reduceat(np.where(estoque <= 0, days, no_rupture), starts) \
+            if len(starts) else np.array([], dtype=np.int64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(span > 0, (last_value - first_value) / span, 0.0)
+            extrapolated = np.where(slope < 0, span + last_value / -slope, np.inf)
+        dias = np.where(rupture_day != no_rupture, (rupture_day - first_day).astype(float), extrapolated)
+
+        current_level = levels[starts]
+        worst_level = np.maximum.reduceat(levels, starts) if len(starts) else levels
+
+        # Prioridades: 1 = crítico com ruptura próxima; 2 = crítico ou ruptura próxima;
+        # 3 = alerta no horizonte ou queda constante; 0 = sem ação
+        near_rupture = dias <= self.urgent_days
+        priority = np.select(
+            [(current_level == 2) & near_rupture,
+             (current_level == 2) | near_rupture,
+             (worst_level >= 1) | ((slope < 0) & (current_level >= 1))],
+            [1, 2, 3],
+            default=0
+        )
+
+        result = pd.DataFrame({
+            produto_col: uniques[codes[starts]] if len(starts) else uniques[:0],
+            'ESTOQUE_ATUAL_PREVISTO': first_value,
+            'ESTOQUE_FINAL_PREVISTO': last_value,
+            'NIVEL_ATUAL': pd.Categorical.from_codes(current_level, dtype=ALERT_LEVEL_DTYPE),
+            'PIOR_NIVEL_HORIZONTE': pd.Categorical.from_codes(worst_level, dtype=ALERT_LEVEL_DTYPE),
+            'TENDENCIA_DIARIA': np.round(slope, 3),
+            'DIAS_ATE_RUPTURA': np.round(dias, 1),
+            'PRIORIDADE': priority,
+            'ACAO': pd.Categorical.from_codes(np.where(priority == 0, 3, priority - 1),
+                                              categories=[PRIORITY_ACTIONS[p] for p in (1, 2, 3, 0)])
+        })
+        result['_ordem'] = np.where(priority == 0, 4, priority)
+        return result.sort_values(['_ordem', 'DIAS_ATE_RUPTURA', 'ESTOQUE_ATUAL_PREVISTO']) \
+            .drop(columns='_ordem').reset_index(drop=True)
+
+    def alerts_summary(
+        self,
+        df: pd.DataFrame,
+        nivel_col: str = 'NIVEL_ALERTA',
+        produto_col: str = 'ID_PRODUTO',
+        dias_col: str = 'DIAS_ATE_RUPTURA',
+        group_by: Optional[Union[str, List[str]]] = None
+    ) -> Dict:
+        """
+        Resumo no formato de get_alerts_summary, calculado de forma colunar
+
+        Args:
+            group_by: Coluna(s) de agregação (ex.: 'CATEGORIA', ['CATEGORIA', 'REGIAO']);
+                retorna {'nivel', 'total', 'grupos': {chave: resumo}}, com as
+                contagens dos grupos somando as do total
+        """
+        if group_by is not None:
+            keys = [group_by] if isinstance(group_by, str) else list(group_by)
+            grupos = {}
+            for key, group in df.groupby(keys, sort=True, observed=True):
+                key = key[0] if isinstance(key, tuple) and len(key) == 1 else key
+                grupos[key] = self.alerts_summary(group, nivel_col, produto_col, dias_col)
+            return {'nivel': '_'.join(keys), 'total': self.alerts_summary(df, nivel_col, produto_col, dias_col),
+                    'grupos': grupos}
+
+        nivel = df[nivel_col].to_numpy()
+        dias = df[dias_col] if dias_col in df.columns else pd.Series('N/A', index=df.index)
+
+        def produtos(mask):
+            return [{'produto_id': p, 'dias_ate_ruptura': d}
+                    for p, d in zip(df[produto_col].to_numpy()[mask].tolist(), dias.to_numpy()[mask].tolist())]
+
+        criticos, alertas = nivel == 'CRITICO', nivel == 'ALERTA'
+        return {
+            'total_produtos': int(len(df)),
+            'criticos': int(criticos.sum()),
+            'alerta': int(alertas.sum()),
+            'normal': int(len(df) - criticos.sum() - alertas.sum()),
+            'produtos_criticos': produtos(criticos),
+            'produtos_alerta': produtos(alertas)
+        }
+
+
+def print_priorities(priorities: pd.DataFrame, limit: int = 10):
+    """Exibe a lista priorizada no formato de padroes_identificados.md"""
+    icons = {1: '🚨', 2: '⚠️ ', 3: '📊'}
+    for level in (1, 2, 3):
+        group = priorities[priorities['PRIORIDADE'] == level]
+        if group.empty:
+            continue
+        print(f"\n{icons[level]} PRIORIDADE {level}: {len(group)} produto(s) - Ação: {PRIORITY_ACTIONS[level]}")
+        for row in group.head(limit).itertuples(index=False):
+            dias = f"{row.DIAS_ATE_RUPTURA:.1f}" if np.isfinite(row.DIAS_ATE_RUPTURA) else 'sem ruptura prevista'
+            print(f"    - Produto {row[0]}: estoque {row.ESTOQUE_ATUAL_PREVISTO:.0f}, "
+                  f"nível {row.NIVEL_ATUAL}, dias até ruptura: {dias}")
+        if len(group) > limit:
+            print(f"    - ... e mais {len(group) - limit} produto(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Motor de alertas para tabelas de previsão')
+    parser.add_argument('input', help='CSV/Parquet com ID_PRODUTO, DIA e PREVISAO_ESTOQUE')
+    parser.add_argument('--output', '-o', help='Arquivo de saída da lista priorizada (CSV ou Parquet)')
+    parser.add_argument('--estoque-col', default='PREVISAO_ESTOQUE', help='Coluna do estoque previsto')
+    parser.add_argument('--critico', type=float, default=ALERT_THRESHOLDS['critico'], help='Limiar crítico')
+    parser.add_argument('--alerta', type=float, default=ALERT_THRESHOLDS['alerta'], help='Limiar de alerta')
+    parser.add_argument('--thresholds', help='CSV com limiares por produto (ID_PRODUTO,CRITICO,ALERTA) '
+                                             'ou categoria (CATEGORIA,CRITICO,ALERTA)')
+    parser.add_argument('--categoria-col', help='Coluna de categoria para limiares por categoria')
+    parser.add_argument('--catalogo', help='Catálogo de produtos com CRITICO/ALERTA e CATEGORIA por produto '
+                                           '(product_catalog.py)')
+    args = parser.parse_args()
+
+    try:
+        df = pd.read_parquet(args.input) if args.input.endswith('.parquet') \
+            else pd.read_csv(args.input, encoding='utf-8-sig')
+
+        product_thresholds = category_thresholds = None
+        if args.thresholds:
+            limits = pd.read_csv(args.thresholds)
+            if 'ID_PRODUTO' in limits.columns:
+                product_thresholds = limits
+            else:
+                category_thresholds = limits
+
+        catalog = load_catalog(args.catalogo) if args.catalogo else None
+        engine = AlertEngine(args.critico, args.alerta, product_thresholds, category_thresholds, catalog=catalog)
+        priorities = engine.evaluate_trajectories(df, estoque_col=args.estoque_col,
+                                                  categoria_col=args.categoria_col)
+        print_priorities(priorities)
+
+        if args.output:
+            if args.output.endswith('.parquet'):
+                priorities.to_parquet(args.output, index=False)
+            else:
+                priorities.to_csv(args.output, index=False, encoding='utf-8-sig')
+            print(f"\n📄 Lista priorizada salva em: {args.output}")
+    except Exception as e:
+        print(f"\n❌ Erro: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
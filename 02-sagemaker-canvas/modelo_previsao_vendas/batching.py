@@ -0,0 +1,177 @@
+"""
+Agendador de micro-batching para inferência
+
+Requisições concorrentes (tipicamente de um registro) entram em uma fila e são
+agregadas em uma única chamada vetorizada ao ModelPredictor quando o lote
+atinge max_batch_size registros ou quando o registro mais antigo espera
+max_wait_ms. Cada chamador recebe apenas a sua fatia do resultado.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Tuple
+
+import numpy as np
+
+Arrays = Tuple[np.ndarray, ...]
+
+
+class QueueFullError(Exception):
+    """Fila de inferência cheia (o servidor responde 503)"""
+
+
+class BatchScheduler:
+    """
+    Fila com coalescência de requisições por tamanho máximo ou prazo
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[..., Dict[str, np.ndarray]],
+        max_batch_size: int = 256,
+        max_wait_ms: float = 2.0,
+        max_queue: int = 10000
+    ):
+        """
+        Args:
+            predict_fn: Função vetorizada (ex.: ModelPredictor.predict_arrays)
+            max_batch_size: Registros por chamada ao modelo
+            max_wait_ms: Espera máxima do primeiro registro da fila
+            max_queue: Registros aguardando antes de rejeitar novas requisições
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+
+        self.queue: Deque[Tuple[Arrays, asyncio.Future, float]] = deque()
+        self.queued_rows = 0
+        self._timer = None
+        self._flush_scheduled = False
+
+        # Métricas
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.rejected = 0
+        self.max_queue_depth = 0
+        self.model_time_ms = 0.0
+        self.batch_size_histogram: Dict[int, int] = {}
+        self._waits_ms: Deque[float] = deque(maxlen=10000)
+
+    def submit(self, arrays: Arrays) -> asyncio.Future:
+        """Enfileira um pedido; o future resolve com (fatia_do_resultado, tempo_modelo_ms)"""
+        size = len(arrays[0])
+        if self.queued_rows + size > self.max_queue and self.queue:
+            self.rejected += 1
+            raise QueueFullError(f"Fila de inferência cheia ({self.queued_rows} registros)")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.append((arrays, future, time.perf_counter()))
+        self.queued_rows += size
+        self.max_queue_depth = max(self.max_queue_depth, self.queued_rows)
+
+        if self.queued_rows >= self.max_batch_size or self.max_wait <= 0:
+            self._schedule_now(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._on_deadline)
+        return future
+
+    def _schedule_now(self, loop: asyncio.AbstractEventLoop):
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+
+    def _on_deadline(self):
+        self._timer = None
+        self._flush()
+
+    def _take_batch(self) -> List[Tuple[Arrays, asyncio.Future, float]]:
+        batch, rows = [], 0
+        while self.queue:
+            size = len(self.queue[0][0][0])
+            # Um pedido maior que o lote máximo é processado sozinho
+            if batch and rows + size > self.max_batch_size:
+                break
+            batch.append(self.queue.popleft())
+            rows += size
+        self.queued_rows -= rows
+        return batch
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.queue:
+            return
+
+        batch = self._take_batch()
+        now = time.perf_counter()
+        sizes = [len(arrays[0]) for arrays, _, _ in batch]
+        total = sum(sizes)
+
+        start = time.perf_counter()
+        try:
+            n_arrays = len(batch[0][0])
+            out = self.predict_fn(*(
+                batch[0][0][i] if len(batch) == 1 else np.concatenate([arrays[i] for arrays, _, _ in batch])
+                for i in range(n_arrays)
+            ))
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            out = None
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self.batches += 1
+        self.requests += len(batch)
+        self.rows += total
+        self.model_time_ms += elapsed_ms
+        bucket = 1 << max(total - 1, 0).bit_length()
+        self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+        self._waits_ms.extend((now - enqueued) * 1000 for _, _, enqueued in batch)
+
+        if out is not None:
+            offset = 0
+            for (_, future, _), size in zip(batch, sizes):
+                if not future.done():
+                    future.set_result(({key: values[offset:offset + size] for key, values in out.items()},
+                                       elapsed_ms))
+                offset += size
+
+        # Restante da fila: lote cheio segue imediatamente, senão aguarda o prazo
+        if self.queue:
+            loop = asyncio.get_running_loop()
+            oldest_wait = time.perf_counter() - self.queue[0][2]
+            if self.queued_rows >= self.max_batch_size or oldest_wait >= self.max_wait:
+                self._schedule_now(loop)
+            elif self._timer is None:
+                self._timer = loop.call_later(self.max_wait - oldest_wait, self._on_deadline)
+
+    def metrics(self) -> Dict:
+        """Métricas do agendador (configuração, fila, lotes e espera)"""
+        waits = np.fromiter(self._waits_ms, dtype=float)
+        return {
+            'config': {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'max_queue': self.max_queue
+            },
+            'queue_depth': self.queued_rows,
+            'max_queue_depth': self.max_queue_depth,
+            'batches': self.batches,
+            'requests': self.requests,
+            'rows': self.rows,
+            'rejected': self.rejected,
+            'avg_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0.0,
+            'avg_requests_per_batch': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'batch_rows_histogram': {str(k): v for k, v in sorted(self.batch_size_histogram.items())},
+            'model_time_ms_total': round(self.model_time_ms, 3),
+            'queue_wait_ms': {
+                'p50': round(float(np.percentile(waits, 50)), 3) if len(waits) else 0.0,
+                'p99': round(float(np.percentile(waits, 99)), 3) if len(waits) else 0.0
+            }
+        }
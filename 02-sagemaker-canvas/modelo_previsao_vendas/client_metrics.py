@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+Métricas do cliente de previsão (EstoquePredictionClient)
+
+Por operação (predict_single, predict_frame):
+- histogramas de latência (buckets geométricos, ~1% de erro, estilo HDR) do
+  total e de cada fase: serializacao, rede, modelo e desserializacao, por
+  resultado (sucesso/erro: timeouts e erros lentos também aparecem). O tempo
+  do modelo é o processing_time_ms informado pelo endpoint; rede é o tempo
+  de envio + resposta menos o do modelo
+- requisições, registros, erros por tipo, bytes enviados e recebidos
+- requisições em andamento (atual e máximo), retentativas por motivo,
+  conexões novas x reutilizadas (keep-alive) e pico de memória do processo
+
+Custo: ~10 µs por requisição (um lock, poucos dicionários e um log por fase),
+desprezível perto de uma chamada HTTP (milissegundos).
+
+Exposição:
+- Prometheus (texto): ClientMetrics.serve_prometheus(porta) -> /metrics
+  (e /metrics.json com o snapshot)
+- JSON periódico: ClientMetrics.start_json_dump(caminho, intervalo)
+- Sem alterar código, via variáveis de ambiente lidas pelo cliente:
+    ESTOQUE_METRICS_PORT=9102             servidor Prometheus em 127.0.0.1
+    ESTOQUE_METRICS_JSON=metricas.json    snapshot JSON periódico (e ao sair)
+    ESTOQUE_METRICS_INTERVAL=60           intervalo do snapshot em segundos
+
+Uso:
+    python client_metrics.py metricas.json     # resumo de um snapshot por fase
+"""
+import argparse
+import atexit
+import json
+import math
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PHASES = ('serializacao', 'rede', 'modelo', 'desserializacao')
+OUTCOMES = ('sucesso', 'erro')
+# Limites (ms) dos buckets exportados para o Prometheus
+PROMETHEUS_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+PREFIX = 'estoque_cliente'
+
+
+class LatencyHistogram:
+    """
+    Histograma de latência com buckets geométricos (erro relativo de ~1%,
+    como um HDR histogram de 2 dígitos significativos) e memória constante
+    """
+
+    RATIO = 1.02
+    MIN_MS = 0.001
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self._log_ratio = math.log(self.RATIO)
+
+    def index(self, value_ms: float) -> int:
+        return int(math.log(max(value_ms, self.MIN_MS) / self.MIN_MS) / self._log_ratio)
+
+    def record(self, value_ms: float):
+        index = self.index(value_ms)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+    def merge(self, other: 'LatencyHistogram'):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total_ms += other.total_ms
+        self.max_ms = max(self.max_ms, other.max_ms)
+
+    def upper_ms(self, index: int) -> float:
+        return self.MIN_MS * self.RATIO ** (index + 1)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self.upper_ms(index), self.max_ms)
+        return self.max_ms
+
+    def cumulative(self, bounds_ms: Tuple[float, ...]) -> List[int]:
+        """Contagens acumuladas até cada limite (buckets 'le' do Prometheus)"""
+        limits = [self.index(bound) for bound in bounds_ms]
+        totals = [0] * len(limits)
+        for index, count in self.counts.items():
+            for i, limit in enumerate(limits):
+                if index <= limit:
+                    totals[i] += count
+        return totals
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50), 3),
+            'p90_ms': round(self.percentile(90), 3),
+            'p95_ms': round(self.percentile(95), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'p999_ms': round(self.percentile(99.9), 3),
+            'max_ms': round(self.max_ms, 3)
+        }
+
+    def buckets(self) -> List[List[float]]:
+        """Pares [limite_superior_ms, contagem] dos buckets não vazios"""
+        return [[round(self.upper_ms(i), 3), self.counts[i]] for i in sorted(self.counts)]
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """Status HTTP de um erro do LocalRuntimeClient ou do boto3 (ModelError)"""
+    status = getattr(error, 'status', None)
+    if status is None:
+        status = getattr(error, 'response', {}).get('OriginalStatusCode')
+    return status
+
+
+def error_kind(error: BaseException) -> str:
+    """http_<status> para erros HTTP, senão o nome da exceção"""
+    status = status_code(error)
+    return f"http_{status}" if status else type(error).__name__
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memória residente do processo em MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return round(peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024, 2)
+
+
+class _Phase:
+    """Soma o tempo do bloco na fase da chamada"""
+
+    __slots__ = ('call', 'name', 'start')
+
+    def __init__(self, call: 'CallRecord', name: str):
+        self.call = call
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        phases = self.call.phases
+        phases[self.name] = phases.get(self.name, 0.0) + (time.perf_counter() - self.start) * 1000
+        return False
+
+
+class CallRecord:
+    """
+    Uma requisição do cliente; as fases e os bytes são preenchidos dentro do bloco
+
+    'envio' (invoke_endpoint + leitura da resposta) vira 'rede' e 'modelo'
+    quando o endpoint informa processing_time_ms.
+    """
+
+    __slots__ = ('metrics', 'operation', 'rows', 'phases', 'bytes_sent', 'bytes_received', 'model_ms', 'start')
+
+    def __init__(self, metrics: 'ClientMetrics', operation: str, rows: int = 0):
+        self.metrics = metrics
+        self.operation = operation
+        self.rows = rows
+        self.phases: Dict[str, float] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.model_ms: Optional[float] = None
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def sent(self, n: int):
+        self.bytes_sent += n
+
+    def received(self, n: int):
+        self.bytes_received += n
+
+    def endpoint_ms(self, value: Optional[float]):
+        if value is not None:
+            self.model_ms = (self.model_ms or 0.0) + float(value)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def __enter__(self):
+        self.metrics._begin()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        total_ms = self.elapsed_ms()
+        phases = self.phases
+        envio = phases.pop('envio', None)
+        if envio is not None:
+            if self.model_ms is not None:
+                model_ms = min(self.model_ms, envio)
+                phases['modelo'] = model_ms
+                phases['rede'] = envio - model_ms
+            else:
+                phases['rede'] = envio
+        self.metrics._finish(self, total_ms, error_kind(exc) if exc is not None else None)
+        return False
+
+
+class _OperationStats:
+    __slots__ = ('requests', 'rows', 'bytes_sent', 'bytes_received', 'errors', 'total', 'phases')
+
+    def __init__(self):
+        self.requests = 0
+        self.rows = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.errors: Dict[str, int] = {}
+        # Por resultado (sucesso/erro): fase -> histograma
+        self.total = {outcome: LatencyHistogram() for outcome in OUTCOMES}
+        self.phases: Dict[str, Dict[str, LatencyHistogram]] = {outcome: {} for outcome in OUTCOMES}
+
+
+class ClientMetrics:
+    """
+    Métricas agregadas de um ou mais clientes (thread-safe)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.operations: Dict[str, _OperationStats] = {}
+        self.retries: Dict[str, int] = {}
+        self.connections = {'novas': 0, 'reutilizadas': 0}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = time.time()
+        self._configured = False
+        self._server = None
+        self._dump = None
+
+    # Registro
+
+    def call(self, operation: str, rows: int = 0) -> CallRecord:
+        return CallRecord(self, operation, rows)
+
+    def _begin(self):
+        with self.lock:
+            self.in_flight += 1
+            if self.in_flight > self.max_in_flight:
+                self.max_in_flight = self.in_flight
+
+    def _finish(self, call: CallRecord, total_ms: float, error: Optional[str]):
+        with self.lock:
+            self.in_flight -= 1
+            stats = self.operations.get(call.operation)
+            if stats is None:
+                stats = self.operations[call.operation] = _OperationStats()
+            stats.requests += 1
+            stats.bytes_sent += call.bytes_sent
+            stats.bytes_received += call.bytes_received
+            if error is not None:
+                stats.errors[error] = stats.errors.get(error, 0) + 1
+                outcome = 'erro'
+            else:
+                stats.rows += call.rows
+                outcome = 'sucesso'
+            stats.total[outcome].record(total_ms)
+            phases = stats.phases[outcome]
+            for name, value in call.phases.items():
+                histogram = phases.get(name)
+                if histogram is None:
+                    histogram = phases[name] = LatencyHistogram()
+                histogram.record(value)
+
+    def record_retry(self, reason: str, n: int = 1):
+        with self.lock:
+            self.retries[reason] = self.retries.get(reason, 0) + n
+
+    def record_connection(self, reused: bool):
+        with self.lock:
+            self.connections['reutilizadas' if reused else 'novas'] += 1
+
+    def reset(self):
+        with self.lock:
+            self.operations = {}
+            self.retries = {}
+            self.connections = {'novas': 0, 'reutilizadas': 0}
+            self.max_in_flight = self.in_flight
+            self.started = time.time()
+
+    # Leitura
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Métricas como dicionário JSON; participacao_fases é a fração do tempo
+        total (somado) gasta em cada fase - mostra se a lentidão vem da
+        serialização, da rede ou do modelo. latencia/fases são das chamadas
+        bem-sucedidas; latencia_erros/fases_erros, das que falharam
+        """
+        with self.lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            operations = {}
+            for name, stats in self.operations.items():
+                total_ms = stats.total['sucesso'].total_ms
+                operations[name] = {
+                    'requisicoes': stats.requests,
+                    'erros': dict(stats.errors),
+                    'registros': stats.rows,
+                    'bytes_enviados': stats.bytes_sent,
+                    'bytes_recebidos': stats.bytes_received,
+                    'vazao_rps': round(stats.requests / elapsed, 3),
+                    'vazao_registros_s': round(stats.rows / elapsed, 3),
+                    'latencia': stats.total['sucesso'].summary(),
+                    'fases': {phase: histogram.summary() for phase, histogram in stats.phases['sucesso'].items()},
+                    'participacao_fases': {phase: round(histogram.total_ms / total_ms, 4) if total_ms else 0.0
+                                           for phase, histogram in stats.phases['sucesso'].items()},
+                    'latencia_erros': stats.total['erro'].summary(),
+                    'fases_erros': {phase: histogram.summary() for phase, histogram in stats.phases['erro'].items()}
+                }
+            return {
+                'inicio': datetime.fromtimestamp(self.started).isoformat(),
+                'timestamp': datetime.now().isoformat(),
+                'duracao_s': round(elapsed, 3),
+                'em_andamento': self.in_flight,
+                'em_andamento_max': self.max_in_flight,
+                'memoria_pico_mb': peak_rss_mb(),
+                'retentativas': dict(self.retries),
+                'conexoes': dict(self.connections),
+                'operacoes': operations
+            }
+
+    def prometheus(self) -> str:
+        """Métricas no formato de texto do Prometheus (latências em segundos)"""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{PREFIX}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{PREFIX}_{name} {value}")
+
+        with self.lock:
+            ops = sorted(self.operations.items())
+            metric('requisicoes_total', 'counter', 'Requisições ao endpoint',
+                   [({'operacao': op}, s.requests) for op, s in ops])
+            metric('erros_total', 'counter', 'Requisições com erro por tipo',
+                   [({'operacao': op, 'tipo': kind}, n) for op, s in ops for kind, n in sorted(s.errors.items())])
+            metric('registros_total', 'counter', 'Registros previstos',
+                   [({'operacao': op}, s.rows) for op, s in ops])
+            metric('bytes_enviados_total', 'counter', 'Bytes enviados no corpo das requisições',
+                   [({'operacao': op}, s.bytes_sent) for op, s in ops])
+            metric('bytes_recebidos_total', 'counter', 'Bytes recebidos no corpo das respostas',
+                   [({'operacao': op}, s.bytes_received) for op, s in ops])
+            metric('retentativas_total', 'counter', 'Retentativas por motivo',
+                   [({'motivo': reason}, n) for reason, n in sorted(self.retries.items())])
+            metric('conexoes_total', 'counter', 'Conexões HTTP abertas e reutilizadas (keep-alive)',
+                   [({'reutilizada': 'true' if kind == 'reutilizadas' else 'false'}, n)
+                    for kind, n in sorted(self.connections.items())])
+            metric('em_andamento', 'gauge', 'Requisições em andamento', [({}, self.in_flight)])
+            metric('em_andamento_max', 'gauge', 'Máximo de requisições simultâneas', [({}, self.max_in_flight)])
+            rss = peak_rss_mb()
+            if rss is not None:
+                metric('memoria_pico_bytes', 'gauge', 'Pico de memória residente do processo',
+                       [({}, int(rss * 1024 * 1024))])
+
+            lines.append(f"# HELP {PREFIX}_latencia_segundos Latência por operação, resultado "
+                         f"({', '.join(OUTCOMES)}) e fase (total, " + ', '.join(PHASES) + ')')
+            lines.append(f"# TYPE {PREFIX}_latencia_segundos histogram")
+            for op, stats in ops:
+                for outcome in OUTCOMES:
+                    for phase, histogram in [('total', stats.total[outcome])] + sorted(stats.phases[outcome].items()):
+                        labels = f'operacao="{op}",resultado="{outcome}",fase="{phase}"'
+                        for bound, count in zip(PROMETHEUS_BUCKETS_MS, histogram.cumulative(PROMETHEUS_BUCKETS_MS)):
+                            lines.append(f'{PREFIX}_latencia_segundos_bucket{{{labels},le="{bound / 1000:g}"}} {count}')
+                        lines.append(f'{PREFIX}_latencia_segundos_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                        lines.append(f'{PREFIX}_latencia_segundos_sum{{{labels}}} {histogram.total_ms / 1000:.6f}')
+                        lines.append(f'{PREFIX}_latencia_segundos_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    # Exposição
+
+    def write_json(self, path: str):
+        """Snapshot em JSON (escrita atômica)"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def start_json_dump(self, path: str, interval: float = 60.0) -> threading.Event:
+        """Grava o snapshot a cada `interval` segundos e ao final do processo; set() no evento para parar"""
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                self.write_json(path)
+
+        threading.Thread(target=loop, name='client-metrics-dump', daemon=True).start()
+        atexit.register(lambda: stop.is_set() or self.write_json(path))
+        self._dump = stop
+        return stop
+
+    def serve_prometheus(self, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """Servidor HTTP em segundo plano com /metrics (Prometheus) e /metrics.json"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json'
+                elif self.path.startswith('/metrics'):
+                    body = metrics.prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='client-metrics-http', daemon=True).start()
+        self._server = server
+        return server
+
+    def configure_from_env(self):
+        """ESTOQUE_METRICS_PORT / ESTOQUE_METRICS_JSON (uma vez por processo)"""
+        with self.lock:
+            if self._configured:
+                return
+            self._configured = True
+        port = os.environ.get('ESTOQUE_METRICS_PORT')
+        if port:
+            self.serve_prometheus(int(port))
+        path = os.environ.get('ESTOQUE_METRICS_JSON')
+        if path:
+            self.start_json_dump(path, float(os.environ.get('ESTOQUE_METRICS_INTERVAL', 60)))
+
+
+# Instância do processo, compartilhada pelos clientes (como o TRACER da instrumentação)
+CLIENT_METRICS = ClientMetrics()
+
+
+def print_snapshot(snapshot: Dict[str, Any]):
+    print(f"\n📊 Métricas do cliente ({snapshot['inicio']} a {snapshot['timestamp']}, "
+          f"{snapshot['duracao_s']:.0f}s)")
+    print(f"   Em andamento: {snapshot['em_andamento']} (máximo {snapshot['em_andamento_max']}) | "
+          f"conexões: {snapshot['conexoes']['novas']} novas, {snapshot['conexoes']['reutilizadas']} reutilizadas"
+          + (f" | memória (pico): {snapshot['memoria_pico_mb']} MB" if snapshot.get('memoria_pico_mb') else ''))
+    if snapshot['retentativas']:
+        print("   Retentativas: " + ', '.join(f"{k} {v}" for k, v in snapshot['retentativas'].items()))
+    for name, op in snapshot['operacoes'].items():
+        latency = op['latencia']
+        print(f"\n   {name}: {op['requisicoes']} requisições ({op['vazao_rps']:.1f}/s), "
+              f"{op['registros']} registros, {sum(op['erros'].values())} erros")
+        print(f"      total: p50 {latency['p50_ms']:.2f} ms | p99 {latency['p99_ms']:.2f} ms | "
+              f"enviados {op['bytes_enviados']:,} B | recebidos {op['bytes_recebidos']:,} B")
+        failed = op.get('latencia_erros', {})
+        if failed.get('count'):
+            print(f"      erros: p50 {failed['p50_ms']:.2f} ms | p99 {failed['p99_ms']:.2f} ms | "
+                  f"máximo {failed['max_ms']:.2f} ms")
+        for phase in PHASES:
+            if phase in op['fases']:
+                summary = op['fases'][phase]
+                print(f"      {phase:<16} p50 {summary['p50_ms']:8.2f} ms | p99 {summary['p99_ms']:8.2f} ms | "
+                      f"{op['participacao_fases'][phase]:6.1%} do tempo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resumo de um snapshot JSON das métricas do cliente')
+    parser.add_argument('snapshot', help='Arquivo gravado por ESTOQUE_METRICS_JSON / start_json_dump')
+    args = parser.parse_args()
+
+    try:
+        with open(args.snapshot, encoding='utf-8') as f:
+            print_snapshot(json.load(f))
+    except Exception as e:
+        print(f"\n❌ Erro: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
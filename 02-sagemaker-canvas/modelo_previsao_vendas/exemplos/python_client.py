@@ -1,33 +1,185 @@
 """
 Cliente Python para consumir o modelo de previsão
 """
+import http.client
+import io
 import json
+import os
+import time
+import numpy as np
 import pandas as pd
-import boto3
+from contextlib import nullcontext
 from datetime import datetime
 from typing import Dict, List, Union
+from urllib.parse import urlparse
+
+try:
+    # Instrumentação opcional (06-scripts-utilitarios/instrumentacao.py no PYTHONPATH)
+    from instrumentacao import span
+except ImportError:
+    def span(name, rows=None, **attrs):
+        return nullcontext()
+
+try:
+    # Validação opcional contra config/schema_*.json (schema_validation.py no PYTHONPATH)
+    from schema_validation import input_batch_validator, input_validator, output_batch_validator, output_validator
+except ImportError:
+    input_validator = None
+
+try:
+    # Formatos binários opcionais (payload_codec.py e client_metrics.py no PYTHONPATH)
+    from payload_codec import ARROW_TYPE, BINARY_TYPES, METADATA_HEADERS, NPY_TYPE, decode_output, encode_input
+    from client_metrics import status_code
+    PAYLOAD_TYPES = {name: t for name, t in (('npy', NPY_TYPE), ('arrow', ARROW_TYPE)) if t in BINARY_TYPES}
+except ImportError:
+    PAYLOAD_TYPES = {}
+
+try:
+    # Métricas do cliente (client_metrics.py no PYTHONPATH): latência por fase, bytes, retentativas
+    from client_metrics import CLIENT_METRICS
+except ImportError:
+    class _NullCall:
+        """Chamada sem métricas: fases e contadores sem custo"""
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def phase(self, name):
+            return nullcontext()
+
+        def sent(self, n):
+            pass
+
+        def received(self, n):
+            pass
+
+        def endpoint_ms(self, value):
+            pass
+
+    class _NullMetrics:
+        """Sem client_metrics: chamadas, retentativas e conexões não são registradas"""
+        def call(self, operation, rows=0):
+            return _NullCall()
+
+        def record_retry(self, reason, n=1):
+            pass
+
+        def record_connection(self, reused):
+            pass
+
+        def configure_from_env(self):
+            pass
+
+    CLIENT_METRICS = _NullMetrics()
+
+class EndpointError(RuntimeError):
+    """Resposta HTTP diferente de 200 do endpoint"""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+class LocalRuntimeClient:
+    """
+    Cliente HTTP com a mesma interface de invoke_endpoint do SageMaker Runtime,
+    para endpoints compatíveis com /invocations (ex.: local_server.py)
+    """
+    
+    def __init__(self, endpoint_url: str, timeout: float = 10.0, metrics=None):
+        parsed = urlparse(endpoint_url)
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        self.https = parsed.scheme == 'https'
+        self.path = parsed.path.rstrip('/') or ''
+        self.timeout = timeout
+        self.metrics = metrics if metrics is not None else CLIENT_METRICS
+        self._connection = None
+    
+    def _connect(self):
+        reused = self._connection is not None
+        if not reused:
+            connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._connection = connection_class(self.host, self.port, timeout=self.timeout)
+        self.metrics.record_connection(reused)
+        return self._connection
+    
+    def invoke_endpoint(self, EndpointName: str, Body: bytes, ContentType: str = 'text/csv',
+                        Accept: str = 'application/json') -> Dict:
+        path = self.path if self.path.endswith('/invocations') else f"{self.path}/invocations"
+        headers = {'Content-Type': ContentType, 'Accept': Accept}
+        
+        # Uma nova tentativa se a conexão keep-alive tiver sido fechada pelo servidor
+        for attempt in range(2):
+            connection = self._connect()
+            try:
+                connection.request('POST', path, body=Body, headers=headers)
+                response = connection.getresponse()
+                payload = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                self._connection = None
+                if attempt:
+                    raise
+                self.metrics.record_retry('conexao_fechada')
+        
+        if response.status != 200:
+            raise EndpointError(response.status,
+                                f"Endpoint retornou HTTP {response.status}: {payload.decode('utf-8', 'replace')}")
+        
+        return {
+            'Body': io.BytesIO(payload),
+            'ContentType': response.getheader('Content-Type', 'application/json'),
+            'ResponseMetadata': {
+                'HTTPStatusCode': response.status,
+                'HTTPHeaders': {name.lower(): value for name, value in response.getheaders()}
+            }
+        }
 
 class EstoquePredictionClient:
     """
     Cliente para consumir o endpoint do modelo de previsão
     """
     
-    def __init__(self, endpoint_name: str = None, region: str = 'us-east-1'):
+    def __init__(self, endpoint_name: str = None, region: str = 'us-east-1', endpoint_url: str = None,
+                 payload_format: str = None, catalog=None, metrics=None):
         """
         Inicializa o cliente do modelo
         
         Args:
             endpoint_name: Nome do endpoint SageMaker
             region: Região AWS
+            endpoint_url: URL de um endpoint compatível (ex.: http://127.0.0.1:8080
+                          para local_server.py). Padrão: $ESTOQUE_ENDPOINT_URL
+            payload_format: Formato dos lotes: 'csv' (padrão), 'npy' ou 'arrow'.
+                            Padrão: $ESTOQUE_PAYLOAD_FORMAT
+            catalog: ProductCatalog (product_catalog.py) usado para agrupar os
+                     alertas por atributo do produto (ex.: CATEGORIA)
+            metrics: ClientMetrics (client_metrics.py). Padrão: métricas do
+                     processo, expostas via $ESTOQUE_METRICS_PORT/$ESTOQUE_METRICS_JSON
         """
         self.endpoint_name = endpoint_name or 'estoque-prediction-endpoint'
         self.region = region
+        self.endpoint_url = endpoint_url or os.environ.get('ESTOQUE_ENDPOINT_URL')
+        payload_format = payload_format or os.environ.get('ESTOQUE_PAYLOAD_FORMAT', 'csv')
+        # Formato binário indisponível (sem payload_codec/pyarrow): CSV
+        self.payload_format = payload_format if payload_format in PAYLOAD_TYPES else 'csv'
+        self.catalog = catalog
+        self.metrics = metrics if metrics is not None else CLIENT_METRICS
+        self.metrics.configure_from_env()
         
-        # Inicializar cliente SageMaker Runtime
-        self.runtime_client = boto3.client(
-            'runtime.sagemaker',
-            region_name=self.region
-        )
+        if self.endpoint_url:
+            # Endpoint local/compatível: HTTP direto, sem AWS
+            self.runtime_client = LocalRuntimeClient(self.endpoint_url, metrics=self.metrics)
+        else:
+            # Inicializar cliente SageMaker Runtime
+            import boto3
+            self.runtime_client = boto3.client(
+                'runtime.sagemaker',
+                region_name=self.region
+            )
     
     def predict_single(
         self, 
@@ -48,27 +200,39 @@ class EstoquePredictionClient:
         Returns:
             Dicionário com previsão e alertas
         """
-        # Preparar dados no formato CSV
-        csv_data = f"{produto_id},{flag_promocao},{estoque_atual}"
+        validate = input_validator is not None
         
         try:
-            # Invocar endpoint
-            response = self.runtime_client.invoke_endpoint(
-                EndpointName=self.endpoint_name,
-                ContentType='text/csv',
-                Body=csv_data.encode('utf-8')
-            )
-            
-            # Processar resposta
-            result_bytes = response['Body'].read()
-            result = json.loads(result_bytes.decode('utf-8'))
-            
-            # Adicionar metadados
-            result['metadata'] = {
-                'produto_id': produto_id,
-                'data_previsao': data,
-                'timestamp': datetime.now().isoformat()
-            }
+            start = time.perf_counter()
+            with self.metrics.call('predict_single', rows=1) as call:
+                with call.phase('serializacao'):
+                    if validate:
+                        # Entrada inválida não chega ao endpoint
+                        input_validator()({'ID_PRODUTO': produto_id, 'DIA': data,
+                                           'FLAG_PROMOCAO': flag_promocao, 'QUANTIDADE_ESTOQUE': estoque_atual})
+                    # Preparar dados no formato CSV
+                    csv_data = f"{produto_id},{flag_promocao},{estoque_atual}".encode('utf-8')
+                
+                # Invocar endpoint
+                with span('cliente.invoke', rows=1):
+                    _, result_bytes = self._invoke(call, csv_data, 'text/csv', 'application/json')
+                
+                # Processar resposta
+                with span('cliente.desserializacao', rows=1), call.phase('desserializacao'):
+                    result = json.loads(result_bytes.decode('utf-8'))
+                    if validate:
+                        output_validator()(result)
+                
+                # Adicionar metadados (preservando model_version e demais campos do endpoint)
+                model_metadata = result.get('metadata', {})
+                call.endpoint_ms(model_metadata.get('processing_time_ms'))
+                result['metadata'] = {
+                    **model_metadata,
+                    'produto_id': produto_id,
+                    'data_previsao': data,
+                    'timestamp': datetime.now().isoformat(),
+                    'client_time_ms': round((time.perf_counter() - start) * 1000, 3)
+                }
             
             return result
             
@@ -82,6 +246,113 @@ class EstoquePredictionClient:
                 }
             }
     
+    def predict_frame(self, dados: pd.DataFrame, chunk_size: int = 100000) -> pd.DataFrame:
+        """
+        Previsão colunar de um lote inteiro, em poucas requisições
+        
+        Com payload_format 'npy' ou 'arrow' entrada e saída trafegam como
+        arrays (payload_codec.py); se o endpoint recusar o formato (HTTP 415)
+        o cliente passa a usar text/csv + JSON.
+        
+        Args:
+            dados: DataFrame com ID_PRODUTO, FLAG_PROMOCAO, QUANTIDADE_ESTOQUE
+            chunk_size: Registros por requisição
+            
+        Returns:
+            DataFrame com as colunas de predict_arrays e model_version, no
+            índice de dados; metadados da última requisição em .attrs['metadata']
+        """
+        if input_validator is not None:
+            input_batch_validator().validate(dados)
+        return self._predict_columns(dados, chunk_size)
+    
+    def _predict_columns(self, dados: pd.DataFrame, chunk_size: int = 100000) -> pd.DataFrame:
+        parts, metadata = [], {}
+        for start in range(0, len(dados), chunk_size):
+            chunk = dados.iloc[start:start + chunk_size]
+            with self.metrics.call('predict_frame', rows=len(chunk)) as call:
+                with span('cliente.invoke', rows=len(chunk)):
+                    response, body = self._invoke_columns(chunk, call)
+                with span('cliente.desserializacao', rows=len(chunk)), call.phase('desserializacao'):
+                    out, metadata = self._decode_columns(response, body)
+                    if input_validator is not None:
+                        output_batch_validator().validate(out)
+                call.endpoint_ms(metadata.get('processing_time_ms'))
+            part = pd.DataFrame(out, index=chunk.index)
+            # Versão por registro: uma troca de modelo pode ocorrer entre requisições
+            part['model_version'] = pd.Categorical.from_codes(
+                np.zeros(len(part), dtype=np.int8), categories=[str(metadata.get('model_version', ''))])
+            parts.append(part)
+        frame = pd.concat(parts) if len(parts) > 1 else parts[0] if parts else pd.DataFrame(index=dados.index)
+        frame.attrs['metadata'] = metadata
+        return frame
+    
+    def _invoke(self, call, body: bytes, content_type: str, accept: str):
+        """invoke_endpoint + leitura da resposta (fase 'envio': rede e modelo) -> (resposta, corpo)"""
+        with call.phase('envio'):
+            response = self.runtime_client.invoke_endpoint(
+                EndpointName=self.endpoint_name,
+                ContentType=content_type,
+                Accept=accept,
+                Body=body
+            )
+            payload = response['Body'].read()
+        call.sent(len(body))
+        call.received(len(payload))
+        # boto3 refaz sozinho requisições com throttling/erros transitórios
+        retries = response.get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        if retries:
+            self.metrics.record_retry('sdk', retries)
+        return response, payload
+    
+    def _invoke_columns(self, chunk: pd.DataFrame, call):
+        """Uma requisição com o lote; formato binário com fallback para CSV -> (resposta, corpo)"""
+        content_type = PAYLOAD_TYPES.get(self.payload_format)
+        if content_type:
+            with call.phase('serializacao'):
+                body = encode_input(chunk['ID_PRODUTO'].to_numpy(), chunk['FLAG_PROMOCAO'].to_numpy(),
+                                    chunk['QUANTIDADE_ESTOQUE'].to_numpy(), content_type)
+            try:
+                return self._invoke(call, body, content_type, f"{content_type}, application/json;q=0.5")
+            except Exception as e:
+                if status_code(e) != 415:
+                    raise
+                # Endpoint sem suporte ao formato binário: CSV daqui em diante
+                self.payload_format = 'csv'
+                self.metrics.record_retry('formato_nao_suportado')
+        
+        with call.phase('serializacao'):
+            body = '\n'.join(f"{p},{f},{e}" for p, f, e in zip(
+                chunk['ID_PRODUTO'], chunk['FLAG_PROMOCAO'], chunk['QUANTIDADE_ESTOQUE'])).encode('utf-8')
+        return self._invoke(call, body, 'text/csv', 'application/json')
+    
+    @staticmethod
+    def _decode_columns(response: Dict, body: bytes):
+        """Resposta (binária ou JSON) -> (dicionário de arrays, metadados do modelo)"""
+        content_type = response.get('ContentType', 'application/json').split(';')[0].strip().lower()
+        if content_type in PAYLOAD_TYPES.values():
+            headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+            metadata = {key: headers[header.lower()] for key, header in METADATA_HEADERS.items()
+                        if header.lower() in headers}
+            if 'processing_time_ms' in metadata:
+                metadata['processing_time_ms'] = float(metadata['processing_time_ms'])
+            return decode_output(content_type, body), metadata
+        
+        result = json.loads(body.decode('utf-8'))
+        records = result if isinstance(result, list) else [result]
+        dias = [r['alerts']['dias_ate_ruptura'] for r in records]
+        out = {
+            'estoque_previsto': np.array([r['prediction']['estoque_previsto'] for r in records], dtype=float),
+            'demanda_prevista': np.array([r['prediction']['demanda_prevista'] for r in records], dtype=float),
+            'score': np.array([r['confidence']['score'] for r in records], dtype=float),
+            'interval_low': np.array([r['confidence']['interval_95'][0] for r in records], dtype=float),
+            'interval_high': np.array([r['confidence']['interval_95'][1] for r in records], dtype=float),
+            'level': pd.Categorical([r['alerts']['level'] for r in records]),
+            'dias_ate_ruptura': np.array([np.inf if d is None else d for d in dias], dtype=float),
+            'recommendation': pd.Categorical([r['alerts']['recommendation'] for r in records])
+        }
+        return out, records[0].get('metadata', {}) if records else {}
+    
     def predict_batch(self, dados: pd.DataFrame) -> List[Dict]:
         """
         Faz previsões em lote
@@ -95,27 +366,121 @@ class EstoquePredictionClient:
         """
         predictions = []
         
-        for _, row in dados.iterrows():
-            prediction = self.predict_single(
-                produto_id=row['ID_PRODUTO'],
-                data=row['DIA'],
-                flag_promocao=row['FLAG_PROMOCAO'],
-                estoque_atual=row['QUANTIDADE_ESTOQUE']
-            )
-            predictions.append(prediction)
+        # Validação colunar do lote inteiro antes de qualquer chamada ao endpoint
+        invalid, errors = (input_batch_validator().check(dados) if input_validator is not None
+                           else ([False] * len(dados), []))
+        
+        with span('cliente.predict_batch', rows=len(dados)):
+            if self.payload_format != 'csv':
+                # Formato binário: uma requisição colunar em vez de uma por registro
+                return self._predict_batch_columns(dados, invalid, errors)
+            for is_invalid, (_, row) in zip(invalid, dados.iterrows()):
+                if is_invalid:
+                    predictions.append({
+                        'error': f"Registro fora do schema_input.json ({'; '.join(errors)})",
+                        'metadata': {
+                            'produto_id': row['ID_PRODUTO'],
+                            'data_previsao': row['DIA'],
+                            'timestamp': datetime.now().isoformat()
+                        }
+                    })
+                    continue
+                prediction = self.predict_single(
+                    produto_id=row['ID_PRODUTO'],
+                    data=row['DIA'],
+                    flag_promocao=row['FLAG_PROMOCAO'],
+                    estoque_atual=row['QUANTIDADE_ESTOQUE']
+                )
+                predictions.append(prediction)
+        
+        return predictions
+    
+    def _predict_batch_columns(self, dados: pd.DataFrame, invalid, errors: List[str]) -> List[Dict]:
+        """predict_batch via _predict_columns, no mesmo formato de predict_single"""
+        invalid = np.asarray(invalid, dtype=bool)
+        valid = dados[~invalid]
+        try:
+            frame = self._predict_columns(valid) if len(valid) else None
+            failure = None
+        except Exception as e:
+            frame, failure = None, str(e)
+        columns = {name: frame[name].tolist() for name in frame.columns} if frame is not None else {}
+        model_metadata = frame.attrs.get('metadata', {}) if frame is not None else {}
         
+        predictions = []
+        position = 0
+        for is_invalid, (_, row) in zip(invalid, dados.iterrows()):
+            metadata = {
+                'produto_id': row['ID_PRODUTO'],
+                'data_previsao': row['DIA'],
+                'timestamp': datetime.now().isoformat()
+            }
+            if is_invalid:
+                predictions.append({'error': f"Registro fora do schema_input.json ({'; '.join(errors)})",
+                                    'metadata': metadata})
+                continue
+            if frame is None:
+                predictions.append({'error': failure, 'metadata': metadata})
+                continue
+            pred = {name: values[position] for name, values in columns.items()}
+            position += 1
+            dias = pred['dias_ate_ruptura']
+            predictions.append({
+                'prediction': {
+                    'estoque_previsto': pred['estoque_previsto'],
+                    'demanda_prevista': pred['demanda_prevista']
+                },
+                'confidence': {
+                    'score': pred['score'],
+                    'interval_95': [pred['interval_low'], pred['interval_high']]
+                },
+                'alerts': {
+                    'level': pred['level'],
+                    'dias_ate_ruptura': dias if np.isfinite(dias) else None,
+                    'recommendation': pred['recommendation']
+                },
+                'metadata': {**model_metadata, 'model_version': pred['model_version'], **metadata}
+            })
         return predictions
     
-    def get_alerts_summary(self, predictions: List[Dict]) -> Dict:
+    def get_alerts_summary(self, predictions: List[Dict], nivel: str = None,
+                           hierarquia: pd.DataFrame = None) -> Dict:
         """
         Gera resumo de alertas a partir das previsões
         
         Args:
             predictions: Lista de previsões
+            nivel: Agregação opcional por produto ('produto_id'), por um campo
+                   de metadata (ex.: 'regiao') ou por uma coluna de hierarquia
+                   (ex.: 'CATEGORIA', 'REGIAO'), ou do catálogo de produtos
+            hierarquia: DataFrame ID_PRODUTO -> colunas de nível (ex.: CATEGORIA)
             
         Returns:
-            Resumo de alertas
+            Resumo de alertas; com nivel, {'nivel', 'total', 'grupos'} com um
+            resumo por grupo (as contagens dos grupos somam as do total)
         """
+        if nivel is not None:
+            lookup = {}
+            if hierarquia is not None and nivel in hierarquia.columns:
+                lookup = dict(zip(hierarquia['ID_PRODUTO'].tolist(), hierarquia[nivel].tolist()))
+            elif self.catalog is not None and nivel in self.catalog.columns:
+                ids = sorted({pred.get('metadata', {}).get('produto_id') for pred in predictions} - {None})
+                valores = pd.Series(self.catalog.lookup(ids, nivel)).tolist()
+                lookup = {pid: valor for pid, valor in zip(ids, valores) if not pd.isna(valor)}
+            grupos = {}
+            for pred in predictions:
+                metadata = pred.get('metadata', {})
+                if nivel in metadata:
+                    chave = metadata[nivel]
+                else:
+                    chave = lookup.get(metadata.get('produto_id'), 'SEM_' + nivel.upper())
+                grupos.setdefault(chave, []).append(pred)
+            return {
+                'nivel': nivel,
+                'total': self.get_alerts_summary(predictions),
+                'grupos': {chave: self.get_alerts_summary(preds) for chave, preds in grupos.items()}
+            }
+        
         summary = {
             'total_produtos': len(predictions),
             'criticos': 0,
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Agregação hierárquica e reconciliação de previsões
+
+Séries da base: (ID_PRODUTO, REGIAO). Níveis agregados (os que existirem nos
+dados): TOTAL, CATEGORIA, REGIAO, CATEGORIA_REGIAO e ID_PRODUTO.
+
+Matriz de soma S: cada série da base pertence a exatamente um nó de cada
+nível, então S é guardada esparsa como um vetor de códigos por nível (e o
+número de nós). S @ y é uma soma por grupo (np.bincount) e S.T @ u é uma
+indexação u[códigos]; nenhuma matriz densa é montada.
+
+Reconciliação (previsões coerentes: cada nó = soma dos filhos):
+- bottom_up: S @ previsões da base
+- ols, wls, mint: S (S' W^-1 S)^-1 S' W^-1 y com W diagonal - identidade (ols),
+  número de séries da base sob o nó (wls estrutural) ou variância do erro de
+  previsão de cada nó (mint com covariância diagonal, p.ex. (margem / 1,96)^2
+  dos intervalos de 95%). O sistema S' W^-1 S é resolvido por gradientes
+  conjugados com pré-condicionador diagonal; cada iteração custa uma soma por
+  grupo por nível.
+
+Uso:
+    python hierarchy.py previsoes.csv --metodo mint --output hierarquia.csv
+"""
+import argparse
+import sys
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from alerting import ALERT_LEVELS, AlertEngine
+
+# Nível -> colunas-chave, do mais agregado à base
+DEFAULT_LEVELS = {
+    'TOTAL': (),
+    'CATEGORIA': ('CATEGORIA',),
+    'REGIAO': ('REGIAO',),
+    'CATEGORIA_REGIAO': ('CATEGORIA', 'REGIAO'),
+    'ID_PRODUTO': ('ID_PRODUTO',),
+    'ID_PRODUTO_REGIAO': ('ID_PRODUTO', 'REGIAO')
+}
+RECONCILIATION_METHODS = ('bottom_up', 'ols', 'wls', 'mint')
+
+
+class HierarchyEngine:
+    """
+    Hierarquia de séries com matriz de soma esparsa
+    """
+
+    def __init__(self, bottom: pd.DataFrame, levels: Optional[Dict[str, Sequence[str]]] = None):
+        """
+        Args:
+            bottom: Uma linha por série da base, com as colunas-chave de todos os níveis
+            levels: Nível -> colunas-chave (padrão: DEFAULT_LEVELS presentes em bottom);
+                o último nível deve identificar unicamente as séries da base
+        """
+        levels = levels or DEFAULT_LEVELS
+        self.bottom = bottom.reset_index(drop=True)
+        self.levels = {name: tuple(cols) for name, cols in levels.items()
+                       if all(col in self.bottom.columns for col in cols)}
+        self.codes: Dict[str, np.ndarray] = {}
+        self.nodes: Dict[str, pd.DataFrame] = {}
+        self._counts: Dict[str, np.ndarray] = {}
+        for name, cols in self.levels.items():
+            if cols:
+                codes = self.bottom.groupby(list(cols), sort=True, observed=True).ngroup().to_numpy()
+            else:
+                codes = np.zeros(len(self.bottom), dtype=np.int64)
+            uniques, first = np.unique(codes, return_index=True)
+            self.codes[name] = codes
+            self._counts[name] = np.bincount(codes, minlength=len(uniques))
+            self.nodes[name] = self.bottom.iloc[first][list(cols)].reset_index(drop=True)
+        self.bottom_level = list(self.levels)[-1]
+        if len(self.nodes[self.bottom_level]) != len(self.bottom):
+            raise ValueError(f"O nível {self.bottom_level} não identifica unicamente as séries da base")
+        # Base em ordem de chave: S da base é a identidade
+        self._identity = {name: np.array_equal(codes, np.arange(len(codes))) for name, codes in self.codes.items()}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, levels: Optional[Dict[str, Sequence[str]]] = None
+                   ) -> Tuple['HierarchyEngine', np.ndarray]:
+        """
+        Hierarquia a partir de uma tabela com uma ou mais linhas por série da base
+
+        Returns:
+            (engine, posição da série da base de cada linha de df)
+        """
+        levels = levels or DEFAULT_LEVELS
+        present = {name: cols for name, cols in levels.items() if all(col in df.columns for col in cols)}
+        key_cols = list(present[list(present)[-1]])
+        all_cols = list(dict.fromkeys(col for cols in present.values() for col in cols))
+        row_codes = df.groupby(key_cols, sort=True, observed=True).ngroup().to_numpy()
+        first = np.unique(row_codes, return_index=True)[1]
+        bottom = df.iloc[first][all_cols]
+        return cls(bottom, present), row_codes
+
+    def size(self, level: str) -> int:
+        return len(self.nodes[level])
+
+    def series_count(self, level: str) -> np.ndarray:
+        """Número de séries da base sob cada nó (soma das colunas de S no nível)"""
+        return self._counts[level]
+
+    def sum_to(self, level: str, values: np.ndarray) -> np.ndarray:
+        """S_nivel @ values: soma por nó (values com n_base linhas, 1 ou 2 dimensões)"""
+        values = np.asarray(values, dtype=float)
+        if self._identity[level]:
+            return values.copy()
+        if values.ndim == 1:
+            return np.bincount(self.codes[level], weights=values, minlength=self.size(level))
+        # Uma coluna contígua por vez: bincount é bem mais rápido que reduceat em 2D
+        columns = np.ascontiguousarray(values.T)
+        return np.stack([np.bincount(self.codes[level], weights=c, minlength=self.size(level))
+                         for c in columns], axis=1)
+
+    def expand(self, level: str, node_values: np.ndarray) -> np.ndarray:
+        """S_nivel.T @ node_values: valor do nó de cada série da base"""
+        if self._identity[level]:
+            return np.asarray(node_values)
+        return np.asarray(node_values)[self.codes[level]]
+
+    def aggregate(self, values: np.ndarray) -> Dict[str, np.ndarray]:
+        """Agregação bottom-up em todos os níveis"""
+        return {level: self.sum_to(level, values) for level in self.levels}
+
+    def reconcile(self, base: Dict[str, np.ndarray], method: str = 'mint',
+                  variances: Optional[Dict[str, np.ndarray]] = None, nonnegative: bool = False,
+                  tol: float = 1e-8, max_iter: int = 200) -> Dict[str, np.ndarray]:
+        """
+        Previsões coerentes em todos os níveis
+
+        Args:
+            base: Nível -> previsões de cada nó (n_nós ou n_nós x k); a base é obrigatória,
+                níveis ausentes não entram na reconciliação
+            method: bottom_up, ols, wls ou mint
+            variances: Nível -> variância do erro de previsão de cada nó (mint)
+            nonnegative: Trunca a base reconciliada em zero e reagrega (estoque)
+        """
+        if method not in RECONCILIATION_METHODS:
+            raise ValueError(f"Método desconhecido: {method}. Métodos: {list(RECONCILIATION_METHODS)}")
+        if self.bottom_level not in base:
+            raise ValueError(f"Previsões do nível {self.bottom_level} são obrigatórias")
+        bottom = np.asarray(base[self.bottom_level], dtype=float)
+        if method != 'bottom_up':
+            weights = self._weights(base, method, variances)
+            if bottom.ndim == 1:
+                bottom = self._solve(base, weights, bottom, tol, max_iter)
+            else:
+                # Colunas (p.ex. horizontes) são sistemas independentes
+                bottom = np.stack([self._solve({level: np.asarray(v, dtype=float)[:, j] for level, v in base.items()},
+                                               weights, bottom[:, j], tol, max_iter)
+                                   for j in range(bottom.shape[1])], axis=1)
+        if nonnegative:
+            bottom = np.maximum(bottom, 0.0)
+        return self.aggregate(bottom)
+
+    def _weights(self, base: Dict[str, np.ndarray], method: str,
+                 variances: Optional[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """W^-1 (diagonal) de cada nível presente em base"""
+        weights = {}
+        for level in base:
+            if method == 'ols':
+                weights[level] = np.ones(self.size(level))
+            elif method == 'wls':
+                weights[level] = 1.0 / self.series_count(level)
+            else:
+                if variances is None or level not in variances:
+                    raise ValueError(f"mint exige a variância das previsões do nível {level}")
+                weights[level] = 1.0 / np.maximum(np.asarray(variances[level], dtype=float), 1e-12)
+        return weights
+
+    def _solve(self, base: Dict[str, np.ndarray], weights: Dict[str, np.ndarray], x: np.ndarray,
+               tol: float, max_iter: int) -> np.ndarray:
+        """Gradientes conjugados (pré-condicionados) para (S' W^-1 S) x = S' W^-1 y"""
+        def apply(v):
+            return sum(self.expand(level, w * self.sum_to(level, v)) for level, w in weights.items())
+
+        rhs = sum(self.expand(level, w * np.asarray(base[level], dtype=float)) for level, w in weights.items())
+        diagonal = sum(self.expand(level, w) for level, w in weights.items())
+
+        residual = rhs - apply(x)
+        z = residual / diagonal
+        direction = z.copy()
+        rz = residual @ z
+        threshold = tol * max(np.linalg.norm(rhs), 1e-12)
+        for _ in range(max_iter):
+            if np.linalg.norm(residual) <= threshold or rz <= 0:
+                break
+            product = apply(direction)
+            alpha = rz / (direction @ product)
+            x = x + alpha * direction
+            residual -= alpha * product
+            z = residual / diagonal
+            rz_next = residual @ z
+            direction = z + (rz_next / rz) * direction
+            rz = rz_next
+        return x
+
+    def to_frame(self, values: Dict[str, np.ndarray], value_col: str = 'PREVISAO_ESTOQUE') -> pd.DataFrame:
+        """Tabela longa: NIVEL, colunas-chave (vazias nos níveis acima) e o valor"""
+        key_cols = list(dict.fromkeys(col for cols in self.levels.values() for col in cols))
+        frames = []
+        for level, node_values in values.items():
+            frame = self.nodes[level].copy()
+            frame.insert(0, 'NIVEL', level)
+            frame[value_col] = node_values
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)[['NIVEL'] + key_cols + [value_col]]
+
+    def alert_counts(self, level_codes: np.ndarray) -> Dict[str, pd.DataFrame]:
+        """Séries CRITICO/ALERTA/NORMAL sob cada nó (somas de S: os níveis somam entre si)"""
+        one_hot = np.zeros((len(level_codes), len(ALERT_LEVELS)))
+        one_hot[np.arange(len(level_codes)), level_codes] = 1.0
+        counts = self.aggregate(one_hot)
+        return {level: pd.DataFrame(c.astype(np.int64), columns=['NORMAL', 'ALERTA', 'CRITICO'])
+                for level, c in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Agregação hierárquica e reconciliação de previsões')
+    parser.add_argument('input', help='CSV/Parquet com ID_PRODUTO, PREVISAO_ESTOQUE e CATEGORIA/REGIAO '
+                                      '(uma linha por produto e região; DIA opcional: usa o primeiro dia)')
+    parser.add_argument('--output', '-o', help='Tabela reconciliada por nível (CSV ou Parquet)')
+    parser.add_argument('--metodo', choices=RECONCILIATION_METHODS, default='bottom_up',
+                        help='Reconciliação (mint usa INTERVALO_SUPERIOR como variância)')
+    parser.add_argument('--base', help='CSV/Parquet com previsões próprias de níveis agregados '
+                                       '(NIVEL, colunas-chave, PREVISAO_ESTOQUE[, INTERVALO_SUPERIOR])')
+    args = parser.parse_args()
+
+    def load(path):
+        return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, encoding='utf-8-sig')
+
+    try:
+        start = time.perf_counter()
+        df = load(args.input)
+        if 'DIA' in df.columns:
+            df = df[df['DIA'] == df['DIA'].iloc[0]]
+        engine, rows = HierarchyEngine.from_frame(df)
+        n_bottom = len(engine.bottom)
+
+        def per_node(frame, level, column):
+            keys = list(engine.levels[level])
+            if not keys:
+                return frame[column].to_numpy(dtype=float)[:1]
+            index = engine.nodes[level].set_index(keys).index
+            values = frame.set_index(keys)[column]
+            return values.reindex(index).to_numpy(dtype=float)
+
+        base = {engine.bottom_level: np.bincount(rows, weights=df['PREVISAO_ESTOQUE'].to_numpy(dtype=float),
+                                                 minlength=n_bottom)}
+        variances = None
+        if 'INTERVALO_SUPERIOR' in df.columns:
+            margin = df['INTERVALO_SUPERIOR'].to_numpy(dtype=float) - df['PREVISAO_ESTOQUE'].to_numpy(dtype=float)
+            variances = {engine.bottom_level: np.bincount(rows, weights=(margin / 1.96) ** 2, minlength=n_bottom)}
+        if args.base:
+            extra = load(args.base)
+            for level, frame in extra.groupby('NIVEL', sort=False):
+                if level in engine.levels and level != engine.bottom_level:
+                    base[level] = per_node(frame, level, 'PREVISAO_ESTOQUE')
+                    if variances is not None and 'INTERVALO_SUPERIOR' in frame.columns:
+                        margin = per_node(frame, level, 'INTERVALO_SUPERIOR') - base[level]
+                        variances[level] = (margin / 1.96) ** 2
+
+        reconciled = engine.reconcile(base, args.metodo, variances, nonnegative=True)
+        table = engine.to_frame(reconciled)
+
+        estoque = engine.bottom.assign(PREVISAO_ESTOQUE=reconciled[engine.bottom_level])
+        codes = AlertEngine().level_codes(estoque['PREVISAO_ESTOQUE'].to_numpy(),
+                                          estoque['ID_PRODUTO'].to_numpy() if 'ID_PRODUTO' in estoque else None)
+        counts = pd.concat(engine.alert_counts(codes).values(), ignore_index=True)
+        table = pd.concat([table, counts], axis=1)
+
+        print(f"\n🧮 Hierarquia: {n_bottom} séries da base, "
+              + ', '.join(f"{level} {engine.size(level)}" for level in engine.levels)
+              + f" ({args.metodo}, {time.perf_counter() - start:.2f}s)")
+        for level in engine.levels:
+            if level in (engine.bottom_level, 'ID_PRODUTO'):
+                continue
+            print(f"\n📊 {level}")
+            for row in table[table['NIVEL'] == level].head(20).itertuples(index=False):
+                keys = ' / '.join(str(getattr(row, col)) for col in engine.levels[level]) or 'Total'
+                print(f"   {keys}: estoque previsto {row.PREVISAO_ESTOQUE:,.0f} | "
+                      f"🚨 {row.CRITICO} ⚠️  {row.ALERTA} ✅ {row.NORMAL}")
+
+        if args.output:
+            if args.output.endswith('.parquet'):
+                table.to_parquet(args.output, index=False)
+            else:
+                table.to_csv(args.output, index=False, encoding='utf-8-sig')
+            print(f"\n📄 Tabela hierárquica salva em: {args.output}")
+    except Exception as e:
+        print(f"\n❌ Erro: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do EstoquePredictionClient
+
+Reproduz misturas de requisições (historico_vendas_estoque_prod2.csv ou dados
+gerados) contra um endpoint configurável, em dois modos:
+- concorrência (laço fechado): N clientes enviando o mais rápido possível
+- taxa alvo (laço aberto): requisições agendadas a R por segundo; a latência é
+  medida a partir do instante agendado, então a fila do lado do cliente entra
+  na medição (sem "coordinated omission")
+
+Com --ramp, cada valor é um degrau (ex.: 50,100,200,400 req/s); o relatório
+indica o ponto de saturação: o primeiro degrau em que a vazão não acompanha o
+alvo, o p99 ultrapassa o SLO ou a taxa de erros passa do limite.
+
+Alvo padrão: um mock local (subcomando `mock`) que reutiliza o servidor de
+inferência e injeta latência, limite de capacidade, throttling (HTTP 429)
+e erros aleatórios (HTTP 500).
+
+Uso:
+    python load_test.py run --ramp 100,200,400,800 --step-duration 10 --slo-ms 100
+    python load_test.py run --concurrency 32 --duration 30 --endpoint-url http://127.0.0.1:8080
+    python load_test.py mock --port 8081 --latency-ms 40 --capacity 8 --throttle-rps 500
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from client_metrics import CLIENT_METRICS, LatencyHistogram
+from local_server import InferenceServer, create_socket
+from model_predictor import ModelPredictor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'exemplos'))
+from python_client import EstoquePredictionClient  # noqa: E402
+
+DEFAULT_DATA = Path(__file__).resolve().parents[2] / '01-Dados' / 'historico_vendas_estoque_prod2.csv'
+
+Request = Tuple[int, str, int, int]
+
+
+class MockEndpoint(InferenceServer):
+    """
+    Endpoint simulado: mesmo contrato do servidor local, com latência
+    (log-normal), capacidade limitada, throttling por token bucket e erros
+    """
+
+    def __init__(self, predictor: ModelPredictor, latency_ms: float = 20.0, latency_sigma: float = 0.25,
+                 capacity: int = 16, throttle_rps: Optional[float] = None, throttle_burst: Optional[int] = None,
+                 error_rate: float = 0.0, seed: int = 42, **batching):
+        """
+        Args:
+            latency_ms: Mediana da latência injetada por requisição
+            latency_sigma: Dispersão log-normal (0 = latência fixa)
+            capacity: Requisições atendidas simultaneamente (as demais esperam)
+            throttle_rps: Taxa máxima aceita; acima dela responde 429 (ThrottlingException)
+            throttle_burst: Tamanho do balde de tokens (padrão: throttle_rps)
+            error_rate: Fração de requisições respondidas com 500 (ModelError)
+        """
+        super().__init__(predictor, **batching)
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.capacity = capacity
+        self.throttle_rps = throttle_rps
+        self.throttle_burst = throttle_burst or throttle_rps
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+        self._slots = None
+        self._tokens = float(self.throttle_burst or 0)
+        self._last_refill = time.perf_counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.throttled = 0
+        self.injected_errors = 0
+
+    def _take_token(self) -> bool:
+        now = time.perf_counter()
+        self._tokens = min(self.throttle_burst, self._tokens + (now - self._last_refill) * self.throttle_rps)
+        self._last_refill = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes):
+        if path.split('?')[0] == '/metrics' and method == 'GET':
+            status, payload, content_type = await super().dispatch(method, path, headers, body)
+            metrics = dict(json.loads(payload), mock={
+                'in_flight': self.in_flight, 'max_in_flight': self.max_in_flight,
+                'throttled': self.throttled, 'injected_errors': self.injected_errors
+            })
+            return status, json.dumps(metrics).encode(), content_type
+
+        if method != 'POST':
+            return await super().dispatch(method, path, headers, body)
+
+        if self.throttle_rps and not self._take_token():
+            self.throttled += 1
+            return 429, b'{"error": "ThrottlingException: Rate exceeded"}', 'application/json'
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.capacity)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            async with self._slots:
+                latency = self.latency_ms
+                if self.latency_sigma > 0:
+                    latency = self.random.lognormvariate(math.log(self.latency_ms), self.latency_sigma)
+                await asyncio.sleep(latency / 1000)
+                if self.error_rate and self.random.random() < self.error_rate:
+                    self.injected_errors += 1
+                    return 500, b'{"error": "ModelError: erro injetado pelo mock"}', 'application/json'
+                return await super().dispatch(method, path, headers, body)
+        finally:
+            self.in_flight -= 1
+
+
+def load_requests(path: Optional[str] = None, n: int = 10000, seed: int = 42) -> List[Request]:
+    """
+    Mistura de requisições (produto, dia, flag, estoque) a partir de um CSV
+    histórico ou gerada com as distribuições de gerar_dataset.py
+    """
+    if path:
+        import pandas as pd
+        df = pd.read_csv(path, encoding='utf-8-sig')
+        return list(zip(df['ID_PRODUTO'].astype(int), df['DIA'].astype(str),
+                        df['FLAG_PROMOCAO'].astype(int), df['QUANTIDADE_ESTOQUE'].astype(int)))
+
+    rng = random.Random(seed)
+    return [(rng.randint(1001, 1050), f"{rng.randint(1, 28):02d}/01/2024",
+             int(rng.random() < 0.3), rng.randint(0, 300)) for _ in range(n)]
+
+
+def classify_error(message: str) -> str:
+    match = re.search(r'HTTP (\d{3})', message)
+    if match:
+        status = int(match.group(1))
+        return 'throttling' if status == 429 else f'http_{status // 100}xx'
+    if 'timed out' in message.lower():
+        return 'timeout'
+    return 'conexao'
+
+
+class StepRecorder:
+    """Latências, erros e linha do tempo (por segundo) de um degrau"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = LatencyHistogram()
+        self.service = LatencyHistogram()
+        self.errors: Dict[str, int] = {}
+        self.timeline: Dict[int, List] = {}
+        self.start = time.perf_counter()
+
+    def record(self, scheduled: float, sent: float, done: float, error: Optional[str]):
+        second = int(done - self.start)
+        with self.lock:
+            bucket = self.timeline.get(second)
+            if bucket is None:
+                bucket = self.timeline[second] = [0, 0, LatencyHistogram()]
+            if error is None:
+                self.latency.record((done - scheduled) * 1000)
+                self.service.record((done - sent) * 1000)
+                bucket[0] += 1
+                bucket[2].record((done - scheduled) * 1000)
+            else:
+                kind = classify_error(error)
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+                bucket[1] += 1
+
+
+class LoadGenerator:
+    """Gera carga usando o EstoquePredictionClient (um cliente por thread)"""
+
+    def __init__(self, endpoint_url: str, requests: List[Request], timeout: float = 10.0):
+        self.endpoint_url = endpoint_url
+        self.requests = requests
+        self.timeout = timeout
+        self._local = threading.local()
+        self._next = itertools.count()
+
+    def _client(self) -> EstoquePredictionClient:
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = EstoquePredictionClient(endpoint_url=self.endpoint_url)
+            client.runtime_client.timeout = self.timeout
+        return client
+
+    def _call(self, recorder: StepRecorder, scheduled: float):
+        produto_id, dia, flag, estoque = self.requests[next(self._next) % len(self.requests)]
+        sent = time.perf_counter()
+        result = self._client().predict_single(produto_id, dia, flag, estoque)
+        recorder.record(scheduled, sent, time.perf_counter(), result.get('error'))
+
+    def run_concurrency(self, concurrency: int, duration: float) -> StepRecorder:
+        """Laço fechado: cada thread envia a próxima requisição ao receber a resposta"""
+        recorder = StepRecorder()
+        deadline = recorder.start + duration
+
+        def worker():
+            while time.perf_counter() < deadline:
+                self._call(recorder, time.perf_counter())
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return recorder
+
+    def run_rate(self, rps: float, duration: float, max_workers: int = 256) -> StepRecorder:
+        """Laço aberto: requisições agendadas a `rps` por segundo, independentemente das respostas"""
+        recorder = StepRecorder()
+        total = int(rps * duration)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for i in range(total):
+                scheduled = recorder.start + i / rps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._call, recorder, scheduled)
+        return recorder
+
+
+def step_report(mode: str, target: float, duration: float, recorder: StepRecorder) -> Dict:
+    elapsed = max(time.perf_counter() - recorder.start, duration)
+    ok = recorder.latency.count
+    errors = sum(recorder.errors.values())
+    total = ok + errors
+    return {
+        'modo': mode,
+        'alvo': target,
+        'duracao_s': round(elapsed, 3),
+        'requisicoes': total,
+        'sucesso': ok,
+        'erros': dict(recorder.errors),
+        'taxa_erro': round(errors / total, 4) if total else 0.0,
+        'vazao_rps': round(ok / elapsed, 1),
+        'latencia': recorder.latency.summary(),
+        'tempo_servico': recorder.service.summary(),
+        'histograma': recorder.latency.buckets(),
+        'linha_do_tempo': [
+            {'segundo': second, 'sucesso': ok_s, 'erros': err_s, 'p99_ms': round(hist.percentile(99), 3)}
+            for second, (ok_s, err_s, hist) in sorted(recorder.timeline.items())
+        ]
+    }
+
+
+def find_saturation(steps: List[Dict], slo_ms: float, max_error_rate: float) -> Dict:
+    """
+    Primeiro degrau saturado: vazão abaixo de 90% do alvo (modo taxa) ou ganho
+    de vazão < 5% sobre o degrau anterior (modo concorrência), p99 acima do SLO
+    ou taxa de erros acima do limite
+    """
+    previous = None
+    for step in steps:
+        reasons = []
+        if step['modo'] == 'rps' and step['vazao_rps'] < 0.9 * step['alvo']:
+            reasons.append(f"vazão {step['vazao_rps']:.0f} < 90% do alvo")
+        if step['modo'] == 'concorrencia' and previous and step['vazao_rps'] < 1.05 * previous['vazao_rps']:
+            reasons.append("vazão parou de crescer com a concorrência")
+        if step['latencia']['p99_ms'] > slo_ms:
+            reasons.append(f"p99 {step['latencia']['p99_ms']:.1f} ms > SLO {slo_ms:.0f} ms")
+        if step['taxa_erro'] > max_error_rate:
+            reasons.append(f"taxa de erro {step['taxa_erro']:.2%} > {max_error_rate:.2%}")
+        if reasons:
+            return {
+                'saturado_em': step['alvo'],
+                'capacidade_sustentada': previous['alvo'] if previous else None,
+                'vazao_maxima_rps': max(s['vazao_rps'] for s in steps),
+                'motivos': reasons
+            }
+        previous = step
+    return {'saturado_em': None, 'capacidade_sustentada': steps[-1]['alvo'] if steps else None,
+            'vazao_maxima_rps': max((s['vazao_rps'] for s in steps), default=0.0), 'motivos': []}
+
+
+def print_step(step: Dict):
+    lat = step['latencia']
+    errors = ', '.join(f"{k}={v}" for k, v in step['erros'].items()) or '-'
+    print(f"  {step['modo']:<12} {step['alvo']:>8}  {step['vazao_rps']:>9,.1f} req/s  "
+          f"p50 {lat['p50_ms']:>8.2f}  p95 {lat['p95_ms']:>8.2f}  p99 {lat['p99_ms']:>8.2f} ms  "
+          f"erros {step['taxa_erro']:.2%} ({errors})")
+
+
+def start_mock(args) -> Tuple[subprocess.Popen, str]:
+    """Sobe o mock em outro processo (sem disputar o GIL com o gerador de carga)"""
+    command = [sys.executable, str(Path(__file__).resolve()), 'mock', '--port', '0']
+    for option in ('latency_ms', 'latency_sigma', 'capacity', 'throttle_rps', 'throttle_burst', 'error_rate'):
+        value = getattr(args, option)
+        if value is not None:
+            command += [f"--{option.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    match = re.search(r'http://[\d.]+:\d+', process.stdout.readline())
+    if not match:
+        process.kill()
+        raise RuntimeError("Não foi possível iniciar o mock de endpoint")
+    url = match.group(0)
+
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/ping", timeout=1).read()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return process, url
+
+
+def run_mock(args):
+    sock = create_socket(args.host, args.port)
+    host, port = sock.getsockname()[:2]
+    mock = MockEndpoint(ModelPredictor(args.model), latency_ms=args.latency_ms,
+                        latency_sigma=args.latency_sigma, capacity=args.capacity,
+                        throttle_rps=args.throttle_rps, throttle_burst=args.throttle_burst,
+                        error_rate=args.error_rate)
+    print(f"Mock de endpoint em http://{host}:{port} (latência {args.latency_ms} ms, "
+          f"capacidade {args.capacity}, throttling {args.throttle_rps or 'desligado'})", flush=True)
+    try:
+        asyncio.run(mock.serve(sock))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_load(args):
+    requests = load_requests(args.data or (str(DEFAULT_DATA) if DEFAULT_DATA.exists() else None), seed=args.seed)
+    mode = 'concorrencia' if args.concurrency or (args.mode == 'concorrencia' and not args.rps) else 'rps'
+    if mode == 'rps' and not args.rps and not args.ramp:
+        args.rps = 100.0
+    if args.ramp:
+        targets = [float(v) if mode == 'rps' else int(v) for v in args.ramp.split(',')]
+    else:
+        targets = [args.rps if mode == 'rps' else args.concurrency]
+
+    mock, endpoint_url = None, args.endpoint_url
+    if not endpoint_url:
+        mock, endpoint_url = start_mock(args)
+
+    print(f"\n{'='*60}")
+    print(f"TESTE DE CARGA: {endpoint_url} ({'mock local' if mock else 'endpoint externo'})")
+    print(f"Requisições na mistura: {len(requests):,} | degraus: {targets} | "
+          f"{args.step_duration or args.duration}s cada")
+    print(f"{'='*60}")
+
+    steps = []
+    try:
+        generator = LoadGenerator(endpoint_url, requests, timeout=args.timeout)
+        for target in targets:
+            duration = args.step_duration if args.ramp else args.duration
+            if mode == 'rps':
+                recorder = generator.run_rate(target, duration, max_workers=args.max_workers)
+            else:
+                recorder = generator.run_concurrency(target, duration)
+            step = step_report(mode, target, duration, recorder)
+            steps.append(step)
+            print_step(step)
+    finally:
+        if mock:
+            mock.terminate()
+            mock.wait()
+
+    saturation = find_saturation(steps, args.slo_ms, args.max_error_rate)
+    print(f"\n📈 Vazão máxima: {saturation['vazao_maxima_rps']:,.1f} req/s")
+    if saturation['saturado_em'] is not None:
+        print(f"🚨 Saturação em {saturation['saturado_em']} ({'; '.join(saturation['motivos'])})")
+        print(f"✅ Capacidade sustentada: {saturation['capacidade_sustentada']}")
+    else:
+        print("✅ Nenhum degrau saturou")
+
+    if args.output:
+        report = {
+            'endpoint': endpoint_url,
+            'mock': {k: getattr(args, k) for k in ('latency_ms', 'latency_sigma', 'capacity', 'throttle_rps',
+                                                  'throttle_burst', 'error_rate')} if mock else None,
+            'slo_ms': args.slo_ms,
+            'degraus': steps,
+            'saturacao': saturation,
+            # Latência por fase (serialização, rede, modelo), bytes e conexões dos clientes
+            'metricas_cliente': CLIENT_METRICS.snapshot()
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📄 Relatório salvo em: {args.output}")
+    return 0
+
+
+def main():
+    mock_options = argparse.ArgumentParser(add_help=False)
+    mock_options.add_argument('--latency-ms', type=float, default=20.0, help='Latência mediana injetada (padrão: 20)')
+    mock_options.add_argument('--latency-sigma', type=float, default=0.25, help='Dispersão log-normal da latência')
+    mock_options.add_argument('--capacity', type=int, default=16, help='Requisições simultâneas atendidas')
+    mock_options.add_argument('--throttle-rps', type=float, help='Taxa acima da qual o mock responde 429')
+    mock_options.add_argument('--throttle-burst', type=int, help='Rajada permitida pelo throttling')
+    mock_options.add_argument('--error-rate', type=float, default=0.0, help='Fração de respostas 500')
+
+    parser = argparse.ArgumentParser(description='Teste de carga do cliente de previsão')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    mock_parser = subparsers.add_parser('mock', parents=[mock_options], help='Sobe apenas o mock de endpoint')
+    mock_parser.add_argument('--host', default='127.0.0.1')
+    mock_parser.add_argument('--port', type=int, default=8081)
+    mock_parser.add_argument('--model', help='Arquivo JSON de parâmetros do modelo')
+
+    run_parser = subparsers.add_parser('run', parents=[mock_options], help='Executa o teste de carga')
+    run_parser.add_argument('--endpoint-url', help='Endpoint alvo (padrão: mock local em outro processo)')
+    run_parser.add_argument('--data', help=f'CSV com a mistura de requisições (padrão: {DEFAULT_DATA.name})')
+    run_parser.add_argument('--rps', type=float, help='Taxa alvo (laço aberto)')
+    run_parser.add_argument('--concurrency', type=int, help='Clientes simultâneos (laço fechado)')
+    run_parser.add_argument('--mode', choices=['rps', 'concorrencia'], default='rps',
+                            help='Interpretação de --ramp: taxa alvo ou clientes simultâneos')
+    run_parser.add_argument('--ramp', help='Degraus de taxa ou concorrência (ex.: 50,100,200,400)')
+    run_parser.add_argument('--duration', type=float, default=10.0, help='Duração sem --ramp (s)')
+    run_parser.add_argument('--step-duration', type=float, default=10.0, help='Duração de cada degrau (s)')
+    run_parser.add_argument('--slo-ms', type=float, default=100.0, help='SLO de latência p99 (padrão: 100)')
+    run_parser.add_argument('--max-error-rate', type=float, default=0.01, help='Taxa de erro aceitável')
+    run_parser.add_argument('--max-workers', type=int, default=256, help='Threads no modo de taxa alvo')
+    run_parser.add_argument('--timeout', type=float, default=10.0, help='Timeout por requisição (s)')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', '-o', help='Relatório JSON')
+
+    args = parser.parse_args()
+    return run_mock(args) if args.command == 'mock' else run_load(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Servidor local de inferência compatível com o contrato do SageMaker
+
+Rotas:
+- GET  /ping                              -> 200 quando o modelo está carregado
+- POST /invocations                       -> previsões (schema_output.json)
+- POST /endpoints/<nome>/invocations      -> mesmo contrato, caminho usado pelo SDK
+- GET  /metrics                           -> métricas do agendador de micro-batching
+
+Entrada aceita:
+- text/csv: um registro por linha, "produto,flag_promocao,estoque" (formato de
+  predict_single) ou "produto,dia,flag_promocao,estoque"
+- application/jsonlines / application/json: objetos com ID_PRODUTO,
+  FLAG_PROMOCAO, QUANTIDADE_ESTOQUE (um por linha, lista ou objeto único)
+- application/x-npy / application/vnd.apache.arrow.stream: lote colunar
+  binário (payload_codec.py)
+
+Saída: objeto JSON para um registro; lista JSON para vários registros, ou
+uma previsão por linha se Accept: application/jsonlines. Com Accept de um
+formato binário a resposta é colunar, com os metadados nos cabeçalhos
+X-Model-Version, X-Inference-Timestamp e X-Processing-Time-Ms.
+
+Entradas são validadas contra config/schema_input.json (400 se inválidas) e
+a saída de cada lote contra config/schema_output.json (schema_validation.py):
+um registro pelo validador compilado, lotes pelo caminho colunar.
+
+O modelo é carregado uma vez no processo principal e compartilhado pelos
+workers (fork, copy-on-write). Em cada worker as requisições concorrentes
+passam pelo BatchScheduler (batching.py) e são agregadas em uma única
+chamada vetorizada ao preditor.
+
+Com --registry o modelo vem da versão ativa do registro (model_registry.py).
+Cada worker acompanha o ponteiro CURRENT; uma nova versão é carregada e
+aquecida em uma thread e então substitui o preditor com uma única atribuição.
+Lotes já em execução terminam no preditor anterior e cada resposta informa
+em metadata.model_version a versão que de fato a produziu.
+
+Uso:
+    python local_server.py --port 8080 --workers 4 --max-batch-size 256 --max-wait-ms 2
+    python local_server.py --registry modelos --watch-interval 5
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    # Importação tardia (06-scripts-utilitarios/importacao_tardia.py no PYTHONPATH):
+    # `estoque.py servir --help` não carrega asyncio, numpy, pandas nem o modelo
+    from importacao_tardia import lazy_import
+except ImportError:
+    from importlib import import_module as lazy_import
+
+asyncio = lazy_import('asyncio')
+np = lazy_import('numpy')
+batching = lazy_import('batching')
+model_predictor = lazy_import('model_predictor')
+model_registry = lazy_import('model_registry')
+payload_codec = lazy_import('payload_codec')
+schema_validation = lazy_import('schema_validation')
+
+JSON_TYPES = ('application/json', 'application/jsonlines', 'application/x-jsonlines', 'application/x-ndjson')
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+class RequestError(Exception):
+    """Erro de entrada do cliente (HTTP 4xx)"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_csv(body: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Converte corpo text/csv em arrays (produto, flag, estoque)"""
+    produtos, flags, estoques = [], [], []
+    for line in body.decode('utf-8-sig').splitlines():
+        fields = [f.strip() for f in line.split(',')]
+        if not fields or fields == ['']:
+            continue
+        if len(fields) == 4:
+            fields = [fields[0], fields[2], fields[3]]
+        if len(fields) != 3:
+            raise RequestError(400, f"Linha CSV inválida (esperado produto,flag,estoque): {line!r}")
+        try:
+            produtos.append(int(fields[0]))
+            flags.append(int(fields[1]))
+            estoques.append(float(fields[2]))
+        except ValueError:
+            # Cabeçalho opcional
+            if not produtos and not fields[0].lstrip('-').isdigit():
+                continue
+            raise RequestError(400, f"Valor não numérico na linha CSV: {line!r}")
+    return np.array(produtos, dtype=np.int64), np.array(flags, dtype=np.int64), np.array(estoques, dtype=float)
+
+
+def whole_numbers(values: List[Any], field: str) -> np.ndarray:
+    """Array int64 de valores inteiros (1001.7 não é truncado para 1001: vira 400)"""
+    ints = np.array(values, dtype=np.int64)
+    if (ints != np.array(values, dtype=float)).any():
+        raise RequestError(400, f"{field} deve ser inteiro")
+    return ints
+
+
+def parse_json(body: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Converte corpo JSON (objeto, lista ou JSON lines) em arrays"""
+    text = body.decode('utf-8').strip()
+    try:
+        if text.startswith('['):
+            records = json.loads(text)
+        else:
+            records = [json.loads(line) for line in text.splitlines() if line.strip()]
+        return (
+            whole_numbers([r['ID_PRODUTO'] for r in records], 'ID_PRODUTO'),
+            whole_numbers([r['FLAG_PROMOCAO'] for r in records], 'FLAG_PROMOCAO'),
+            np.array([r['QUANTIDADE_ESTOQUE'] for r in records], dtype=float)
+        )
+    except (ValueError, KeyError, TypeError) as e:
+        raise RequestError(400, f"JSON inválido: {e}")
+
+
+def parse_body(content_type: str, body: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    content_type = payload_codec.media_type(content_type)
+    if content_type == 'text/csv':
+        return parse_csv(body)
+    if content_type in JSON_TYPES:
+        return parse_json(body)
+    if content_type in payload_codec.BINARY_TYPES:
+        try:
+            return payload_codec.decode_input(content_type, body)
+        except ValueError as e:
+            raise RequestError(400, str(e))
+    raise RequestError(415, f"Content-Type não suportado: {content_type}")
+
+
+class InferenceServer:
+    """Servidor HTTP/1.1 assíncrono (keep-alive) sobre asyncio"""
+
+    def __init__(self, predictor: model_predictor.ModelPredictor, max_batch_size: int = 256,
+                 max_wait_ms: float = 2.0, max_queue: int = 10000, validate: bool = True,
+                 registry: Optional[model_registry.ModelRegistry] = None, watch_interval: float = 5.0):
+        """
+        Args:
+            registry: Registro acompanhado para troca de versão sem downtime
+            watch_interval: Intervalo entre consultas ao ponteiro CURRENT (s)
+        """
+        self.predictor = predictor
+        self.validate = validate
+        self.registry = registry
+        self.watch_interval = watch_interval
+        self.swaps = 0
+        self._failed_version = None
+        if validate:
+            # Validadores compilados na inicialização, não por requisição
+            self.record_validator = schema_validation.input_validator(wire=True)
+            self.batch_validator = schema_validation.input_batch_validator(wire=True)
+            self.output_validator = schema_validation.output_batch_validator()
+        self.batcher = batching.BatchScheduler(self.predict_current, max_batch_size, max_wait_ms, max_queue)
+
+    def predict_current(self, *arrays):
+        """
+        Previsão de um lote no preditor ativo, com a saída checada uma vez por
+        lote (colunar); a chave 'predictor' leva o preditor que produziu o lote
+        """
+        predictor = self.predictor
+        out = predictor.predict_arrays(*arrays)
+        if self.validate:
+            self.output_validator.validate(out)
+        # Visão de passo zero: fatiada pelo BatchScheduler sem cópia
+        holder = np.empty((), dtype=object)
+        holder[()] = predictor
+        out['predictor'] = np.broadcast_to(holder, len(arrays[0]))
+        return out
+
+    def swap_predictor(self, predictor: model_predictor.ModelPredictor) -> float:
+        """
+        Aquece e ativa um novo preditor; lotes em andamento terminam no anterior
+
+        Returns:
+            Tempo de aquecimento em ms
+        """
+        warm_ms = predictor.warm_up()
+        self.predictor = predictor
+        self.swaps += 1
+        return warm_ms
+
+    async def watch_registry(self):
+        """Carrega em segundo plano cada nova versão ativa do registro"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            version = None
+            try:
+                version = self.registry.active_version()
+                if not version or version in (self.predictor.model_version, self._failed_version):
+                    continue
+                # Leitura do disco e aquecimento fora do loop de eventos
+                predictor = await loop.run_in_executor(None, self.registry.load, version)
+                warm_ms = await loop.run_in_executor(None, self.swap_predictor, predictor)
+                print(f"🔄 [{os.getpid()}] Modelo {version} ativo (aquecimento {warm_ms:.1f} ms)")
+            except Exception as e:
+                self._failed_version = version
+                print(f"⚠️  [{os.getpid()}] Versão {version} não carregada, mantendo "
+                      f"{self.predictor.model_version}: {e}")
+
+    def check_input(self, arrays: Tuple[np.ndarray, np.ndarray, np.ndarray]):
+        """Levanta RequestError(400) se a entrada violar schema_input.json"""
+        try:
+            if len(arrays[0]) == 1:
+                record = {name: values[0].item()
+                          for name, values in zip(schema_validation.WIRE_INPUT_FIELDS, arrays)}
+                self.record_validator(record)
+                return
+            invalid, errors = self.batch_validator.check(dict(zip(schema_validation.WIRE_INPUT_FIELDS, arrays)))
+        except schema_validation.SchemaValidationError as e:
+            errors = [str(e)]
+        if errors:
+            raise RequestError(400, f"Entrada fora do schema_input.json: {'; '.join(errors[:20])}")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.respond(writer, 400, '{"error": "Requisição inválida"}'.encode())
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Sem tamanho válido não há como achar o fim do corpo: responde e fecha
+                    await self.respond(writer, 400, '{"error": "Content-Length inválido"}'.encode())
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.respond(writer, 413, b'{"error": "Corpo muito grande"}')
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                try:
+                    status, payload, content_type, *extra = await self.dispatch(method, path, headers, body)
+                except Exception as e:
+                    status, content_type, extra = 500, 'application/json', []
+                    payload = json.dumps({'error': str(e)}, ensure_ascii=False).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                await self.respond(writer, status, payload, content_type, keep_alive, *extra)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes):
+        """
+        Returns:
+            (status, corpo, content-type) ou, com cabeçalhos extras,
+            (status, corpo, content-type, {cabeçalho: valor})
+        """
+        path = path.split('?')[0]
+        if path == '/ping' and method == 'GET':
+            return 200, b'', 'application/json'
+
+        if path == '/metrics' and method == 'GET':
+            metrics = dict(self.batcher.metrics(), pid=os.getpid(),
+                           model_version=self.predictor.model_version, model_swaps=self.swaps)
+            return 200, json.dumps(metrics).encode(), 'application/json'
+
+        if method == 'POST' and (path == '/invocations' or
+                                 (path.startswith('/endpoints/') and path.endswith('/invocations'))):
+            try:
+                arrays = parse_body(headers.get('content-type', 'text/csv'), body)
+                if self.validate and len(arrays[0]):
+                    self.check_input(arrays)
+            except RequestError as e:
+                return e.status, json.dumps({'error': str(e)}, ensure_ascii=False).encode(), 'application/json'
+            if len(arrays[0]) == 0:
+                return 400, b'{"error": "Nenhum registro recebido"}', 'application/json'
+
+            try:
+                out, elapsed_ms = await self.batcher.submit(arrays)
+            except batching.QueueFullError as e:
+                return 503, json.dumps({'error': str(e)}, ensure_ascii=False).encode(), 'application/json'
+            # Metadados do preditor que atendeu o lote (pode ter sido trocado depois)
+            predictor = out.pop('predictor')[0]
+            accept = payload_codec.negotiate(headers.get('accept'), payload_codec.BINARY_TYPES + JSON_TYPES,
+                                            'application/json')
+            if accept in payload_codec.BINARY_TYPES:
+                # Colunar: sem conversão para registros
+                extra = {payload_codec.METADATA_HEADERS[key]: str(value)
+                         for key, value in predictor.metadata(elapsed_ms).items()}
+                return 200, payload_codec.encode_output(out, accept), accept, extra
+            records = predictor.to_records(out, elapsed_ms)
+            if accept in JSON_TYPES[1:]:
+                payload = '\n'.join(json.dumps(r, ensure_ascii=False) for r in records) + '\n'
+                return 200, payload.encode(), 'application/jsonlines'
+            result = records[0] if len(records) == 1 else records
+            return 200, json.dumps(result, ensure_ascii=False).encode(), 'application/json'
+
+        return 404, b'{"error": "Rota inexistente"}', 'application/json'
+
+    @staticmethod
+    async def respond(writer: asyncio.StreamWriter, status: int, payload: bytes,
+                      content_type: str = 'application/json', keep_alive: bool = False,
+                      extra_headers: Optional[Dict[str, str]] = None):
+        reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+                   415: 'Unsupported Media Type', 429: 'Too Many Requests', 500: 'Internal Server Error',
+                   503: 'Service Unavailable'}
+        head = (f"HTTP/1.1 {status} {reasons.get(status, 'OK')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                + ''.join(f"{name}: {value}\r\n" for name, value in (extra_headers or {}).items())
+                + "\r\n")
+        writer.write(head.encode('latin-1') + payload)
+        await writer.drain()
+
+    async def serve(self, sock: socket.socket):
+        server = await asyncio.start_server(self.handle_connection, sock=sock, backlog=1024)
+        if self.registry is not None:
+            self._watcher = asyncio.create_task(self.watch_registry())
+        async with server:
+            await server.serve_forever()
+
+
+def create_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+def run_worker(predictor: model_predictor.ModelPredictor, sock: socket.socket, **batching):
+    try:
+        asyncio.run(InferenceServer(predictor, **batching).serve(sock))
+    except KeyboardInterrupt:
+        pass
+
+
+def serve(predictor: model_predictor.ModelPredictor, host: str = '127.0.0.1', port: int = 8080, workers: int = 1,
+          **batching):
+    """
+    Sobe o servidor; com workers > 1 faz fork após carregar o modelo
+
+    Args:
+        batching: max_batch_size, max_wait_ms e max_queue do BatchScheduler, validate,
+                  registry e watch_interval (InferenceServer)
+    """
+    sock = create_socket(host, port)
+    print(f"Servidor de inferência em http://{host}:{port} "
+          f"(modelo {predictor.model_version}, {workers} worker(s))")
+
+    if workers <= 1 or not hasattr(os, 'fork'):
+        run_worker(predictor, sock, **batching)
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            run_worker(predictor, sock, **batching)
+            os._exit(0)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for pid in children:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Servidor local de inferência (contrato SageMaker)')
+    parser.add_argument('--host', default='127.0.0.1', help='Endereço (padrão: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='Porta (padrão: 8080)')
+    parser.add_argument('--workers', type=int, default=1, help='Processos worker (padrão: 1)')
+    parser.add_argument('--model', help='Arquivo JSON de parâmetros do modelo')
+    parser.add_argument('--registry', nargs='?', const='',
+                        help='Usa a versão ativa do registro e troca de versão sem downtime '
+                             '(padrão: $ESTOQUE_MODEL_REGISTRY ou ./modelos)')
+    parser.add_argument('--watch-interval', type=float, default=5.0,
+                        help='Intervalo de consulta ao registro em segundos (padrão: 5)')
+    parser.add_argument('--max-batch-size', type=int, default=256,
+                        help='Registros por chamada ao modelo (padrão: 256)')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0,
+                        help='Espera máxima para formar um lote em ms (padrão: 2)')
+    parser.add_argument('--max-queue', type=int, default=10000,
+                        help='Registros na fila antes de responder 503 (padrão: 10000)')
+    parser.add_argument('--no-validation', action='store_true',
+                        help='Desliga a validação de entrada/saída contra os schemas')
+    args = parser.parse_args(argv)
+
+    registry = model_registry.ModelRegistry(args.registry or None) if args.registry is not None else None
+    try:
+        predictor = registry.load() if registry is not None else model_predictor.ModelPredictor(args.model)
+    except model_registry.RegistryError as e:
+        print(f"❌ {e}")
+        return 1
+    predictor.warm_up()
+    serve(predictor, args.host, args.port, args.workers,
+          max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms, max_queue=args.max_queue,
+          validate=not args.no_validation, registry=registry, watch_interval=args.watch_interval)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+"""
+Preditor local do modelo de previsão de estoque
+
+Reproduz localmente o contrato do endpoint SageMaker (config/schema_output.json)
+para testes, execução offline e testes de carga. O "modelo" é uma tabela de
+demanda diária por produto (com fator de promoção) estimada a partir do
+histórico; a previsão de todos os registros é feita de forma vetorizada.
+Intervalos e scores de confiança vêm de prediction_intervals.IntervalEngine,
+calibrado por horizonte no próprio from_history.
+"""
+import json
+import time
+import numpy as np
+import pandas as pd
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from alerting import ALERT_LEVEL_DTYPE, RECOMMENDATION_DTYPE, AlertEngine
+from prediction_intervals import COVERAGE, DEFAULT_HORIZON, IntervalEngine, conformal_margins
+
+# Parâmetros padrão: vendas de 5-20 un/dia sem promoção e 15-30 com promoção
+# (gerar_dataset.py) e RMSE do model_card.json. margem_horizonte vazio: margens
+# 1,96 * rmse * sqrt(h) até a calibração
+DEFAULT_PARAMS = {
+    'model_version': '1.0.0',
+    'demanda_padrao': 12.5,
+    'fator_promocao': 1.8,
+    'demanda_produto': {},
+    'rmse': 12.5,
+    'margem_horizonte': []
+}
+
+# Fração inicial do histórico (em dias) usada para estimar a demanda na calibração
+CALIBRATION_SPLIT = 0.8
+MIN_CALIBRATION_DAYS = 10
+
+
+def _estimate_demand(consumo: np.ndarray, produto_t: np.ndarray, normal: np.ndarray,
+                     fator_promocao: float):
+    """Demanda base global, fator de promoção e demanda base por produto (ids ordenados)"""
+    base_global = float(consumo[normal].mean()) if normal.any() else float(consumo.mean())
+    if normal.any() and (~normal).any() and base_global > 0:
+        fator_promocao = round(float(consumo[~normal].mean()) / base_global, 4)
+    # Promoções descontadas pelo fator
+    base = np.where(normal, consumo, consumo / fator_promocao)
+    ids, inverse = np.unique(produto_t, return_inverse=True)
+    demanda = np.bincount(inverse, weights=base) / np.bincount(inverse)
+    return base_global, fator_promocao, ids, demanda
+
+
+class ModelPredictor:
+    """
+    Preditor local compatível com o endpoint estoque-prediction-endpoint
+    """
+
+    def __init__(self, model_path: Optional[str] = None, params: Optional[Dict] = None,
+                 alert_engine: Optional[AlertEngine] = None, catalog=None):
+        """
+        Inicializa o preditor
+
+        Args:
+            model_path: Arquivo JSON com os parâmetros do modelo (opcional)
+            params: Parâmetros do modelo já carregados (opcional)
+            alert_engine: Limiares de alerta (padrão: faixas 0-20 crítico, 21-50 alerta)
+            catalog: ProductCatalog com limiares por produto/categoria (sem alert_engine)
+        """
+        self.alert_engine = alert_engine or AlertEngine(catalog=catalog)
+        self.params = dict(DEFAULT_PARAMS)
+        if model_path:
+            with open(model_path, encoding='utf-8') as f:
+                self.params.update(json.load(f))
+        if params:
+            self.params.update(params)
+        self._build_lookup()
+        self.intervals = IntervalEngine.from_params(self.params)
+
+    def _build_lookup(self):
+        """Indexa a demanda por produto em arrays ordenados (busca vetorizada)"""
+        demanda = {int(k): float(v) for k, v in self.params.get('demanda_produto', {}).items()}
+        self._ids = np.array(sorted(demanda), dtype=np.int64)
+        self._demanda = np.array([demanda[i] for i in self._ids], dtype=float)
+
+    @property
+    def model_version(self) -> str:
+        return str(self.params['model_version'])
+
+    @classmethod
+    def from_history(cls, df: pd.DataFrame, model_version: str = '1.0.0') -> 'ModelPredictor':
+        """
+        Estima a demanda diária por produto a partir do histórico de estoque
+
+        Os intervalos são calibrados por conformal split: demanda estimada com
+        os primeiros 80% dos dias e margens medidas nos dias restantes (ver
+        prediction_intervals); o modelo final usa o histórico completo.
+
+        Args:
+            df: DataFrame com colunas ID_PRODUTO, DIA, FLAG_PROMOCAO, QUANTIDADE_ESTOQUE
+            model_version: Versão atribuída ao modelo estimado
+        """
+        dates = df['DIA']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, format='%d/%m/%Y', errors='coerce')
+        days = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+        produto = df['ID_PRODUTO'].to_numpy(dtype=np.int64)
+        estoque = df['QUANTIDADE_ESTOQUE'].to_numpy(dtype=float)
+        promo = df['FLAG_PROMOCAO'].to_numpy(dtype=np.int64)
+
+        order = np.lexsort((days, produto))
+        produto, days, estoque, promo = produto[order], days[order], estoque[order], promo[order]
+
+        # Consumo diário entre leituras consecutivas do mesmo produto (sem reposição)
+        valid = (produto[1:] == produto[:-1]) & (np.diff(days) > 0) & (np.diff(estoque) <= 0)
+        consumo = (-np.diff(estoque) / np.maximum(np.diff(days), 1))[valid]
+        produto_t, promo_t, days_t = produto[1:][valid], promo[1:][valid], days[1:][valid]
+
+        params = dict(DEFAULT_PARAMS, model_version=model_version)
+        if len(consumo) == 0:
+            return cls(params=params)
+
+        normal = promo_t == 0
+        params.update(cls._calibrate(consumo, produto_t, normal, days_t, params['fator_promocao']))
+
+        # Demanda base por produto: consumo sem promoção (promoções descontadas pelo fator)
+        base_global, fator, ids, demanda = _estimate_demand(consumo, produto_t, normal, params['fator_promocao'])
+        fitted = demanda[np.searchsorted(ids, produto_t)] * np.where(normal, 1.0, fator)
+        params.update({
+            'demanda_padrao': round(base_global, 4),
+            'fator_promocao': fator,
+            'demanda_produto': {str(i): round(float(d), 4) for i, d in zip(ids, demanda)},
+            'rmse': round(float(np.sqrt(np.mean((consumo - fitted) ** 2))), 4) or DEFAULT_PARAMS['rmse']
+        })
+        return cls(params=params)
+
+    @staticmethod
+    def _calibrate(consumo: np.ndarray, produto_t: np.ndarray, normal: np.ndarray,
+                   days_t: np.ndarray, fator_promocao: float) -> Dict[str, Any]:
+        """
+        Margens conformais por horizonte (1..14 dias) medidas fora da amostra
+
+        Returns:
+            Parâmetros margem_horizonte, cobertura_alvo e janelas_calibracao
+            (vazio se o histórico tem menos de MIN_CALIBRATION_DAYS dias)
+        """
+        distinct_days = np.unique(days_t)
+        if len(distinct_days) < MIN_CALIBRATION_DAYS:
+            return {}
+        cutoff = distinct_days[int(len(distinct_days) * CALIBRATION_SPLIT) - 1]
+        train = days_t <= cutoff
+        if not train.any() or train.all():
+            return {}
+
+        base_global, fator, ids, demanda = _estimate_demand(
+            consumo[train], produto_t[train], normal[train], fator_promocao)
+        produto_c = produto_t[~train]
+        pos = np.clip(np.searchsorted(ids, produto_c), 0, len(ids) - 1)
+        base = np.where(ids[pos] == produto_c, demanda[pos], base_global)
+        fitted = base * np.where(normal[~train], 1.0, fator)
+
+        # Registros em ordem (produto, dia): janelas de h dias consecutivos por produto
+        margins, counts = conformal_margins(consumo[~train] - fitted, produto_c, DEFAULT_HORIZON, COVERAGE)
+        return {
+            'margem_horizonte': [round(float(m), 4) if np.isfinite(m) else None for m in margins],
+            'cobertura_alvo': COVERAGE,
+            'janelas_calibracao': int(counts[0])
+        }
+
+    def save(self, model_path: str):
+        """Salva os parâmetros do modelo em JSON"""
+        path = Path(model_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.params, f, indent=2, ensure_ascii=False)
+
+    def warm_up(self, batch_sizes=(1, 16, 256)) -> float:
+        """
+        Executa previsões de aquecimento (produtos conhecidos e desconhecidos,
+        com e sem promoção) antes de o preditor receber tráfego
+
+        Returns:
+            Tempo total em ms
+        """
+        start = time.perf_counter()
+        ids = self._ids if len(self._ids) else np.array([0], dtype=np.int64)
+        for size in batch_sizes:
+            index = np.arange(size)
+            produto_ids = np.where(index % 4 == 3, -1, ids[index % len(ids)])
+            out = self.predict_arrays(produto_ids, index % 2, (index * 7 % 200).astype(float))
+            self.to_records(out)
+        return (time.perf_counter() - start) * 1000
+
+    def demanda_base(self, produto_ids: np.ndarray) -> np.ndarray:
+        """Demanda diária sem promoção para cada produto (padrão para produtos sem histórico)"""
+        produto_ids = np.asarray(produto_ids, dtype=np.int64)
+        demanda = np.full(len(produto_ids), float(self.params['demanda_padrao']))
+        if len(self._ids):
+            pos = np.clip(np.searchsorted(self._ids, produto_ids), 0, len(self._ids) - 1)
+            found = self._ids[pos] == produto_ids
+            demanda[found] = self._demanda[pos[found]]
+        return demanda
+
+    def predict_arrays(
+        self,
+        produto_ids: np.ndarray,
+        flags_promocao: np.ndarray,
+        estoques: np.ndarray,
+        horizonte: Union[int, np.ndarray] = 1
+    ) -> Dict[str, np.ndarray]:
+        """
+        Previsão vetorizada para arrays de produto, promoção e estoque atual
+
+        Args:
+            horizonte: Dias à frente (escalar ou um valor por registro); a
+                margem do intervalo e o score usam a incerteza do horizonte
+
+        Returns:
+            Dicionário de arrays: estoque_previsto, demanda_prevista, score,
+            interval_low, interval_high, level, dias_ate_ruptura, recommendation
+            (level e recommendation como pd.Categorical)
+        """
+        flags = np.asarray(flags_promocao, dtype=float)
+        estoques = np.asarray(estoques, dtype=float)
+
+        demanda = self.demanda_base(produto_ids) * np.where(flags >= 1, self.params['fator_promocao'], 1.0)
+        estoque_previsto = np.maximum(estoques - demanda * horizonte, 0.0)
+
+        critico, alerta = self.alert_engine.thresholds(produto_ids, n=len(estoques))
+        level_idx = self.alert_engine.codes_for(estoque_previsto, critico, alerta)
+        score = self.intervals.scores(estoque_previsto, level_idx, critico, alerta, horizonte)
+        low, high = self.intervals.intervals(estoque_previsto, horizonte)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dias = np.where(demanda > 0, estoques / demanda, np.inf)
+
+        return {
+            'estoque_previsto': np.round(estoque_previsto, 1),
+            'demanda_prevista': np.round(demanda, 1),
+            'score': score,
+            'interval_low': np.round(low, 1),
+            'interval_high': np.round(high, 1),
+            'level': pd.Categorical.from_codes(level_idx, dtype=ALERT_LEVEL_DTYPE),
+            'dias_ate_ruptura': np.round(dias, 1),
+            'recommendation': pd.Categorical.from_codes(level_idx, dtype=RECOMMENDATION_DTYPE)
+        }
+
+    def predict_frame(self, dados: pd.DataFrame) -> pd.DataFrame:
+        """Previsão colunar: retorna um DataFrame com uma linha por registro"""
+        out = self.predict_arrays(
+            dados['ID_PRODUTO'].to_numpy(),
+            dados['FLAG_PROMOCAO'].to_numpy(),
+            dados['QUANTIDADE_ESTOQUE'].to_numpy()
+        )
+        return pd.DataFrame(out, index=dados.index)
+
+    def predict_trajectory(
+        self,
+        produto_ids: np.ndarray,
+        flags_promocao: np.ndarray,
+        estoques: np.ndarray,
+        horizonte: int = DEFAULT_HORIZON,
+        inicio: Optional[Union[str, pd.Timestamp]] = None
+    ) -> pd.DataFrame:
+        """
+        Trajetórias de estoque de horizonte dias para cada registro, numa única
+        chamada vetorizada (n * horizonte linhas)
+
+        Args:
+            inicio: Data do primeiro dia previsto (padrão: amanhã)
+
+        Returns:
+            DataFrame no formato de previsoes_estoque.csv (ID_PRODUTO, DIA,
+            PREVISAO_ESTOQUE, NIVEL_ALERTA, CONFIANCA_PREVISAO) mais HORIZONTE,
+            DEMANDA_PREVISTA, INTERVALO_INFERIOR e INTERVALO_SUPERIOR;
+            compatível com AlertEngine.evaluate_trajectories e com
+            ReplenishmentPlanner.plan
+        """
+        produto_ids = np.repeat(np.asarray(produto_ids, dtype=np.int64), horizonte)
+        dias = np.tile(np.arange(1, horizonte + 1), len(produto_ids) // horizonte if horizonte else 0)
+        out = self.predict_arrays(
+            produto_ids,
+            np.repeat(np.asarray(flags_promocao), horizonte),
+            np.repeat(np.asarray(estoques, dtype=float), horizonte),
+            horizonte=dias
+        )
+        if inicio is None:
+            inicio = pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+        datas = pd.Timestamp(inicio).to_datetime64().astype('datetime64[D]') + (dias - 1)
+        return pd.DataFrame({
+            'ID_PRODUTO': produto_ids,
+            'DIA': datas.astype('datetime64[ns]'),
+            'HORIZONTE': dias,
+            'PREVISAO_ESTOQUE': out['estoque_previsto'],
+            'DEMANDA_PREVISTA': out['demanda_prevista'],
+            'INTERVALO_INFERIOR': out['interval_low'],
+            'INTERVALO_SUPERIOR': out['interval_high'],
+            'NIVEL_ALERTA': out['level'],
+            'CONFIANCA_PREVISAO': out['score']
+        })
+
+    def metadata(self, processing_time_ms: float = 0.0) -> Dict[str, Any]:
+        """Bloco metadata de schema_output.json para uma chamada"""
+        return {
+            'model_version': self.model_version,
+            'inference_timestamp': datetime.now(timezone.utc).isoformat(),
+            'processing_time_ms': round(processing_time_ms, 3)
+        }
+
+    def to_records(self, out: Dict[str, np.ndarray], processing_time_ms: float = 0.0) -> List[Dict]:
+        """Converte a saída vetorizada em dicionários no formato de schema_output.json"""
+        metadata = self.metadata(processing_time_ms)
+        levels = np.asarray(out['level']).tolist()
+        recommendations = np.asarray(out['recommendation']).tolist()
+        records = []
+        for i in range(len(out['estoque_previsto'])):
+            dias = float(out['dias_ate_ruptura'][i])
+            records.append({
+                'prediction': {
+                    'estoque_previsto': float(out['estoque_previsto'][i]),
+                    'demanda_prevista': float(out['demanda_prevista'][i])
+                },
+                'confidence': {
+                    'score': float(out['score'][i]),
+                    'interval_95': [float(out['interval_low'][i]), float(out['interval_high'][i])]
+                },
+                'alerts': {
+                    'level': levels[i],
+                    'dias_ate_ruptura': dias if np.isfinite(dias) else None,
+                    'recommendation': recommendations[i]
+                },
+                'metadata': dict(metadata)
+            })
+        return records
+
+    def predict_batch(self, dados: pd.DataFrame) -> List[Dict]:
+        """
+        Faz previsões em lote
+
+        Args:
+            dados: DataFrame com colunas ID_PRODUTO, FLAG_PROMOCAO, QUANTIDADE_ESTOQUE
+
+        Returns:
+            Lista de previsões no formato de schema_output.json
+        """
+        start = time.perf_counter()
+        out = self.predict_arrays(
+            dados['ID_PRODUTO'].to_numpy(),
+            dados['FLAG_PROMOCAO'].to_numpy(),
+            dados['QUANTIDADE_ESTOQUE'].to_numpy()
+        )
+        return self.to_records(out, (time.perf_counter() - start) * 1000)
+
+    def predict(self, registro: Union[pd.Series, Dict]) -> Dict:
+        """
+        Faz previsão para um único registro
+
+        Args:
+            registro: Series ou dicionário com ID_PRODUTO, FLAG_PROMOCAO, QUANTIDADE_ESTOQUE
+
+        Returns:
+            Dicionário com previsão, confiança, alertas e metadados
+        """
+        start = time.perf_counter()
+        out = self.predict_arrays(
+            np.array([registro['ID_PRODUTO']]),
+            np.array([registro['FLAG_PROMOCAO']]),
+            np.array([registro['QUANTIDADE_ESTOQUE']])
+        )
+        return self.to_records(out, (time.perf_counter() - start) * 1000)[0]
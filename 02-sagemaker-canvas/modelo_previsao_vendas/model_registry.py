@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Registro local de modelos versionados
+
+Estrutura do diretório (padrão: ./modelos ou $ESTOQUE_MODEL_REGISTRY):
+
+    modelos/
+      CURRENT              -> versão ativa (ex.: "1.1.0")
+      1.0.0/model.json     -> parâmetros do ModelPredictor
+      1.0.0/model_card.json
+      1.1.0/...
+
+Cada versão é gravada em um diretório temporário e renomeada ao final, e o
+ponteiro CURRENT é trocado com os.replace: leitores nunca veem uma versão
+pela metade. Os servidores (local_server.py --registry) acompanham CURRENT,
+carregam a nova versão em segundo plano, aquecem e trocam o preditor
+atomicamente.
+
+Uso:
+    python model_registry.py list
+    python model_registry.py train historico.csv --activate
+    python model_registry.py train ../../06-scripts-utilitarios/historico@12
+    python model_registry.py register --model params.json --version 1.2.0
+    python model_registry.py activate 1.1.0
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from model_predictor import ModelPredictor
+
+try:
+    # Histórico consolidado opcional (06-scripts-utilitarios/consolidar_historico.py no PYTHONPATH)
+    from consolidar_historico import is_store, read_snapshot
+except ImportError:
+    is_store = None
+
+DEFAULT_REGISTRY = Path(__file__).parent / 'modelos'
+MODEL_CARD = Path(__file__).parent / 'model_card.json'
+
+
+class RegistryError(Exception):
+    """Versão inexistente ou registro inválido"""
+
+
+def load_model_card(path: Path = MODEL_CARD) -> Dict[str, Any]:
+    """
+    Lê um model card JSON, tolerando texto ao redor (o model_card.json do
+    repositório está dentro de um bloco markdown)
+    """
+    text = Path(path).read_text(encoding='utf-8')
+    start = text.find('{')
+    if start < 0:
+        raise RegistryError(f"Nenhum objeto JSON em {path}")
+    try:
+        card, _ = json.JSONDecoder().raw_decode(text, start)
+    except json.JSONDecodeError as e:
+        raise RegistryError(f"Model card inválido em {path}: {e}")
+    return card
+
+
+def version_key(version: str):
+    """Ordenação semântica ('1.10.0' depois de '1.9.0'); partes não numéricas no fim"""
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part) for part in version.split('.'))
+
+
+def next_version(version: Optional[str]) -> str:
+    """Incrementa a versão minor (retreinamento): 1.2.3 -> 1.3.0"""
+    if not version:
+        return '1.0.0'
+    parts = [int(p) if p.isdigit() else 0 for p in version.split('.')[:3]] + [0, 0]
+    return f"{parts[0]}.{parts[1] + 1}.0"
+
+
+class ModelRegistry:
+    """
+    Diretório de versões do modelo com ponteiro para a versão ativa
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        """
+        Args:
+            root: Diretório do registro (padrão: $ESTOQUE_MODEL_REGISTRY ou ./modelos)
+        """
+        self.root = Path(root or os.environ.get('ESTOQUE_MODEL_REGISTRY') or DEFAULT_REGISTRY)
+
+    def versions(self) -> List[str]:
+        """Versões registradas, da mais antiga para a mais recente"""
+        if not self.root.is_dir():
+            return []
+        return sorted((p.name for p in self.root.iterdir()
+                       if p.is_dir() and (p / 'model.json').is_file()), key=version_key)
+
+    def active_version(self) -> Optional[str]:
+        """Versão apontada por CURRENT (ou a mais recente, sem ponteiro)"""
+        try:
+            version = (self.root / 'CURRENT').read_text(encoding='utf-8').strip()
+        except FileNotFoundError:
+            versions = self.versions()
+            return versions[-1] if versions else None
+        return version or None
+
+    def _version_dir(self, version: str) -> Path:
+        path = self.root / version
+        if not (path / 'model.json').is_file():
+            raise RegistryError(f"Versão {version} não encontrada em {self.root}")
+        return path
+
+    def card(self, version: str) -> Dict[str, Any]:
+        """Model card da versão ({} se ausente)"""
+        path = self._version_dir(version) / 'model_card.json'
+        return load_model_card(path) if path.is_file() else {}
+
+    def load(self, version: Optional[str] = None) -> ModelPredictor:
+        """Preditor da versão indicada (padrão: ativa)"""
+        version = version or self.active_version()
+        if version is None:
+            raise RegistryError(f"Nenhuma versão registrada em {self.root}")
+        predictor = ModelPredictor(str(self._version_dir(version) / 'model.json'))
+        # A versão vem do diretório, mesmo que o JSON tenha sido copiado de outra
+        predictor.params['model_version'] = version
+        return predictor
+
+    def register(self, predictor: ModelPredictor, card: Optional[Dict[str, Any]] = None,
+                 activate: bool = False, training_data: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Grava uma nova versão (model.json + model_card.json)
+
+        Args:
+            predictor: Preditor com model_version definida
+            card: Model card base (padrão: o da versão ativa ou model_card.json)
+            activate: Aponta CURRENT para a nova versão
+            training_data: Campos de training_data a atualizar no card
+
+        Returns:
+            Versão registrada
+        """
+        version = predictor.model_version
+        if (self.root / version).exists():
+            raise RegistryError(f"Versão {version} já registrada em {self.root}")
+        if card is None:
+            active = self.active_version()
+            card = self.card(active) if active else (load_model_card() if MODEL_CARD.is_file() else {})
+        card = json.loads(json.dumps(card))
+        details = card.setdefault('model_details', {})
+        details.update({'version': version, 'date_created': date.today().isoformat()})
+        card.setdefault('metrics', {}).setdefault('performance_metrics', {})['rmse'] = predictor.params['rmse']
+        if training_data:
+            card.setdefault('training_data', {}).update(training_data)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f'.{version}-', dir=self.root))
+        try:
+            predictor.save(str(staging / 'model.json'))
+            with open(staging / 'model_card.json', 'w', encoding='utf-8') as f:
+                json.dump(card, f, indent=2, ensure_ascii=False)
+            os.replace(staging, self.root / version)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version: str):
+        """Troca atômica do ponteiro CURRENT"""
+        self._version_dir(version)
+        fd, tmp = tempfile.mkstemp(prefix='.CURRENT-', dir=self.root)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(version + '\n')
+        os.replace(tmp, self.root / 'CURRENT')
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Resumo de cada versão (métricas e data do model card)"""
+        active = self.active_version()
+        rows = []
+        for version in self.versions():
+            card = self.card(version)
+            rows.append({
+                'version': version,
+                'active': version == active,
+                'date_created': card.get('model_details', {}).get('date_created'),
+                'metrics': card.get('metrics', {}).get('performance_metrics', {})
+            })
+        return rows
+
+
+def train(registry: ModelRegistry, data_path: str, version: Optional[str] = None,
+          activate: bool = False) -> str:
+    """
+    Estima um novo preditor a partir do histórico e registra como nova versão
+
+    data_path pode ser um CSV ou um diretório do histórico consolidado
+    (historico ou historico@versão, lido como snapshot consistente)
+    """
+    snapshot = None
+    if Path(data_path).is_dir() or (is_store is not None and is_store(data_path)):
+        if is_store is None:
+            raise RegistryError("Leitura do histórico consolidado requer consolidar_historico.py no PYTHONPATH")
+        df, manifest = read_snapshot(data_path)
+        snapshot = manifest['versao']
+    else:
+        df = pd.read_csv(data_path)
+    missing = [c for c in ('ID_PRODUTO', 'DIA', 'FLAG_PROMOCAO', 'QUANTIDADE_ESTOQUE') if c not in df.columns]
+    if missing:
+        raise RegistryError(f"Colunas ausentes em {data_path}: {', '.join(missing)}")
+    versions = registry.versions()
+    version = version or next_version(versions[-1] if versions else None)
+    predictor = ModelPredictor.from_history(df, model_version=version)
+    dates = pd.to_datetime(df['DIA'], format='%d/%m/%Y', errors='coerce')
+    training_data = {
+        'dataset': Path(data_path).name,
+        'total_records': int(len(df)),
+        'date_range': [d.date().isoformat() if pd.notna(d) else None for d in (dates.min(), dates.max())]
+    }
+    if snapshot is not None:
+        training_data['snapshot'] = snapshot
+    return registry.register(predictor, activate=activate, training_data=training_data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Registro local de versões do modelo')
+    parser.add_argument('--registry', help='Diretório do registro (padrão: $ESTOQUE_MODEL_REGISTRY ou ./modelos)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help='Lista as versões registradas')
+
+    train_parser = commands.add_parser('train', help='Estima e registra uma versão a partir do histórico')
+    train_parser.add_argument('data', help='CSV com ID_PRODUTO, DIA, FLAG_PROMOCAO, QUANTIDADE_ESTOQUE '
+                                           'ou diretório do histórico consolidado (aceita @versão)')
+    train_parser.add_argument('--version', help='Versão (padrão: incrementa a minor da mais recente)')
+    train_parser.add_argument('--activate', action='store_true', help='Ativa a versão registrada')
+
+    register_parser = commands.add_parser('register', help='Registra parâmetros já estimados')
+    register_parser.add_argument('--model', help='Arquivo JSON de parâmetros (padrão: parâmetros padrão)')
+    register_parser.add_argument('--version', help='Versão (padrão: model_version do arquivo)')
+    register_parser.add_argument('--card', help='Model card (padrão: o da versão ativa ou model_card.json)')
+    register_parser.add_argument('--activate', action='store_true', help='Ativa a versão registrada')
+
+    activate_parser = commands.add_parser('activate', help='Ativa uma versão (troca sem downtime nos servidores)')
+    activate_parser.add_argument('version')
+
+    args = parser.parse_args()
+    registry = ModelRegistry(args.registry)
+
+    try:
+        if args.command == 'list':
+            rows = registry.describe()
+            if not rows:
+                print(f"📭 Nenhuma versão em {registry.root}")
+            for row in rows:
+                metrics = ', '.join(f"{k}={v}" for k, v in row['metrics'].items())
+                print(f"{'➡️ ' if row['active'] else '   '} {row['version']:<10} "
+                      f"{row['date_created'] or '-':<12} {metrics}")
+        elif args.command == 'train':
+            version = train(registry, args.data, args.version, args.activate)
+            print(f"✅ Versão {version} registrada em {registry.root}" + (' (ativa)' if args.activate else ''))
+        elif args.command == 'register':
+            predictor = ModelPredictor(args.model)
+            if args.version:
+                predictor.params['model_version'] = args.version
+            card = load_model_card(args.card) if args.card else None
+            version = registry.register(predictor, card=card, activate=args.activate)
+            print(f"✅ Versão {version} registrada em {registry.root}" + (' (ativa)' if args.activate else ''))
+        elif args.command == 'activate':
+            registry.activate(args.version)
+            print(f"✅ Versão {args.version} ativa")
+    except RegistryError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
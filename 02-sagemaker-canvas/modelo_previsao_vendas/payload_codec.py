@@ -0,0 +1,254 @@
+"""
+Formatos binários colunares para lotes de inferência
+
+- application/x-npy: array estruturado NumPy (.npy), sem dependências extras
+- application/vnd.apache.arrow.stream: Arrow IPC (stream), quando o pyarrow
+  está instalado; level e recommendation vão como colunas dictionary
+
+Entrada: colunas ID_PRODUTO, FLAG_PROMOCAO, QUANTIDADE_ESTOQUE (DIA e outras
+colunas são ignoradas). Saída: as mesmas chaves de
+ModelPredictor.predict_arrays, um registro por linha (dias_ate_ruptura
+infinito permanece inf; só o JSON converte para null). Os metadados
+(model_version, inference_timestamp, processing_time_ms) vão em cabeçalhos
+HTTP (METADATA_HEADERS).
+
+text/csv e JSON continuam sendo o formato padrão; negotiate() escolhe o
+formato de resposta a partir do cabeçalho Accept.
+"""
+import io
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+NPY_TYPE = 'application/x-npy'
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+BINARY_TYPES = (NPY_TYPE, ARROW_TYPE) if pa is not None else (NPY_TYPE,)
+
+INPUT_FIELDS = ('ID_PRODUTO', 'FLAG_PROMOCAO', 'QUANTIDADE_ESTOQUE')
+INPUT_DTYPE = np.dtype([('ID_PRODUTO', '<i8'), ('FLAG_PROMOCAO', '<i8'), ('QUANTIDADE_ESTOQUE', '<f8')])
+
+# Strings em bytes ASCII de tamanho fixo (32 bytes por registro em vez de 128
+# com 'U'); larguras múltiplas de 8 permitem decodificar por hash (_factorize_bytes)
+OUTPUT_DTYPE = np.dtype([
+    ('estoque_previsto', '<f8'), ('demanda_prevista', '<f8'), ('score', '<f8'),
+    ('interval_low', '<f8'), ('interval_high', '<f8'), ('level', 'S8'),
+    ('dias_ate_ruptura', '<f8'), ('recommendation', 'S24')
+])
+
+METADATA_HEADERS = {
+    'model_version': 'X-Model-Version',
+    'inference_timestamp': 'X-Inference-Timestamp',
+    'processing_time_ms': 'X-Processing-Time-Ms'
+}
+
+
+def media_type(content_type: Optional[str]) -> str:
+    """Tipo sem parâmetros, em minúsculas ('text/csv; charset=utf-8' -> 'text/csv')"""
+    return (content_type or '').split(';')[0].strip().lower()
+
+
+def negotiate(accept: Optional[str], available: Sequence[str], default: str) -> str:
+    """
+    Escolhe o formato de resposta pelo cabeçalho Accept (q-values e curingas)
+
+    Args:
+        accept: Valor do cabeçalho Accept (None/vazio -> default)
+        available: Formatos suportados, em ordem de preferência do servidor
+        default: Formato quando nada do Accept é suportado
+
+    Returns:
+        Tipo escolhido
+    """
+    if not accept:
+        return default
+    best, best_q = default, 0.0
+    for item in accept.split(','):
+        media, *params = [part.strip() for part in item.split(';')]
+        media = media.lower()
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media in ('*/*', 'application/*'):
+            candidate = default
+        elif media in available:
+            candidate = media
+        else:
+            continue
+        # Empate no q: vale a ordem do cliente
+        if q > best_q:
+            best, best_q = candidate, q
+    return best
+
+
+def _as_int(values: np.ndarray, name: str) -> np.ndarray:
+    if values.dtype.kind in 'iu':
+        return values.astype(np.int64, copy=False)
+    if values.dtype.kind == 'f' and np.array_equal(values, np.floor(values)):
+        return values.astype(np.int64)
+    raise ValueError(f"{name} deve ser inteiro (recebido {values.dtype})")
+
+
+def encode_input(produto_ids, flags_promocao, estoques, content_type: str = NPY_TYPE) -> bytes:
+    """Serializa um lote de entrada (arrays ou colunas) no formato binário"""
+    content_type = media_type(content_type)
+    if content_type == ARROW_TYPE:
+        table = pa.table({
+            'ID_PRODUTO': np.asarray(produto_ids, dtype=np.int64),
+            'FLAG_PROMOCAO': np.asarray(flags_promocao, dtype=np.int64),
+            'QUANTIDADE_ESTOQUE': np.asarray(estoques, dtype=float)
+        })
+        return _write_arrow(table)
+    records = np.empty(len(produto_ids), dtype=INPUT_DTYPE)
+    records['ID_PRODUTO'] = produto_ids
+    records['FLAG_PROMOCAO'] = flags_promocao
+    records['QUANTIDADE_ESTOQUE'] = estoques
+    return _write_npy(records)
+
+
+def decode_input(content_type: str, body: bytes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Converte um corpo binário em arrays (produto, flag, estoque)
+
+    Aceita array estruturado com os campos de INPUT_FIELDS ou matriz (n, 3)
+    nessa ordem. Levanta ValueError se o corpo não puder ser interpretado.
+    """
+    content_type = media_type(content_type)
+    if content_type == ARROW_TYPE:
+        if pa is None:
+            raise ValueError('pyarrow não instalado')
+        try:
+            table = pa.ipc.open_stream(body).read_all()
+        except pa.ArrowInvalid as e:
+            raise ValueError(f"Arrow IPC inválido: {e}")
+        missing = [name for name in INPUT_FIELDS if name not in table.column_names]
+        if missing:
+            raise ValueError(f"Colunas ausentes: {', '.join(missing)}")
+        columns = [table.column(name).to_numpy() for name in INPUT_FIELDS]
+    else:
+        array = _read_npy(body)
+        if array.dtype.names:
+            missing = [name for name in INPUT_FIELDS if name not in array.dtype.names]
+            if missing:
+                raise ValueError(f"Campos ausentes: {', '.join(missing)}")
+            columns = [array[name] for name in INPUT_FIELDS]
+        elif array.ndim == 2 and array.shape[1] == 3:
+            columns = [array[:, i] for i in range(3)]
+        else:
+            raise ValueError(f"Esperado array estruturado ou matriz (n, 3), recebido {array.shape}")
+    return (
+        _as_int(np.asarray(columns[0]), 'ID_PRODUTO'),
+        _as_int(np.asarray(columns[1]), 'FLAG_PROMOCAO'),
+        np.asarray(columns[2], dtype=float)
+    )
+
+
+def encode_output(out: Dict[str, np.ndarray], content_type: str) -> bytes:
+    """Serializa a saída de predict_arrays no formato binário"""
+    content_type = media_type(content_type)
+    if content_type == ARROW_TYPE:
+        # pd.Categorical -> coluna dictionary (categorias enviadas uma vez)
+        return _write_arrow(pa.table({name: out[name] for name in OUTPUT_DTYPE.names}))
+    records = np.empty(len(out['estoque_previsto']), dtype=OUTPUT_DTYPE)
+    for name in OUTPUT_DTYPE.names:
+        values = out[name]
+        if isinstance(values, pd.Categorical):
+            # Converte só as categorias; os registros recebem por código
+            values = np.asarray(values.categories, dtype=OUTPUT_DTYPE[name])[values.codes]
+        records[name] = values
+    return _write_npy(records)
+
+
+def decode_output(content_type: str, body: bytes) -> Dict[str, np.ndarray]:
+    """
+    Converte uma resposta binária no dicionário de arrays de predict_arrays
+    (level e recommendation como pd.Categorical)
+    """
+    content_type = media_type(content_type)
+    if content_type == ARROW_TYPE:
+        table = pa.ipc.open_stream(body).read_all()
+        frame = table.to_pandas()
+        return {name: frame[name].array if isinstance(frame[name].dtype, pd.CategoricalDtype)
+                else frame[name].to_numpy() for name in frame.columns}
+    records = _read_npy(body)
+    out = {}
+    for name in records.dtype.names:
+        values = records[name]
+        if values.dtype.kind == 'S':
+            # Poucos valores distintos: decodifica as categorias, não os registros
+            codes, uniques = _factorize_bytes(values)
+            values = pd.Categorical.from_codes(codes, categories=[u.decode('ascii') for u in uniques])
+        out[name] = values
+    return out
+
+
+def output_frame(out: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Saída decodificada como DataFrame (uma linha por registro)"""
+    return pd.DataFrame(out, copy=False)
+
+
+def _factorize_bytes(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    pd.factorize para strings de bytes de tamanho fixo
+
+    Cada valor vira um hash uint64 das suas palavras de 8 bytes (fatorado
+    como inteiro); a igualdade das palavras com as do representativo de cada
+    grupo confirma que não houve colisão. Sem isso, pd.factorize converte tudo para objeto.
+    """
+    width = values.dtype.itemsize
+    if width % 8 == 0 and len(values):
+        words = np.ascontiguousarray(values).view('<u8').reshape(len(values), width // 8)
+        key = words[:, 0].copy()
+        for i in range(1, words.shape[1]):
+            key *= np.uint64(0x9E3779B97F4A7C15)
+            key ^= words[:, i]
+        codes, _ = pd.factorize(key)
+        first = np.empty(codes.max() + 1, dtype=np.intp)
+        first[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+        if (words == words[first][codes]).all():
+            return codes, values[first]
+    codes, uniques = pd.factorize(values)
+    return codes, np.asarray(uniques, dtype=values.dtype)
+
+
+def _write_npy(array: np.ndarray) -> bytes:
+    """Cabeçalho .npy + buffer do array, sem a cópia em blocos de np.save"""
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, np.lib.format.header_data_from_array_1_0(array))
+    return header.getvalue() + np.ascontiguousarray(array).data.cast('B')
+
+
+def _read_npy(body: bytes) -> np.ndarray:
+    """Lê um .npy como visão do corpo (sem cópia); recusa dtypes de objeto"""
+    stream = io.BytesIO(body)
+    try:
+        major, _ = np.lib.format.read_magic(stream)
+        read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(stream)
+    except (ValueError, OSError, EOFError) as e:
+        raise ValueError(f".npy inválido: {e}")
+    if dtype.hasobject:
+        raise ValueError('.npy com dtype de objeto não é aceito')
+    count = int(np.prod(shape))
+    if len(body) - stream.tell() < count * dtype.itemsize:
+        raise ValueError('.npy truncado')
+    array = np.frombuffer(body, dtype=dtype, count=count, offset=stream.tell())
+    return array.reshape(shape, order='F' if fortran_order else 'C')
+
+
+def _write_arrow(table) -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,204 @@
+"""
+Intervalos de previsão e scores de confiança vetorizados
+
+Intervalos conformais por resíduos (split conformal): ModelPredictor.from_history
+estima a demanda com os primeiros 80% do histórico (backtest) e mede, no
+restante, o erro do estoque previsto h dias à frente, isto é, a soma de h
+resíduos diários consecutivos do mesmo produto. A margem de cada horizonte é
+o quantil conformal de ordem ceil((n + 1) * 0.95) dos erros absolutos. As
+margens nunca diminuem com o horizonte e, além do último horizonte
+calibrado, crescem com sqrt(h) (a incerteza aumenta com a distância, como em
+padroes_identificados.md). Sem calibração, a margem é 1,96 * rmse * sqrt(h).
+
+Score de confiança: probabilidade de o nível de alerta previsto
+(NORMAL/ALERTA/CRITICO) estar correto, supondo erro normal com desvio
+margem_h / 1,96. Margens e a CDF normal são tabelas pré-calculadas; com
+limiares escalares múltiplos de 0,1 (o caso do endpoint) o score é uma tabela
+por horizonte e estoque previsto em passos de 0,1 unidade, consultada por
+indexação.
+"""
+import math
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+COVERAGE = 0.95
+Z_COVERAGE = 1.959963984540054
+DEFAULT_HORIZON = 14
+
+# Passo (unidades de estoque) da tabela de scores por estoque previsto
+SCORE_STEP = 0.1
+
+# CDF normal tabelada em passos de 0,005 desvio no intervalo [-8, 8]
+_CDF_STEP = 0.005
+_CDF_LIMIT = 8.0
+_CDF_TABLE = np.array([0.5 * math.erfc(-z / math.sqrt(2))
+                       for z in np.arange(-_CDF_LIMIT, _CDF_LIMIT + _CDF_STEP / 2, _CDF_STEP)])
+
+Horizons = Union[int, np.ndarray]
+
+
+def _on_grid(threshold) -> bool:
+    """Limiar escalar múltiplo de SCORE_STEP (níveis constantes em cada célula da tabela)"""
+    if np.ndim(threshold):
+        return False
+    cells = float(threshold) / SCORE_STEP
+    return abs(cells - round(cells)) < 1e-6
+
+
+def _cdf_scaled(distance: np.ndarray, inverse_step) -> np.ndarray:
+    """CDF normal de distance * inverse_step * _CDF_STEP (altera distance)"""
+    distance *= inverse_step
+    distance += _CDF_LIMIT / _CDF_STEP + 0.5
+    np.clip(distance, 0, len(_CDF_TABLE) - 1, out=distance)
+    return _CDF_TABLE[distance.astype(np.intp)]
+
+
+def normal_cdf(z: np.ndarray) -> np.ndarray:
+    """CDF normal padrão por consulta à tabela (erro < 0,002)"""
+    return _cdf_scaled(np.array(z, dtype=float, ndmin=1), 1.0 / _CDF_STEP)
+
+
+def normal_ppf(probability: float) -> float:
+    """Quantil da normal padrão (inversa da tabela da CDF, interpolação linear)"""
+    if not 0 < probability < 1:
+        raise ValueError(f"Probabilidade deve estar entre 0 e 1: {probability}")
+    grid = np.arange(len(_CDF_TABLE)) * _CDF_STEP - _CDF_LIMIT
+    return float(np.interp(probability, _CDF_TABLE, grid))
+
+
+def conformal_margins(residuals: np.ndarray, groups: np.ndarray, horizon: int = DEFAULT_HORIZON,
+                      coverage: float = COVERAGE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Margens conformais por horizonte a partir de resíduos diários
+
+    Args:
+        residuals: Resíduos diários (observado - previsto), em ordem de dia dentro de cada grupo
+        groups: Grupo (produto) de cada resíduo; grupos contíguos
+        horizon: Último horizonte calibrado
+        coverage: Cobertura alvo
+
+    Returns:
+        (margens[h - 1], número de janelas de calibração por horizonte);
+        margem NaN quando não há janelas suficientes para o quantil conformal
+    """
+    residuals = np.asarray(residuals, dtype=float)
+    groups = np.asarray(groups)
+    cumulative = np.r_[0.0, np.cumsum(residuals)]
+    margins = np.full(horizon, np.nan)
+    counts = np.zeros(horizon, dtype=np.int64)
+    for h in range(1, min(horizon, len(residuals)) + 1):
+        # Janela de h resíduos consecutivos dentro do mesmo grupo
+        end = np.arange(h, len(residuals) + 1)
+        same_group = groups[end - 1] == groups[end - h]
+        errors = np.abs(cumulative[end] - cumulative[end - h])[same_group]
+        n = len(errors)
+        counts[h - 1] = n
+        rank = math.ceil((n + 1) * coverage)
+        if n and rank <= n:
+            margins[h - 1] = np.partition(errors, rank - 1)[rank - 1]
+    return margins, counts
+
+
+class IntervalEngine:
+    """Margens por horizonte, intervalos e scores de confiança"""
+
+    def __init__(self, margins: Optional[Sequence[float]] = None, rmse: float = 12.5,
+                 horizon: int = DEFAULT_HORIZON):
+        """
+        Args:
+            margins: Margens calibradas por horizonte (1..len); None/NaN usam rmse
+            rmse: Erro da demanda diária (fallback 1,96 * rmse * sqrt(h))
+            horizon: Horizontes pré-calculados sem extrapolação
+        """
+        fallback = Z_COVERAGE * float(rmse) * np.sqrt(np.arange(1, horizon + 1))
+        table = fallback.copy()
+        if margins is not None and len(margins):
+            calibrated = np.asarray(margins, dtype=float)[:horizon]
+            known = np.isfinite(calibrated)
+            table[:len(calibrated)][known] = calibrated[known]
+            # Horizontes sem janelas suficientes: último calibrado escalado por sqrt(h)
+            last = np.flatnonzero(known)
+            if len(last) and last[-1] + 1 < horizon:
+                h0 = last[-1] + 1
+                table[h0:] = table[h0 - 1] * np.sqrt(np.arange(h0 + 1, horizon + 1) / h0)
+        # Incerteza não diminui com o horizonte
+        self.margins = np.maximum.accumulate(table)
+        self._score_tables: Dict[Tuple[int, float, float], np.ndarray] = {}
+
+    @classmethod
+    def from_params(cls, params: Dict[str, Any]) -> 'IntervalEngine':
+        return cls(params.get('margem_horizonte'), params.get('rmse', 12.5))
+
+    def margin(self, horizons: Horizons) -> Union[float, np.ndarray]:
+        """Margem de 95% para cada horizonte (dias à frente, >= 1)"""
+        if np.ndim(horizons) == 0:
+            h = max(int(horizons), 1)
+            return float(self._margin_table(h)[h - 1])
+        index = np.asarray(horizons, dtype=np.intp) - 1
+        np.maximum(index, 0, out=index)
+        return self._margin_table(int(index.max(initial=0)) + 1)[index]
+
+    def _margin_table(self, max_horizon: int) -> np.ndarray:
+        """Margens dos horizontes 1..max_horizon (sqrt(h) além dos pré-calculados)"""
+        if max_horizon <= len(self.margins):
+            return self.margins
+        extra = np.arange(len(self.margins) + 1, max_horizon + 1)
+        return np.r_[self.margins, self.margins[-1] * np.sqrt(extra / len(self.margins))]
+
+    def intervals(self, previsto: np.ndarray, horizons: Horizons = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Intervalo de 95% do estoque previsto (limite inferior em zero)"""
+        margin = self.margin(horizons)
+        return np.maximum(previsto - margin, 0.0), previsto + margin
+
+    def scores(self, previsto: np.ndarray, level_codes: np.ndarray, critico, alerta,
+               horizons: Horizons = 1) -> np.ndarray:
+        """
+        Probabilidade do nível previsto (0 = NORMAL, 1 = ALERTA, 2 = CRITICO)
+        dado o erro do horizonte, com 4 casas decimais
+        """
+        if not (_on_grid(critico) and _on_grid(alerta)):
+            return np.round(self._band_probability(previsto, level_codes, critico, alerta, horizons), 4)
+        critico, alerta = float(critico), float(alerta)
+        if np.ndim(horizons) == 0:
+            table = self._score_table(int(horizons), critico, alerta)
+            row = None
+        else:
+            # Trajetórias: uma linha da tabela por horizonte
+            row = np.maximum(np.asarray(horizons, dtype=np.intp), 1) - 1
+            tables = [self._score_table(h, critico, alerta) for h in range(1, int(row.max(initial=0)) + 2)]
+            width = max(len(t) for t in tables)
+            table = np.stack([np.pad(t, (0, width - len(t)), mode='edge') for t in tables])
+        # Célula k: estoque em ((k - 1) * passo, k * passo], sempre num único nível
+        index = np.ceil(previsto * (1.0 / SCORE_STEP))
+        np.clip(index, 0, table.shape[-1] - 1, out=index)
+        flat = index.astype(np.intp)
+        if row is not None:
+            flat += row * table.shape[-1]
+        return table.ravel()[flat]
+
+    def _score_table(self, horizon: int, critico: float, alerta: float) -> np.ndarray:
+        """Score por estoque previsto 0, 0.1, ... até alerta + 8 desvios (acima: último valor)"""
+        key = (horizon, critico, alerta)
+        if key not in self._score_tables:
+            sigma = self.margin(horizon) / Z_COVERAGE
+            cells = int(np.ceil((max(alerta, 0.0) + _CDF_LIMIT * sigma) / SCORE_STEP)) + 1
+            grid = np.arange(cells) * SCORE_STEP
+            codes = (grid <= alerta + 1e-9).astype(np.int8) + (grid <= critico + 1e-9).astype(np.int8)
+            self._score_tables[key] = np.round(self._band_probability(grid, codes, critico, alerta, horizon), 4)
+        return self._score_tables[key]
+
+    def _band_probability(self, previsto: np.ndarray, level_codes: np.ndarray, critico, alerta,
+                          horizons: Horizons) -> np.ndarray:
+        sigma = np.maximum(self.margin(horizons) / Z_COVERAGE, 1e-9)
+        # Faixa (inferior, superior] do nível previsto de cada registro
+        if np.ndim(critico) == 0 and np.ndim(alerta) == 0:
+            upper = np.array([np.inf, alerta, critico])[level_codes]
+            lower = np.array([alerta, critico, -np.inf])[level_codes]
+        else:
+            upper = np.choose(level_codes, np.broadcast_arrays(np.inf, alerta, critico))
+            lower = np.choose(level_codes, np.broadcast_arrays(alerta, critico, -np.inf))
+        inverse_step = 1.0 / (sigma * _CDF_STEP)
+        upper -= previsto
+        lower -= previsto
+        return _cdf_scaled(upper, inverse_step) - _cdf_scaled(lower, inverse_step)
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Catálogo de produtos indexado
+
+Substitui a faixa fixa 1001-1050: ids ordenados (int64) e atributos por
+produto (CATEGORIA, REGIAO, LEAD_TIME_DIAS, CRITICO, ALERTA, ...) em arrays
+alinhados. Consultas são np.searchsorted sobre os ids: checar ou juntar n
+registros contra k produtos custa O(n log k), sem dicionários Python.
+
+Estrutura do diretório (padrão: $ESTOQUE_CATALOGO_PRODUTOS ou
+01-Dados/catalogo_produtos; sem catálogo, vale a faixa 1001-1050):
+
+    catalogo_produtos/
+      catalogo.json                 -> manifesto: número de produtos, menor/maior
+                                       id, hash, atributos e categorias
+      <hash>.ID_PRODUTO.npy         -> ids ordenados
+      <hash>.<ATRIBUTO>.npy         -> valores (categóricos como códigos int32)
+
+Com ids densos (faixa até 64x o número de produtos) a busca usa um índice
+direto id -> posição, O(1) por registro.
+
+Os arrays são abertos com memória mapeada (np.load mmap_mode='r') e só no
+primeiro uso: validar um relatório em cache ou montar o schema lê apenas o
+manifesto. O manifesto é trocado com os.replace depois dos arrays; leitores
+nunca veem um catálogo pela metade. Cada gravação mantém os arrays da geração
+anterior (apagados só na gravação seguinte), então um leitor carregado antes
+de uma reconstrução continua consultando o catálogo que leu.
+
+Uso:
+    python product_catalog.py build produtos.csv -o ../../01-Dados/catalogo_produtos
+    python product_catalog.py build produtos.csv -o catalogo --dicionario ../../01-Dados/dicionario_produtos.json
+    python product_catalog.py info ../../01-Dados/catalogo_produtos
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    # Importação tardia (06-scripts-utilitarios/importacao_tardia.py no PYTHONPATH)
+    from importacao_tardia import lazy_import
+    np = lazy_import('numpy')
+    pd = lazy_import('pandas')
+except ImportError:
+    import numpy as np
+    import pandas as pd
+
+DEFAULT_CATALOG = Path(__file__).resolve().parent.parent.parent / '01-Dados' / 'catalogo_produtos'
+MANIFEST = 'catalogo.json'
+ID_COLUMN = 'ID_PRODUTO'
+# Faixa do layout canônico, usada quando não há catálogo
+DEFAULT_RANGE = (1001, 1050)
+# Índice direto (int32) até 16M entradas e 64 ids possíveis por produto; senão busca binária
+DENSE_INDEX_LIMIT = 1 << 24
+DENSE_INDEX_SPARSITY = 64
+
+
+class ProductCatalog:
+    """
+    Ids de produto ordenados e atributos alinhados, com busca vetorizada
+    """
+
+    def __init__(self, manifest: Dict[str, Any], arrays: Optional[Dict[str, np.ndarray]] = None,
+                 path: Optional[Path] = None):
+        """
+        Args:
+            manifest: Número de produtos, faixa de ids, hash e atributos (ver from_frame)
+            arrays: ID_PRODUTO e atributos já em memória (padrão: lidos de path no primeiro uso)
+            path: Diretório do catálogo persistido
+        """
+        self.manifest = manifest
+        self.path = Path(path) if path else None
+        self._arrays = arrays
+        self._dense = None
+
+    # Construção
+
+    @classmethod
+    def from_range(cls, first: int = DEFAULT_RANGE[0], last: int = DEFAULT_RANGE[1]) -> 'ProductCatalog':
+        """Catálogo sem atributos com os ids first..last"""
+        manifest = {'n_produtos': max(last - first + 1, 0), 'id_min': first, 'id_max': last,
+                    'hash': f'faixa:{first}-{last}', 'faixa': [first, last], 'atributos': {}}
+        return cls(manifest)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, id_column: str = ID_COLUMN) -> 'ProductCatalog':
+        """
+        Catálogo a partir de uma tabela com um produto por linha
+
+        Colunas numéricas viram arrays float64/int64; as demais, categóricas
+        (códigos int32 + categorias no manifesto).
+        """
+        if id_column not in df.columns:
+            raise ValueError(f"Coluna {id_column} ausente na tabela de produtos")
+        ids = pd.to_numeric(df[id_column], errors='raise').to_numpy(dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        ids = ids[order]
+        duplicated = ids[1:] == ids[:-1]
+        if duplicated.any():
+            raise ValueError(f"{int(duplicated.sum())} ids repetidos no catálogo (ex.: {ids[1:][duplicated][0]})")
+
+        arrays = {ID_COLUMN: ids}
+        attributes = {}
+        for column in df.columns:
+            if column == id_column:
+                continue
+            values = df[column].iloc[order]
+            if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+                dtype = np.int64 if pd.api.types.is_integer_dtype(values) else np.float64
+                arrays[column] = values.to_numpy(dtype=dtype)
+                attributes[column] = {'dtype': np.dtype(dtype).name}
+            else:
+                codes, uniques = pd.factorize(values.astype('string'), sort=True)
+                arrays[column] = codes.astype(np.int32)
+                attributes[column] = {'dtype': 'category', 'categorias': [str(u) for u in uniques]}
+        return cls(cls._manifest(arrays, attributes), arrays)
+
+    @staticmethod
+    def _manifest(arrays: Dict[str, np.ndarray], attributes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        ids = arrays[ID_COLUMN]
+        digest = hashlib.blake2b(digest_size=16)
+        for name in [ID_COLUMN] + sorted(attributes):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+        digest.update(json.dumps(attributes, sort_keys=True).encode())
+        return {'n_produtos': int(len(ids)),
+                'id_min': int(ids[0]) if len(ids) else None,
+                'id_max': int(ids[-1]) if len(ids) else None,
+                'hash': digest.hexdigest(), 'atributos': attributes}
+
+    @classmethod
+    def load(cls, path: str) -> 'ProductCatalog':
+        """Lê o manifesto; os arrays são mapeados em memória no primeiro uso"""
+        path = Path(path)
+        with open(path / MANIFEST, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if 'faixa' in manifest:
+            return cls(manifest)
+        return cls(manifest, path=path)
+
+    def save(self, path: str):
+        """Grava arrays (nomes com o hash) e, por último, o manifesto (os.replace)"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        prefix = self.fingerprint[:16].replace(':', '_')
+        files = {}
+        if 'faixa' not in self.manifest:
+            for name in [ID_COLUMN] + self.columns:
+                files[name] = f"{prefix}.{name}.npy"
+                tmp = path / f"{files[name]}.{os.getpid()}.tmp"
+                with open(tmp, 'wb') as f:
+                    np.save(f, np.ascontiguousarray(self._array(name)))
+                os.replace(tmp, path / files[name])
+
+        manifest = dict(self.manifest, arquivos=files)
+        # Arrays da geração que está sendo substituída: leitores que já leram
+        # o manifesto anterior ainda podem mapeá-los (ver abaixo)
+        previous = set()
+        try:
+            with open(path / MANIFEST, encoding='utf-8') as f:
+                previous = set(json.load(f).get('arquivos', {}).values())
+        except (OSError, ValueError):
+            pass
+        tmp = path / f"{MANIFEST}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path / MANIFEST)
+
+        # Só apaga gerações mais antigas que a anterior: um leitor carregado
+        # antes desta gravação mapeia os arrays sob demanda e continua válido
+        keep = set(files.values()) | previous
+        for old in path.glob('*.npy'):
+            if old.name not in keep:
+                old.unlink()
+        self.manifest, self.path = manifest, path
+
+    # Metadados (só o manifesto)
+
+    def __len__(self) -> int:
+        return int(self.manifest['n_produtos'])
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifica o conteúdo (ids e atributos) do catálogo"""
+        return self.manifest['hash']
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.manifest['atributos'])
+
+    def id_range(self) -> Tuple[Optional[int], Optional[int]]:
+        """(menor, maior) id do catálogo"""
+        return self.manifest['id_min'], self.manifest['id_max']
+
+    # Arrays
+
+    def _array(self, name: str) -> np.ndarray:
+        if self._arrays is None:
+            self._arrays = {}
+        if name not in self._arrays:
+            if 'faixa' in self.manifest:
+                first, last = self.manifest['faixa']
+                self._arrays[name] = np.arange(first, last + 1, dtype=np.int64)
+            else:
+                self._arrays[name] = np.load(self.path / self.manifest['arquivos'][name], mmap_mode='r')
+        return self._arrays[name]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Ids ordenados"""
+        return self._array(ID_COLUMN)
+
+    def positions(self, produto_ids) -> np.ndarray:
+        """Posição de cada id no catálogo (-1 se ausente), O(n log k)"""
+        produto_ids = np.asarray(produto_ids)
+        if produto_ids.dtype.kind == 'f':
+            # Nulos e ids fracionários não estão no catálogo
+            integral = np.isfinite(produto_ids) & (produto_ids == np.floor(produto_ids))
+            produto_ids = np.where(integral, produto_ids, -1).astype(np.int64)
+        else:
+            produto_ids = produto_ids.astype(np.int64, copy=False)
+        if not len(self):
+            return np.full(len(produto_ids), -1, dtype=np.int64)
+        if 'faixa' in self.manifest:
+            first, last = self.manifest['faixa']
+            return np.where((produto_ids >= first) & (produto_ids <= last), produto_ids - first, -1)
+        table = self._dense_index()
+        if table is not None:
+            offset = produto_ids - self.manifest['id_min']
+            inside = (offset >= 0) & (offset < len(table))
+            return np.where(inside, table[np.where(inside, offset, 0)], -1)
+        ids = self.ids
+        pos = np.searchsorted(ids, produto_ids)
+        np.minimum(pos, len(ids) - 1, out=pos)
+        return np.where(ids[pos] == produto_ids, pos, -1)
+
+    def _dense_index(self) -> Optional[np.ndarray]:
+        """
+        Tabela id - id_min -> posição, quando os ids são densos o bastante
+
+        Busca binária em ids aleatórios é limitada por faltas de cache (~200 ns
+        por registro com 100k+ produtos); a tabela direta resolve em O(1) por
+        registro. Só é montada se couber em DENSE_INDEX_LIMIT entradas e não
+        passar de DENSE_INDEX_SPARSITY vezes o número de produtos.
+        """
+        if self._dense is None:
+            span = self.manifest['id_max'] - self.manifest['id_min'] + 1
+            self._dense = False
+            if span <= min(DENSE_INDEX_LIMIT, max(DENSE_INDEX_SPARSITY * len(self), 1 << 16)):
+                table = np.full(span, -1, dtype=np.int32)
+                table[np.asarray(self.ids) - self.manifest['id_min']] = np.arange(len(self), dtype=np.int32)
+                self._dense = table
+        return self._dense if self._dense is not False else None
+
+    def covers(self, low, high) -> bool:
+        """Todo inteiro de [low, high] está no catálogo (só o manifesto é lido)"""
+        first, last = self.id_range()
+        if first is None or not (first <= low and high <= last):
+            return False
+        return 'faixa' in self.manifest or last - first + 1 == len(self)
+
+    def contains(self, produto_ids) -> np.ndarray:
+        """Máscara dos ids presentes no catálogo"""
+        return self.positions(produto_ids) >= 0
+
+    def __contains__(self, produto_id) -> bool:
+        """Checagem de um id (validação registro a registro), sem montar arrays"""
+        try:
+            value = int(produto_id)
+        except (TypeError, ValueError, OverflowError):
+            return False
+        first, last = self.id_range()
+        if value != produto_id or first is None or not first <= value <= last:
+            return False
+        if 'faixa' in self.manifest:
+            return True
+        table = self._dense_index()
+        if table is not None:
+            return bool(table[value - first] >= 0)
+        pos = int(np.searchsorted(self.ids, value))
+        return pos < len(self) and int(self.ids[pos]) == value
+
+    def lookup(self, produto_ids, column: str, default: Any = float('nan')):
+        """
+        Atributo de cada id (default para ids fora do catálogo)
+
+        Returns:
+            Array numérico ou pd.Categorical (atributos categóricos; ausentes nulos)
+        """
+        return self._take(self.positions(produto_ids), column, default)
+
+    def _take(self, pos: np.ndarray, column: str, default: Any = float('nan')):
+        """Atributo nas posições de positions() (-1: fora do catálogo)"""
+        if column not in self.manifest['atributos']:
+            raise KeyError(f"Atributo {column} não existe no catálogo (atributos: {self.columns})")
+        found = pos >= 0
+        values = self._array(column)
+        info = self.manifest['atributos'][column]
+        if not len(values):
+            values = np.zeros(1, dtype=np.int32 if info['dtype'] == 'category' else info['dtype'])
+        taken = values[np.where(found, pos, 0)]
+        if info['dtype'] == 'category':
+            return pd.Categorical.from_codes(np.where(found, taken, -1).astype(np.int32),
+                                             categories=info['categorias'])
+        if found.all():
+            return np.asarray(taken)
+        result = taken.astype(np.result_type(taken.dtype, np.asarray(default).dtype))
+        result[~found] = default
+        return result
+
+    def attributes(self, produto_ids, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Atributos de cada id (uma linha por id, na ordem de entrada)"""
+        columns = self.columns if columns is None else list(columns)
+        pos = self.positions(produto_ids)
+        return pd.DataFrame({column: self._take(pos, column) for column in columns})
+
+    def join(self, df: pd.DataFrame, columns: Optional[Sequence[str]] = None,
+             id_column: str = ID_COLUMN) -> pd.DataFrame:
+        """df com os atributos do catálogo (colunas já existentes em df são mantidas)"""
+        columns = [c for c in (self.columns if columns is None else columns) if c not in df.columns]
+        pos = self.positions(df[id_column].to_numpy())
+        return df.assign(**{column: self._take(pos, column) for column in columns})
+
+    def frame(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Catálogo inteiro como tabela (ID_PRODUTO + atributos)"""
+        table = self.attributes(self.ids, columns)
+        table.insert(0, ID_COLUMN, np.asarray(self.ids))
+        return table
+
+    def with_ids(self, produto_ids: Iterable[int]) -> 'ProductCatalog':
+        """Catálogo acrescido dos ids informados (sem atributos), ex.: ids do dicionário de códigos"""
+        extra = np.setdiff1d(np.asarray(list(produto_ids), dtype=np.int64), self.ids)
+        if not len(extra):
+            return self
+        table = pd.concat([self.frame(), pd.DataFrame({ID_COLUMN: extra})], ignore_index=True)
+        for column, info in self.manifest['atributos'].items():
+            if info['dtype'] == 'int64' and table[column].isna().any():
+                table[column] = table[column].astype(float)
+        return ProductCatalog.from_frame(table)
+
+
+def load_catalog(path: Optional[str] = None) -> ProductCatalog:
+    """
+    Catálogo em path, $ESTOQUE_CATALOGO_PRODUTOS ou 01-Dados/catalogo_produtos;
+    sem nenhum deles, a faixa 1001-1050
+    """
+    path = path or os.environ.get('ESTOQUE_CATALOGO_PRODUTOS')
+    if path:
+        if not (Path(path) / MANIFEST).exists():
+            raise FileNotFoundError(f"Catálogo de produtos não encontrado: {path}")
+        return ProductCatalog.load(path)
+    if (DEFAULT_CATALOG / MANIFEST).exists():
+        return ProductCatalog.load(DEFAULT_CATALOG)
+    return ProductCatalog.from_range()
+
+
+def print_info(catalog: ProductCatalog):
+    first, last = catalog.id_range()
+    print(f"\n📦 Catálogo: {len(catalog):,} produtos (ids {first} a {last})")
+    print(f"   Hash: {catalog.fingerprint}")
+    for column, info in catalog.manifest['atributos'].items():
+        if info['dtype'] == 'category':
+            print(f"   {column}: {len(info['categorias'])} categorias ({', '.join(info['categorias'][:5])}"
+                  f"{', ...' if len(info['categorias']) > 5 else ''})")
+        else:
+            print(f"   {column}: {info['dtype']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Catálogo de produtos indexado')
+    commands = parser.add_subparsers(dest='comando', required=True)
+
+    build_parser = commands.add_parser('build', help='Cria o catálogo a partir de uma tabela de produtos')
+    build_parser.add_argument('input', help='CSV/Parquet com ID_PRODUTO e atributos (CATEGORIA, REGIAO, '
+                                            'LEAD_TIME_DIAS, CRITICO, ALERTA, ...)')
+    build_parser.add_argument('--output', '-o', default=str(DEFAULT_CATALOG),
+                              help='Diretório do catálogo (padrão: 01-Dados/catalogo_produtos)')
+    build_parser.add_argument('--dicionario', help='Inclui os ids do dicionário de códigos de produto '
+                                                   '(mapear_layout.ProductCodeMap)')
+
+    info_parser = commands.add_parser('info', help='Resumo de um catálogo')
+    info_parser.add_argument('path', nargs='?', help='Diretório do catálogo (padrão: catálogo ativo)')
+    args = parser.parse_args()
+
+    try:
+        if args.comando == 'build':
+            table = (pd.read_parquet(args.input) if args.input.endswith('.parquet')
+                     else pd.read_csv(args.input, encoding='utf-8-sig'))
+            catalog = ProductCatalog.from_frame(table)
+            if args.dicionario:
+                with open(args.dicionario, encoding='utf-8') as f:
+                    codes = json.load(f).get('codigos', {})
+                catalog = catalog.with_ids(int(v) for v in codes.values())
+            catalog.save(args.output)
+            print_info(catalog)
+            print(f"\n📄 Catálogo salvo em: {args.output}")
+        else:
+            print_info(load_catalog(args.path))
+    except Exception as e:
+        print(f"\n❌ Erro: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
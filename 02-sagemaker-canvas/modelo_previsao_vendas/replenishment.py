@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Reabastecimento em lote: pontos de pedido e quantidades a partir das previsões
+
+Para todos os produtos de uma vez (arrays, sem laço por produto):
+- demanda diária e estoque atual vêm da trajetória de previsão
+  (ModelPredictor.predict_trajectory ou previsoes_estoque.csv)
+- o desvio da demanda acumulada em h dias vem do intervalo de 95% da
+  trajetória (margem_h / 1,96), extrapolado com sqrt(h) além do horizonte
+- ponto de pedido = demanda * lead time + z * desvio no lead time
+  (relatorio_analise.md: "Demanda média × Lead time + Estoque de segurança")
+- estoque alvo = demanda * (lead time + cobertura) + z * desvio no mesmo prazo
+- pedido = alvo - (estoque atual + em trânsito), arredondado ao múltiplo e ao
+  lote mínimo, quando a posição de estoque chegou ao ponto de pedido
+
+z é o quantil normal do nível de serviço. Com orçamento (CUSTO_UNITARIO) ou
+capacidade (VOLUME_UNITARIO), cada pedido é dividido em duas parcelas - até o
+ponto de pedido (proteção contra ruptura) e o restante até o alvo - aprovadas
+por urgência (parcelas de proteção primeiro, menor cobertura em dias primeiro)
+até esgotar o limite. Com uma única restrição é a solução da relaxação linear
+(mochila fracionária), arredondada ao lote, sem depender de um solver.
+
+Parâmetros por produto (CSV ou catálogo de produtos; colunas e produtos
+ausentes usam o padrão): ID_PRODUTO, LEAD_TIME_DIAS, LOTE_MINIMO,
+LOTE_MULTIPLO, CUSTO_UNITARIO, VOLUME_UNITARIO, EM_TRANSITO
+
+Uso:
+    python replenishment.py ../../03-resultados/previsoes_estoque.csv --output pedidos.csv
+    python replenishment.py leituras.csv --model modelo.json --parametros produtos.csv \\
+        --nivel-servico 0.98 --orcamento 50000 --capacidade 1200
+    python replenishment.py leituras.csv --catalogo ../../01-Dados/catalogo_produtos
+"""
+import argparse
+import sys
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from model_predictor import ModelPredictor
+from prediction_intervals import Z_COVERAGE, IntervalEngine, normal_ppf
+from product_catalog import ProductCatalog, load_catalog
+
+# Lead time do fornecedor e nível de serviço (relatorio_analise.md) e cobertura
+# de 7 dias (horizonte de previsão do modelo)
+DEFAULT_PARAMETERS = {
+    'LEAD_TIME_DIAS': 2,
+    'LOTE_MINIMO': 0,
+    'LOTE_MULTIPLO': 1,
+    'CUSTO_UNITARIO': np.nan,
+    'VOLUME_UNITARIO': np.nan,
+    'EM_TRANSITO': 0
+}
+DEFAULT_SERVICE_LEVEL = 0.95
+DEFAULT_COVERAGE_DAYS = 7
+
+
+def round_to_lot(quantity: np.ndarray, minimum: np.ndarray, multiple: np.ndarray) -> np.ndarray:
+    """Arredonda para cima ao múltiplo do lote, com o lote mínimo para quantidades positivas"""
+    multiple = np.maximum(multiple, 1)
+    rounded = np.ceil(np.maximum(quantity, 0) / multiple - 1e-9) * multiple
+    floor = np.ceil(minimum / multiple - 1e-9) * multiple
+    return np.where(rounded > 0, np.maximum(rounded, floor), 0.0)
+
+
+class ReplenishmentPlanner:
+    """
+    Pontos de pedido, estoques alvo e quantidades para tabelas de trajetórias
+    """
+
+    def __init__(self, service_level: float = DEFAULT_SERVICE_LEVEL,
+                 coverage_days: int = DEFAULT_COVERAGE_DAYS,
+                 intervals: Optional[IntervalEngine] = None):
+        """
+        Args:
+            service_level: Probabilidade alvo de não romper durante o lead time
+            coverage_days: Dias de demanda cobertos por pedido, além do lead time
+            intervals: Margens usadas quando a trajetória não traz intervalos
+                (padrão: 1,96 * rmse * sqrt(h) do modelo padrão)
+        """
+        self.z = normal_ppf(service_level)
+        self.service_level = service_level
+        self.coverage_days = coverage_days
+        self.intervals = intervals or IntervalEngine()
+
+    def summarize(self, df: pd.DataFrame, date_format: str = '%d/%m/%Y') -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Reduz as trajetórias a uma linha por produto
+
+        Returns:
+            (DataFrame ID_PRODUTO, ESTOQUE_ATUAL, DEMANDA_DIARIA, HORIZONTES;
+            matriz produto x horizonte das margens de 95%)
+        """
+        codes, uniques = pd.factorize(df['ID_PRODUTO'], sort=True)
+        if 'HORIZONTE' in df.columns:
+            step = df['HORIZONTE'].to_numpy(dtype=np.int64)
+        else:
+            dates = df['DIA']
+            if not pd.api.types.is_datetime64_any_dtype(dates):
+                dates = pd.to_datetime(dates, format=date_format, errors='coerce')
+            step = dates.to_numpy().astype('datetime64[D]').astype(np.int64)
+        order = np.lexsort((step, codes))
+        codes = codes[order]
+        estoque = df['PREVISAO_ESTOQUE'].to_numpy(dtype=float)[order]
+        n_products = len(uniques)
+
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.zeros(0, dtype=int)
+        lengths = np.diff(np.r_[starts, len(codes)])
+        horizon = np.arange(len(codes)) - np.repeat(starts, lengths) + 1
+
+        if 'DEMANDA_PREVISTA' in df.columns:
+            demanda = df['DEMANDA_PREVISTA'].to_numpy(dtype=float)[order][starts]
+        else:
+            # Queda média entre dias consecutivos enquanto o estoque previsto é positivo;
+            # se zera já no segundo dia, a queda observada é um limite inferior
+            same = codes[1:] == codes[:-1]
+            drop = estoque[:-1] - estoque[1:]
+            unclipped = same & (estoque[1:] > 0)
+            total = np.bincount(codes[:-1][unclipped], weights=drop[unclipped], minlength=n_products)
+            count = np.bincount(codes[:-1][unclipped], minlength=n_products)
+            first_drop = np.where(lengths > 1, estoque[starts] - estoque[np.minimum(starts + 1, len(codes) - 1)], 0.0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                demanda = np.where(count > 0, total / count, first_drop)
+        demanda = np.maximum(demanda, 0.0)
+
+        if 'ESTOQUE_ATUAL' in df.columns:
+            atual = df['ESTOQUE_ATUAL'].to_numpy(dtype=float)[order][starts]
+        else:
+            # Primeiro dia previsto = estoque atual menos um dia de demanda
+            atual = estoque[starts] + demanda
+
+        if 'INTERVALO_SUPERIOR' in df.columns:
+            margin = df['INTERVALO_SUPERIOR'].to_numpy(dtype=float)[order] - estoque
+        else:
+            margin = self.intervals.margin(horizon)
+        margins = np.full((n_products, int(horizon.max(initial=1))), np.nan)
+        margins[codes, horizon - 1] = margin
+        # Horizontes ausentes herdam a maior margem anterior
+        margins = np.nan_to_num(np.fmax.accumulate(margins, axis=1))
+
+        summary = pd.DataFrame({
+            'ID_PRODUTO': uniques,
+            'ESTOQUE_ATUAL': atual,
+            'DEMANDA_DIARIA': demanda,
+            'HORIZONTES': lengths
+        })
+        return summary, margins
+
+    @staticmethod
+    def _margin_at(margins: np.ndarray, horizons: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """Margem de cada produto em days dias (sqrt(h) além da trajetória; 0 em 0 dias)"""
+        horizons = np.maximum(horizons, 1)
+        index = np.clip(np.minimum(days, horizons) - 1, 0, margins.shape[1] - 1).astype(np.intp)
+        base = margins[np.arange(len(margins)), index]
+        scale = np.sqrt(np.maximum(days / horizons, 1.0))
+        return np.where(days > 0, base * scale, 0.0)
+
+    def plan(self, trajectories: pd.DataFrame, parameters: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Plano de reabastecimento, uma linha por produto
+
+        Args:
+            trajectories: ID_PRODUTO, DIA ou HORIZONTE, PREVISAO_ESTOQUE e,
+                opcionalmente, DEMANDA_PREVISTA, INTERVALO_SUPERIOR, ESTOQUE_ATUAL
+            parameters: Parâmetros por produto (ver DEFAULT_PARAMETERS)
+        """
+        summary, margins = self.summarize(trajectories)
+        params = self.product_parameters(summary['ID_PRODUTO'], parameters)
+
+        demanda = summary['DEMANDA_DIARIA'].to_numpy()
+        atual = summary['ESTOQUE_ATUAL'].to_numpy()
+        horizons = summary['HORIZONTES'].to_numpy()
+        lead = np.ceil(params['LEAD_TIME_DIAS'].to_numpy(dtype=float))
+        protection = lead + self.coverage_days
+        em_transito = params['EM_TRANSITO'].to_numpy(dtype=float)
+
+        sigma_lead = self._margin_at(margins, horizons, lead) / Z_COVERAGE
+        sigma_protection = self._margin_at(margins, horizons, protection) / Z_COVERAGE
+        seguranca = self.z * sigma_protection
+        ponto = demanda * lead + self.z * sigma_lead
+        alvo = demanda * protection + seguranca
+        posicao = atual + em_transito
+
+        pedir = (posicao <= ponto) & (alvo > posicao)
+        quantidade = np.where(pedir, round_to_lot(alvo - posicao, params['LOTE_MINIMO'].to_numpy(dtype=float),
+                                                  params['LOTE_MULTIPLO'].to_numpy(dtype=float)), 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cobertura = np.where(demanda > 0, posicao / demanda, np.inf)
+
+        plan = pd.DataFrame({
+            'ID_PRODUTO': summary['ID_PRODUTO'].to_numpy(),
+            'ESTOQUE_ATUAL': np.round(atual, 1),
+            'EM_TRANSITO': em_transito,
+            'DEMANDA_DIARIA': np.round(demanda, 2),
+            'LEAD_TIME_DIAS': lead.astype(np.int64),
+            'ESTOQUE_SEGURANCA': np.round(seguranca, 1),
+            'PONTO_PEDIDO': np.round(ponto, 1),
+            'ESTOQUE_ALVO': np.round(alvo, 1),
+            'DIAS_COBERTURA': np.round(cobertura, 1),
+            'QUANTIDADE_PEDIDO': quantidade
+        })
+        for column in ('LOTE_MINIMO', 'LOTE_MULTIPLO', 'CUSTO_UNITARIO', 'VOLUME_UNITARIO'):
+            plan[column] = params[column].to_numpy()
+        return plan
+
+    @staticmethod
+    def product_parameters(produto_ids: pd.Series, parameters: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Parâmetros alinhados aos produtos do plano, com os padrões para o que faltar"""
+        table = pd.DataFrame(index=pd.Index(produto_ids, name='ID_PRODUTO'))
+        if parameters is not None and len(parameters):
+            known = parameters.drop_duplicates('ID_PRODUTO', keep='last').set_index('ID_PRODUTO')
+            table = table.join(known[[c for c in DEFAULT_PARAMETERS if c in known.columns]])
+        for column, default in DEFAULT_PARAMETERS.items():
+            table[column] = table[column].fillna(default) if column in table.columns else default
+        return table
+
+    def allocate(self, plan: pd.DataFrame, budget: Optional[float] = None,
+                 capacity: Optional[float] = None) -> pd.DataFrame:
+        """
+        Aprova os pedidos dentro do orçamento e/ou da capacidade do armazém
+
+        Returns:
+            Plano com QUANTIDADE_APROVADA (e CUSTO_APROVADO quando há custos)
+        """
+        result = plan.copy()
+        quantidade = plan['QUANTIDADE_PEDIDO'].to_numpy(dtype=float)
+        custo = plan['CUSTO_UNITARIO'].to_numpy(dtype=float)
+        volume = plan['VOLUME_UNITARIO'].to_numpy(dtype=float)
+        if budget is not None and np.isnan(custo[quantidade > 0]).any():
+            raise ValueError('Orçamento exige CUSTO_UNITARIO para todos os produtos com pedido')
+        if capacity is not None and np.isnan(volume[quantidade > 0]).any():
+            raise ValueError('Capacidade exige VOLUME_UNITARIO para todos os produtos com pedido')
+
+        aprovada = quantidade.copy()
+        if budget is not None or capacity is not None:
+            aprovada = self._approve(plan, quantidade,
+                                     custo if budget is not None else np.zeros_like(custo),
+                                     volume if capacity is not None else np.zeros_like(volume),
+                                     np.inf if budget is None else float(budget),
+                                     np.inf if capacity is None else float(capacity))
+        result['QUANTIDADE_APROVADA'] = aprovada
+        if not np.isnan(custo).all():
+            result['CUSTO_APROVADO'] = np.round(aprovada * np.nan_to_num(custo), 2)
+        return result
+
+    @staticmethod
+    def _approve(plan: pd.DataFrame, quantidade: np.ndarray, custo: np.ndarray, volume: np.ndarray,
+                 budget: float, capacity: float) -> np.ndarray:
+        """Aprovação gulosa por urgência das parcelas de proteção e de cobertura"""
+        minimum = plan['LOTE_MINIMO'].to_numpy(dtype=float)
+        multiple = np.maximum(plan['LOTE_MULTIPLO'].to_numpy(dtype=float), 1)
+        posicao = plan['ESTOQUE_ATUAL'].to_numpy(dtype=float) + plan['EM_TRANSITO'].to_numpy(dtype=float)
+        protecao = np.minimum(round_to_lot(plan['PONTO_PEDIDO'].to_numpy(dtype=float) - posicao,
+                                           minimum, multiple), quantidade)
+
+        n = len(quantidade)
+        product = np.r_[np.arange(n), np.arange(n)]
+        units = np.r_[protecao, quantidade - protecao]
+        stage = np.r_[np.zeros(n), np.ones(n)]
+        urgency = np.tile(plan['DIAS_COBERTURA'].to_numpy(dtype=float), 2)
+        keep = units > 0
+        order = np.flatnonzero(keep)[np.lexsort((urgency[keep], stage[keep]))]
+
+        cost = np.cumsum(units[order] * custo[product[order]])
+        space = np.cumsum(units[order] * volume[product[order]])
+        fits = (cost <= budget + 1e-9) & (space <= capacity + 1e-9)
+        accepted = len(order) if fits.all() else int(np.argmin(fits))
+
+        aprovada = np.bincount(product[order[:accepted]], weights=units[order[:accepted]], minlength=n)
+        if accepted < len(order):
+            # Parcela parcial da primeira que não coube, no múltiplo do lote
+            i = order[accepted]
+            p = product[i]
+            spent_cost = cost[accepted - 1] if accepted else 0.0
+            spent_space = space[accepted - 1] if accepted else 0.0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                room = min((budget - spent_cost) / custo[p] if custo[p] > 0 else np.inf,
+                           (capacity - spent_space) / volume[p] if volume[p] > 0 else np.inf)
+            partial = np.floor(min(room, units[i]) / multiple[p] + 1e-9) * multiple[p]
+            if aprovada[p] + partial >= minimum[p]:
+                aprovada[p] += partial
+        return aprovada
+
+
+def load_table(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, encoding='utf-8-sig')
+
+
+def trajectories_from_readings(readings: pd.DataFrame, predictor: ModelPredictor, horizon: int) -> pd.DataFrame:
+    """Trajetórias a partir da leitura mais recente de cada produto"""
+    latest = readings
+    if 'DIA' in readings.columns:
+        dates = pd.to_datetime(readings['DIA'], format='%d/%m/%Y', errors='coerce')
+        latest = readings.assign(_dia=dates).sort_values('_dia', kind='stable')
+    latest = latest.drop_duplicates('ID_PRODUTO', keep='last')
+    trajectories = predictor.predict_trajectory(
+        latest['ID_PRODUTO'].to_numpy(),
+        latest['FLAG_PROMOCAO'].to_numpy() if 'FLAG_PROMOCAO' in latest.columns else np.zeros(len(latest)),
+        latest['QUANTIDADE_ESTOQUE'].to_numpy(),
+        horizonte=horizon
+    )
+    atual = np.repeat(latest['QUANTIDADE_ESTOQUE'].to_numpy(dtype=float), horizon)
+    return trajectories.assign(ESTOQUE_ATUAL=atual)
+
+
+def print_plan(plan: pd.DataFrame, top: int = 10):
+    """Resumo do plano no console"""
+    orders = plan[plan['QUANTIDADE_APROVADA'] > 0] if 'QUANTIDADE_APROVADA' in plan.columns \
+        else plan[plan['QUANTIDADE_PEDIDO'] > 0]
+    quantity_col = 'QUANTIDADE_APROVADA' if 'QUANTIDADE_APROVADA' in plan.columns else 'QUANTIDADE_PEDIDO'
+    print(f"\n📦 Plano de reabastecimento: {len(plan)} produtos, {len(orders)} pedidos, "
+          f"{orders[quantity_col].sum():,.0f} unidades")
+    if 'CUSTO_APROVADO' in plan.columns:
+        print(f"   💰 Custo aprovado: {plan['CUSTO_APROVADO'].sum():,.2f}")
+    if quantity_col == 'QUANTIDADE_APROVADA':
+        cortados = int((plan['QUANTIDADE_APROVADA'] < plan['QUANTIDADE_PEDIDO']).sum())
+        if cortados:
+            print(f"   ✂️  Pedidos reduzidos pela restrição: {cortados}")
+    for row in orders.sort_values('DIAS_COBERTURA').head(top).itertuples(index=False):
+        print(f"   {row.ID_PRODUTO}: pedir {getattr(row, quantity_col):,.0f} "
+              f"(posição {row.ESTOQUE_ATUAL + row.EM_TRANSITO:,.0f}, ponto de pedido {row.PONTO_PEDIDO:,.0f}, "
+              f"cobertura {row.DIAS_COBERTURA} dias)")
+
+
+def catalog_parameters(catalog: ProductCatalog) -> Optional[pd.DataFrame]:
+    """Parâmetros de reabastecimento guardados no catálogo (None se não houver)"""
+    columns = [c for c in DEFAULT_PARAMETERS if c in catalog.columns]
+    return catalog.frame(columns) if columns else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plano de reabastecimento a partir das previsões')
+    parser.add_argument('input', help='Trajetórias (ID_PRODUTO, DIA/HORIZONTE, PREVISAO_ESTOQUE) ou '
+                                      'leituras (ID_PRODUTO, DIA, FLAG_PROMOCAO, QUANTIDADE_ESTOQUE); CSV ou Parquet')
+    parser.add_argument('--output', '-o', help='Arquivo do plano (CSV ou Parquet)')
+    parser.add_argument('--model', help='Arquivo JSON de parâmetros do modelo (leituras e margens padrão)')
+    parser.add_argument('--parametros', help='CSV com parâmetros por produto (lead time, lotes, custo, volume)')
+    parser.add_argument('--catalogo', help='Catálogo de produtos com os parâmetros (sem --parametros; '
+                                           'padrão: $ESTOQUE_CATALOGO_PRODUTOS)')
+    parser.add_argument('--nivel-servico', type=float, default=DEFAULT_SERVICE_LEVEL,
+                        help='Nível de serviço alvo (padrão: 0.95)')
+    parser.add_argument('--cobertura', type=int, default=DEFAULT_COVERAGE_DAYS,
+                        help='Dias de demanda cobertos por pedido além do lead time (padrão: 7)')
+    parser.add_argument('--orcamento', type=float, help='Orçamento total dos pedidos (usa CUSTO_UNITARIO)')
+    parser.add_argument('--capacidade', type=float, help='Capacidade livre do armazém (usa VOLUME_UNITARIO)')
+    args = parser.parse_args()
+
+    try:
+        start = time.perf_counter()
+        predictor = ModelPredictor(args.model)
+        planner = ReplenishmentPlanner(args.nivel_servico, args.cobertura, predictor.intervals)
+        if args.parametros:
+            parameters = load_table(args.parametros)
+        else:
+            parameters = catalog_parameters(load_catalog(args.catalogo))
+
+        data = load_table(args.input)
+        if 'PREVISAO_ESTOQUE' not in data.columns:
+            lead = parameters['LEAD_TIME_DIAS'].max() if parameters is not None and \
+                'LEAD_TIME_DIAS' in parameters.columns else DEFAULT_PARAMETERS['LEAD_TIME_DIAS']
+            data = trajectories_from_readings(data, predictor, int(np.ceil(lead)) + args.cobertura)
+
+        plan = planner.allocate(planner.plan(data, parameters), args.orcamento, args.capacidade)
+        print_plan(plan)
+        print(f"\n⏱️  {len(plan)} produtos planejados em {time.perf_counter() - start:.2f}s")
+
+        if args.output:
+            if args.output.endswith('.parquet'):
+                plan.to_parquet(args.output, index=False)
+            else:
+                plan.to_csv(args.output, index=False, encoding='utf-8-sig')
+            print(f"\n📄 Plano salvo em: {args.output}")
+    except Exception as e:
+        print(f"\n❌ Erro: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,435 @@
+"""
+Validação de entradas e saídas de inferência contra config/schema_*.json
+
+Dois caminhos, ambos preparados uma única vez na inicialização:
+- registro a registro: o schema é compilado em código Python (no estilo do
+  fastjsonschema) e cada validação é uma chamada de função sem interpretação
+  do schema
+- colunar: para lotes, cada campo do schema vira uma checagem vetorizada
+  (tipo, faixa, enum, padrão) sobre o array inteiro; padrões de texto são
+  avaliados apenas nos valores distintos
+
+Subconjunto suportado do draft-07: type (inclusive listas), required,
+properties, additionalProperties=false, enum, minimum, maximum,
+exclusiveMinimum, exclusiveMaximum, pattern, format date-time, items,
+minItems e maxItems. Extensão: "x-catalogo": "produtos" exige que o valor
+esteja no catálogo de produtos (product_catalog.py; busca vetorizada nos lotes,
+feita só quando os ids saem da faixa de um catálogo sem lacunas).
+
+Custo medido em lotes de 2M registros: ~20 ms para a entrada e ~17 ms para a
+saída, contra ~140-160 ms do predict_arrays (cerca de 25% a mais por lote).
+Não é desprezível em lotes grandes; --no-validation no servidor o desliga.
+"""
+import json
+import re
+from functools import lru_cache
+from numbers import Integral, Real
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from product_catalog import load_catalog
+
+CONFIG_DIR = Path(__file__).resolve().parent / 'config'
+
+# Campos enviados por predict_single / local_server (DIA não trafega no CSV)
+WIRE_INPUT_FIELDS = ['ID_PRODUTO', 'FLAG_PROMOCAO', 'QUANTIDADE_ESTOQUE']
+
+# Campo do schema de saída -> array(s) retornados por ModelPredictor.predict_arrays
+OUTPUT_COLUMNS = {
+    'prediction.estoque_previsto': 'estoque_previsto',
+    'prediction.demanda_prevista': 'demanda_prevista',
+    'confidence.score': 'score',
+    'confidence.interval_95': ('interval_low', 'interval_high'),
+    'alerts.level': 'level',
+    'alerts.dias_ate_ruptura': 'dias_ate_ruptura',
+    'alerts.recommendation': 'recommendation'
+}
+
+DATE_TIME_PATTERN = r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})?$'
+
+
+class SchemaValidationError(ValueError):
+    """Violação de schema; `path` indica o campo e `row` o registro (validação colunar)"""
+
+    def __init__(self, message: str, path: str = '', row: Optional[int] = None):
+        super().__init__(message)
+        self.path = path
+        self.row = row
+
+
+@lru_cache(maxsize=None)
+def load_schema(name: str) -> Dict[str, Any]:
+    """Carrega config/<name>.json (ex.: 'schema_input')"""
+    with open(CONFIG_DIR / f'{name}.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def schema_catalog(name: str):
+    """Catálogo referenciado por x-catalogo (carregado uma vez por processo)"""
+    if name != 'produtos':
+        raise ValueError(f"Catálogo desconhecido no schema: {name}")
+    return load_catalog()
+
+
+def _types(schema: Dict[str, Any]) -> List[str]:
+    types = schema.get('type', [])
+    return [types] if isinstance(types, str) else list(types)
+
+
+class _CodeGenerator:
+    """Gera o código-fonte de uma função validate(data) para um schema"""
+
+    TYPE_CHECKS = {
+        'object': 'isinstance({v}, dict)',
+        'array': 'isinstance({v}, (list, tuple))',
+        'string': 'isinstance({v}, str)',
+        'boolean': 'isinstance({v}, bool)',
+        'null': '{v} is None',
+        # Tipos nativos primeiro; escalares numpy/pandas caem nas ABCs numéricas
+        'number': '(type({v}) is float or type({v}) is int or '
+                  '(isinstance({v}, Real) and not isinstance({v}, bool)))',
+        'integer': '(type({v}) is int or (type({v}) is float and {v}.is_integer()) or '
+                   '(isinstance({v}, Integral) and not isinstance({v}, bool)) or '
+                   '(isinstance({v}, Real) and not isinstance({v}, bool) and float({v}).is_integer()))'
+    }
+
+    def __init__(self):
+        self.lines: List[str] = []
+        self.namespace: Dict[str, Any] = {
+            'SchemaValidationError': SchemaValidationError, 'Integral': Integral, 'Real': Real
+        }
+        self.counter = 0
+
+    def constant(self, prefix: str, value: Any) -> str:
+        self.counter += 1
+        name = f'{prefix}_{self.counter}'
+        self.namespace[name] = value
+        return name
+
+    def emit(self, indent: int, line: str):
+        self.lines.append('    ' * indent + line)
+
+    def fail(self, indent: int, path: str, message: str):
+        text = f"{path or 'registro'}: {message}"
+        self.emit(indent, f'raise SchemaValidationError({text!r}, {path!r})')
+
+    def generate(self, schema: Dict[str, Any], var: str, path: str, indent: int):
+        types = _types(schema)
+        if types:
+            check = ' or '.join(self.TYPE_CHECKS[t].format(v=var) for t in types)
+            self.emit(indent, f'if not ({check}):')
+            self.fail(indent + 1, path, f"deve ser do tipo {' ou '.join(types)}")
+
+        if 'enum' in schema:
+            enum = self.constant('ENUM', tuple(schema['enum']))
+            self.emit(indent, f'if {var} not in {enum}:')
+            self.fail(indent + 1, path, f"valor fora de {schema['enum']}")
+
+        # Sem guarda de tipo quando o `type` já garantiu um número
+        numeric = '' if types and set(types) <= {'integer', 'number'} else \
+            f'(isinstance({var}, Real) and not isinstance({var}, bool)) and '
+        for keyword, op in (('minimum', '<'), ('maximum', '>'), ('exclusiveMinimum', '<='), ('exclusiveMaximum', '>=')):
+            if keyword in schema:
+                self.emit(indent, f'if {numeric}{var} {op} {schema[keyword]!r}:')
+                self.fail(indent + 1, path, f"{keyword} {schema[keyword]}")
+
+        if 'x-catalogo' in schema:
+            catalog = self.constant('CATALOG', schema_catalog(schema['x-catalogo']))
+            self.emit(indent, f'if {var} not in {catalog}:')
+            self.fail(indent + 1, path, f"fora do catálogo de {schema['x-catalogo']}")
+
+        patterns = []
+        if 'pattern' in schema:
+            patterns.append(('pattern', schema['pattern']))
+        if schema.get('format') == 'date-time':
+            patterns.append(('format date-time', DATE_TIME_PATTERN))
+        for label, pattern in patterns:
+            regex = self.constant('PATTERN', re.compile(pattern))
+            self.emit(indent, f'if isinstance({var}, str) and {regex}.search({var}) is None:')
+            self.fail(indent + 1, path, f"não atende {label}")
+
+        if 'properties' in schema or 'required' in schema:
+            body = indent
+            if types != ['object']:
+                self.emit(indent, f'if isinstance({var}, dict):')
+                self.emit(indent + 1, 'pass')
+                body = indent + 1
+            for key in schema.get('required', []):
+                self.emit(body, f'if {key!r} not in {var}:')
+                self.fail(body + 1, f'{path}.{key}' if path else key, 'campo obrigatório ausente')
+            if schema.get('additionalProperties') is False:
+                allowed = self.constant('ALLOWED', frozenset(schema.get('properties', {})))
+                self.emit(body, f'for key in {var}:')
+                self.emit(body + 1, f'if key not in {allowed}:')
+                prefix = f"{path or 'registro'}: campo não permitido "
+                self.emit(body + 2, f'raise SchemaValidationError({prefix!r} + str(key), {path!r})')
+            for key, child in schema.get('properties', {}).items():
+                self.counter += 1
+                child_var = f'v{self.counter}'
+                self.emit(body, f'if {key!r} in {var}:')
+                self.emit(body + 1, f'{child_var} = {var}[{key!r}]')
+                self.generate(child, child_var, f'{path}.{key}' if path else key, body + 1)
+
+        if any(k in schema for k in ('items', 'minItems', 'maxItems')):
+            body = indent
+            if types != ['array']:
+                self.emit(indent, f'if isinstance({var}, (list, tuple)):')
+                self.emit(indent + 1, 'pass')
+                body = indent + 1
+            if 'minItems' in schema:
+                self.emit(body, f'if len({var}) < {schema["minItems"]}:')
+                self.fail(body + 1, path, f"mínimo de {schema['minItems']} itens")
+            if 'maxItems' in schema:
+                self.emit(body, f'if len({var}) > {schema["maxItems"]}:')
+                self.fail(body + 1, path, f"máximo de {schema['maxItems']} itens")
+            if isinstance(schema.get('items'), dict):
+                self.counter += 1
+                item_var = f'v{self.counter}'
+                self.emit(body, f'for {item_var} in {var}:')
+                self.generate(schema['items'], item_var, f'{path}[]', body + 1)
+
+
+def compile_schema(schema: Dict[str, Any], required: Optional[Sequence[str]] = None) -> Callable[[Any], Any]:
+    """
+    Compila o schema em uma função validate(data) que retorna `data` ou
+    levanta SchemaValidationError na primeira violação
+
+    Args:
+        required: Substitui a lista `required` do nível superior (ex.: campos trafegados)
+    """
+    if required is not None:
+        schema = dict(schema, required=list(required))
+    generator = _CodeGenerator()
+    generator.emit(0, 'def validate(data):')
+    generator.generate(schema, 'data', '', 1)
+    generator.emit(1, 'return data')
+    source = '\n'.join(generator.lines)
+    exec(compile(source, f"<schema {schema.get('title', '')}>", 'exec'), generator.namespace)
+    validate = generator.namespace['validate']
+    validate.source = source
+    return validate
+
+
+class ColumnarValidator:
+    """
+    Validação vetorizada de lotes: colunas (arrays) nomeadas pelo caminho do
+    campo no schema ('ID_PRODUTO', 'alerts.level', ...)
+    """
+
+    def __init__(self, schema: Dict[str, Any], required: Optional[Sequence[str]] = None,
+                 columns: Optional[Dict[str, Union[str, Tuple[str, ...]]]] = None):
+        """
+        Args:
+            schema: Schema de objeto (propriedades escalares ou aninhadas)
+            required: Campos obrigatórios (padrão: `required` do schema)
+            columns: Campo do schema -> nome da coluna (ou tupla, para arrays de tamanho fixo)
+        """
+        self.fields: Dict[str, Dict[str, Any]] = {}
+        self._flatten(schema, '')
+        self.required = list(schema.get('required', []) if required is None else required)
+        self.columns = columns or {path: path for path in self.fields}
+        self._patterns = {path: [re.compile(p) for p in self._field_patterns(rule)]
+                          for path, rule in self.fields.items()}
+        # Metadados por campo resolvidos uma vez (lotes pequenos pagam só as reduções)
+        self._rules = {path: self._prepare(rule) for path, rule in self.fields.items()}
+
+    def _flatten(self, schema: Dict[str, Any], prefix: str):
+        for key, child in schema.get('properties', {}).items():
+            path = f'{prefix}.{key}' if prefix else key
+            if 'properties' in child:
+                self._flatten(child, path)
+            else:
+                self.fields[path] = child.get('items', child) if 'array' in _types(child) else child
+
+    @staticmethod
+    def _field_patterns(rule: Dict[str, Any]) -> List[str]:
+        patterns = [rule['pattern']] if 'pattern' in rule else []
+        if rule.get('format') == 'date-time':
+            patterns.append(DATE_TIME_PATTERN)
+        return patterns
+
+    @staticmethod
+    def _prepare(rule: Dict[str, Any]) -> Dict[str, Any]:
+        types = _types(rule)
+        limits = [(k, op) for k, op in (('minimum', np.less), ('maximum', np.greater),
+                                        ('exclusiveMinimum', np.less_equal),
+                                        ('exclusiveMaximum', np.greater_equal)) if k in rule]
+        return {
+            'types': types,
+            'type_error': f"deve ser do tipo {' ou '.join(types)}",
+            'nullable': 'null' in types,
+            'numeric': bool({'integer', 'number'} & set(types)),
+            'limits': limits,
+            'enum': set(rule['enum']) if 'enum' in rule else None,
+            'catalog': schema_catalog(rule['x-catalogo']) if 'x-catalogo' in rule else None
+        }
+
+    def _check_array(self, path: str, values: Union[np.ndarray, pd.Categorical]) -> List[Tuple[str, np.ndarray]]:
+        """
+        Máscaras de violação (mensagem, máscara) de um array
+
+        O caso comum (lote válido) é resolvido com reduções de uma passada
+        (soma, mínimo, máximo); máscaras por registro só são montadas quando
+        há violação.
+        """
+        rule = self.fields[path]
+        prepared = self._rules[path]
+        types, type_error, nullable = prepared['types'], prepared['type_error'], prepared['nullable']
+        numeric, enum = prepared['numeric'], prepared['enum']
+        categorical = isinstance(values, pd.Categorical)
+        if categorical and 'string' not in types:
+            values, categorical = np.asarray(values), False
+        kind = 'O' if categorical else values.dtype.kind
+        problems = []
+
+        if kind == 'O' and numeric:
+            values = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float)
+            kind = 'f'
+
+        if numeric:
+            if kind not in 'iuf':
+                return [(type_error, np.ones(len(values), dtype=bool))]
+            if not len(values):
+                return problems
+            if kind == 'f':
+                # NaN/inf equivalem a null na saída JSON (to_records); a soma os propaga
+                finite = bool(np.isfinite(np.add.reduce(values)))
+                if not nullable and not finite:
+                    bad = ~np.isfinite(values)
+                    if bad.any():
+                        problems.append((type_error, bad))
+                if 'integer' in types and 'number' not in types:
+                    with np.errstate(invalid='ignore'):
+                        fractional = values != np.floor(values)
+                    if not finite:
+                        fractional &= np.isfinite(values)
+                    if fractional.any():
+                        problems.append((type_error, fractional))
+
+            limits, catalog = prepared['limits'], prepared['catalog']
+            if limits or enum is not None or catalog is not None:
+                # fmin/fmax ignoram NaN (já tratado acima)
+                low, high = np.fmin.reduce(values), np.fmax.reduce(values)
+                for keyword, op in limits:
+                    if op(low, rule[keyword]) or op(high, rule[keyword]):
+                        problems.append((f"{keyword} {rule[keyword]}", op(values, rule[keyword])))
+                if enum is not None:
+                    # Faixa inteira pequena contida no enum (ex.: flags 0/1): sem máscara.
+                    # Só para dtype inteiro: em float, 0.5 cabe na faixa 0-1 e não está no enum
+                    covered = (kind in 'iu' and high - low <= 1024 and
+                               all(v in enum for v in range(int(low), int(high) + 1)))
+                    if not covered:
+                        bad = ~np.isin(values, rule['enum'])
+                        if nullable and kind == 'f':
+                            bad &= ~np.isnan(values)
+                        if bad.any():
+                            problems.append((f"valor fora de {rule['enum']}", bad))
+            # Ids inteiros dentro de um catálogo sem lacunas dispensam a busca por registro
+            if catalog is not None and not (kind in 'iu' and catalog.covers(low, high)):
+                bad = ~catalog.contains(values)
+                if nullable and kind == 'f':
+                    bad &= ~np.isnan(values)
+                if bad.any():
+                    problems.append((f"fora do catálogo de {rule['x-catalogo']}", bad))
+            return problems
+
+        if 'string' in types:
+            # Valores distintos primeiro: tipo, enum e padrão avaliados uma vez por valor
+            if categorical:
+                # Categorias já são os valores distintos; código -1 (ausente) vira null
+                raw_codes = values.codes
+                has_null = len(raw_codes) > 0 and raw_codes.min() < 0
+                uniques = np.asarray(values.categories, dtype=object)
+                if has_null:
+                    uniques = np.append(uniques, None)
+                codes = lambda: np.where(raw_codes < 0, len(uniques) - 1, raw_codes) if has_null else raw_codes
+            else:
+                factorized, uniques = pd.factorize(values, use_na_sentinel=False)
+                uniques = np.asarray(uniques, dtype=object)
+                codes = lambda: factorized
+
+            checks = [(type_error, [isinstance(u, str) or (nullable and u is None) for u in uniques])]
+            if enum is not None:
+                checks.append((f"valor fora de {rule['enum']}",
+                               [u in enum or (nullable and u is None) for u in uniques]))
+            for regex in self._patterns[path]:
+                checks.append((f"não atende o padrão {regex.pattern}",
+                               [not isinstance(u, str) or regex.search(u) is not None for u in uniques]))
+            for message, ok in checks:
+                if not all(ok):
+                    problems.append((message, ~np.array(ok, dtype=bool)[codes()]))
+        return problems
+
+    def check(self, data: Union[Dict[str, Any], pd.DataFrame]) -> Tuple[np.ndarray, List[str]]:
+        """
+        Valida todas as colunas
+
+        Returns:
+            (máscara de registros inválidos, mensagens no formato
+            "campo: regra (N registros, primeiro na linha i)")
+        """
+        n = len(data) if isinstance(data, pd.DataFrame) else None
+        invalid = None
+        errors = []
+        for path, column in self.columns.items():
+            names = column if isinstance(column, tuple) else (column,)
+            if any(name not in data for name in names):
+                if path in self.required:
+                    errors.append(f"{path}: campo obrigatório ausente")
+                    n = n if n is not None else len(next(iter(data.values()))) if data else 0
+                    invalid = np.ones(n, dtype=bool)
+                continue
+            for name in names:
+                values = data[name]
+                if isinstance(values, pd.Series):
+                    values = values.array if isinstance(values.dtype, pd.CategoricalDtype) else values.to_numpy()
+                elif not isinstance(values, pd.Categorical):
+                    values = np.asarray(values)
+                if invalid is None:
+                    invalid = np.zeros(len(values), dtype=bool)
+                for message, bad in self._check_array(path, values):
+                    rows = np.flatnonzero(bad)
+                    if not len(rows):
+                        # Categoria inválida sem nenhum registro
+                        continue
+                    errors.append(f"{path}: {message} ({len(rows)} registros, primeiro na linha {rows[0]})")
+                    invalid |= bad
+        if invalid is None:
+            invalid = np.zeros(n or 0, dtype=bool)
+        return invalid, errors
+
+    def validate(self, data: Union[Dict[str, Any], pd.DataFrame]):
+        """Levanta SchemaValidationError se algum registro violar o schema"""
+        invalid, errors = self.check(data)
+        if errors:
+            raise SchemaValidationError('; '.join(errors), row=int(np.argmax(invalid)) if invalid.any() else None)
+
+
+# Validadores compilados uma única vez por processo
+
+@lru_cache(maxsize=None)
+def input_validator(wire: bool = False) -> Callable[[Any], Any]:
+    """Registro de entrada; wire=True exige só os campos trafegados pelo endpoint"""
+    return compile_schema(load_schema('schema_input'), WIRE_INPUT_FIELDS if wire else None)
+
+
+@lru_cache(maxsize=None)
+def output_validator() -> Callable[[Any], Any]:
+    """Resposta do endpoint (um registro)"""
+    return compile_schema(load_schema('schema_output'))
+
+
+@lru_cache(maxsize=None)
+def input_batch_validator(wire: bool = False) -> ColumnarValidator:
+    """Lote de entrada (DataFrame ou dicionário de arrays)"""
+    return ColumnarValidator(load_schema('schema_input'), WIRE_INPUT_FIELDS if wire else None)
+
+
+@lru_cache(maxsize=None)
+def output_batch_validator() -> ColumnarValidator:
+    """Saída vetorizada de ModelPredictor.predict_arrays"""
+    return ColumnarValidator(load_schema('schema_output'), required=[], columns=OUTPUT_COLUMNS)
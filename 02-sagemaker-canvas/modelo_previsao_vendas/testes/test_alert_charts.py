@@ -0,0 +1,65 @@
+"""
+Testes dos gráficos de alerta em lote (alert_charts)
+"""
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from alert_charts import AlertChartPipeline, build_jobs, matplotlib_available
+
+class TestAlertCharts(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(9)
+        ids = np.arange(1001, 1013)
+        dias = pd.date_range('2024-01-20', periods=7)
+        self.df = pd.DataFrame({
+            'ID_PRODUTO': np.repeat(ids, len(dias)),
+            'DIA': np.tile(dias.strftime('%d/%m/%Y'), len(ids)),
+            'PREVISAO_ESTOQUE': rng.uniform(0, 120, len(ids) * len(dias)).round(1),
+            'CATEGORIA': np.repeat(np.where(ids < 1007, 'Medicamentos', 'Higiene'), len(dias))
+        }).sample(frac=1, random_state=2)
+
+    def test_jobs(self):
+        jobs, produtos = build_jobs(self.df)
+        por_produto = [job for job in jobs if job['tipo'] == 'produto']
+        categorias = [job for job in jobs if job['tipo'] == 'categoria']
+        self.assertEqual(len(por_produto), 12)
+        self.assertEqual(len(categorias), 2)
+        self.assertEqual(sum(int(job['atual'].sum()) for job in categorias), 12)
+        # Cada dia de cada categoria conta os 6 produtos da categoria
+        self.assertTrue(all((job['por_dia'].sum(axis=1) == 6).all() for job in categorias))
+        job = por_produto[0]
+        self.assertTrue((np.diff(job['x']) > 0).all())
+        self.assertEqual(job['rotulos'][0], '20/01')
+        self.assertEqual(list(produtos['PRIORIDADE']), sorted(produtos['PRIORIDADE'], key=lambda p: p or 4))
+
+    def test_incremental_render(self):
+        with tempfile.TemporaryDirectory() as path:
+            pipeline = AlertChartPipeline(path, formato='svg', workers=2)
+            stats = pipeline.run(self.df)
+            self.assertEqual((stats['desenhados'], stats['em_cache'], stats['erros']), (14, 0, {}))
+            index = Path(stats['indice']).read_text(encoding='utf-8')
+            self.assertEqual(index.count('<figure'), 12)
+            self.assertTrue((Path(path) / 'produtos' / '1001.svg').exists())
+
+            # Só o produto alterado e a categoria dele (níveis mudaram) são redesenhados
+            df = self.df.copy()
+            df.loc[df['ID_PRODUTO'] == 1001, 'PREVISAO_ESTOQUE'] = 0.0
+            stats = pipeline.run(df)
+            self.assertEqual((stats['desenhados'], stats['em_cache']), (2, 12))
+
+            # Produto removido: o gráfico antigo é apagado
+            pipeline.run(df[df['ID_PRODUTO'] != 1012])
+            self.assertFalse((Path(path) / 'produtos' / '1012.svg').exists())
+
+    @unittest.skipUnless(matplotlib_available(), 'matplotlib não instalado')
+    def test_png(self):
+        with tempfile.TemporaryDirectory() as path:
+            stats = AlertChartPipeline(path, formato='png', workers=1).run(self.df)
+            self.assertEqual(stats['erros'], {})
+            self.assertEqual((Path(path) / 'produtos' / '1001.png').read_bytes()[:4], b'\x89PNG')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Testes do serviço incremental de alertas
+"""
+import unittest
+import io
+import os
+import queue
+import tempfile
+from contextlib import redirect_stderr
+from alert_service import IncrementalAlertService, queue_events, tail_csv
+
+class TestIncrementalAlertService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = IncrementalAlertService()
+
+    def test_alert_only_on_level_change(self):
+        """Leituras no mesmo nível não geram novos alertas"""
+        self.assertIsNone(self.service.process(1001, '01/01/2024', 100, 0))
+        self.assertIsNone(self.service.process(1001, '02/01/2024', 90, 0))
+        self.assertIsNone(self.service.process(1001, '03/01/2024', 70, 0))
+
+        alert = self.service.process(1001, '04/01/2024', 60, 0)
+        self.assertEqual(alert['nivel_anterior'], 'NORMAL')
+        self.assertEqual(alert['nivel'], 'ALERTA')
+        self.assertIsNone(self.service.process(1001, '05/01/2024', 58, 0))
+
+        # Reposição volta o produto ao nível normal
+        alert = self.service.process(1001, '06/01/2024', 300, 0)
+        self.assertEqual(alert['nivel'], 'NORMAL')
+
+    def test_only_affected_product_changes(self):
+        """Cada evento atualiza apenas o estado do próprio produto"""
+        self.service.process(1001, '01/01/2024', 200, 0)
+        self.service.process(1002, '01/01/2024', 10, 1)
+        snapshot = self.service.snapshot()
+        self.assertEqual(snapshot[1001]['nivel'], 'NORMAL')
+        self.assertEqual(snapshot[1002]['nivel'], 'CRITICO')
+
+    def test_late_event_discarded(self):
+        """Leitura anterior ao último dia processado é descartada"""
+        self.service.process(1001, '05/01/2024', 200, 0)
+        self.assertIsNone(self.service.process(1001, '01/01/2024', 5, 0))
+        self.assertEqual(self.service.stats()['descartados'], 1)
+
+    def test_queue_source(self):
+        """Consumo de eventos a partir de uma fila local"""
+        events = queue.Queue()
+        for event in [(1001, '01/01/2024', 15.0, 0), (1002, '01/01/2024', 200.0, 0), None]:
+            events.put(event)
+
+        alerts = []
+        sink = type('Sink', (), {'write': lambda self, s: alerts.append(s), 'flush': lambda self: None})()
+        stats = self.service.run(queue_events(events), sink)
+        self.assertEqual(stats['eventos'], 2)
+        self.assertEqual(len(alerts), 1)
+
+    def test_malformed_csv_lines_rejected(self):
+        """Linhas malformadas do CSV são contadas como rejeitadas e a leitura continua"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'eventos.csv')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('ID_PRODUTO,DIA,QUANTIDADE_ESTOQUE,FLAG_PROMOCAO\n'
+                        '1001,01/01/2024,200,0\n'
+                        'abc,01/01/2024,200,0\n'
+                        '1002,01/01/2024\n'
+                        '1003,31/02/2024,50,0\n'
+                        '1002,01/01/2024,10,1\n')
+            with redirect_stderr(io.StringIO()):
+                stats = self.service.run(tail_csv(path, on_reject=self.service.reject), io.StringIO())
+        self.assertEqual(stats['eventos'], 2)
+        self.assertEqual(stats['rejeitados'], 3)
+        self.assertEqual(set(self.service.snapshot()), {1001, 1002})
+
+if __name__ == '__main__':
+    unittest.main()
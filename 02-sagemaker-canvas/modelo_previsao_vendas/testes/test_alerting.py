@@ -0,0 +1,50 @@
+"""
+Testes do motor de alertas vetorizado
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from alerting import AlertEngine
+
+class TestAlertEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = AlertEngine()
+        self.previsoes = pd.read_csv('../../03-resultados/previsoes_estoque.csv')
+
+    def test_default_bands(self):
+        """Faixas 0-20 crítico, 21-50 alerta, acima normal"""
+        codes = self.engine.level_codes(np.array([0, 20, 21, 50, 51]))
+        self.assertEqual(codes.tolist(), [2, 2, 1, 1, 0])
+        # Versão escalar (alert_service) com os mesmos limites
+        self.assertEqual([AlertEngine.code_for(v, self.engine.critico, self.engine.alerta)
+                          for v in (0, 20, 20.5, 50, 50.5)], [2, 2, 1, 1, 0])
+
+    def test_product_and_category_thresholds(self):
+        """Limiar por produto tem precedência sobre o de categoria"""
+        engine = AlertEngine(
+            product_thresholds=pd.DataFrame({'ID_PRODUTO': [1001], 'CRITICO': [5], 'ALERTA': [10]}),
+            category_thresholds=pd.DataFrame({'CATEGORIA': ['Higiene'], 'CRITICO': [40], 'ALERTA': [80]})
+        )
+        codes = engine.level_codes(np.array([15, 15, 15]), np.array([1001, 1002, 1003]),
+                                   np.array(['Higiene', 'Higiene', 'Outros']))
+        self.assertEqual(codes.tolist(), [0, 2, 2])
+
+    def test_trajectory_priorities(self):
+        """Prioridades das trajetórias de previsoes_estoque.csv"""
+        priorities = self.engine.evaluate_trajectories(self.previsoes).set_index('ID_PRODUTO')
+        self.assertEqual(priorities.loc[1005, 'PRIORIDADE'], 1)
+        self.assertEqual(priorities.loc[1005, 'DIAS_ATE_RUPTURA'], 6)
+        self.assertEqual(priorities.loc[1009, 'PRIORIDADE'], 2)
+        self.assertEqual(priorities.loc[1003, 'PRIORIDADE'], 3)
+
+    def test_alerts_summary(self):
+        """Resumo colunar no formato de get_alerts_summary"""
+        primeiro_dia = self.engine.classify(self.previsoes[self.previsoes['DIA'] == '20/01/2024'])
+        summary = self.engine.alerts_summary(primeiro_dia)
+        self.assertEqual(summary['total_produtos'], 10)
+        self.assertEqual(summary['criticos'] + summary['alerta'] + summary['normal'], 10)
+        self.assertIn(1005, [p['produto_id'] for p in summary['produtos_criticos']])
+
+if __name__ == '__main__':
+    unittest.main()
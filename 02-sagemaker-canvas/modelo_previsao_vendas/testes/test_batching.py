@@ -0,0 +1,43 @@
+"""
+Testes do agendador de micro-batching
+"""
+import unittest
+import asyncio
+import numpy as np
+from model_predictor import ModelPredictor
+from batching import BatchScheduler, QueueFullError
+
+class TestBatchScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.predictor = ModelPredictor()
+
+    def run_concurrent(self, scheduler, n):
+        async def main():
+            futures = [
+                scheduler.submit((np.array([1001 + i]), np.array([0]), np.array([10.0 * i])))
+                for i in range(n)
+            ]
+            return await asyncio.gather(*futures)
+        return asyncio.run(main())
+
+    def test_coalesces_concurrent_requests(self):
+        """Requisições concorrentes viram poucos lotes e cada uma recebe sua fatia"""
+        scheduler = BatchScheduler(self.predictor.predict_arrays, max_batch_size=16, max_wait_ms=2)
+        results = self.run_concurrent(scheduler, 40)
+
+        self.assertEqual(scheduler.batches, 3)
+        self.assertEqual(scheduler.requests, 40)
+        for i, (part, _) in enumerate(results):
+            expected = self.predictor.predict_arrays(np.array([1001 + i]), np.array([0]), np.array([10.0 * i]))
+            self.assertEqual(part['estoque_previsto'][0], expected['estoque_previsto'][0])
+
+    def test_queue_limit(self):
+        """Fila cheia rejeita novas requisições"""
+        scheduler = BatchScheduler(self.predictor.predict_arrays, max_batch_size=64, max_wait_ms=50, max_queue=5)
+        with self.assertRaises(QueueFullError):
+            self.run_concurrent(scheduler, 10)
+        self.assertEqual(scheduler.metrics()['rejected'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Testes das métricas do cliente (client_metrics)
+"""
+import sys
+import unittest
+import importlib.util
+import asyncio
+import threading
+from pathlib import Path
+from model_predictor import ModelPredictor
+from local_server import InferenceServer, create_socket
+from client_metrics import PROMETHEUS_BUCKETS_MS, ClientMetrics
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'exemplos'))
+from python_client import EstoquePredictionClient  # noqa: E402
+
+class TestClientMetrics(unittest.TestCase):
+
+    def test_phases_and_errors(self):
+        """'envio' vira rede + modelo; erros têm histogramas próprios (resultado=erro)"""
+        metrics = ClientMetrics()
+        with metrics.call('predict_single', rows=1) as call:
+            call.phases['envio'] = 10.0
+            call.endpoint_ms(4.0)
+            call.sent(20)
+            call.received(300)
+        with self.assertRaises(ValueError):
+            with metrics.call('predict_single', rows=1) as call:
+                call.phases['envio'] = 30.0
+                raise ValueError('falhou')
+        op = metrics.snapshot()['operacoes']['predict_single']
+        self.assertEqual((op['requisicoes'], op['registros'], op['erros']), (2, 1, {'ValueError': 1}))
+        self.assertEqual((op['bytes_enviados'], op['bytes_recebidos']), (20, 300))
+        self.assertAlmostEqual(op['fases']['modelo']['mean_ms'], 4.0, delta=0.1)
+        self.assertAlmostEqual(op['fases']['rede']['mean_ms'], 6.0, delta=0.1)
+        self.assertEqual((op['latencia']['count'], op['latencia_erros']['count']), (1, 1))
+        self.assertAlmostEqual(op['fases_erros']['rede']['mean_ms'], 30.0, delta=0.5)
+        self.assertIn('resultado="erro",fase="rede",le="+Inf"} 1', metrics.prometheus())
+        self.assertEqual(metrics.snapshot()['em_andamento'], 0)
+
+    def test_prometheus_buckets(self):
+        """Buckets acumulados e crescentes, terminando na contagem total"""
+        metrics = ClientMetrics()
+        for value in (0.5, 3, 40, 700, 20000):
+            with metrics.call('predict_frame', rows=10) as call:
+                call.phases['serializacao'] = value
+        histogram = metrics.operations['predict_frame'].phases['sucesso']['serializacao']
+        counts = histogram.cumulative(PROMETHEUS_BUCKETS_MS)
+        self.assertEqual(counts[PROMETHEUS_BUCKETS_MS.index(1)], 1)
+        self.assertEqual(counts[PROMETHEUS_BUCKETS_MS.index(50)], 3)
+        self.assertEqual(counts[-1], 4)
+        text = metrics.prometheus()
+        self.assertIn('estoque_cliente_latencia_segundos_bucket{operacao="predict_frame",resultado="sucesso",'
+                      'fase="serializacao",le="+Inf"} 5', text)
+        self.assertIn('estoque_cliente_registros_total{operacao="predict_frame"} 50', text)
+
+    def test_client_against_local_server(self):
+        """Fases, bytes e reuso da conexão keep-alive numa chamada real"""
+        sock = create_socket('127.0.0.1', 0)
+        loop = asyncio.new_event_loop()
+        server = InferenceServer(ModelPredictor())
+        threading.Thread(target=loop.run_until_complete, args=(server.serve(sock),), daemon=True).start()
+
+        metrics = ClientMetrics()
+        client = EstoquePredictionClient(endpoint_url=f"http://127.0.0.1:{sock.getsockname()[1]}", metrics=metrics)
+        for _ in range(5):
+            result = client.predict_single(1001, '20/01/2024', 0, 50)
+        self.assertGreater(result['metadata']['client_time_ms'], 0)
+        snapshot = metrics.snapshot()
+        op = snapshot['operacoes']['predict_single']
+        self.assertEqual(op['requisicoes'], 5)
+        self.assertEqual(set(op['fases']), {'serializacao', 'rede', 'modelo', 'desserializacao'})
+        self.assertGreater(op['bytes_recebidos'], op['bytes_enviados'])
+        self.assertEqual(snapshot['conexoes'], {'novas': 1, 'reutilizadas': 4})
+
+    def test_client_without_client_metrics(self):
+        """Sem client_metrics o cliente continua prevendo (métricas nulas)"""
+        sock = create_socket('127.0.0.1', 0)
+        loop = asyncio.new_event_loop()
+        server = InferenceServer(ModelPredictor())
+        threading.Thread(target=loop.run_until_complete, args=(server.serve(sock),), daemon=True).start()
+
+        path = Path(__file__).resolve().parents[1] / 'exemplos' / 'python_client.py'
+        spec = importlib.util.spec_from_file_location('python_client_sem_metricas', path)
+        module = importlib.util.module_from_spec(spec)
+        saved = sys.modules.get('client_metrics')
+        sys.modules['client_metrics'] = None  # força ImportError
+        try:
+            spec.loader.exec_module(module)
+        finally:
+            if saved is not None:
+                sys.modules['client_metrics'] = saved
+            else:
+                del sys.modules['client_metrics']
+        self.assertEqual(type(module.CLIENT_METRICS).__name__, '_NullMetrics')
+
+        client = module.EstoquePredictionClient(endpoint_url=f"http://127.0.0.1:{sock.getsockname()[1]}")
+        result = client.predict_single(1001, '20/01/2024', 0, 50)
+        self.assertNotIn('error', result)
+        self.assertIn('estoque_previsto', result['prediction'])
+        self.assertGreater(result['metadata']['client_time_ms'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+"""
+Testes da agregação hierárquica e reconciliação (hierarchy)
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from alerting import AlertEngine
+from hierarchy import HierarchyEngine
+
+class TestHierarchy(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        rows = [(p, r) for p in range(1001, 1009) for r in ('Norte', 'Sul', 'Centro-Oeste')]
+        self.df = pd.DataFrame(rows, columns=['ID_PRODUTO', 'REGIAO']).sample(frac=1, random_state=3)
+        self.df['CATEGORIA'] = np.where(self.df['ID_PRODUTO'] < 1005, 'Medicamentos', 'Higiene')
+        self.df['PREVISAO_ESTOQUE'] = rng.uniform(0, 120, len(self.df)).round(1)
+        self.engine, self.rows = HierarchyEngine.from_frame(self.df)
+        self.rng = rng
+
+    def dense_summing_matrix(self):
+        n = len(self.engine.bottom)
+        blocks = []
+        for level in self.engine.levels:
+            block = np.zeros((self.engine.size(level), n))
+            block[self.engine.codes[level], np.arange(n)] = 1.0
+            blocks.append(block)
+        return np.vstack(blocks)
+
+    def test_bottom_up(self):
+        """Níveis somam a base: total, categoria, região e produto"""
+        base = np.bincount(self.rows, weights=self.df['PREVISAO_ESTOQUE'].to_numpy())
+        totals = self.engine.aggregate(base)
+        self.assertEqual(self.engine.size('CATEGORIA_REGIAO'), 6)
+        self.assertAlmostEqual(totals['TOTAL'][0], self.df['PREVISAO_ESTOQUE'].sum())
+        self.assertAlmostEqual(totals['CATEGORIA'].sum(), totals['TOTAL'][0])
+        by_region = self.df.groupby('REGIAO')['PREVISAO_ESTOQUE'].sum()
+        np.testing.assert_allclose(totals['REGIAO'], by_region.reindex(self.engine.nodes['REGIAO']['REGIAO']))
+
+    def test_reconciliation_matches_dense_solution(self):
+        """WLS/MinT por gradientes conjugados = solução densa; resultado coerente"""
+        S = self.dense_summing_matrix()
+        base = {level: self.rng.normal(30 * self.engine.series_count(level), 5) for level in self.engine.levels}
+        variances = {level: self.rng.uniform(1, 9, self.engine.size(level)) for level in self.engine.levels}
+        y = np.concatenate([base[level] for level in self.engine.levels])
+        for method in ('wls', 'mint'):
+            if method == 'wls':
+                w = 1.0 / np.concatenate([self.engine.series_count(level) for level in self.engine.levels])
+            else:
+                w = 1.0 / np.concatenate([variances[level] for level in self.engine.levels])
+            expected = np.linalg.solve(S.T @ (w[:, None] * S), S.T @ (w * y))
+            reconciled = self.engine.reconcile(base, method, variances)
+            np.testing.assert_allclose(reconciled[self.engine.bottom_level], expected, atol=1e-4)
+            self.assertAlmostEqual(reconciled['TOTAL'][0], reconciled['CATEGORIA'].sum())
+
+    def test_alert_counts_roll_up(self):
+        """Contagens de alerta por nó somam entre níveis e batem com alerts_summary por grupo"""
+        base = np.bincount(self.rows, weights=self.df['PREVISAO_ESTOQUE'].to_numpy())
+        codes = AlertEngine().level_codes(base)
+        counts = self.engine.alert_counts(codes)
+        self.assertEqual(counts['TOTAL'].iloc[0].sum(), len(self.engine.bottom))
+        np.testing.assert_array_equal(counts['REGIAO'].sum().to_numpy(), counts['TOTAL'].iloc[0].to_numpy())
+
+        frame = AlertEngine().classify(self.engine.bottom.assign(PREVISAO_ESTOQUE=base))
+        summary = AlertEngine().alerts_summary(frame, group_by='CATEGORIA')
+        self.assertEqual(sum(g['criticos'] for g in summary['grupos'].values()), summary['total']['criticos'])
+        higiene = self.engine.nodes['CATEGORIA']['CATEGORIA'].tolist().index('Higiene')
+        self.assertEqual(summary['grupos']['Higiene']['criticos'], counts['CATEGORIA']['CRITICO'][higiene])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -78,6 +78,10 @@ class TestModelInference(unittest.TestCase):
         self.assertIsInstance(result['prediction'], dict)
         self.assertIsInstance(result['confidence']['score'], float)
         self.assertIn(result['alerts']['level'], ['NORMAL', 'ALERTA', 'CRITICO'])
+        
+        # Validação completa pelo schema compilado
+        from schema_validation import compile_schema
+        compile_schema(schema)(result)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""
+Testes do harness de carga (histograma, mock de endpoint e saturação)
+"""
+import unittest
+import asyncio
+import threading
+from model_predictor import ModelPredictor
+from local_server import create_socket
+from load_test import LatencyHistogram, LoadGenerator, MockEndpoint, find_saturation, load_requests, step_report
+
+class TestLoadTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Mock com latência baixa e throttling agressivo, em porta livre"""
+        sock = create_socket('127.0.0.1', 0)
+        cls.url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        loop = asyncio.new_event_loop()
+        mock = MockEndpoint(ModelPredictor(), latency_ms=1.0, latency_sigma=0.0, throttle_rps=20, throttle_burst=5)
+        threading.Thread(target=loop.run_until_complete, args=(mock.serve(sock),), daemon=True).start()
+
+    def test_histogram_percentiles(self):
+        """Percentis com erro relativo de ~2%"""
+        histogram = LatencyHistogram()
+        for value in range(1, 1001):
+            histogram.record(float(value))
+        self.assertAlmostEqual(histogram.percentile(50), 500, delta=10)
+        self.assertAlmostEqual(histogram.percentile(99), 990, delta=20)
+        self.assertEqual(histogram.percentile(100), 1000)
+
+    def test_throttling_counted_as_error(self):
+        """Respostas 429 do mock aparecem como erros de throttling"""
+        generator = LoadGenerator(self.url, load_requests(n=50))
+        step = step_report('concorrencia', 4, 0.5, generator.run_concurrency(4, 0.5))
+        self.assertGreater(step['sucesso'], 0)
+        self.assertGreater(step['erros'].get('throttling', 0), 0)
+
+    def test_saturation_point(self):
+        """Primeiro degrau com vazão abaixo do alvo é o ponto de saturação"""
+        steps = [
+            {'modo': 'rps', 'alvo': 100, 'vazao_rps': 99.0, 'taxa_erro': 0.0, 'latencia': {'p99_ms': 30.0}},
+            {'modo': 'rps', 'alvo': 200, 'vazao_rps': 150.0, 'taxa_erro': 0.0, 'latencia': {'p99_ms': 40.0}}
+        ]
+        saturation = find_saturation(steps, slo_ms=100, max_error_rate=0.01)
+        self.assertEqual(saturation['saturado_em'], 200)
+        self.assertEqual(saturation['capacidade_sustentada'], 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Testes do servidor local de inferência (contrato /invocations e /ping)
+"""
+import unittest
+import asyncio
+import json
+import socket
+import threading
+import http.client
+import numpy as np
+from model_predictor import ModelPredictor
+from local_server import InferenceServer, create_socket
+from payload_codec import NPY_TYPE, decode_output, encode_input
+
+class TestLocalServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Sobe o servidor em uma thread, em porta livre"""
+        cls.sock = create_socket('127.0.0.1', 0)
+        cls.port = cls.sock.getsockname()[1]
+        cls.loop = asyncio.new_event_loop()
+        server = InferenceServer(ModelPredictor())
+        cls.thread = threading.Thread(
+            target=cls.loop.run_until_complete, args=(server.serve(cls.sock),), daemon=True
+        )
+        cls.thread.start()
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        payload = response.read()
+        connection.close()
+        return response.status, payload
+
+    def test_ping(self):
+        """Health check do contrato SageMaker"""
+        status, _ = self.request('GET', '/ping')
+        self.assertEqual(status, 200)
+
+    def test_csv_single_record(self):
+        """Formato enviado por predict_single"""
+        status, payload = self.request('POST', '/invocations', b'1001,0,50', {'Content-Type': 'text/csv'})
+        self.assertEqual(status, 200)
+        result = json.loads(payload)
+        for field in ['prediction', 'confidence', 'alerts', 'metadata']:
+            self.assertIn(field, result)
+        self.assertIn(result['alerts']['level'], ['NORMAL', 'ALERTA', 'CRITICO'])
+
+    def test_jsonlines_multi_record(self):
+        """Vários registros em JSON lines com resposta em JSON lines"""
+        body = '\n'.join(json.dumps({'ID_PRODUTO': 1001 + i, 'FLAG_PROMOCAO': i % 2,
+                                     'QUANTIDADE_ESTOQUE': 10 * i}) for i in range(5))
+        status, payload = self.request('POST', '/invocations', body.encode(), {
+            'Content-Type': 'application/jsonlines', 'Accept': 'application/jsonlines'
+        })
+        self.assertEqual(status, 200)
+        lines = payload.decode().strip().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(json.loads(lines[0])['alerts']['level'], 'CRITICO')
+
+    def test_npy_batch(self):
+        """Lote binário (.npy) com resposta colunar e metadados nos cabeçalhos"""
+        body = encode_input(np.arange(1001, 1011), np.zeros(10, dtype=int), np.full(10, 50.0))
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        connection.request('POST', '/invocations', body=body, headers={
+            'Content-Type': NPY_TYPE, 'Accept': f'{NPY_TYPE}, application/json;q=0.5'
+        })
+        response = connection.getresponse()
+        out = decode_output(response.getheader('Content-Type'), response.read())
+        connection.close()
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('X-Model-Version'), ModelPredictor().model_version)
+        self.assertEqual(len(out['estoque_previsto']), 10)
+        self.assertTrue(set(out['level']) <= {'NORMAL', 'ALERTA', 'CRITICO'})
+
+    def test_binary_input_json_output(self):
+        """Sem Accept binário a resposta continua em JSON"""
+        body = encode_input([1001, 1002], [0, 1], [50.0, 20.0])
+        status, payload = self.request('POST', '/invocations', body, {'Content-Type': NPY_TYPE})
+        self.assertEqual(status, 200)
+        self.assertEqual(len(json.loads(payload)), 2)
+
+    def test_input_outside_schema(self):
+        """Entrada fora do schema_input.json retorna 400"""
+        status, payload = self.request('POST', '/invocations', b'1001,3,50', {'Content-Type': 'text/csv'})
+        self.assertEqual(status, 400)
+        self.assertIn('FLAG_PROMOCAO', json.loads(payload)['error'])
+
+    def test_fractional_json_id(self):
+        """Inteiros do JSON não são truncados: 1001.7 retorna 400"""
+        body = json.dumps({'ID_PRODUTO': 1001.7, 'FLAG_PROMOCAO': 0, 'QUANTIDADE_ESTOQUE': 50}).encode()
+        status, payload = self.request('POST', '/invocations', body, {'Content-Type': 'application/json'})
+        self.assertEqual(status, 400)
+        self.assertIn('ID_PRODUTO', json.loads(payload)['error'])
+
+    def test_invalid_content_length(self):
+        """Content-Length não numérico ou negativo retorna 400"""
+        for length in ['abc', '-5']:
+            with socket.create_connection(('127.0.0.1', self.port), timeout=5) as sock:
+                sock.sendall(f'POST /invocations HTTP/1.1\r\nContent-Type: text/csv\r\n'
+                             f'Content-Length: {length}\r\n\r\n1001,0,50'.encode())
+                self.assertTrue(sock.recv(1024).startswith(b'HTTP/1.1 400'))
+
+    def test_invalid_content_type(self):
+        """Content-Type não suportado retorna 415"""
+        status, _ = self.request('POST', '/invocations', b'x', {'Content-Type': 'text/plain'})
+        self.assertEqual(status, 415)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Testes do registro de modelos e da troca de versão no servidor
+"""
+import unittest
+import asyncio
+import json
+import tempfile
+import threading
+import http.client
+from model_predictor import ModelPredictor
+from model_registry import ModelRegistry, RegistryError, load_model_card, next_version
+from local_server import InferenceServer, create_socket
+
+class TestModelRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry = ModelRegistry(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_model_card_inside_markdown(self):
+        """model_card.json do repositório vem dentro de um bloco markdown"""
+        card = load_model_card()
+        self.assertEqual(card['model_details']['version'], '1.0.0')
+        self.assertIn('performance_metrics', card['metrics'])
+
+    def test_register_and_activate(self):
+        """Versões ordenadas semanticamente, ponteiro CURRENT e card por versão"""
+        self.registry.register(ModelPredictor(params={'model_version': '1.9.0'}), activate=True)
+        self.registry.register(ModelPredictor(params={'model_version': '1.10.0', 'demanda_padrao': 30.0}))
+        self.assertEqual(self.registry.versions(), ['1.9.0', '1.10.0'])
+        self.assertEqual(self.registry.active_version(), '1.9.0')
+
+        self.registry.activate('1.10.0')
+        predictor = self.registry.load()
+        self.assertEqual(predictor.model_version, '1.10.0')
+        self.assertEqual(predictor.params['demanda_padrao'], 30.0)
+        self.assertEqual(self.registry.card('1.10.0')['model_details']['version'], '1.10.0')
+        self.assertEqual(next_version('1.10.0'), '1.11.0')
+
+        with self.assertRaises(RegistryError):
+            self.registry.register(ModelPredictor(params={'model_version': '1.9.0'}))
+        with self.assertRaises(RegistryError):
+            self.registry.activate('2.0.0')
+
+    def test_server_swap(self):
+        """Após a troca as respostas informam a nova versão"""
+        sock = create_socket('127.0.0.1', 0)
+        server = InferenceServer(ModelPredictor())
+        loop = asyncio.new_event_loop()
+        threading.Thread(target=loop.run_until_complete, args=(server.serve(sock),), daemon=True).start()
+
+        def version():
+            connection = http.client.HTTPConnection('127.0.0.1', sock.getsockname()[1], timeout=5)
+            connection.request('POST', '/invocations', body=b'1001,0,50', headers={'Content-Type': 'text/csv'})
+            result = json.loads(connection.getresponse().read())
+            connection.close()
+            return result['metadata']['model_version']
+
+        self.assertEqual(version(), '1.0.0')
+        self.assertGreaterEqual(server.swap_predictor(ModelPredictor(params={'model_version': '1.1.0'})), 0)
+        self.assertEqual(version(), '1.1.0')
+        self.assertEqual(server.swaps, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+Testes dos formatos binários de lote (payload_codec)
+"""
+import unittest
+import io
+import numpy as np
+from model_predictor import ModelPredictor
+from payload_codec import (ARROW_TYPE, BINARY_TYPES, NPY_TYPE, decode_input, decode_output,
+                           encode_input, encode_output, negotiate)
+
+class TestPayloadCodec(unittest.TestCase):
+
+    def setUp(self):
+        self.inputs = (np.array([1001, 1002, 1050]), np.array([0, 1, 0]), np.array([50.0, 0.0, 120.0]))
+        self.out = ModelPredictor().predict_arrays(*self.inputs)
+
+    def test_roundtrip(self):
+        """Entrada e saída sobrevivem à ida e volta em todos os formatos binários"""
+        for content_type in BINARY_TYPES:
+            decoded = decode_input(content_type, encode_input(*self.inputs, content_type))
+            for original, values in zip(self.inputs, decoded):
+                np.testing.assert_array_equal(original, values)
+            out = decode_output(content_type, encode_output(self.out, content_type))
+            np.testing.assert_array_equal(out['dias_ate_ruptura'], self.out['dias_ate_ruptura'])
+            self.assertEqual(list(out['level']), list(self.out['level']))
+            self.assertEqual(list(out['recommendation']), list(self.out['recommendation']))
+
+    def test_invalid_npy(self):
+        """Corpo inválido, com objetos Python ou produto não inteiro é recusado"""
+        for array in (np.array([[1001.5, 0.0, 10.0]]), np.array([[1001, 0, 10]], dtype=object)):
+            buffer = io.BytesIO()
+            np.save(buffer, array, allow_pickle=True)
+            with self.assertRaises(ValueError):
+                decode_input(NPY_TYPE, buffer.getvalue())
+        with self.assertRaises(ValueError):
+            decode_input(NPY_TYPE, b'nao e npy')
+
+    def test_negotiate(self):
+        """Accept com q-values, curingas e formatos desconhecidos"""
+        available = BINARY_TYPES + ('application/json',)
+        self.assertEqual(negotiate(None, available, 'application/json'), 'application/json')
+        self.assertEqual(negotiate(f'{NPY_TYPE};q=0.4, application/json', available, 'application/json'),
+                         'application/json')
+        self.assertEqual(negotiate(f'text/html, {NPY_TYPE}', available, 'application/json'), NPY_TYPE)
+        self.assertEqual(negotiate('*/*', available, 'application/json'), 'application/json')
+        if ARROW_TYPE in BINARY_TYPES:
+            self.assertEqual(negotiate(f'{ARROW_TYPE}, {NPY_TYPE};q=0.9', available, 'application/json'),
+                             ARROW_TYPE)
+
+if __name__ == '__main__':
+    unittest.main()
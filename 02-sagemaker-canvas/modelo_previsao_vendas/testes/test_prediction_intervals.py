@@ -0,0 +1,57 @@
+"""
+Testes dos intervalos de previsão e scores de confiança (prediction_intervals)
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from alerting import AlertEngine
+from model_predictor import ModelPredictor
+
+class TestPredictionIntervals(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        # 20 produtos, 60 dias, consumo diário ~ N(10, 3) (15 com promoção) sem reposição
+        rng = np.random.default_rng(7)
+        days = pd.date_range('2024-01-01', periods=60)
+        frames = []
+        for produto in range(1001, 1021):
+            promo = rng.random(len(days)) < 0.2
+            consumo = np.maximum(rng.normal(10, 3, len(days)) * np.where(promo, 1.5, 1.0), 0)
+            frames.append(pd.DataFrame({
+                'ID_PRODUTO': produto, 'DIA': days, 'FLAG_PROMOCAO': promo.astype(int),
+                'QUANTIDADE_ESTOQUE': 5000 - np.cumsum(consumo)
+            }))
+        cls.history = pd.concat(frames, ignore_index=True)
+        cls.predictor = ModelPredictor.from_history(cls.history)
+
+    def test_calibrated_margins(self):
+        """Margens calibradas crescem com o horizonte e cobrem ~95% do erro de 1 dia"""
+        margins = self.predictor.params['margem_horizonte']
+        self.assertEqual(len(margins), 14)
+        self.assertTrue(np.all(np.diff(self.predictor.intervals.margins) >= 0))
+        self.assertGreater(self.predictor.params['janelas_calibracao'], 0)
+        # Erro diário ~ N(0, 3): margem de 1 dia perto de 1,96 * 3
+        self.assertAlmostEqual(margins[0], 1.96 * 3, delta=1.5)
+        self.assertGreater(self.predictor.intervals.margin(30), self.predictor.intervals.margin(14))
+
+    def test_trajectory(self):
+        """Trajetória de 14 dias: intervalos mais largos e confiança em [0, 1]"""
+        traj = self.predictor.predict_trajectory([1001, 1002], [0, 1], [200.0, 60.0], inicio='2024-03-01')
+        self.assertEqual(len(traj), 28)
+        self.assertEqual(traj['DIA'].iloc[13], pd.Timestamp('2024-03-14'))
+        width = (traj['INTERVALO_SUPERIOR'] - traj['INTERVALO_INFERIOR']).to_numpy()[:14]
+        self.assertTrue(np.all(np.diff(width) >= -0.11))  # arredondamento de 0,1
+        self.assertTrue(traj['CONFIANCA_PREVISAO'].between(0, 1).all())
+        prioridades = AlertEngine().evaluate_trajectories(traj)
+        self.assertEqual(set(prioridades['ID_PRODUTO']), {1001, 1002})
+
+    def test_score_reflects_distance_to_threshold(self):
+        """Estoque perto do limiar de alerta tem confiança menor que estoque distante"""
+        out = ModelPredictor().predict_arrays(np.array([1001, 1001]), np.array([0, 0]), np.array([63.0, 300.0]))
+        self.assertLess(out['score'][0], out['score'][1])
+        self.assertGreater(out['score'][1], 0.99)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Testes do catálogo de produtos indexado (product_catalog)
+"""
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from alerting import AlertEngine
+from product_catalog import ProductCatalog
+
+class TestProductCatalog(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.rng = rng
+        self.produtos = pd.DataFrame({
+            'ID_PRODUTO': rng.choice(np.arange(1, 50_000), 300, replace=False),
+            'CATEGORIA': rng.choice(['Medicamentos', 'Higiene', 'Bebidas'], 300),
+            'LEAD_TIME_DIAS': rng.integers(1, 6, 300),
+            'CRITICO': rng.uniform(10, 30, 300).round(1)
+        })
+
+    def assert_matches_pandas(self, catalog, produtos):
+        ids = np.concatenate([self.rng.choice(produtos['ID_PRODUTO'], 1000), self.rng.integers(0, 60_000, 1000)])
+        expected = produtos.set_index('ID_PRODUTO').reindex(ids)
+        np.testing.assert_array_equal(catalog.contains(ids), np.isin(ids, produtos['ID_PRODUTO']))
+        np.testing.assert_array_equal(catalog.lookup(ids, 'CRITICO'), expected['CRITICO'].to_numpy())
+        self.assertEqual(list(catalog.lookup(ids, 'CATEGORIA').astype(object)),
+                         expected['CATEGORIA'].tolist())
+        self.assertIn(int(produtos['ID_PRODUTO'].iloc[0]), catalog)
+
+    def test_roundtrip_dense_and_sparse(self):
+        dense = self.produtos.assign(ID_PRODUTO=np.arange(1001, 1301))
+        for produtos in (self.produtos, dense):
+            with tempfile.TemporaryDirectory() as path:
+                ProductCatalog.from_frame(produtos).save(path)
+                catalog = ProductCatalog.load(path)
+                self.assertEqual(len(catalog), len(produtos))
+                self.assertEqual(catalog.id_range(),
+                                 (produtos['ID_PRODUTO'].min(), produtos['ID_PRODUTO'].max()))
+                self.assert_matches_pandas(catalog, produtos)
+
+    def test_rebuild_with_open_reader(self):
+        """Leitor carregado antes de uma reconstrução continua consultando o catálogo que leu"""
+        with tempfile.TemporaryDirectory() as path:
+            ProductCatalog.from_frame(self.produtos).save(path)
+            reader = ProductCatalog.load(path)
+            novos = self.produtos.assign(CRITICO=self.produtos['CRITICO'] + 1)
+            ProductCatalog.from_frame(novos).save(path)
+            self.assert_matches_pandas(reader, self.produtos)
+            self.assert_matches_pandas(ProductCatalog.load(path), novos)
+
+    def test_default_range(self):
+        catalog = ProductCatalog.from_range()
+        np.testing.assert_array_equal(catalog.contains([1000, 1001, 1050, 1050.5, 1051]),
+                                      [False, True, True, False, False])
+        with self.assertRaises(ValueError):
+            ProductCatalog.from_frame(pd.DataFrame({'ID_PRODUTO': [1, 2, 2]}))
+
+    def test_covers(self):
+        """Faixa coberta só sem lacunas: um catálogo esparso sempre cai na busca por registro"""
+        self.assertTrue(ProductCatalog.from_range().covers(1001, 1050))
+        self.assertFalse(ProductCatalog.from_range().covers(1001, 1051))
+        self.assertTrue(ProductCatalog.from_frame(pd.DataFrame({'ID_PRODUTO': [3, 1, 2]})).covers(1, 3))
+        self.assertFalse(ProductCatalog.from_frame(pd.DataFrame({'ID_PRODUTO': [1, 3]})).covers(1, 3))
+
+    def test_alert_thresholds_from_catalog(self):
+        produtos = self.produtos.assign(ALERTA=self.produtos['CRITICO'] + 20)
+        engine = AlertEngine(catalog=ProductCatalog.from_frame(produtos))
+        ids = np.append(produtos['ID_PRODUTO'].to_numpy()[:3], -1)
+        critico, alerta = engine.thresholds(ids, n=len(ids))
+        np.testing.assert_array_equal(critico[:3], produtos['CRITICO'].to_numpy()[:3])
+        self.assertEqual((critico[3], alerta[3]), (engine.critico, engine.alerta))
+
+if __name__ == '__main__':
+    unittest.main()
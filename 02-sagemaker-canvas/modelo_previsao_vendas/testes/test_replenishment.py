@@ -0,0 +1,53 @@
+"""
+Testes do planejador de reabastecimento (replenishment)
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from model_predictor import ModelPredictor
+from prediction_intervals import normal_ppf
+from replenishment import ReplenishmentPlanner
+
+class TestReplenishment(unittest.TestCase):
+
+    def setUp(self):
+        self.predictor = ModelPredictor()
+        # 1001 quase sem estoque, 1002 intermediário, 1003 folgado
+        self.trajectories = self.predictor.predict_trajectory([1001, 1002, 1003], [0, 0, 0], [10.0, 40.0, 500.0],
+                                                              horizonte=9, inicio='2024-03-01')
+        self.parameters = pd.DataFrame({
+            'ID_PRODUTO': [1001, 1002, 1003],
+            'LEAD_TIME_DIAS': [2, 2, 2],
+            'LOTE_MINIMO': [24, 0, 0],
+            'LOTE_MULTIPLO': [12, 1, 1],
+            'CUSTO_UNITARIO': [10.0, 10.0, 10.0]
+        })
+        self.planner = ReplenishmentPlanner(service_level=0.95, coverage_days=7,
+                                            intervals=self.predictor.intervals)
+
+    def test_reorder_point(self):
+        """Ponto de pedido = demanda * lead time + z * desvio; só pede quem está abaixo dele"""
+        plan = self.planner.plan(self.trajectories, self.parameters).set_index('ID_PRODUTO')
+        demanda = self.predictor.params['demanda_padrao']
+        sigma = self.predictor.intervals.margin(2) / 1.959963984540054
+        self.assertAlmostEqual(plan.loc[1001, 'PONTO_PEDIDO'], demanda * 2 + normal_ppf(0.95) * sigma, delta=0.1)
+        self.assertGreater(plan.loc[1001, 'QUANTIDADE_PEDIDO'], 0)
+        self.assertEqual(plan.loc[1001, 'QUANTIDADE_PEDIDO'] % 12, 0)
+        self.assertEqual(plan.loc[1003, 'QUANTIDADE_PEDIDO'], 0)
+        # Estoque alvo cobre lead time + cobertura
+        self.assertAlmostEqual(plan.loc[1002, 'QUANTIDADE_PEDIDO'], np.ceil(plan.loc[1002, 'ESTOQUE_ALVO'] - 40.0))
+
+    def test_budget_allocation(self):
+        """Orçamento aprova primeiro a proteção do produto mais urgente, sem passar do limite"""
+        plan = self.planner.plan(self.trajectories, self.parameters)
+        allocated = self.planner.allocate(plan, budget=600.0).set_index('ID_PRODUTO')
+        self.assertLessEqual(allocated['CUSTO_APROVADO'].sum(), 600.0)
+        self.assertGreater(allocated.loc[1001, 'QUANTIDADE_APROVADA'], 0)
+        self.assertEqual(allocated.loc[1001, 'QUANTIDADE_APROVADA'] % 12, 0)
+        self.assertLess(allocated['QUANTIDADE_APROVADA'].sum(), allocated['QUANTIDADE_PEDIDO'].sum())
+        with self.assertRaises(ValueError):
+            self.planner.allocate(plan, capacity=10.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
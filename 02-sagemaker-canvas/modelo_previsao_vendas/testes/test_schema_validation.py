@@ -0,0 +1,62 @@
+"""
+Testes da validação de entrada/saída contra os schemas
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from model_predictor import ModelPredictor
+from schema_validation import (ColumnarValidator, SchemaValidationError, input_batch_validator,
+                               input_validator, output_batch_validator, output_validator)
+
+class TestSchemaValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.registro = {'ID_PRODUTO': 1001, 'DIA': '20/01/2024', 'FLAG_PROMOCAO': 0, 'QUANTIDADE_ESTOQUE': 50}
+
+    def test_compiled_input_validator(self):
+        """Validador compilado aceita o exemplo e rejeita faixa, enum e padrão"""
+        input_validator()(self.registro)
+        for campo, valor in [('ID_PRODUTO', 999), ('FLAG_PROMOCAO', 2), ('DIA', '2024-01-20'),
+                             ('QUANTIDADE_ESTOQUE', 12.5)]:
+            with self.assertRaises(SchemaValidationError) as ctx:
+                input_validator()(dict(self.registro, **{campo: valor}))
+            self.assertEqual(ctx.exception.path, campo)
+
+    def test_wire_input_without_date(self):
+        """No endpoint o DIA não é obrigatório (não trafega no CSV)"""
+        registro = {k: v for k, v in self.registro.items() if k != 'DIA'}
+        input_validator(wire=True)(registro)
+        with self.assertRaises(SchemaValidationError):
+            input_validator()(registro)
+
+    def test_columnar_input(self):
+        """Lote inválido: máscara aponta exatamente os registros fora do schema"""
+        df = pd.DataFrame([self.registro] * 5)
+        df.loc[1, 'ID_PRODUTO'] = 2000
+        df.loc[3, 'DIA'] = '20-01-2024'
+        invalid, errors = input_batch_validator().check(df)
+        self.assertEqual(np.flatnonzero(invalid).tolist(), [1, 3])
+        self.assertEqual(len(errors), 2)
+
+    def test_columnar_number_enum(self):
+        """Enum numérico em float: 0.5 fica entre 0 e 1 mas não está no enum"""
+        validator = ColumnarValidator({'properties': {'FLAG_PROMOCAO': {'type': 'number', 'enum': [0, 1]}}})
+        invalid, _ = validator.check({'FLAG_PROMOCAO': np.array([0.0, 0.5, 1.0])})
+        self.assertEqual(np.flatnonzero(invalid).tolist(), [1])
+        invalid, _ = validator.check({'FLAG_PROMOCAO': np.array([0, 1, 1])})
+        self.assertFalse(invalid.any())
+
+    def test_columnar_output(self):
+        """Saída vetorizada do preditor é válida; violações são detectadas"""
+        predictor = ModelPredictor()
+        out = predictor.predict_arrays(np.array([1001, 1002]), np.array([0, 1]), np.array([50.0, 5.0]))
+        output_batch_validator().validate(out)
+        output_validator()(predictor.to_records(out)[0])
+
+        out['score'] = np.array([0.9, 1.5])
+        with self.assertRaises(SchemaValidationError) as ctx:
+            output_batch_validator().validate(out)
+        self.assertEqual(ctx.exception.row, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Amostragem em passagem única (streaming) para arquivos grandes
+
+Modos:
+- aleatoria: amostragem de reservatório uniforme de N registros
+- produto, dia, promocao: estratificada, com cota de cada estrato
+  (ID_PRODUTO, DIA ou FLAG_PROMOCAO) proporcional ao seu tamanho
+- historico: sorteia N produtos e mantém o histórico completo de cada um
+  (séries temporais intactas para o Canvas)
+
+Cada registro recebe uma chave aleatória (gerador com semente, consumido na
+ordem do arquivo; o resultado não depende do tamanho dos blocos) e a amostra
+são as menores chaves, globalmente ou por estrato. No modo historico a chave
+é um hash do código do produto com a semente. Só a amostra candidata e o
+bloco corrente ficam em memória; nos modos estratificados cada estrato
+guarda no máximo a cota proporcional ao que já foi lido, com uma margem.
+
+Uso (via converter_formato.py):
+    python converter_formato.py export.csv amostra.csv --sample 100 --sample-mode produto
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, Optional
+
+from consolidar_historico import STORE_FORMAT, VERSION_COLUMN, HistoryStore, split_snapshot
+from importacao_tardia import lazy_import
+from mapear_layout import LAYOUTS, detect_layout
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+SAMPLE_MODES = {
+    'aleatoria': None,
+    'produto': 'ID_PRODUTO',
+    'dia': 'DIA',
+    'promocao': 'FLAG_PROMOCAO',
+    'historico': 'ID_PRODUTO'
+}
+
+KEY_COLUMN = '_chave_amostra'
+POSITION_COLUMN = '_posicao'
+STRATUM_COLUMN = '_estrato'
+
+
+def read_chunks(input_path: str, input_format: str, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    """
+    Lê o arquivo em blocos de até chunksize registros
+
+    CSV, Parquet e o histórico consolidado (partição a partição) são lidos
+    em streaming; JSON (array de registros) e XLSX não têm leitura
+    incremental e chegam como um único bloco.
+    """
+    if input_format == 'csv':
+        yield from pd.read_csv(input_path, encoding='utf-8-sig', chunksize=chunksize)
+    elif input_format == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    elif input_format == STORE_FORMAT:
+        import pyarrow.parquet as pq
+        root, version = split_snapshot(input_path)
+        for path in HistoryStore(root).files(version):
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+                yield batch.to_pandas().drop(columns=VERSION_COLUMN, errors='ignore')
+    elif input_format == 'json':
+        yield pd.read_json(input_path)
+    elif input_format == 'xlsx':
+        yield pd.read_excel(input_path)
+    else:
+        raise ValueError(f"Formato não suportado: {input_format}")
+
+
+def source_column(columns: Iterable[str], canonical: str) -> str:
+    """Coluna do arquivo que corresponde à coluna canônica (layouts mapeados)"""
+    columns = list(columns)
+    if canonical in columns:
+        return canonical
+    layout = detect_layout(columns)
+    for source, target in LAYOUTS.get(layout, {}).get('colunas', {}).items():
+        if target == canonical and source in columns:
+            return source
+    raise ValueError(f"Coluna {canonical} (ou equivalente) ausente para a amostragem estratificada")
+
+
+def stratum_labels(uniques) -> list:
+    """Rótulos de estrato como texto (1001 e 1001.0 de blocos diferentes coincidem)"""
+    uniques = pd.Index(uniques)
+    if pd.api.types.is_float_dtype(uniques.dtype) and np.array_equal(uniques, np.floor(uniques)):
+        uniques = uniques.astype(np.int64)
+    return uniques.astype(str).tolist()
+
+
+def allocate(counts: pd.Series, sample_size: int) -> pd.Series:
+    """Cota proporcional de cada estrato (maiores restos, soma = sample_size)"""
+    total = counts.sum()
+    if total <= sample_size:
+        return counts
+    exact = counts * sample_size / total
+    quota = np.floor(exact).astype(np.int64)
+    remaining = int(sample_size - quota.sum())
+    if remaining:
+        order = (exact - quota).sort_values(ascending=False, kind='stable').index[:remaining]
+        quota[order] += 1
+    return quota
+
+
+class ReservoirSampler:
+    """
+    Amostrador de reservatório por chaves aleatórias (uma passagem)
+
+    Uso: add(bloco) para cada bloco do arquivo, depois result().
+    """
+
+    def __init__(self, sample_size: int, mode: str = 'aleatoria', random_state: Optional[int] = 42):
+        if mode not in SAMPLE_MODES:
+            raise ValueError(f"Modo de amostragem desconhecido: {mode}. Modos: {list(SAMPLE_MODES)}")
+        if sample_size < 1:
+            raise ValueError('O tamanho da amostra deve ser positivo')
+        self.sample_size = sample_size
+        self.mode = mode
+        self.random_state = random_state
+        self.rng = np.random.default_rng(random_state)
+        self.kept: Optional[pd.DataFrame] = None
+        self.rows_seen = 0
+        # Estratos: rótulo -> id sequencial; contagens e limiar de chave por id
+        self.strata: Dict[str, int] = {}
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.thresholds = np.zeros(0)
+        self.threshold = np.inf
+        self._column: Optional[str] = None
+
+    def _stratum_ids(self, values: pd.Series) -> np.ndarray:
+        """Id global do estrato de cada registro (só os valores distintos viram texto)"""
+        codes, uniques = pd.factorize(values)
+        ids = []
+        for label in stratum_labels(uniques) + ['']:
+            # Nulos (código -1, último elemento) formam o estrato ''
+            ids.append(self.strata.setdefault(label, len(self.strata)))
+        if len(self.strata) > len(self.counts):
+            grow = len(self.strata) - len(self.counts)
+            self.counts = np.r_[self.counts, np.zeros(grow, dtype=np.int64)]
+            self.thresholds = np.r_[self.thresholds, np.full(grow, np.inf)]
+        return np.asarray(ids, dtype=np.int64)[codes]
+
+    def _keys(self, strata: Optional[np.ndarray], n_rows: int) -> np.ndarray:
+        if self.mode != 'historico':
+            # Consumido na ordem do arquivo: mesmas chaves com qualquer tamanho de bloco
+            return self.rng.random(n_rows)
+        # Mesma chave para todos os registros do produto, em qualquer bloco
+        labels = np.empty(len(self.strata), dtype=object)
+        for label, index in self.strata.items():
+            labels[index] = label
+        seed = 0 if self.random_state is None else self.random_state
+        hashes = pd.util.hash_array(labels, hash_key=f"{seed % 10 ** 16:016d}")
+        return (hashes >> np.uint64(11)).astype(np.float64)[strata] / float(1 << 53)
+
+    def add(self, chunk: pd.DataFrame):
+        """Incorpora um bloco, mantendo apenas as candidatas à amostra"""
+        n_rows = len(chunk)
+        strata = None
+        if SAMPLE_MODES[self.mode]:
+            if self._column is None:
+                self._column = source_column(chunk.columns, SAMPLE_MODES[self.mode])
+            strata = self._stratum_ids(chunk[self._column])
+            if self.mode != 'historico':
+                self.counts += np.bincount(strata, minlength=len(self.counts))
+        keys = self._keys(strata, n_rows)
+
+        # Descarta antes de copiar: chaves acima do limiar nunca entram na amostra
+        if self.mode in ('aleatoria', 'historico'):
+            candidates = np.flatnonzero(keys <= self.threshold)
+        else:
+            candidates = np.flatnonzero(keys <= self.thresholds[strata])
+        if len(candidates):
+            extra = {POSITION_COLUMN: self.rows_seen + candidates, KEY_COLUMN: keys[candidates]}
+            if strata is not None:
+                extra[STRATUM_COLUMN] = strata[candidates]
+            selected = chunk.iloc[candidates].reset_index(drop=True).assign(**extra)
+            combined = selected if self.kept is None else pd.concat([self.kept, selected], ignore_index=True)
+            self.kept = combined.iloc[self._select(combined)].reset_index(drop=True)
+        self.rows_seen += n_rows
+
+    def _select(self, combined: pd.DataFrame) -> np.ndarray:
+        """Posições das candidatas mantidas (atualiza os limiares de chave)"""
+        keys = combined[KEY_COLUMN].to_numpy()
+        k = self.sample_size
+        if self.mode == 'aleatoria':
+            if len(keys) < k:
+                return np.arange(len(keys))
+            keep = np.argpartition(keys, k - 1)[:k]
+            self.threshold = keys[keep].max()
+            return keep
+        if self.mode == 'historico':
+            distinct = np.unique(keys)
+            if len(distinct) < k:
+                return np.arange(len(keys))
+            self.threshold = distinct[k - 1]
+            return np.flatnonzero(keys <= self.threshold)
+        # Estratificada: as menores chaves de cada estrato, até a cota proporcional
+        # atual mais uma margem (memória ~ tamanho da amostra, não k x estratos)
+        strata = combined[STRATUM_COLUMN].to_numpy()
+        order = np.lexsort((keys, strata))
+        sorted_strata = strata[order]
+        starts = np.flatnonzero(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]])
+        rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+        bound = self._buffer_bounds()[sorted_strata]
+        full = rank == bound - 1
+        self.thresholds[sorted_strata[full]] = keys[order[full]]
+        return order[rank < bound]
+
+    def _buffer_bounds(self) -> np.ndarray:
+        """
+        Candidatas mantidas por estrato: cota proporcional ao que já foi lido
+        mais 3 desvios-padrão (ao menos 1; nunca mais que o tamanho da amostra)
+
+        Os candidatos de um estrato são sempre todos os seus registros com
+        chave abaixo do limiar, então a amostra dentro do estrato continua
+        uniforme; se a participação do estrato crescer depois, os registros
+        novos abaixo do limiar repõem a cota.
+        """
+        quota = self.sample_size * self.counts / max(int(self.counts.sum()), 1)
+        bound = np.ceil(quota + 3 * np.sqrt(quota))
+        return np.minimum(bound, self.sample_size).astype(np.int64)
+
+    def result(self) -> pd.DataFrame:
+        """Amostra final na ordem original do arquivo (sem as colunas auxiliares)"""
+        if self.kept is None:
+            return pd.DataFrame()
+        sample = self.kept
+        if SAMPLE_MODES[self.mode] and self.mode != 'historico':
+            quota = allocate(pd.Series(self.counts), self.sample_size).to_numpy()
+            sample = sample.sort_values(KEY_COLUMN, kind='stable')
+            rank = sample.groupby(STRATUM_COLUMN, sort=False).cumcount().to_numpy()
+            sample = sample[rank < quota[sample[STRATUM_COLUMN].to_numpy()]]
+        sample = sample.sort_values(POSITION_COLUMN)
+        return sample.drop(columns=[c for c in (KEY_COLUMN, POSITION_COLUMN, STRATUM_COLUMN)
+                                    if c in sample.columns]).reset_index(drop=True)
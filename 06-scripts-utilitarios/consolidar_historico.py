@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Histórico consolidado de estoque com upsert de deltas diários
+
+Estrutura do diretório:
+
+    historico/
+      CURRENT                          -> versão ativa (ex.: "12")
+      snapshots/000012.json            -> partições da versão e estatísticas da carga
+      dados/ano_mes=2023-05/v000012.parquet
+
+Os registros são particionados por mês de DIA e a chave é (ID_PRODUTO, DIA).
+Um upsert reescreve só as partições que o delta toca (último a escrever
+vence) e grava um novo snapshot; os arquivos de partição nunca são
+alterados, de modo que leitores de um snapshot (conversor, validador,
+treinamento) veem sempre um estado consistente e versões anteriores
+continuam legíveis até a limpeza (vacuum). O custo da carga é proporcional
+ao delta e às partições afetadas, não ao histórico inteiro.
+
+Leitura de um snapshot específico: caminho@versão (ex.: historico@11).
+
+Uso:
+    python consolidar_historico.py upsert historico/ delta_2024-05-02.csv
+    python consolidar_historico.py snapshots historico/
+    python consolidar_historico.py export historico@11 historico_v11.parquet
+    python consolidar_historico.py vacuum historico/ --keep 7
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from importacao_tardia import lazy_import
+from instrumentacao import span
+from mapear_layout import DEFAULT_PRODUCT_MAP, LayoutMapper, ProductCodeMap
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+pa = lazy_import('pyarrow')
+pq = lazy_import('pyarrow.parquet')
+
+# Formato usado pelo conversor para ler/gravar o histórico
+STORE_FORMAT = 'historico'
+KEY_COLUMNS = ['ID_PRODUTO', 'DIA']
+PARTITION_PREFIX = 'ano_mes='
+VERSION_COLUMN = '_versao'
+
+
+class HistoryStoreError(Exception):
+    """Histórico inexistente, snapshot ausente ou delta inválido"""
+
+
+def split_snapshot(path: str) -> Tuple[str, Optional[int]]:
+    """'historico@11' -> ('historico', 11); sem sufixo, versão None (ativa)"""
+    base, sep, version = str(path).rpartition('@')
+    if sep and version.isdigit():
+        return base, int(version)
+    return str(path), None
+
+
+def is_store(path: str) -> bool:
+    """Diretório de histórico (aceita o sufixo @versão)"""
+    root = Path(split_snapshot(path)[0])
+    return root.is_dir() and (root / 'snapshots').is_dir()
+
+
+def row_keys(produto: np.ndarray, dias: np.ndarray) -> np.ndarray:
+    """Chave int64 de (ID_PRODUTO, DIA): produto nos 32 bits altos, dia nos baixos"""
+    days = dias.astype('datetime64[D]').astype(np.int64)
+    return (produto.astype(np.int64) << 32) | (days & 0xFFFFFFFF)
+
+
+class HistoryStore:
+    """Histórico particionado por mês com snapshots versionados"""
+
+    def __init__(self, root: str, product_map: Optional[ProductCodeMap] = None):
+        self.root = Path(root)
+        self.layout_mapper = LayoutMapper(product_map)
+
+    # Snapshots
+
+    def versions(self) -> List[int]:
+        snapshots = self.root / 'snapshots'
+        if not snapshots.is_dir():
+            return []
+        return sorted(int(p.stem) for p in snapshots.glob('*.json') if p.stem.isdigit())
+
+    def current_version(self) -> Optional[int]:
+        try:
+            return int((self.root / 'CURRENT').read_text(encoding='utf-8').strip())
+        except (FileNotFoundError, ValueError):
+            versions = self.versions()
+            return versions[-1] if versions else None
+
+    def snapshot(self, version: Optional[int] = None) -> Dict[str, Any]:
+        """Manifesto do snapshot (padrão: ativo); histórico vazio -> versão 0"""
+        version = self.current_version() if version is None else version
+        if version is None or version == 0:
+            return {'versao': 0, 'particoes': {}, 'registros': 0}
+        path = self.root / 'snapshots' / f'{version:06d}.json'
+        if not path.is_file():
+            raise HistoryStoreError(f"Snapshot {version} não encontrado em {self.root}")
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def files(self, version: Optional[int] = None) -> List[Path]:
+        """Arquivos Parquet do snapshot, em ordem de partição"""
+        partitions = self.snapshot(version)['particoes']
+        return [self.root / partitions[name]['arquivo'] for name in sorted(partitions)]
+
+    def read(self, version: Optional[int] = None, columns: Optional[List[str]] = None,
+             with_version: bool = False) -> pd.DataFrame:
+        """
+        Registros do snapshot no layout canônico (ID renumerado, DIA datetime,
+        ordenados por mês, produto e dia)
+        """
+        files = self.files(version)
+        with span('historico.leitura', arquivos=len(files)) as read_span:
+            if not files:
+                return pd.DataFrame(columns=['ID'] + KEY_COLUMNS)
+            if columns is not None:
+                columns = list(dict.fromkeys(KEY_COLUMNS + [c for c in columns if c != 'ID']))
+            # Partições podem ter colunas diferentes (features adicionadas em cargas novas)
+            tables = [pq.read_table(path, columns=columns) for path in files]
+            df = pa.concat_tables(tables, promote_options='default').to_pandas()
+            read_span.rows = len(df)
+        if not with_version and VERSION_COLUMN in df.columns:
+            df = df.drop(columns=VERSION_COLUMN)
+        df.insert(0, 'ID', np.arange(1, len(df) + 1, dtype=np.int64))
+        return df
+
+    # Carga
+
+    def prepare_delta(self, delta: pd.DataFrame) -> pd.DataFrame:
+        """Layout canônico, DIA como data e uma linha por chave (a última do delta)"""
+        delta, _ = self.layout_mapper.normalize(delta)
+        missing = [col for col in KEY_COLUMNS if col not in delta.columns]
+        if missing:
+            raise HistoryStoreError(f"Colunas de chave ausentes no delta: {', '.join(missing)}")
+        delta = delta.drop(columns=['ID'], errors='ignore')
+        if not pd.api.types.is_datetime64_any_dtype(delta['DIA']):
+            codes, uniques = pd.factorize(delta['DIA'])
+            parsed = pd.to_datetime(pd.Series(uniques), format='%d/%m/%Y', errors='coerce')
+            delta['DIA'] = pd.Series(parsed.to_numpy().take(codes), index=delta.index).where(codes >= 0)
+        delta['DIA'] = delta['DIA'].astype('datetime64[ms]')
+        produto = pd.to_numeric(delta['ID_PRODUTO'], errors='coerce')
+        invalid = int((produto.isna() | delta['DIA'].isna()).sum())
+        if invalid:
+            raise HistoryStoreError(f"{invalid} registros do delta sem ID_PRODUTO ou DIA válidos")
+        delta['ID_PRODUTO'] = produto.astype(np.int64)
+        # Ordena pela chave (argsort estável) e fica com a última ocorrência de cada uma
+        keys = row_keys(delta['ID_PRODUTO'].to_numpy(), delta['DIA'].to_numpy())
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        last = np.r_[sorted_keys[1:] != sorted_keys[:-1], True]
+        return delta.iloc[order[last]].reset_index(drop=True)
+
+    @contextmanager
+    def lock(self, timeout: float = 30.0):
+        """Um escritor por vez (arquivo de trava criado com O_EXCL)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / '.lock'
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    raise HistoryStoreError(f"Histórico {self.root} travado por outra carga ({path})")
+                time.sleep(0.05)
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            yield
+        finally:
+            os.close(fd)
+            os.unlink(path)
+
+    def upsert(self, delta: pd.DataFrame, source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Aplica o delta (inserções e correções por ID_PRODUTO/DIA) e publica um
+        novo snapshot
+
+        Returns:
+            Manifesto do novo snapshot (com inseridos/atualizados da carga)
+        """
+        with span('historico.upsert', rows=len(delta)):
+            delta = self.prepare_delta(delta)
+            self.layout_mapper.product_map.save()
+            with self.lock():
+                base = self.snapshot()
+                version = max([base['versao']] + self.versions()) + 1
+                delta[VERSION_COLUMN] = np.int64(version)
+                # Mês de cada registro como inteiro; um argsort separa as partições
+                months, month_values = pd.factorize(delta['DIA'].to_numpy().astype('datetime64[M]'), sort=True)
+                order = np.argsort(months, kind='stable')
+                bounds = np.searchsorted(months[order], np.arange(len(month_values) + 1))
+                partitions = dict(base['particoes'])
+                inserted = updated = 0
+
+                for i, month in enumerate(month_values):
+                    name = f'{PARTITION_PREFIX}{str(month)[:7]}'
+                    rows = delta.iloc[order[bounds[i]:bounds[i + 1]]]
+                    with span('historico.particao', rows=len(rows), particao=name):
+                        merged, replaced = self._merge_partition(base['particoes'].get(name), rows)
+                        relative = Path('dados') / name / f'v{version:06d}.parquet'
+                        self._write_parquet(merged, self.root / relative)
+                    partitions[name] = {'arquivo': relative.as_posix(), 'registros': int(len(merged))}
+                    updated += replaced
+                    inserted += len(rows) - replaced
+
+                manifest = {
+                    'versao': version,
+                    'versao_anterior': base['versao'],
+                    'criado_em': datetime.now().isoformat(timespec='seconds'),
+                    'origem': source,
+                    'particoes': partitions,
+                    'registros': int(sum(p['registros'] for p in partitions.values())),
+                    'carga': {
+                        'inseridos': int(inserted),
+                        'atualizados': int(updated),
+                        'particoes_reescritas': int(len(month_values))
+                    }
+                }
+                self._write_json(self.root / 'snapshots' / f'{version:06d}.json', manifest)
+                self._write_text(self.root / 'CURRENT', f'{version}\n')
+        return manifest
+
+    def _merge_partition(self, partition: Optional[Dict[str, Any]],
+                         rows: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+        """Partição atual sem as chaves do delta + linhas do delta (último vence)"""
+        rows = rows.reset_index(drop=True)
+        if partition is None:
+            merged, replaced = rows, 0
+        else:
+            current = pq.read_table(self.root / partition['arquivo']).to_pandas()
+            current_keys = row_keys(current['ID_PRODUTO'].to_numpy(), current['DIA'].to_numpy())
+            stale = np.isin(current_keys, row_keys(rows['ID_PRODUTO'].to_numpy(), rows['DIA'].to_numpy()))
+            replaced = int(stale.sum())
+            merged = pd.concat([current[~stale], rows], ignore_index=True)
+        keys = row_keys(merged['ID_PRODUTO'].to_numpy(), merged['DIA'].to_numpy())
+        return merged.iloc[np.argsort(keys, kind='stable')].reset_index(drop=True), replaced
+
+    # Manutenção
+
+    def vacuum(self, keep: int = 7) -> Dict[str, int]:
+        """Remove snapshots além dos `keep` mais recentes (keep >= 1) e arquivos sem referência"""
+        if keep < 1:
+            raise HistoryStoreError(f"keep deve ser pelo menos 1 (recebido {keep})")
+        with self.lock():
+            versions = self.versions()
+            current = self.current_version()
+            keep_versions = set(versions[len(versions) - keep:]) | ({current} if current else set())
+            removed_snapshots = 0
+            for version in versions:
+                if version not in keep_versions:
+                    (self.root / 'snapshots' / f'{version:06d}.json').unlink()
+                    removed_snapshots += 1
+            referenced = {
+                (self.root / p['arquivo']).resolve()
+                for version in keep_versions for p in self.snapshot(version)['particoes'].values()
+            }
+            removed_files = 0
+            for path in (self.root / 'dados').glob(f'{PARTITION_PREFIX}*/*.parquet'):
+                if path.resolve() not in referenced:
+                    path.unlink()
+                    removed_files += 1
+        return {'snapshots_removidos': removed_snapshots, 'arquivos_removidos': removed_files}
+
+    # Escrita atômica (tmp + os.replace)
+
+    @staticmethod
+    def _write_parquet(df: pd.DataFrame, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def _write_json(cls, path: Path, data: Dict[str, Any]):
+        cls._write_text(path, json.dumps(data, indent=2, ensure_ascii=False))
+
+    @staticmethod
+    def _write_text(path: Path, text: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str, columns: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Lê 'historico' ou 'historico@versão' -> (registros, manifesto)"""
+    root, version = split_snapshot(path)
+    store = HistoryStore(root)
+    manifest = store.snapshot(version)
+    return store.read(manifest['versao'], columns=columns), manifest
+
+
+def read_input(path: str) -> pd.DataFrame:
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.json'):
+        return pd.read_json(path)
+    return pd.read_csv(path, encoding='utf-8-sig')
+
+
+def parse_keep(text: str) -> int:
+    """--keep: número de snapshots mantidos (pelo menos 1)"""
+    try:
+        keep = int(text)
+    except ValueError:
+        keep = 0
+    if keep < 1:
+        raise argparse.ArgumentTypeError(f"--keep deve ser um inteiro >= 1: {text}")
+    return keep
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Histórico consolidado de estoque (upsert de deltas)')
+    parser.add_argument('--product-map',
+                        default=os.environ.get('ESTOQUE_DICIONARIO_PRODUTOS', str(DEFAULT_PRODUCT_MAP)),
+                        help='Dicionário de códigos de produto para deltas em outros layouts '
+                             '(padrão: $ESTOQUE_DICIONARIO_PRODUTOS ou 01-Dados/dicionario_produtos.json)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    upsert_parser = commands.add_parser('upsert', help='Aplica deltas (novos registros e correções)')
+    upsert_parser.add_argument('store', help='Diretório do histórico (criado se não existir)')
+    upsert_parser.add_argument('deltas', nargs='+', help='Arquivos CSV/Parquet/JSON, aplicados em ordem')
+
+    snapshots_parser = commands.add_parser('snapshots', help='Lista os snapshots')
+    snapshots_parser.add_argument('store')
+
+    export_parser = commands.add_parser('export', help='Exporta um snapshot (historico ou historico@versão)')
+    export_parser.add_argument('store')
+    export_parser.add_argument('output', help='Arquivo .csv ou .parquet')
+
+    vacuum_parser = commands.add_parser('vacuum', help='Remove snapshots antigos e arquivos sem referência')
+    vacuum_parser.add_argument('store')
+    vacuum_parser.add_argument('--keep', type=parse_keep, default=7, help='Snapshots mantidos (padrão: 7)')
+
+    args = parser.parse_args()
+    product_map = ProductCodeMap(args.product_map)
+
+    try:
+        if args.command == 'upsert':
+            store = HistoryStore(args.store, product_map)
+            for path in args.deltas:
+                start = time.perf_counter()
+                manifest = store.upsert(read_input(path), source=Path(path).name)
+                load = manifest['carga']
+                print(f"✅ {path}: snapshot {manifest['versao']} | {load['inseridos']:,} inseridos, "
+                      f"{load['atualizados']:,} atualizados, {load['particoes_reescritas']} partições "
+                      f"reescritas, {manifest['registros']:,} registros ({time.perf_counter() - start:.2f} s)")
+        elif args.command == 'snapshots':
+            store = HistoryStore(args.store)
+            current = store.current_version()
+            versions = store.versions()
+            if not versions:
+                print(f"📭 Nenhum snapshot em {store.root}")
+            for version in versions:
+                manifest = store.snapshot(version)
+                load = manifest.get('carga', {})
+                print(f"{'➡️ ' if version == current else '   '} {version:>6} {manifest['criado_em']} "
+                      f"{manifest['registros']:>12,} registros  +{load.get('inseridos', 0):,} "
+                      f"~{load.get('atualizados', 0):,}  {manifest.get('origem') or '-'}")
+        elif args.command == 'export':
+            df, manifest = read_snapshot(args.store)
+            if args.output.endswith('.parquet'):
+                df.to_parquet(args.output, index=False)
+            else:
+                df.assign(DIA=df['DIA'].dt.strftime('%d/%m/%Y')).to_csv(args.output, index=False, encoding='utf-8-sig')
+            print(f"✅ Snapshot {manifest['versao']}: {len(df):,} registros em {args.output}")
+        elif args.command == 'vacuum':
+            removed = HistoryStore(args.store).vacuum(args.keep)
+            print(f"🧹 {removed['snapshots_removidos']} snapshots e "
+                  f"{removed['arquivos_removidos']} arquivos removidos")
+    except (HistoryStoreError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
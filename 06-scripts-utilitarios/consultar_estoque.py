@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Consultas analíticas locais sobre o histórico e as previsões de estoque
+
+Substitui, offline, as consultas ad hoc feitas no Athena/QuickSight:
+
+- faixas_estoque: registros por dia em cada faixa de estoque (as mesmas de
+  DataValidator.generate_summary)
+- produtos: registros, período e estoque médio por produto
+- promocao: distribuição de promoções e efeito da promoção no consumo diário
+  por produto
+- alertas: previsões por dia e nível de alerta (breakdown de get_alerts_summary)
+- ruptura: produtos com ruptura prevista em até N dias (AlertEngine)
+- sql: SQL livre sobre as tabelas historico e previsoes (requer duckdb)
+
+As fontes são lidas com pyarrow.dataset: só as colunas usadas são lidas e os
+filtros de período e produto descem para a leitura (predicate pushdown). No
+histórico consolidado, partições mensais fora do período nem são abertas.
+CSVs (e arquivos com DIA em texto) são convertidos uma vez para Parquet
+ordenado por dia no diretório de cache, invalidado por tamanho e data de
+modificação do arquivo.
+
+Uso:
+    python consultar_estoque.py faixas_estoque --historico historico/ --inicio 2023-01-01 --fim 2023-03-31
+    python consultar_estoque.py promocao --historico historico@12 --produtos 1001,1002
+    python consultar_estoque.py ruptura --previsoes ../03-resultados/previsoes_estoque.csv --dias 7
+    python consultar_estoque.py sql "SELECT NIVEL_ALERTA, COUNT(*) FROM previsoes GROUP BY 1"
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from consolidar_historico import PARTITION_PREFIX, HistoryStore, is_store, split_snapshot
+from instrumentacao import span
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / '02-sagemaker-canvas' / 'modelo_previsao_vendas'
+if str(MODEL_DIR) not in sys.path:
+    sys.path.insert(0, str(MODEL_DIR))
+
+try:
+    from alerting import ALERT_THRESHOLDS, AlertEngine
+except ImportError:
+    AlertEngine = None
+    ALERT_THRESHOLDS = {'critico': 20, 'alerta': 50}
+
+DEFAULT_FORECASTS = Path(__file__).resolve().parent.parent / '03-resultados' / 'previsoes_estoque.csv'
+DEFAULT_CACHE = Path(tempfile.gettempdir()) / 'estoque_consultas'
+
+# Faixas de DataValidator.generate_summary: (nome, mínimo, máximo inclusivo)
+STOCK_BANDS = [
+    ('critico_0_20', 0, 20),
+    ('alerta_21_50', 21, 50),
+    ('normal_51_100', 51, 100),
+    ('alto_100_plus', 101, np.inf)
+]
+
+# Linhas por row group no cache: granularidade do pushdown por data
+CACHE_ROW_GROUP = 65_536
+
+
+def parse_date(text: Optional[str]) -> Optional[pd.Timestamp]:
+    """Aceita aaaa-mm-dd ou dd/mm/aaaa"""
+    if not text:
+        return None
+    for date_format in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return pd.Timestamp(datetime.strptime(text, date_format))
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Data inválida: {text} (use aaaa-mm-dd ou dd/mm/aaaa)")
+
+
+def parse_products(text: str) -> List[int]:
+    try:
+        return [int(p) for p in text.split(',') if p.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Lista de produtos inválida: {text}")
+
+
+class QueryEngine:
+    """Leitura com projeção e pushdown de filtros + visões predefinidas"""
+
+    def __init__(self, historico: Optional[str] = None, previsoes: Optional[str] = None,
+                 cache_dir: Optional[str] = None):
+        self.sources = {'historico': historico, 'previsoes': previsoes}
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE
+
+    # Fontes
+
+    def dataset(self, name: str, inicio: Optional[pd.Timestamp] = None,
+                fim: Optional[pd.Timestamp] = None) -> ds.Dataset:
+        """Dataset da fonte (histórico: só as partições mensais do período)"""
+        path = self.sources.get(name)
+        if not path:
+            raise ValueError(f"Fonte '{name}' não informada (use --{name})")
+        if is_store(path):
+            root, version = split_snapshot(path)
+            store = HistoryStore(root)
+            partitions = store.snapshot(version)['particoes']
+            first = inicio.strftime('%Y-%m') if inicio is not None else ''
+            last = fim.strftime('%Y-%m') if fim is not None else '9999-99'
+            files = [str(store.root / partitions[p]['arquivo']) for p in sorted(partitions)
+                     if first <= p[len(PARTITION_PREFIX):] <= last]
+            return ds.dataset(files, format='parquet')
+        if not Path(path).exists():
+            raise FileNotFoundError(f"Arquivo não encontrado: {path}")
+        if Path(path).suffix.lower() == '.parquet' or Path(path).is_dir():
+            dataset = ds.dataset(path, format='parquet')
+            if 'DIA' not in dataset.schema.names or pa.types.is_temporal(dataset.schema.field('DIA').type):
+                return dataset
+        return ds.dataset(self.cached(path), format='parquet')
+
+    def cached(self, path: str) -> str:
+        """Cópia Parquet (DIA como data, ordenada por dia) de CSV/JSON/Parquet com DIA texto"""
+        stat = Path(path).stat()
+        key = hashlib.blake2b(f"{Path(path).resolve()}|{stat.st_size}|{stat.st_mtime_ns}".encode(),
+                              digest_size=12).hexdigest()
+        target = self.cache_dir / f"{Path(path).stem}-{key}.parquet"
+        if target.exists():
+            return str(target)
+        with span('consulta.cache', arquivo=Path(path).name) as cache_span:
+            suffix = Path(path).suffix.lower()
+            if suffix == '.parquet':
+                df = pd.read_parquet(path)
+            elif suffix == '.json':
+                df = pd.read_json(path)
+            else:
+                df = pd.read_csv(path, encoding='utf-8-sig')
+            cache_span.rows = len(df)
+            if 'DIA' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['DIA']):
+                # Poucas datas distintas: converte só os valores distintos
+                codes, uniques = pd.factorize(df['DIA'])
+                parsed = pd.to_datetime(pd.Series(uniques), format='%d/%m/%Y', errors='coerce')
+                df['DIA'] = pd.Series(parsed.to_numpy().take(codes), index=df.index).where(codes >= 0)
+            if 'DIA' in df.columns:
+                df = df.sort_values(['DIA'] + (['ID_PRODUTO'] if 'ID_PRODUTO' in df.columns else []),
+                                    kind='stable')
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_suffix(f'.{os.getpid()}.tmp')
+            df.to_parquet(tmp_path, index=False, row_group_size=CACHE_ROW_GROUP)
+            os.replace(tmp_path, target)
+        return str(target)
+
+    def scan(self, name: str, columns: List[str], inicio: Optional[pd.Timestamp] = None,
+             fim: Optional[pd.Timestamp] = None, produtos: Optional[List[int]] = None) -> pa.Table:
+        """Colunas da fonte com os filtros de período e produto aplicados na leitura"""
+        dataset = self.dataset(name, inicio, fim)
+        schema = dataset.schema
+        missing = [col for col in columns if col not in schema.names]
+        if missing:
+            raise ValueError(f"Colunas ausentes em {name}: {', '.join(missing)}")
+        condition = None
+        if 'DIA' in schema.names:
+            dia_type = schema.field('DIA').type
+            if inicio is not None:
+                condition = ds.field('DIA') >= pa.scalar(inicio.to_pydatetime(), type=dia_type)
+            if fim is not None:
+                upper = ds.field('DIA') <= pa.scalar(fim.to_pydatetime(), type=dia_type)
+                condition = upper if condition is None else condition & upper
+        if produtos:
+            in_products = ds.field('ID_PRODUTO').isin(produtos)
+            condition = in_products if condition is None else condition & in_products
+        with span(f'consulta.leitura.{name}') as read_span:
+            table = dataset.to_table(columns=columns, filter=condition)
+            read_span.rows = table.num_rows
+        return table
+
+    # Visões
+
+    def faixas_estoque(self, inicio=None, fim=None, produtos=None) -> pd.DataFrame:
+        """Registros por dia em cada faixa de estoque"""
+        table = self.scan('historico', ['DIA', 'QUANTIDADE_ESTOQUE'], inicio, fim, produtos)
+        stock = table.column('QUANTIDADE_ESTOQUE').to_numpy(zero_copy_only=False).astype(float)
+        days = table.column('DIA').to_numpy(zero_copy_only=False).astype('datetime64[D]')
+        band = np.full(len(stock), -1, dtype=np.int64)
+        for i, (_, low, high) in enumerate(STOCK_BANDS):
+            band[(stock >= low) & (stock <= high)] = i
+        day_codes, day_values = pd.factorize(days, sort=True)
+        valid = band >= 0
+        counts = np.bincount(day_codes[valid] * len(STOCK_BANDS) + band[valid],
+                             minlength=len(day_values) * len(STOCK_BANDS)).reshape(-1, len(STOCK_BANDS))
+        result = pd.DataFrame(counts, columns=[name for name, _, _ in STOCK_BANDS])
+        result.insert(0, 'DIA', pd.DatetimeIndex(day_values))
+        result['total'] = np.bincount(day_codes, minlength=len(day_values))
+        return result
+
+    def produtos(self, inicio=None, fim=None, produtos=None) -> pd.DataFrame:
+        """Registros, período e estoque por produto (mais registros primeiro)"""
+        table = self.scan('historico', ['ID_PRODUTO', 'DIA', 'QUANTIDADE_ESTOQUE'], inicio, fim, produtos)
+        grouped = table.group_by('ID_PRODUTO').aggregate([
+            ([], 'count_all'),
+            ('DIA', 'min'), ('DIA', 'max'),
+            ('QUANTIDADE_ESTOQUE', 'mean'), ('QUANTIDADE_ESTOQUE', 'min')
+        ]).to_pandas().rename(columns={
+            'count_all': 'registros', 'DIA_min': 'inicio', 'DIA_max': 'fim',
+            'QUANTIDADE_ESTOQUE_mean': 'estoque_medio', 'QUANTIDADE_ESTOQUE_min': 'estoque_minimo'
+        })
+        grouped['estoque_medio'] = grouped['estoque_medio'].round(2)
+        return grouped[['ID_PRODUTO', 'registros', 'inicio', 'fim', 'estoque_medio', 'estoque_minimo']] \
+            .sort_values(['registros', 'ID_PRODUTO'], ascending=[False, True]).reset_index(drop=True)
+
+    def promocao(self, inicio=None, fim=None, produtos=None) -> pd.DataFrame:
+        """
+        Registros com/sem promoção e consumo diário médio em cada caso por
+        produto (consumo entre leituras consecutivas sem reposição, como em
+        ModelPredictor.from_history); efeito = consumo com / sem promoção
+        """
+        table = self.scan('historico', ['ID_PRODUTO', 'DIA', 'FLAG_PROMOCAO', 'QUANTIDADE_ESTOQUE'],
+                          inicio, fim, produtos)
+        produto = table.column('ID_PRODUTO').to_numpy(zero_copy_only=False).astype(np.int64)
+        days = table.column('DIA').to_numpy(zero_copy_only=False).astype('datetime64[D]').astype(np.int64)
+        promo = table.column('FLAG_PROMOCAO').to_numpy(zero_copy_only=False).astype(np.int64) >= 1
+        stock = table.column('QUANTIDADE_ESTOQUE').to_numpy(zero_copy_only=False)
+
+        codes, ids = pd.factorize(produto, sort=True)
+        n = len(ids)
+        # Histórico consolidado e cache já vêm em ordem de dia dentro de cada produto:
+        # basta um argsort estável pelo produto; senão, ordena por (produto, dia)
+        order = np.argsort(codes, kind='stable')
+        sorted_codes, sorted_days = codes[order], days[order]
+        same = sorted_codes[1:] == sorted_codes[:-1]
+        day_diff = np.diff(sorted_days)
+        if (day_diff[same] < 0).any():
+            order = np.lexsort((days, codes))
+            sorted_codes, sorted_days = codes[order], days[order]
+            day_diff = np.diff(sorted_days)
+        stock_diff = np.diff(stock[order])
+        transitions = np.flatnonzero(same & (day_diff > 0) & (stock_diff <= 0))
+        consumo = -stock_diff[transitions].astype(float) / day_diff[transitions]
+        t_codes, t_promo = sorted_codes[transitions + 1], promo[order[transitions + 1]]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            com = np.bincount(t_codes[t_promo], consumo[t_promo], n) / np.bincount(t_codes[t_promo], minlength=n)
+            sem = np.bincount(t_codes[~t_promo], consumo[~t_promo], n) / np.bincount(t_codes[~t_promo], minlength=n)
+            efeito = com / sem
+        registros = np.bincount(codes, minlength=n)
+        com_promocao = np.bincount(codes, promo, n).astype(np.int64)
+        return pd.DataFrame({
+            'ID_PRODUTO': ids,
+            'registros': registros,
+            'com_promocao': com_promocao,
+            'sem_promocao': registros - com_promocao,
+            'percentual_promocao': np.round(com_promocao / np.maximum(registros, 1) * 100, 2),
+            'consumo_sem_promocao': np.round(sem, 3),
+            'consumo_com_promocao': np.round(com, 3),
+            'efeito_promocao': np.round(np.where(np.isfinite(efeito), efeito, np.nan), 3)
+        })
+
+    def _forecast_levels(self, table: pa.Table) -> np.ndarray:
+        """Nível de alerta das previsões (calculado pelas faixas se a coluna não existir)"""
+        if 'NIVEL_ALERTA' in table.column_names:
+            return table.column('NIVEL_ALERTA').to_numpy(zero_copy_only=False)
+        estoque = table.column('PREVISAO_ESTOQUE').to_numpy(zero_copy_only=False).astype(float)
+        return np.select([estoque <= ALERT_THRESHOLDS['critico'], estoque <= ALERT_THRESHOLDS['alerta']],
+                         ['CRITICO', 'ALERTA'], default='NORMAL')
+
+    def alertas(self, inicio=None, fim=None, produtos=None) -> pd.DataFrame:
+        """Previsões por dia e nível (criticos/alerta/normal de get_alerts_summary)"""
+        names = self.dataset('previsoes', inicio, fim).schema.names
+        columns = ['DIA'] + [c for c in ('NIVEL_ALERTA', 'PREVISAO_ESTOQUE') if c in names][:1]
+        table = self.scan('previsoes', columns, inicio, fim, produtos)
+        levels = self._forecast_levels(table)
+        days = table.column('DIA').to_numpy(zero_copy_only=False).astype('datetime64[D]')
+        day_codes, day_values = pd.factorize(days, sort=True)
+        result = pd.DataFrame({'DIA': pd.DatetimeIndex(day_values)})
+        result['total_produtos'] = np.bincount(day_codes, minlength=len(day_values))
+        for level, column in (('CRITICO', 'criticos'), ('ALERTA', 'alerta'), ('NORMAL', 'normal')):
+            mask = levels == level
+            result[column] = np.bincount(day_codes[mask], minlength=len(day_values))
+        return result
+
+    def ruptura(self, inicio=None, fim=None, produtos=None, dias: float = 7) -> pd.DataFrame:
+        """Produtos com prioridade de alerta ou ruptura prevista em até `dias` dias"""
+        if AlertEngine is None:
+            raise ValueError(f"alerting.py não encontrado em {MODEL_DIR}")
+        table = self.scan('previsoes', ['ID_PRODUTO', 'DIA', 'PREVISAO_ESTOQUE'], inicio, fim, produtos)
+        priorities = AlertEngine(urgent_days=dias).evaluate_trajectories(table.to_pandas())
+        return priorities[(priorities['DIAS_ATE_RUPTURA'] <= dias) | (priorities['PRIORIDADE'].between(1, 2))] \
+            .reset_index(drop=True)
+
+    def sql(self, query: str, inicio=None, fim=None, produtos=None) -> pd.DataFrame:
+        """SQL livre (DuckDB) sobre as tabelas historico e previsoes"""
+        if duckdb is None:
+            raise ValueError("Consultas SQL requerem o pacote duckdb (pip install duckdb); "
+                             "as visões predefinidas funcionam sem ele")
+        connection = duckdb.connect()
+        for name, path in self.sources.items():
+            if path:
+                # Dataset pyarrow: o DuckDB empurra projeção e filtros para a leitura
+                connection.register(name, self.dataset(name, inicio, fim))
+        return connection.execute(query).df()
+
+
+VIEWS: Dict[str, Callable] = {
+    'faixas_estoque': QueryEngine.faixas_estoque,
+    'produtos': QueryEngine.produtos,
+    'promocao': QueryEngine.promocao,
+    'alertas': QueryEngine.alertas,
+    'ruptura': QueryEngine.ruptura
+}
+
+
+def write_result(df: pd.DataFrame, output: str):
+    suffix = Path(output).suffix.lower()
+    if suffix == '.parquet':
+        df.to_parquet(output, index=False)
+    elif suffix == '.json':
+        df.to_json(output, orient='records', indent=2, force_ascii=False, date_format='iso')
+    else:
+        df.to_csv(output, index=False, encoding='utf-8-sig')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consultas analíticas sobre histórico e previsões de estoque')
+    parser.add_argument('view', choices=list(VIEWS) + ['sql'], help='Visão predefinida ou sql')
+    parser.add_argument('query', nargs='?', help='Consulta SQL (apenas com a visão sql)')
+    parser.add_argument('--historico', default=os.environ.get('ESTOQUE_HISTORICO'),
+                        help='Histórico: diretório consolidado (aceita @versão), Parquet ou CSV '
+                             '(padrão: $ESTOQUE_HISTORICO)')
+    parser.add_argument('--previsoes', default=str(DEFAULT_FORECASTS),
+                        help='Tabela de previsões no formato de previsoes_estoque.csv')
+    parser.add_argument('--inicio', type=parse_date, help='Data inicial (aaaa-mm-dd ou dd/mm/aaaa)')
+    parser.add_argument('--fim', type=parse_date, help='Data final, inclusive')
+    parser.add_argument('--produtos', type=parse_products, help='IDs de produto separados por vírgula')
+    parser.add_argument('--dias', type=float, default=7, help='Horizonte de ruptura da visão ruptura (padrão: 7)')
+    parser.add_argument('--cache-dir', default=os.environ.get('ESTOQUE_CONSULTA_CACHE'),
+                        help='Cache Parquet das fontes CSV '
+                             '(padrão: $ESTOQUE_CONSULTA_CACHE ou diretório temporário)')
+    parser.add_argument('--limit', type=int, default=50, help='Linhas exibidas (padrão: 50)')
+    parser.add_argument('--output', '-o', help='Salva o resultado (.csv, .json ou .parquet)')
+    args = parser.parse_args()
+
+    engine = QueryEngine(args.historico, args.previsoes, args.cache_dir)
+    filters = {'inicio': args.inicio, 'fim': args.fim, 'produtos': args.produtos}
+    try:
+        start = time.perf_counter()
+        with span(f'consulta.{args.view}'):
+            if args.view == 'sql':
+                if not args.query:
+                    parser.error('a visão sql requer a consulta')
+                result = engine.sql(args.query, **filters)
+            elif args.view == 'ruptura':
+                result = engine.ruptura(dias=args.dias, **filters)
+            else:
+                result = VIEWS[args.view](engine, **filters)
+        elapsed = time.perf_counter() - start
+    except (ValueError, FileNotFoundError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    if args.output:
+        write_result(result, args.output)
+        print(f"💾 {len(result):,} linhas salvas em {args.output}")
+    else:
+        with pd.option_context('display.width', 160, 'display.max_columns', 20):
+            print(result.head(args.limit).to_string(index=False))
+        if len(result) > args.limit:
+            print(f"... e mais {len(result) - args.limit:,} linhas")
+    print(f"⏱️  {args.view}: {len(result):,} linhas em {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,26 +8,52 @@ Conversões suportadas:
 - Parquet para CSV/JSON
 - Normalização de datas
 - Conversão de codificação
+- Mapeamento de outros layouts (ex.: vendas_historicas) para o canônico
+- Amostragem em uma passagem (reservatório, estratificada ou por produto)
+- Leitura de snapshots e upsert no histórico consolidado (consolidar_historico.py)
 """
+from __future__ import annotations
 
-import pandas as pd
 import argparse
 import json
 import os
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from importacao_tardia import lazy_import
+from instrumentacao import TRACER, span
+from mapear_layout import DEFAULT_PRODUCT_MAP, LayoutMapper, ProductCodeMap
+from amostragem import SAMPLE_MODES, ReservoirSampler, read_chunks
+from consolidar_historico import STORE_FORMAT, HistoryStore, is_store, split_snapshot
+
+pd = lazy_import('pandas')
+
 class DataConverter:
     """Classe principal para conversão de formatos de dados"""
     
-    def __init__(self):
+    def __init__(self, product_map_path=None):
         self.supported_formats = ['csv', 'json', 'parquet', 'xlsx']
         self.date_formats = ['%d/%m/%Y', '%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y']
+        self.stage_times = {}
+        # Códigos de produto de outros layouts -> ids inteiros (dicionário persistido)
+        self.layout_mapper = LayoutMapper(ProductCodeMap(product_map_path))
+    
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Cronometra uma etapa (tempo acumulado em stage_times e span de instrumentação)"""
+        start = time.perf_counter()
+        with span(f'converter.{name}', rows=rows) as current:
+            yield current
+        self.stage_times[name] = self.stage_times.get(name, 0.0) + time.perf_counter() - start
     
     def detect_format(self, file_path):
         """Detecta o formato do arquivo baseado na extensão"""
+        if is_store(file_path):
+            return STORE_FORMAT
         ext = Path(file_path).suffix.lower().replace('.', '')
         if ext in self.supported_formats:
             return ext
@@ -62,7 +88,7 @@ class DataConverter:
         if 'FLAG_PROMOCAO' in df.columns:
             df['FLAG_PROMOCAO'] = pd.to_numeric(df['FLAG_PROMOCAO'], errors='coerce').fillna(0).astype(int)
             # Garante que seja 0 ou 1
-            df['FLAG_PROMOCAO'] = df['FLAG_PROMOCAO'].apply(lambda x: 1 if x >= 1 else 0)
+            df['FLAG_PROMOCAO'] = (df['FLAG_PROMOCAO'] >= 1).astype(int)
         
         if 'QUANTIDADE_ESTOQUE' in df.columns:
             df['QUANTIDADE_ESTOQUE'] = pd.to_numeric(df['QUANTIDADE_ESTOQUE'], errors='coerce').fillna(0).astype(int)
@@ -79,30 +105,53 @@ class DataConverter:
         print(f"Lendo arquivo: {input_path} ({input_format.upper()})")
         
         try:
-            if input_format == 'csv':
-                df = pd.read_csv(input_path, encoding='utf-8-sig')
-            elif input_format == 'json':
-                df = pd.read_json(input_path)
-            elif input_format == 'parquet':
-                df = pd.read_parquet(input_path)
-            elif input_format == 'xlsx':
-                df = pd.read_excel(input_path)
-            else:
-                raise ValueError(f"Formato não suportado: {input_format}")
+            with self.stage('leitura') as read_span:
+                if input_format == 'csv':
+                    df = pd.read_csv(input_path, encoding='utf-8-sig')
+                elif input_format == 'json':
+                    df = pd.read_json(input_path)
+                elif input_format == 'parquet':
+                    df = pd.read_parquet(input_path)
+                elif input_format == 'xlsx':
+                    df = pd.read_excel(input_path)
+                elif input_format == STORE_FORMAT:
+                    # Snapshot consistente (ativo ou historico@versão)
+                    root, version = split_snapshot(input_path)
+                    store = HistoryStore(root)
+                    version = store.snapshot(version)['versao']
+                    df = store.read(version)
+                    print(f"  Snapshot: {version}")
+                else:
+                    raise ValueError(f"Formato não suportado: {input_format}")
+                read_span.rows = len(df)
             
             print(f"  Registros lidos: {len(df):,}")
             print(f"  Colunas: {list(df.columns)}")
             
-            # Aplica validações e normalizações
-            df = self.normalize_dates(df)
-            df = self.validate_data(df)
-            
-            return df
+            return self.prepare(df)
             
         except Exception as e:
             print(f"Erro ao ler arquivo {input_path}: {str(e)}")
             raise
     
+    def prepare(self, df):
+        """Mapeamento de layout, normalização de datas e validações básicas"""
+        # Layout diferente do canônico: colunas mapeadas antes das validações
+        with self.stage('map_layout', rows=len(df)):
+            df, layout = self.layout_mapper.normalize(df)
+            self.layout_mapper.product_map.save()
+        if layout not in (None, 'canonico'):
+            print(f"  Layout {layout} mapeado para o canônico "
+                  f"({len(self.layout_mapper.product_map.codes)} códigos de produto)")
+        
+        # Aplica validações e normalizações
+        with self.stage('normalize_dates', rows=len(df)):
+            df = self.normalize_dates(df)
+        with self.stage('validate_data', rows=len(df)):
+            df = self.validate_data(df)
+        
+        return df
+    
     def write_file(self, df, output_path, output_format=None):
         """Escreve arquivo no formato especificado"""
         if not output_format:
@@ -115,19 +164,28 @@ class DataConverter:
         print(f"Escrevendo arquivo: {output_path} ({output_format.upper()})")
         
         try:
-            if output_format == 'csv':
-                df.to_csv(output_path, index=False, encoding='utf-8-sig')
-            elif output_format == 'json':
-                df.to_json(output_path, orient='records', indent=2, force_ascii=False)
-            elif output_format == 'parquet':
-                df.to_parquet(output_path, index=False)
-            elif output_format == 'xlsx':
-                df.to_excel(output_path, index=False)
-            else:
-                raise ValueError(f"Formato de saída não suportado: {output_format}")
+            with self.stage('escrita', rows=len(df)):
+                if output_format == 'csv':
+                    df.to_csv(output_path, index=False, encoding='utf-8-sig')
+                elif output_format == 'json':
+                    df.to_json(output_path, orient='records', indent=2, force_ascii=False)
+                elif output_format == 'parquet':
+                    df.to_parquet(output_path, index=False)
+                elif output_format == 'xlsx':
+                    df.to_excel(output_path, index=False)
+                elif output_format == STORE_FORMAT:
+                    # Upsert por ID_PRODUTO/DIA: reescreve só as partições afetadas
+                    store = HistoryStore(output_path, self.layout_mapper.product_map)
+                    manifest = store.upsert(df)
+                    load = manifest['carga']
+                    print(f"  Snapshot {manifest['versao']}: {load['inseridos']:,} inseridos, "
+                          f"{load['atualizados']:,} atualizados")
+                else:
+                    raise ValueError(f"Formato de saída não suportado: {output_format}")
             
-            file_size = os.path.getsize(output_path) / 1024  # KB
-            print(f"  Arquivo criado: {file_size:.2f} KB")
+            if output_format != STORE_FORMAT:
+                file_size = os.path.getsize(output_path) / 1024  # KB
+                print(f"  Arquivo criado: {file_size:.2f} KB")
             print(f"  Registros escritos: {len(df):,}")
             
         except Exception as e:
@@ -152,8 +210,11 @@ class DataConverter:
         print(f"{'='*60}")
         
         # Executa conversão
-        df = self.read_file(input_path, input_format)
-        self.write_file(df, output_path, output_format)
+        self.stage_times = {}
+        with span('converter.convert', entrada=input_format, saida=output_format) as convert_span:
+            df = self.read_file(input_path, input_format)
+            self.write_file(df, output_path, output_format)
+            convert_span.rows = len(df)
         
         # Estatísticas
         end_time = datetime.now()
@@ -162,6 +223,8 @@ class DataConverter:
         print(f"\n{'='*60}")
         print("ESTATÍSTICAS DA CONVERSÃO:")
         print(f"  Tempo de processamento: {processing_time:.2f} segundos")
+        for stage_name, seconds in self.stage_times.items():
+            print(f"    {stage_name}: {seconds:.3f} s ({len(df) / seconds if seconds > 0 else 0:,.0f} registros/s)")
         print(f"  Registros convertidos: {len(df):,}")
         print(f"  Colunas: {len(df.columns)}")
         
@@ -187,20 +250,39 @@ class DataConverter:
                 except Exception as e:
                     print(f"Erro ao converter {input_file}: {str(e)}")
     
-    def create_sample(self, input_path, output_path, sample_size=100, random_state=42):
-        """Cria uma amostra do dataset"""
-        df = self.read_file(input_path)
+    def create_sample(self, input_path, output_path, sample_size=100, random_state=42,
+                      mode='aleatoria', input_format=None, chunksize=100_000):
+        """
+        Cria uma amostra do dataset em uma única passagem pelo arquivo
         
-        if len(df) > sample_size:
-            df_sample = df.sample(n=sample_size, random_state=random_state).sort_index()
+        A leitura é feita em blocos e só as candidatas à amostra ficam em
+        memória; o mapeamento de layout e as validações rodam apenas sobre a
+        amostra. Modos em amostragem.SAMPLE_MODES (no modo 'historico',
+        sample_size é o número de produtos).
+        """
+        if not input_format:
+            input_format = self.detect_format(input_path)
+        
+        print(f"Amostrando arquivo: {input_path} ({input_format.upper()}), modo {mode}")
+        sampler = ReservoirSampler(sample_size, mode=mode, random_state=random_state)
+        with self.stage('amostragem') as sample_span:
+            for chunk in read_chunks(input_path, input_format, chunksize):
+                sampler.add(chunk)
+            df_sample = sampler.result()
+            sample_span.rows = sampler.rows_seen
+        
+        print(f"  Registros lidos: {sampler.rows_seen:,}")
+        unit = 'produtos' if mode == 'historico' else 'registros'
+        if len(df_sample) == sampler.rows_seen:
+            print(f"Dataset menor que amostra solicitada. Usando todos os {sampler.rows_seen} registros.")
         else:
-            df_sample = df.copy()
-            print(f"Dataset menor que amostra solicitada. Usando todos os {len(df)} registros.")
+            print(f"  Amostra: {len(df_sample):,} registros ({sample_size} {unit} solicitados)")
         
+        df_sample = self.prepare(df_sample)
         self.write_file(df_sample, output_path)
         return df_sample
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description='Conversor de Formatos de Dados')
     
     # Argumentos principais
@@ -208,10 +290,12 @@ def main():
     parser.add_argument('output', help='Arquivo de saída ou diretório para batch')
     
     # Opções de formato
-    parser.add_argument('--input-format', choices=['csv', 'json', 'parquet', 'xlsx'],
-                       help='Formato do arquivo de entrada (autodetectado se não especificado)')
-    parser.add_argument('--output-format', choices=['csv', 'json', 'parquet', 'xlsx'],
-                       help='Formato do arquivo de saída (autodetectado se não especificado)')
+    parser.add_argument('--input-format', choices=['csv', 'json', 'parquet', 'xlsx', STORE_FORMAT],
+                       help='Formato do arquivo de entrada (autodetectado se não especificado; '
+                            'historico: diretório do histórico consolidado, aceita @versão)')
+    parser.add_argument('--output-format', choices=['csv', 'json', 'parquet', 'xlsx', STORE_FORMAT],
+                       help='Formato do arquivo de saída (autodetectado se não especificado; '
+                            'historico: upsert no histórico consolidado)')
     
     # Opções de processamento
     parser.add_argument('--batch', action='store_true',
@@ -220,6 +304,9 @@ def main():
                        help='Cria amostra com N registros')
     parser.add_argument('--sample-seed', type=int, default=42,
                        help='Seed para amostragem aleatória (padrão: 42)')
+    parser.add_argument('--sample-mode', choices=list(SAMPLE_MODES), default='aleatoria',
+                       help='aleatoria (reservatório), estratificada por produto/dia/promocao, '
+                            'ou historico (N produtos com o histórico completo)')
     
     # Opções de validação
     parser.add_argument('--validate-only', action='store_true',
@@ -227,8 +314,24 @@ def main():
     parser.add_argument('--stats', action='store_true',
                        help='Mostra estatísticas detalhadas')
     
-    args = parser.parse_args()
-    converter = DataConverter()
+    # Mapeamento de layout
+    parser.add_argument('--product-map',
+                       default=os.environ.get('ESTOQUE_DICIONARIO_PRODUTOS', str(DEFAULT_PRODUCT_MAP)),
+                       help='Dicionário de códigos de produto para layouts com códigos texto '
+                            '(padrão: $ESTOQUE_DICIONARIO_PRODUTOS ou 01-Dados/dicionario_produtos.json)')
+    
+    # Opções de instrumentação
+    parser.add_argument('--trace',
+                       help='Exporta spans de desempenho (.trace.json = Chrome Trace, senão JSON)')
+    parser.add_argument('--profile-dir',
+                       help='Salva perfis cProfile (.prof) por etapa neste diretório')
+    
+    args = parser.parse_args(argv)
+    if args.trace:
+        TRACER.export_at_exit(args.trace)
+    if args.profile_dir:
+        TRACER.enable(profile_dir=args.profile_dir)
+    converter = DataConverter(product_map_path=args.product_map)
     
     try:
         if args.validate_only:
@@ -250,7 +353,9 @@ def main():
                 args.input, 
                 args.output, 
                 sample_size=args.sample,
-                random_state=args.sample_seed
+                random_state=args.sample_seed,
+                mode=args.sample_mode,
+                input_format=args.input_format
             )
             if args.stats:
                 print(df_sample.describe().to_string())
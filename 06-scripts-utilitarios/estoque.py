@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+CLI única dos utilitários de estoque
+
+Subcomandos (aliases em inglês entre parênteses):
+- gerar (generate): histórico sintético (gerar_dataset.py)
+- converter (convert): conversão, mapeamento de layout e amostragem (converter_formato.py)
+- validar (validate): validação com cache de relatórios (validar_dados.py)
+- prever (predict): previsões em lote pelo endpoint (exemplos/python_client.py)
+- servir (serve): servidor local de inferência (local_server.py)
+- medir (bench): benchmarks (medir_desempenho.py)
+- daemon: processo residente (start, stop, status)
+
+Partida rápida: este módulo só importa a biblioteca padrão e cada subcomando
+importa o seu módulo na hora; pandas, numpy e pyarrow são importados de forma
+tardia (importacao_tardia.py), só nos caminhos que os usam. --help, gerar e
+validar com relatório em cache não carregam pandas.
+
+Modo daemon: `daemon start` deixa um processo com pandas, numpy, pyarrow e os
+utilitários já importados, escutando num socket Unix. Com --daemon (ou
+ESTOQUE_CLI_DAEMON=1) cada chamada envia argumentos, diretório e ambiente ao
+daemon, que a executa num fork do processo quente (isolado e em paralelo) e
+devolve stdout, stderr e o código de saída. Sem daemon no ar, o comando roda
+localmente. Reinicie o daemon após atualizar o código dos utilitários.
+
+Uso:
+    python estoque.py validar dados.csv --cache-dir .cache
+    python estoque.py daemon start
+    ESTOQUE_CLI_DAEMON=1 python estoque.py converter dados.csv dados.parquet
+    python estoque.py daemon stop
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+# os.path em vez de pathlib: cada importação conta na partida
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(os.path.dirname(SCRIPTS_DIR), '02-sagemaker-canvas', 'modelo_previsao_vendas')
+for extra_path in (SCRIPTS_DIR, MODEL_DIR, os.path.join(MODEL_DIR, 'exemplos')):
+    if extra_path not in sys.path:
+        sys.path.insert(0, extra_path)
+
+PROG = 'estoque.py'
+
+# Subcomando -> (alias, módulo com main(argv); None = prever, definido aqui, descrição)
+COMMANDS = {
+    'gerar': ('generate', 'gerar_dataset', 'Gera o histórico sintético de vendas e estoque'),
+    'converter': ('convert', 'converter_formato', 'Converte formatos, mapeia layouts e amostra'),
+    'validar': ('validate', 'validar_dados', 'Valida um arquivo de dados (com cache de relatórios)'),
+    'prever': ('predict', None, 'Previsões em lote pelo endpoint (SageMaker ou local_server.py)'),
+    'servir': ('serve', 'local_server', 'Servidor local de inferência (contrato SageMaker)'),
+    'medir': ('bench', 'medir_desempenho', 'Benchmarks dos utilitários e da inferência')
+}
+ALIASES = {alias: name for name, (alias, _, _) in COMMANDS.items()}
+# Nunca encaminhados ao daemon: processos longos ou de controle
+LOCAL_ONLY = {'servir', 'daemon'}
+
+# Importados pelo daemon antes de atender (herdados pelos forks)
+WARM_MODULES = ('numpy', 'pandas', 'pyarrow', 'pyarrow.parquet', 'gerar_dataset', 'converter_formato',
+                'validar_dados', 'medir_desempenho', 'model_predictor', 'python_client')
+
+DEFAULT_SOCKET = os.environ.get('ESTOQUE_CLI_SOCKET') or os.path.join(
+    os.environ.get('XDG_RUNTIME_DIR') or '/tmp', f"estoque-cli-{os.getuid() if hasattr(os, 'getuid') else 0}.sock")
+
+
+def run_command(name: str, argv: list) -> int:
+    """Executa o subcomando no processo atual (código de saída)"""
+    name = ALIASES.get(name, name)
+    sys.argv = [f"{PROG} {name}"] + list(argv)
+    try:
+        module = COMMANDS[name][1]
+        code = predict_main(argv) if module is None else importlib.import_module(module).main(argv)
+    except SystemExit as e:
+        # argparse (--help, erro de uso) e sys.exit dentro dos utilitários
+        if isinstance(e.code, str):
+            print(e.code, file=sys.stderr)
+            return 1
+        code = e.code
+    return code or 0
+
+
+def predict_main(argv=None):
+    parser = argparse.ArgumentParser(description='Previsões em lote pelo endpoint do modelo')
+    parser.add_argument('input', help='CSV/JSON/Parquet com ID_PRODUTO, FLAG_PROMOCAO e QUANTIDADE_ESTOQUE '
+                                      '(ou outro layout mapeável)')
+    parser.add_argument('--output', '-o', help='Arquivo com as previsões (CSV, JSON ou Parquet)')
+    parser.add_argument('--endpoint-url', default=os.environ.get('ESTOQUE_ENDPOINT_URL'),
+                        help='Endpoint compatível, ex.: http://127.0.0.1:8080 (padrão: $ESTOQUE_ENDPOINT_URL)')
+    parser.add_argument('--endpoint-name', help='Endpoint SageMaker (sem --endpoint-url)')
+    parser.add_argument('--payload-format', choices=['csv', 'npy', 'arrow'],
+                        help='Formato dos lotes (padrão: $ESTOQUE_PAYLOAD_FORMAT ou csv)')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Registros por requisição (padrão: 100000)')
+    args = parser.parse_args(argv)
+
+    try:
+        from converter_formato import DataConverter
+        from python_client import EstoquePredictionClient
+
+        converter = DataConverter()
+        df = converter.read_file(args.input)
+        client = EstoquePredictionClient(endpoint_name=args.endpoint_name, endpoint_url=args.endpoint_url,
+                                         payload_format=args.payload_format)
+        start = time.perf_counter()
+        predictions = client.predict_frame(df, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - start
+        keys = [col for col in ('ID_PRODUTO', 'DIA', 'REGIAO') if col in df.columns]
+        result = df[keys].join(predictions)
+
+        levels = result['level'].value_counts()
+        print(f"\n📈 {len(result):,} previsões em {elapsed:.2f}s "
+              f"({len(result) / elapsed if elapsed > 0 else 0:,.0f} registros/s)")
+        print(f"   🚨 Críticos: {levels.get('CRITICO', 0):,} | ⚠️  Alerta: {levels.get('ALERTA', 0):,} | "
+              f"✅ Normal: {levels.get('NORMAL', 0):,}")
+        if args.output:
+            converter.write_file(result, args.output)
+    except Exception as e:
+        print(f"\n❌ Erro: {str(e)}")
+        return 1
+    return 0
+
+
+class DaemonUnavailable(OSError):
+    """Nenhum daemon escutando no socket"""
+
+
+def _connect(socket_path: str, timeout: float = None):
+    import socket
+
+    if not hasattr(socket, 'AF_UNIX'):
+        raise DaemonUnavailable('Sockets Unix indisponíveis nesta plataforma')
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        sock.close()
+        raise DaemonUnavailable(str(e))
+    return sock
+
+
+def _request(socket_path: str, message: dict, timeout: float = None):
+    """Envia uma mensagem ao daemon e itera sobre os quadros da resposta"""
+    with _connect(socket_path, timeout) as sock:
+        sock.sendall(json.dumps(message).encode() + b'\n')
+        with sock.makefile('r', encoding='utf-8') as reader:
+            for line in reader:
+                yield json.loads(line)
+
+
+def call_daemon(socket_path: str, name: str, argv: list) -> int:
+    """Executa o subcomando no daemon (levanta DaemonUnavailable se não houver daemon)"""
+    message = {'comando': name, 'args': list(argv), 'cwd': os.getcwd(), 'env': dict(os.environ)}
+    streams = {1: sys.stdout, 2: sys.stderr}
+    for frame in _request(socket_path, message):
+        if 'exit' in frame:
+            return frame['exit']
+        streams[frame['fd']].write(frame['data'])
+        streams[frame['fd']].flush()
+    print('❌ Daemon encerrou a conexão sem código de saída', file=sys.stderr)
+    return 1
+
+
+def daemon_main(argv=None):
+    parser = argparse.ArgumentParser(prog=f"{PROG} daemon", description='Processo residente da CLI')
+    parser.add_argument('acao', choices=['start', 'stop', 'status'])
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help=f"Socket Unix (padrão: {DEFAULT_SOCKET})")
+    parser.add_argument('--foreground', action='store_true', help='start: não se desliga do terminal')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.acao == 'status':
+            try:
+                status = next(_request(args.socket, {'status': True}, timeout=5))
+            except DaemonUnavailable:
+                print(f"⚪ Nenhum daemon em {args.socket}")
+                return 1
+            print(f"🟢 Daemon pid {status['pid']} em {args.socket} (no ar há {status['uptime']:.0f}s)")
+            print(f"   Módulos carregados: {', '.join(status['modulos'])}")
+            return 0
+
+        if args.acao == 'stop':
+            try:
+                list(_request(args.socket, {'stop': True}, timeout=5))
+            except DaemonUnavailable:
+                print(f"⚪ Nenhum daemon em {args.socket}")
+                return 1
+            print("🛑 Daemon encerrado")
+            return 0
+
+        try:
+            _connect(args.socket, timeout=1).close()
+            print(f"⚠️  Já existe um daemon em {args.socket}")
+            return 1
+        except DaemonUnavailable:
+            pass
+        if args.foreground:
+            return serve_forever(args.socket)
+        return start_detached(args.socket)
+    except Exception as e:
+        print(f"\n❌ Erro: {str(e)}")
+        return 1
+
+
+def start_detached(socket_path: str, wait: float = 30.0) -> int:
+    """Inicia o daemon em segundo plano (fork duplo) e espera o socket responder"""
+    pid = os.fork()
+    if pid == 0:
+        os.setsid()
+        if os.fork() != 0:
+            os._exit(0)
+        log = os.open(f"{socket_path}.log", os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(log, 1)
+        os.dup2(log, 2)
+        os._exit(serve_forever(socket_path))
+    os.waitpid(pid, 0)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        try:
+            status = next(_request(socket_path, {'status': True}, timeout=5))
+            print(f"🟢 Daemon pid {status['pid']} em {socket_path} "
+                  f"({len(status['modulos'])} módulos pré-carregados)")
+            return 0
+        except DaemonUnavailable:
+            time.sleep(0.05)
+    print(f"❌ Daemon não respondeu em {wait:.0f}s (log: {socket_path}.log)")
+    return 1
+
+
+def serve_forever(socket_path: str) -> int:
+    """Daemon: pré-carrega os módulos e atende cada chamada num fork do processo quente"""
+    import atexit
+    import contextlib
+    import io
+    import signal
+    import socketserver
+
+    started = time.time()
+    loaded = []
+    for module in WARM_MODULES:
+        try:
+            importlib.import_module(module)
+            loaded.append(module)
+        except ImportError:
+            pass
+
+    class FrameWriter(io.TextIOBase):
+        """stdout/stderr do subcomando como quadros JSON para o cliente"""
+        encoding = 'utf-8'
+
+        def __init__(self, wfile, fd: int):
+            super().__init__()
+            self.wfile = wfile
+            self.fd = fd
+
+        def writable(self) -> bool:
+            return True
+
+        def write(self, data: str) -> int:
+            if data:
+                self.wfile.write(json.dumps({'fd': self.fd, 'data': data}).encode() + b'\n')
+            return len(data)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def reply(self, frame: dict):
+            self.wfile.write(json.dumps(frame).encode() + b'\n')
+
+        def handle(self):
+            message = json.loads(self.rfile.readline())
+            if message.get('status'):
+                self.reply({'pid': os.getppid(), 'uptime': time.time() - started, 'modulos': loaded})
+                return
+            if message.get('stop'):
+                os.kill(os.getppid(), signal.SIGTERM)
+                self.reply({'exit': 0})
+                return
+
+            # Fork isolado: diretório, ambiente e estado dos módulos não vazam para o daemon
+            os.chdir(message['cwd'])
+            os.environ.clear()
+            os.environ.update(message['env'])
+            # O fork termina com os._exit: funções atexit do subcomando (ex.: --trace) rodam aqui
+            atexit._clear()
+            with contextlib.redirect_stdout(FrameWriter(self.wfile, 1)), \
+                    contextlib.redirect_stderr(FrameWriter(self.wfile, 2)):
+                try:
+                    code = run_command(message['comando'], message['args'])
+                except Exception as e:
+                    print(f"\n❌ Erro: {str(e)}")
+                    code = 1
+                atexit._run_exitfuncs()
+            self.reply({'exit': code})
+
+    class Server(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+        pass
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = Server(socket_path, Handler)
+    os.chmod(socket_path, 0o600)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"🟢 Daemon pid {os.getpid()} em {socket_path} ({time.time() - started:.1f}s para pré-carregar "
+          f"{len(loaded)} módulos)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+    return 0
+
+
+def main(argv=None):
+    commands = '\n'.join(f"  {name:<10} ({alias}) {description}"
+                         for name, (alias, _, description) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog=PROG, description='CLI única dos utilitários de estoque',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"subcomandos:\n{commands}\n  {'daemon':<10} start | stop | status\n\n"
+               f"Ajuda de cada subcomando: {PROG} <subcomando> --help")
+    parser.add_argument('--daemon', action='store_true',
+                        default=os.environ.get('ESTOQUE_CLI_DAEMON', '').lower() in ('1', 'true', 'sim'),
+                        help='Executa no daemon, se estiver no ar (padrão: $ESTOQUE_CLI_DAEMON)')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Socket Unix do daemon')
+    parser.add_argument('comando', choices=list(COMMANDS) + list(ALIASES) + ['daemon'], metavar='subcomando')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='Argumentos do subcomando')
+    args = parser.parse_args(argv)
+
+    name = ALIASES.get(args.comando, args.comando)
+    if name == 'daemon':
+        return daemon_main(args.args + (['--socket', args.socket] if '--socket' not in args.args else []))
+    if args.daemon and name not in LOCAL_ONLY:
+        try:
+            return call_daemon(args.socket, name, args.args)
+        except DaemonUnavailable:
+            pass
+    return run_command(name, args.args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
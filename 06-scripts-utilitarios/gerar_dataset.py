@@ -1,75 +1,113 @@
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+#!/usr/bin/env python3
+"""
+Gerador do dataset sintético de histórico de vendas e estoque
+
+Só usa a biblioteca padrão (random + csv): roda sem carregar pandas/numpy e
+gera o mesmo arquivo, byte a byte, para a mesma semente.
+
+Uso:
+    python gerar_dataset.py
+    python gerar_dataset.py --registros 5000 --dias 200 --output historico.csv
+"""
+import argparse
+import csv
 import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+COLUMNS = ['ID', 'ID_PRODUTO', 'DIA', 'FLAG_PROMOCAO', 'QUANTIDADE_ESTOQUE']
+
+
+def generate_records(num_registros: int = 500, num_produtos: int = 50, dias_periodo: int = 20,
+                    produtos_por_dia: int = 25, seed: int = 42,
+                    data_inicio: datetime = datetime(2023, 12, 31)) -> List[Dict]:
+    """Registros diários de estoque com vendas maiores em promoção"""
+    random.seed(seed)
+
+    # Datas
+    datas = [data_inicio + timedelta(days=i) for i in range(dias_periodo)]
+
+    # IDs dos produtos
+    ids_produtos = list(range(1001, 1001 + num_produtos))
+
+    # Estoque inicial
+    estoque_inicial = {pid: random.randint(100, 300) for pid in ids_produtos}
+
+    # Coletar dados
+    dados = []
+    contador_id = 1
+
+    for dia_idx, data_atual in enumerate(datas):
+        produtos_do_dia = random.sample(ids_produtos, produtos_por_dia)
+
+        for produto_id in produtos_do_dia:
+            flag_promocao = random.random() < 0.3
+
+            if produto_id in estoque_inicial:
+                estoque_atual = estoque_inicial[produto_id]
 
-# Configuração
-np.random.seed(42)
-random.seed(42)
-
-num_registros = 500
-num_produtos = 50
-dias_periodo = 20
-produtos_por_dia = 25
-
-# Datas
-data_inicio = datetime(2023, 12, 31)
-datas = [data_inicio + timedelta(days=i) for i in range(dias_periodo)]
-
-# IDs dos produtos
-ids_produtos = list(range(1001, 1001 + num_produtos))
-
-# Estoque inicial
-estoque_inicial = {pid: random.randint(100, 300) for pid in ids_produtos}
-
-# Coletar dados
-dados = []
-contador_id = 1
-
-for dia_idx, data_atual in enumerate(datas):
-    produtos_do_dia = random.sample(ids_produtos, produtos_por_dia)
-    
-    for produto_id in produtos_do_dia:
-        flag_promocao = random.random() < 0.3
-        
-        if produto_id in estoque_inicial:
-            estoque_atual = estoque_inicial[produto_id]
-            
-            if estoque_atual > 0:
-                if flag_promocao:
-                    vendas = random.randint(15, 30)
+                if estoque_atual > 0:
+                    if flag_promocao:
+                        vendas = random.randint(15, 30)
+                    else:
+                        vendas = random.randint(5, 20)
+
+                    vendas = min(vendas, estoque_atual)
+                    novo_estoque = max(0, estoque_atual - vendas)
+                    estoque_inicial[produto_id] = novo_estoque
                 else:
-                    vendas = random.randint(5, 20)
-                
-                vendas = min(vendas, estoque_atual)
-                novo_estoque = max(0, estoque_atual - vendas)
-                estoque_inicial[produto_id] = novo_estoque
+                    novo_estoque = 0
             else:
                 novo_estoque = 0
-        else:
-            novo_estoque = 0
-        
-        dados.append({
-            'ID': contador_id,
-            'ID_PRODUTO': produto_id,
-            'DIA': data_atual.strftime('%d/%m/%Y'),
-            'FLAG_PROMOCAO': 1 if flag_promocao else 0,
-            'QUANTIDADE_ESTOQUE': novo_estoque
-        })
-        
-        contador_id += 1
-        
+
+            dados.append({
+                'ID': contador_id,
+                'ID_PRODUTO': produto_id,
+                'DIA': data_atual.strftime('%d/%m/%Y'),
+                'FLAG_PROMOCAO': 1 if flag_promocao else 0,
+                'QUANTIDADE_ESTOQUE': novo_estoque
+            })
+
+            contador_id += 1
+
+            if len(dados) >= num_registros:
+                break
+
         if len(dados) >= num_registros:
             break
-    
-    if len(dados) >= num_registros:
-        break
-
-# Criar DataFrame
-df = pd.DataFrame(dados)
-df = df.head(500)
-
-# Salvar
-df.to_csv('historico_vendas_estoque.csv', index=False, encoding='utf-8-sig')
-print("Arquivo 'historico_vendas_estoque.csv' criado com sucesso!")
-print(f"Registros: {len(df)}")
+
+    return dados[:num_registros]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera o histórico sintético de vendas e estoque')
+    parser.add_argument('--output', '-o', default='historico_vendas_estoque.csv',
+                        help='Arquivo CSV de saída (padrão: historico_vendas_estoque.csv)')
+    parser.add_argument('--registros', type=int, default=500, help='Número de registros (padrão: 500)')
+    parser.add_argument('--produtos', type=int, default=50, help='Número de produtos (padrão: 50)')
+    parser.add_argument('--dias', type=int, default=20, help='Dias no período (padrão: 20)')
+    parser.add_argument('--produtos-por-dia', type=int, default=25, help='Produtos lidos por dia (padrão: 25)')
+    parser.add_argument('--seed', type=int, default=42, help='Semente (padrão: 42)')
+    args = parser.parse_args(argv)
+
+    try:
+        dados = generate_records(args.registros, args.produtos, args.dias,
+                                min(args.produtos_por_dia, args.produtos), args.seed)
+
+        # Salvar (mesmo formato do to_csv do pandas: BOM, sem índice, \n)
+        with open(args.output, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS, lineterminator='\n')
+            writer.writeheader()
+            writer.writerows(dados)
+
+        print(f"Arquivo '{args.output}' criado com sucesso!")
+        print(f"Registros: {len(dados)}")
+    except Exception as e:
+        print(f"\n❌ Erro: {str(e)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Importação tardia de dependências pesadas (pandas, numpy, pyarrow)
+
+Os utilitários são chamados milhares de vezes por dia pelo orquestrador, muitas
+vezes só para --help, para um relatório em cache ou para gerar um arquivo
+pequeno. Importar pandas/numpy/pyarrow no topo do módulo custa ~1 s a cada
+chamada; com lazy_import o módulo só é carregado no primeiro acesso a um
+atributo (pd.read_csv, np.int64...), ou seja, apenas nos caminhos que usam.
+
+Uso (com `from __future__ import annotations`, para anotações como
+pd.DataFrame não dispararem a importação):
+    from importacao_tardia import lazy_import
+    pd = lazy_import('pandas')
+
+Para conferir o que cada comando importa:
+    python -X importtime estoque.py validar --help 2>&1 | sort -t'|' -k2 -n | tail
+"""
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Substituto de um módulo que o importa no primeiro acesso a atributo
+
+    Após a importação, os atributos do módulo real são copiados para o
+    substituto: acessos seguintes não passam mais por __getattr__.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_target'] = None
+
+    def _load(self) -> types.ModuleType:
+        module = self.__dict__['_lazy_target']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__.update({k: v for k, v in module.__dict__.items() if k != '__name__'})
+            self.__dict__['_lazy_target'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'carregado' if self.__dict__['_lazy_target'] is not None else 'não carregado'
+        return f"<módulo tardio '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Módulo já importado, ou um LazyModule que o importa no primeiro uso"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
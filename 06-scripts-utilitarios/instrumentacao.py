@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Instrumentação de Desempenho dos Utilitários de Estoque
+
+Funcionalidades:
+- Spans (context manager / decorator) com tempo de parede, tempo de CPU,
+  registros processados e pico de memória (RSS)
+- Exportação em JSON ou no formato Chrome Trace (chrome://tracing, Perfetto)
+- Modo cProfile opcional: um arquivo .prof por span de nível superior
+- Ativação sem alterar código, via variáveis de ambiente:
+    ESTOQUE_TRACE=caminho.json         exporta os spans ao final do processo
+    ESTOQUE_TRACE_FORMAT=chrome|json   formato (padrão: chrome se terminar em .trace.json)
+    ESTOQUE_PROFILE=diretorio          salva perfis cProfile por span de nível superior
+
+Os utilitários fora deste diretório (ex.: python_client.py) importam este
+módulo quando ele está no PYTHONPATH e, caso contrário, usam spans vazios.
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memória residente do processo em MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta em KB, macOS em bytes
+    return round(peak / (1024 * 1024) if os.uname().sysname == 'Darwin' else peak / 1024, 2)
+
+
+class Span:
+    """Intervalo medido; `rows` e `attrs` podem ser preenchidos dentro do bloco"""
+
+    __slots__ = ('name', 'rows', 'attrs', 'start_wall', 'start_cpu', 'depth', 'record')
+
+    def __init__(self, name: str, rows: Optional[int] = None, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.rows = rows
+        self.attrs = attrs or {}
+        self.record: Dict[str, Any] = {}
+
+
+class _NullSpan:
+    """Span sem custo usado quando a instrumentação está desligada"""
+
+    name = None
+    rows = None
+    record: Dict[str, Any] = {}
+
+    def __setattr__(self, key, value):
+        pass
+
+    @property
+    def attrs(self) -> Dict[str, Any]:
+        return {}
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Coletor de spans do processo"""
+
+    def __init__(self, enabled: bool = False, profile_dir: Optional[str] = None):
+        self.enabled = enabled or bool(profile_dir)
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.spans: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'Tracer':
+        """Configura o tracer a partir das variáveis de ambiente"""
+        trace_path = os.environ.get('ESTOQUE_TRACE')
+        tracer = cls(enabled=bool(trace_path), profile_dir=os.environ.get('ESTOQUE_PROFILE'))
+        if trace_path:
+            tracer.export_at_exit(trace_path, os.environ.get('ESTOQUE_TRACE_FORMAT'))
+        return tracer
+
+    def enable(self, profile_dir: Optional[str] = None):
+        self.enabled = True
+        if profile_dir:
+            self.profile_dir = Path(profile_dir)
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, rows: Optional[int] = None, **attrs):
+        """Mede o bloco; não faz nada (nem aloca) com o tracer desligado"""
+        if not self.enabled:
+            yield _NULL_SPAN
+            return
+
+        stack = self._stack()
+        current = Span(name, rows, attrs)
+        current.depth = len(stack)
+        stack.append(current)
+
+        profiler = None
+        if self.profile_dir is not None and current.depth == 0:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        current.start_cpu = time.process_time()
+        current.start_wall = time.perf_counter()
+        try:
+            yield current
+        finally:
+            wall = time.perf_counter() - current.start_wall
+            cpu = time.process_time() - current.start_cpu
+            stack.pop()
+
+            if profiler is not None:
+                profiler.disable()
+                self.profile_dir.mkdir(parents=True, exist_ok=True)
+                profiler.dump_stats(str(self.profile_dir / f"{name}.{os.getpid()}.{len(self.spans)}.prof"))
+
+            record = {
+                'name': name,
+                'start_ms': round((current.start_wall - self._origin) * 1000, 3),
+                'wall_ms': round(wall * 1000, 3),
+                'cpu_ms': round(cpu * 1000, 3),
+                'rows': current.rows,
+                'rows_per_s': round(current.rows / wall, 1) if current.rows and wall > 0 else None,
+                'peak_rss_mb': peak_rss_mb(),
+                'depth': current.depth,
+                'parent': stack[-1].name if stack else None,
+                'pid': os.getpid(),
+                'tid': threading.get_ident()
+            }
+            if current.attrs:
+                record['attrs'] = current.attrs
+            current.record = record
+            with self._lock:
+                self.spans.append(record)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator: mede cada chamada da função como um span"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Agrega spans por nome (chamadas, total e máximo)"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        for record in self.spans:
+            entry = totals.setdefault(record['name'], {'calls': 0, 'wall_ms': 0.0, 'cpu_ms': 0.0,
+                                                       'max_wall_ms': 0.0, 'rows': 0})
+            entry['calls'] += 1
+            entry['wall_ms'] = round(entry['wall_ms'] + record['wall_ms'], 3)
+            entry['cpu_ms'] = round(entry['cpu_ms'] + record['cpu_ms'], 3)
+            entry['max_wall_ms'] = max(entry['max_wall_ms'], record['wall_ms'])
+            entry['rows'] += record['rows'] or 0
+        return totals
+
+    def export_json(self, output_path: str):
+        """Exporta spans e agregados em JSON"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({'spans': self.spans, 'summary': self.summary()}, f, ensure_ascii=False)
+
+    def export_chrome_trace(self, output_path: str):
+        """Exporta no formato Trace Event (chrome://tracing, ui.perfetto.dev)"""
+        events = []
+        for record in self.spans:
+            args = {k: record[k] for k in ('cpu_ms', 'rows', 'rows_per_s', 'peak_rss_mb') if record[k] is not None}
+            args.update(record.get('attrs', {}))
+            events.append({
+                'name': record['name'],
+                'cat': record['name'].split('.')[0],
+                'ph': 'X',
+                'ts': int(record['start_ms'] * 1000),
+                'dur': int(record['wall_ms'] * 1000),
+                'pid': record['pid'],
+                'tid': record['tid'],
+                'args': args
+            })
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+    def export(self, output_path: str, fmt: Optional[str] = None):
+        """Exporta no formato indicado (inferido pelo nome do arquivo se omitido)"""
+        fmt = fmt or ('chrome' if str(output_path).endswith('.trace.json') else 'json')
+        if fmt == 'chrome':
+            self.export_chrome_trace(output_path)
+        else:
+            self.export_json(output_path)
+
+    def export_at_exit(self, output_path: str, fmt: Optional[str] = None):
+        self.enabled = True
+        atexit.register(self.export, output_path, fmt)
+
+
+# Tracer global do processo, configurado por variáveis de ambiente
+TRACER = Tracer.from_env()
+span = TRACER.span
+traced = TRACER.traced
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Detecção e mapeamento de layouts de dados para o layout canônico
+
+Layouts suportados:
+- canonico: ID, ID_PRODUTO, DIA (dd/mm/aaaa), FLAG_PROMOCAO, QUANTIDADE_ESTOQUE
+- vendas_historicas: date (ISO), product_id ("P002"), product_name, category,
+  units_sold, price, promotion, stock_level, region
+
+O mapeamento é vetorizado: códigos de produto são fatorados uma vez e apenas
+os valores distintos passam pelo dicionário persistido (ProductCodeMap), que
+atribui ids inteiros compactos e estáveis entre execuções. Colunas extras são
+mantidas como features (VENDAS, PRECO e as categóricas REGIAO, CATEGORIA,
+NOME_PRODUTO, CODIGO_PRODUTO).
+
+Uso:
+    python mapear_layout.py vendas_historicas.csv saida.parquet --product-map dicionario_produtos.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from importacao_tardia import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Dicionário padrão de códigos de produto (ao lado dos dados)
+DEFAULT_PRODUCT_MAP = Path(__file__).resolve().parent.parent / '01-Dados' / 'dicionario_produtos.json'
+
+LAYOUTS = {
+    'canonico': {
+        'assinatura': ['ID_PRODUTO', 'DIA', 'QUANTIDADE_ESTOQUE'],
+        'colunas': {}
+    },
+    'vendas_historicas': {
+        'assinatura': ['product_id', 'date', 'stock_level'],
+        'colunas': {
+            'product_id': 'ID_PRODUTO',
+            'date': 'DIA',
+            'promotion': 'FLAG_PROMOCAO',
+            'stock_level': 'QUANTIDADE_ESTOQUE',
+            'units_sold': 'VENDAS',
+            'price': 'PRECO',
+            'region': 'REGIAO',
+            'category': 'CATEGORIA',
+            'product_name': 'NOME_PRODUTO'
+        },
+        'data_formato': '%Y-%m-%d',
+        'codigo_produto': 'product_id',
+        'categoricas': ['REGIAO', 'CATEGORIA', 'NOME_PRODUTO']
+    }
+}
+
+
+def detect_layout(columns: Iterable[str]) -> Optional[str]:
+    """Nome do layout cujas colunas-assinatura estão todas presentes"""
+    columns = set(columns)
+    for name, layout in LAYOUTS.items():
+        if all(col in columns for col in layout['assinatura']):
+            return name
+    return None
+
+
+def as_categorical(values: pd.Series) -> pd.Categorical:
+    """Categórica a partir de factorize (categorias na ordem de aparição)"""
+    codes, uniques = pd.factorize(values)
+    return pd.Categorical.from_codes(codes, categories=pd.Index(uniques))
+
+
+class ProductCodeMap:
+    """
+    Dicionário persistido código de produto -> id inteiro
+
+    Ids novos são atribuídos em sequência a partir de first_id (padrão 2001,
+    fora da faixa 1001-1050 do layout canônico), em ordem de código dentro de
+    cada lote, e nunca são reaproveitados.
+
+    Com arquivo (e sem read_only), os códigos novos são reservados na hora,
+    sob um arquivo de trava: o dicionário é relido, os códigos já gravados
+    por outro processo mantêm o id de lá e só os restantes recebem ids novos.
+    Dois mapeamentos concorrentes nunca dão o mesmo id a produtos diferentes.
+    read_only (validador) atribui ids só em memória e não grava.
+    """
+
+    LOCK_TIMEOUT = 30.0
+
+    def __init__(self, path: Optional[str] = None, first_id: int = 2001, read_only: bool = False):
+        self.path = Path(path) if path else None
+        self.first_id = first_id
+        self.read_only = read_only
+        self.codes: Dict[str, int] = {}
+        self.dirty = False
+        self._load()
+
+    def _load(self):
+        """Incorpora o dicionário gravado (os ids do arquivo prevalecem)"""
+        if self.path and self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.first_id = int(data.get('primeiro_id', self.first_id))
+            self.codes.update({str(k): int(v) for k, v in data.get('codigos', {}).items()})
+
+    @property
+    def next_id(self) -> int:
+        return max(self.codes.values(), default=self.first_id - 1) + 1
+
+    def id_range(self) -> Tuple[int, int]:
+        """(menor, maior) id atribuído"""
+        if not self.codes:
+            return self.first_id, self.first_id - 1
+        return min(self.codes.values()), max(self.codes.values())
+
+    def encode(self, codes: pd.Series) -> np.ndarray:
+        """
+        Converte códigos em ids (int32); nulos viram -1
+
+        Apenas os valores distintos são consultados no dicionário; os ids
+        por registro saem de uma indexação vetorizada pelos códigos fatorados.
+        """
+        factorized, uniques = pd.factorize(codes)
+        # Código -1 de factorize (nulo) indexa o último elemento (-1)
+        return self.lookup(uniques)[factorized]
+
+    def lookup(self, uniques) -> np.ndarray:
+        """Ids dos códigos distintos (atribuindo os novos) seguidos de -1 para nulos"""
+        uniques = [str(u).strip() for u in uniques]
+        new = sorted(set(u for u in uniques if u not in self.codes))
+        if new:
+            if self.path and not self.read_only:
+                with self.lock():
+                    self._load()
+                    self._assign(new)
+                    self._write()
+            else:
+                self._assign(new)
+                self.dirty = True
+        return np.array([self.codes[u] for u in uniques] + [-1], dtype=np.int32)
+
+    def _assign(self, new: List[str]):
+        new = [code for code in new if code not in self.codes]
+        start = self.next_id
+        self.codes.update({code: start + i for i, code in enumerate(new)})
+
+    @contextmanager
+    def lock(self):
+        """Um escritor por vez (arquivo de trava criado com O_EXCL ao lado do dicionário)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        path = self.path.with_name(self.path.name + '.lock')
+        deadline = time.monotonic() + self.LOCK_TIMEOUT
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Dicionário {self.path} travado por outro processo ({path})")
+                time.sleep(0.05)
+        try:
+            os.write(fd, str(os.getpid()).encode())
+            yield
+        finally:
+            os.close(fd)
+            os.unlink(path)
+
+    def _write(self):
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'primeiro_id': self.first_id, 'codigos': self.codes}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def save(self):
+        """
+        Grava ids atribuídos só em memória, relendo e mesclando o arquivo sob a
+        trava (com arquivo, os ids já são reservados em lookup)
+        """
+        if not self.path or not self.dirty or self.read_only:
+            return
+        with self.lock():
+            mine = self.codes
+            self.codes = {}
+            self._load()
+            self._assign(sorted(code for code in mine if code not in self.codes))
+            self._write()
+        self.dirty = False
+
+
+class LayoutMapper:
+    """Normaliza DataFrames de qualquer layout suportado para o canônico"""
+
+    def __init__(self, product_map: Optional[ProductCodeMap] = None):
+        self.product_map = product_map or ProductCodeMap()
+
+    def normalize(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[str]]:
+        """
+        Returns:
+            (DataFrame no layout canônico + features extras, nome do layout
+            detectado); layouts desconhecidos e o canônico passam inalterados
+        """
+        layout_name = detect_layout(df.columns)
+        if layout_name is None or not LAYOUTS[layout_name]['colunas']:
+            return df, layout_name
+        layout = LAYOUTS[layout_name]
+
+        out = {'ID': np.arange(1, len(df) + 1, dtype=np.int64)}
+        for source, target in layout['colunas'].items():
+            if source not in df.columns:
+                continue
+            values = df[source]
+            if source == layout['codigo_produto']:
+                codes, uniques = pd.factorize(values)
+                out[target] = self.product_map.lookup(uniques)[codes]
+                out['CODIGO_PRODUTO'] = pd.Categorical.from_codes(codes, categories=pd.Index(uniques))
+            elif target == 'DIA':
+                # Poucas datas distintas: converte só os valores distintos
+                codes, uniques = pd.factorize(values)
+                parsed = pd.to_datetime(pd.Series(uniques), format=layout['data_formato'], errors='coerce')
+                out[target] = pd.Series(parsed.to_numpy().take(codes), index=df.index).where(codes >= 0)
+            elif target in layout['categoricas']:
+                out[target] = as_categorical(values)
+            else:
+                out[target] = values
+        mapped = pd.DataFrame(out, index=df.index)
+        # Demais colunas desconhecidas seguem com o nome original
+        extras = [col for col in df.columns if col not in layout['colunas']]
+        for col in extras:
+            mapped[col] = df[col]
+        return mapped, layout_name
+
+    def normalize_many(self, frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """Concatena lotes de layouts diferentes já normalizados (ids pelo mesmo dicionário)"""
+        normalized = []
+        for df in frames:
+            df, _ = self.normalize(df)
+            if 'DIA' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['DIA']):
+                # Layout canônico (dd/mm/aaaa) junto de layouts mapeados (datetime)
+                df = df.assign(DIA=pd.to_datetime(df['DIA'], format='%d/%m/%Y', errors='coerce'))
+            normalized.append(df)
+        combined = pd.concat(normalized, ignore_index=True)
+        # Categorias diferentes entre lotes viram object no concat
+        for layout in LAYOUTS.values():
+            for col in layout.get('categoricas', []) + ['CODIGO_PRODUTO']:
+                if col in combined.columns and not isinstance(combined[col].dtype, pd.CategoricalDtype):
+                    combined[col] = combined[col].astype('category')
+        if 'ID' in combined.columns:
+            combined['ID'] = np.arange(1, len(combined) + 1, dtype=np.int64)
+        return combined
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mapeia arquivos de outros layouts para o layout canônico')
+    parser.add_argument('inputs', nargs='+', help='Arquivos CSV/Parquet de entrada (layouts podem variar)')
+    parser.add_argument('output', help='Arquivo de saída (.csv ou .parquet)')
+    parser.add_argument('--product-map',
+                        default=os.environ.get('ESTOQUE_DICIONARIO_PRODUTOS', str(DEFAULT_PRODUCT_MAP)),
+                        help='Dicionário de códigos de produto (padrão: $ESTOQUE_DICIONARIO_PRODUTOS '
+                             'ou 01-Dados/dicionario_produtos.json)')
+    args = parser.parse_args()
+
+    product_map = ProductCodeMap(args.product_map)
+    mapper = LayoutMapper(product_map)
+    try:
+        frames = []
+        for path in args.inputs:
+            df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path, encoding='utf-8-sig')
+            print(f"📄 {path}: {len(df):,} registros, layout {detect_layout(df.columns) or 'desconhecido'}")
+            frames.append(df)
+        combined = mapper.normalize_many(frames)
+        if args.output.endswith('.parquet'):
+            combined.to_parquet(args.output, index=False)
+        else:
+            # DIA volta ao formato canônico dd/mm/aaaa (normalize converte para datetime)
+            combined.assign(DIA=combined['DIA'].dt.strftime('%d/%m/%Y')).to_csv(
+                args.output, index=False, encoding='utf-8-sig')
+        product_map.save()
+    except Exception as e:
+        print(f"❌ Erro: {e}")
+        return 1
+    print(f"✅ {len(combined):,} registros no layout canônico em {args.output} "
+          f"({len(product_map.codes)} códigos de produto em {product_map.path})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Suíte de Benchmarks dos Utilitários e do Caminho de Inferência
+
+Funcionalidades:
+- Dados sintéticos reprodutíveis (semente fixa) de 1K a 50M registros
+- Casos: DataConverter.convert por par de formatos, normalize_dates,
+  validate_data, mapeamento de layout, amostragem, cada família de regras do DataValidator, generate_summary,
+  previsão individual vs. em lote e resumo de alertas
+- Métricas por caso e tamanho: registros/s, pico de memória (tracemalloc)
+  e latência p50/p95/p99 das repetições
+- Resultados em JSON (com commit, versões e máquina) e comparação com uma
+  execução anterior para detectar regressões
+
+Uso:
+    python medir_desempenho.py --sizes 1k,100k,1m --output bench.json
+    python medir_desempenho.py --filter validador --compare bench_main.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from converter_formato import DataConverter
+from importacao_tardia import lazy_import
+from mapear_layout import LayoutMapper
+from validar_dados import DataValidator, json_default
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / '02-sagemaker-canvas' / 'modelo_previsao_vendas'
+for extra_path in (MODEL_DIR, MODEL_DIR / 'exemplos'):
+    if str(extra_path) not in sys.path:
+        sys.path.insert(0, str(extra_path))
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+# Casos de previsão: importados só ao rodar (os ausentes são pulados via requires)
+model_predictor = lazy_import('model_predictor')
+python_client = lazy_import('python_client')
+
+RESULTS_VERSION = 1
+
+# Dependências opcionais de cada formato de arquivo (os casos sem elas são pulados)
+FORMAT_DEPENDENCIES = {'csv': None, 'json': None, 'parquet': 'pyarrow', 'xlsx': 'openpyxl'}
+
+# Limites práticos por formato (xlsx: limite de linhas do Excel)
+FORMAT_MAX_ROWS = {'xlsx': 1_048_575}
+
+# Previsão individual: no máximo este número de chamadas por repetição
+SINGLE_PREDICTION_MAX = 10_000
+
+# Casos que materializam um dicionário por registro (saída do endpoint)
+RECORDS_MAX_ROWS = 2_000_000
+
+# Acima deste tamanho a repetição de aquecimento é omitida
+WARMUP_MAX_ROWS = 1_000_000
+
+
+def parse_size(text: str) -> int:
+    """Converte '1k', '2.5m', '50M' ou '1000' em número de registros"""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kKmM]?)\s*', text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Tamanho inválido: {text}")
+    value = float(match.group(1)) * {'': 1, 'k': 1_000, 'm': 1_000_000}[match.group(2).lower()]
+    return int(value)
+
+
+def synthetic_dataset(n_rows: int, n_products: int = 50, seed: int = 42) -> pd.DataFrame:
+    """
+    Gera o layout canônico (ID, ID_PRODUTO, DIA, FLAG_PROMOCAO, QUANTIDADE_ESTOQUE)
+    com as mesmas distribuições de gerar_dataset.py, de forma vetorizada
+    """
+    rng = np.random.default_rng(seed)
+    n_products = max(1, min(n_products, n_rows))
+    n_days = -(-n_rows // n_products)
+
+    produto = np.tile(np.arange(1001, 1001 + n_products), n_days)[:n_rows]
+    dia = np.repeat(np.arange(n_days), n_products)[:n_rows]
+    promo = (rng.random(n_rows) < 0.3).astype(np.int64)
+    vendas = np.where(promo == 1, rng.integers(15, 31, n_rows), rng.integers(5, 21, n_rows))
+
+    # Estoque decrescente por produto com reposição a cada 20 dias
+    estoque = rng.integers(100, 301, n_rows) - (dia % 20) * 12 - vendas
+    datas = pd.Timestamp('2023-12-31') + pd.to_timedelta(dia, unit='D')
+
+    return pd.DataFrame({
+        'ID': np.arange(1, n_rows + 1),
+        'ID_PRODUTO': produto,
+        'DIA': datas.strftime('%d/%m/%Y'),
+        'FLAG_PROMOCAO': promo,
+        'QUANTIDADE_ESTOQUE': np.maximum(estoque, 0)
+    })
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def dependency_available(module: str) -> bool:
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+class Benchmark:
+    """
+    Caso de benchmark no estilo asv: `setup` prepara os argumentos de cada
+    repetição (fora da medição) e `run` executa o trecho medido
+    """
+
+    def __init__(self, name: str, setup: Callable[['BenchmarkContext'], Any], run: Callable[[Any], Any],
+                 max_rows: Optional[int] = None, requires: Tuple[str, ...] = (),
+                 rows: Optional[Callable[['BenchmarkContext'], int]] = None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.max_rows = max_rows
+        self.requires = requires
+        self.rows = rows
+
+    def skip_reason(self, n_rows: int) -> Optional[str]:
+        missing = [module for module in self.requires if not dependency_available(module)]
+        if missing:
+            return f"dependência ausente: {', '.join(missing)}"
+        if self.max_rows and n_rows > self.max_rows:
+            return f"acima do limite de {self.max_rows:,} registros"
+        return None
+
+
+class BenchmarkContext:
+    """Dados de um tamanho, compartilhados entre os casos (gerados uma única vez)"""
+
+    def __init__(self, n_rows: int, workdir: Path, seed: int = 42):
+        self.n_rows = n_rows
+        self.workdir = workdir
+        self.seed = seed
+        self._df = None
+        self._validated = None
+        self._files: Dict[str, str] = {}
+        self._predictions = None
+
+    @property
+    def df(self) -> pd.DataFrame:
+        if self._df is None:
+            self._df = synthetic_dataset(self.n_rows, seed=self.seed)
+        return self._df
+
+    @property
+    def validated_df(self) -> pd.DataFrame:
+        """DataFrame após validate_schema (DIA já convertido), como em DataValidator.validate"""
+        if self._validated is None:
+            df = self.df.copy()
+            DataValidator(verbose=False).validate_schema(df)
+            self._validated = df
+        return self._validated
+
+    def input_file(self, fmt: str) -> str:
+        """Arquivo de entrada no formato pedido (escrito uma vez por tamanho)"""
+        if fmt not in self._files:
+            path = self.workdir / f'entrada_{self.n_rows}.{fmt}'
+            with contextlib.redirect_stdout(io.StringIO()):
+                DataConverter().write_file(self.df, str(path), fmt)
+            self._files[fmt] = str(path)
+        return self._files[fmt]
+
+    def predictions(self) -> List[Dict]:
+        """Previsões no formato do endpoint, com produto_id nos metadados (como predict_single)"""
+        if self._predictions is None:
+            predictions = model_predictor.ModelPredictor().predict_batch(self.df)
+            for pred, produto_id in zip(predictions, self.df['ID_PRODUTO'].tolist()):
+                pred['metadata']['produto_id'] = produto_id
+            self._predictions = predictions
+        return self._predictions
+
+
+def convert_case(input_fmt: str, output_fmt: str) -> Benchmark:
+    def setup(ctx):
+        return ctx.input_file(input_fmt), str(ctx.workdir / f'saida_{ctx.n_rows}.{output_fmt}')
+
+    def run(args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataConverter().convert(*args)
+
+    requires = tuple(FORMAT_DEPENDENCIES[fmt] for fmt in (input_fmt, output_fmt) if FORMAT_DEPENDENCIES[fmt])
+    max_rows = min((FORMAT_MAX_ROWS[fmt] for fmt in (input_fmt, output_fmt) if fmt in FORMAT_MAX_ROWS), default=None)
+    return Benchmark(f'converter.convert.{input_fmt}_{output_fmt}', setup, run,
+                     max_rows=max_rows, requires=requires)
+
+
+def validator_case(name: str, method: str, validated: bool = True) -> Benchmark:
+    def setup(ctx):
+        df = (ctx.validated_df if validated else ctx.df).copy()
+        return getattr(DataValidator(verbose=False), method), df
+
+    def run(args):
+        func, df = args
+        func(df)
+
+    return Benchmark(f'validador.{name}', setup, run)
+
+
+def sample_case(mode: str) -> Benchmark:
+    def setup(ctx):
+        return ctx.input_file('csv'), str(ctx.workdir / f'amostra_{ctx.n_rows}.csv')
+
+    def run(args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataConverter().create_sample(*args, sample_size=100, mode=mode)
+
+    return Benchmark(f'converter.create_sample.{mode}', setup, run)
+
+
+def map_layout_case() -> Benchmark:
+    def setup(ctx):
+        # Mesmos registros no layout vendas_historicas (códigos "P<id>", datas ISO)
+        df = pd.DataFrame({
+            'date': pd.to_datetime(ctx.df['DIA'], format='%d/%m/%Y').dt.strftime('%Y-%m-%d'),
+            'product_id': 'P' + ctx.df['ID_PRODUTO'].astype(str),
+            'promotion': ctx.df['FLAG_PROMOCAO'],
+            'stock_level': ctx.df['QUANTIDADE_ESTOQUE']
+        })
+        return LayoutMapper(), df
+
+    def run(args):
+        mapper, df = args
+        mapper.normalize(df)
+
+    return Benchmark('converter.map_layout', setup, run)
+
+
+def single_prediction_case() -> Benchmark:
+    def setup(ctx):
+        records = ctx.df.head(SINGLE_PREDICTION_MAX)[['ID_PRODUTO', 'FLAG_PROMOCAO', 'QUANTIDADE_ESTOQUE']]
+        return model_predictor.ModelPredictor(), records.to_dict('records')
+
+    def run(args):
+        predictor, records = args
+        for record in records:
+            predictor.predict(record)
+
+    return Benchmark('predicao.individual', setup, run, requires=('model_predictor',),
+                     rows=lambda ctx: min(ctx.n_rows, SINGLE_PREDICTION_MAX))
+
+
+def build_benchmarks() -> List[Benchmark]:
+    """Registro de todos os casos da suíte"""
+    converter = DataConverter()
+    benchmarks = [
+        convert_case(input_fmt, output_fmt)
+        for input_fmt in converter.supported_formats
+        for output_fmt in converter.supported_formats
+        if input_fmt != output_fmt
+    ]
+    benchmarks += [
+        Benchmark('converter.normalize_dates', lambda ctx: ctx.df.copy(), DataConverter().normalize_dates),
+        Benchmark('converter.validate_data', lambda ctx: ctx.df.copy(), DataConverter().validate_data),
+        map_layout_case(),
+        sample_case('aleatoria'),
+        sample_case('produto'),
+        validator_case('schema', 'validate_schema', validated=False),
+        validator_case('regras_negocio', 'validate_business_rules'),
+        validator_case('qualidade_estatistica', 'validate_statistical_quality'),
+        validator_case('qualidade_dados', 'validate_data_quality'),
+        validator_case('generate_summary', 'generate_summary'),
+        single_prediction_case(),
+        Benchmark('predicao.lote', lambda ctx: (model_predictor.ModelPredictor(), ctx.df),
+                  lambda args: args[0].predict_batch(args[1]),
+                  max_rows=RECORDS_MAX_ROWS, requires=('model_predictor',)),
+        Benchmark('predicao.lote_vetorizado', lambda ctx: (model_predictor.ModelPredictor(), ctx.df),
+                  lambda args: args[0].predict_frame(args[1]), requires=('model_predictor',)),
+        Benchmark('predicao.trajetoria_14d', lambda ctx: (model_predictor.ModelPredictor(), ctx.df),
+                  lambda args: args[0].predict_trajectory(args[1]['ID_PRODUTO'].to_numpy(),
+                                                          args[1]['FLAG_PROMOCAO'].to_numpy(),
+                                                          args[1]['QUANTIDADE_ESTOQUE'].to_numpy()),
+                  requires=('model_predictor',)),
+        Benchmark('alertas.resumo_cliente',
+                  lambda ctx: (python_client.EstoquePredictionClient(endpoint_url='http://127.0.0.1:8080'),
+                               ctx.predictions()),
+                  lambda args: args[0].get_alerts_summary(args[1]),
+                  max_rows=RECORDS_MAX_ROWS, requires=('model_predictor', 'python_client')),
+    ]
+    return benchmarks
+
+
+class BenchmarkRunner:
+    """Executa os casos selecionados para cada tamanho e consolida os resultados"""
+
+    def __init__(self, sizes: List[int], repeats: int = 5, min_time: float = 0.0,
+                 measure_memory: bool = True, seed: int = 42, verbose: bool = True):
+        self.sizes = sizes
+        self.repeats = repeats
+        self.min_time = min_time
+        self.measure_memory = measure_memory
+        self.seed = seed
+        self.verbose = verbose
+
+    def measure(self, benchmark: Benchmark, ctx: BenchmarkContext) -> Dict[str, Any]:
+        rows = benchmark.rows(ctx) if benchmark.rows else ctx.n_rows
+
+        # Aquecimento fora da medição
+        if ctx.n_rows <= WARMUP_MAX_ROWS:
+            benchmark.run(benchmark.setup(ctx))
+
+        times = []
+        elapsed = 0.0
+        while len(times) < self.repeats or elapsed < self.min_time:
+            args = benchmark.setup(ctx)
+            start = time.perf_counter()
+            benchmark.run(args)
+            duration = time.perf_counter() - start
+            times.append(duration)
+            elapsed += duration
+
+        peak_mb = None
+        if self.measure_memory:
+            # Execução separada: o tracemalloc distorce o tempo, não entra nas latências
+            args = benchmark.setup(ctx)
+            tracemalloc.start()
+            benchmark.run(args)
+            peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 3)
+            tracemalloc.stop()
+
+        times_ms = np.array(times) * 1000
+        p50 = float(np.percentile(times_ms, 50))
+        return {
+            'benchmark': benchmark.name,
+            'rows': rows,
+            'status': 'ok',
+            'repeats': len(times),
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(float(np.percentile(times_ms, 95)), 3),
+            'p99_ms': round(float(np.percentile(times_ms, 99)), 3),
+            'min_ms': round(float(times_ms.min()), 3),
+            'rows_per_s': round(rows / (p50 / 1000), 1) if p50 > 0 else None,
+            'peak_mem_mb': peak_mb
+        }
+
+    def run(self, benchmarks: List[Benchmark]) -> Dict[str, Any]:
+        results = []
+        with tempfile.TemporaryDirectory(prefix='bench_estoque_') as workdir:
+            for n_rows in self.sizes:
+                ctx = BenchmarkContext(n_rows, Path(workdir), seed=self.seed)
+                if self.verbose:
+                    print(f"\n📏 {n_rows:,} registros")
+                for benchmark in benchmarks:
+                    reason = benchmark.skip_reason(n_rows)
+                    if reason:
+                        results.append({'benchmark': benchmark.name, 'rows': n_rows, 'status': 'pulado',
+                                        'motivo': reason})
+                        if self.verbose:
+                            print(f"  ⏭️  {benchmark.name}: {reason}")
+                        continue
+                    try:
+                        result = self.measure(benchmark, ctx)
+                    except Exception as e:
+                        result = {'benchmark': benchmark.name, 'rows': n_rows, 'status': 'erro', 'motivo': str(e)}
+                        if self.verbose:
+                            print(f"  ❌ {benchmark.name}: {e}")
+                    else:
+                        if self.verbose:
+                            print(f"  ✅ {benchmark.name:<40} p50 {result['p50_ms']:>10,.2f} ms  "
+                                  f"p99 {result['p99_ms']:>10,.2f} ms  {result['rows_per_s'] or 0:>14,.0f} reg/s  "
+                                  f"mem {result['peak_mem_mb'] if result['peak_mem_mb'] is not None else '-'} MB")
+                    results.append(result)
+
+        return {
+            'versao': RESULTS_VERSION,
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'ambiente': {
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'numpy': np.__version__,
+                'plataforma': platform.platform(),
+                'processador': platform.processor() or platform.machine(),
+                'cpus': os.cpu_count()
+            },
+            'config': {'sizes': self.sizes, 'repeats': self.repeats, 'min_time_s': self.min_time,
+                       'seed': self.seed, 'memoria': self.measure_memory},
+            'resultados': results
+        }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Compara o p50 de cada (benchmark, registros) com uma execução anterior
+
+    Returns:
+        Lista de comparações; `regressao` é True quando o p50 piorou mais que `threshold`
+    """
+    previous = {(r['benchmark'], r['rows']): r for r in baseline.get('resultados', []) if r.get('status') == 'ok'}
+    comparisons = []
+    for result in current.get('resultados', []):
+        before = previous.get((result['benchmark'], result['rows']))
+        if result.get('status') != 'ok' or before is None or not before['p50_ms']:
+            continue
+        ratio = result['p50_ms'] / before['p50_ms']
+        comparisons.append({
+            'benchmark': result['benchmark'],
+            'rows': result['rows'],
+            'p50_anterior_ms': before['p50_ms'],
+            'p50_atual_ms': result['p50_ms'],
+            'razao': round(ratio, 3),
+            'regressao': ratio > 1 + threshold
+        })
+    return comparisons
+
+
+def print_comparison(comparisons: List[Dict[str, Any]], baseline_commit: Optional[str]):
+    print(f"\n{'='*60}")
+    print(f"COMPARAÇÃO COM {baseline_commit or 'execução anterior'}")
+    print(f"{'='*60}")
+    for item in comparisons:
+        icon = '🔴' if item['regressao'] else ('🟢' if item['razao'] < 1 else '⚪')
+        print(f"{icon} {item['benchmark']:<40} {item['rows']:>12,}  "
+              f"{item['p50_anterior_ms']:>10,.2f} → {item['p50_atual_ms']:>10,.2f} ms  (x{item['razao']})")
+    regressions = sum(item['regressao'] for item in comparisons)
+    print(f"\nRegressões: {regressions} de {len(comparisons)} comparações")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks dos utilitários e da inferência')
+    parser.add_argument('--sizes', default='1k,10k,100k',
+                        help='Tamanhos dos datasets sintéticos (ex.: 1k,100k,1m,50m)')
+    parser.add_argument('--filter', help='Expressão regular aplicada ao nome dos casos')
+    parser.add_argument('--repeats', type=int, default=5, help='Repetições medidas por caso')
+    parser.add_argument('--min-time', type=float, default=0.0,
+                        help='Tempo mínimo (s) medido por caso; repete até atingir')
+    parser.add_argument('--no-memory', action='store_true', help='Não mede pico de memória (tracemalloc)')
+    parser.add_argument('--seed', type=int, default=42, help='Semente dos dados sintéticos')
+    parser.add_argument('--output', '-o', help='Arquivo JSON de resultados (padrão: bench_<commit>.json)')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Piora relativa do p50 considerada regressão (padrão: 0.2)')
+    parser.add_argument('--list', action='store_true', help='Lista os casos e sai')
+    args = parser.parse_args(argv)
+
+    benchmarks = build_benchmarks()
+    if args.filter:
+        pattern = re.compile(args.filter)
+        benchmarks = [b for b in benchmarks if pattern.search(b.name)]
+    if args.list:
+        for benchmark in benchmarks:
+            print(benchmark.name)
+        return 0
+
+    sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    runner = BenchmarkRunner(sizes, repeats=args.repeats, min_time=args.min_time,
+                             measure_memory=not args.no_memory, seed=args.seed)
+    results = runner.run(benchmarks)
+
+    output = args.output or f"bench_{results['commit'] or datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, default=json_default)
+    print(f"\n📄 Resultados salvos em: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparisons = compare_results(results, baseline, args.threshold)
+        print_comparison(comparisons, baseline.get('commit'))
+        if any(item['regressao'] for item in comparisons):
+            return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Monitoramento de Drift de Dados para Previsão de Estoque
+
+Funcionalidades:
+- Perfil de referência compacto a partir dos dados de treino, em uma passada
+  por chunks (histogramas por quantis para features numéricas, frequências
+  para categóricas)
+- Comparação de lotes novos contra a referência em uma única passada por chunks
+- Estatísticas PSI e KS por feature com limiares configuráveis; identificadores
+  de produto só pela parcela de ids fora da referência, e dia da semana só
+  em lotes de 7 dias ou mais (um lote diário tem um único dia da semana)
+- Relatório de drift persistido em JSON
+"""
+
+import pandas as pd
+import numpy as np
+import json
+import argparse
+from pathlib import Path
+from datetime import datetime
+import warnings
+from typing import Dict, List, Optional, Any, Iterator
+import sys
+
+warnings.filterwarnings('ignore')
+
+PROFILE_VERSION = 1
+
+
+class DriftMonitor:
+    """Gera perfis de referência e detecta drift em lotes de dados"""
+
+    def __init__(self, n_bins: int = 20, max_categories: int = 100, chunksize: int = 500_000,
+                 verbose: bool = True):
+        self.n_bins = n_bins
+        self.max_categories = max_categories
+        self.chunksize = chunksize
+        self.verbose = verbose
+
+        # Features monitoradas (apenas as presentes no arquivo são usadas)
+        self.numeric_features = ['QUANTIDADE_ESTOQUE', 'stock_level', 'units_sold', 'price']
+        self.categorical_features = ['FLAG_PROMOCAO', 'ID_PRODUTO', 'promotion',
+                                     'product_id', 'category', 'region']
+        # Identificadores: um lote (ex.: um dia) traz só parte dos produtos, então a
+        # distribuição não é comparada; só a parcela de ids ausentes da referência
+        self.id_features = ['ID_PRODUTO', 'product_id']
+        # dia_semana só é comparado em lotes que cobrem uma semana inteira
+        self.min_days_weekday = 7
+
+        # Faixas de estoque iguais às de DataValidator.generate_summary
+        self.stock_bands = {
+            'bins': [-np.inf, 20, 50, 100, np.inf],
+            'labels': ['critico_0_20', 'alerta_21_50', 'normal_51_100', 'alto_100_plus']
+        }
+        self.date_columns = {'DIA': '%d/%m/%Y', 'date': '%Y-%m-%d'}
+
+        # Limiares usuais de PSI e coeficiente do KS para alfa = 0.05
+        self.thresholds = {
+            'psi_moderado': 0.1,
+            'psi_significativo': 0.25,
+            'ks_alpha_coef': 1.358,
+            # Parcela dos registros do lote com id fora da referência
+            'ids_novos_moderado': 0.01,
+            'ids_novos_significativo': 0.05
+        }
+
+    def iter_chunks(self, filepath: str) -> Iterator[pd.DataFrame]:
+        """Lê o arquivo em blocos para manter a memória constante"""
+        path = Path(filepath)
+        if not path.exists():
+            raise FileNotFoundError(f"Arquivo não encontrado: {filepath}")
+
+        suffix = path.suffix.lower()
+        if suffix == '.csv':
+            yield from pd.read_csv(filepath, encoding='utf-8-sig', chunksize=self.chunksize)
+        elif suffix == '.parquet':
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                yield pd.read_parquet(filepath)
+                return
+            for batch in pq.ParquetFile(filepath).iter_batches(batch_size=self.chunksize):
+                yield batch.to_pandas()
+        elif suffix == '.json':
+            yield pd.read_json(filepath)
+        elif suffix == '.xlsx':
+            yield pd.read_excel(filepath)
+        else:
+            raise ValueError(f"Formato não suportado: {suffix}")
+
+    def _derived_features(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        """Features categóricas derivadas: faixa de estoque e dia da semana"""
+        derived = {}
+
+        stock_col = next((c for c in ['QUANTIDADE_ESTOQUE', 'stock_level'] if c in df.columns), None)
+        if stock_col:
+            stock = pd.to_numeric(df[stock_col], errors='coerce')
+            derived['faixa_estoque'] = pd.cut(stock, **self.stock_bands).astype(str)
+
+        dates = self._dates(df)
+        if dates is not None:
+            derived['dia_semana'] = dates.dt.dayofweek.astype('Int64').astype(str)
+
+        return derived
+
+    def _dates(self, df: pd.DataFrame) -> Optional[pd.Series]:
+        """Coluna de data do arquivo já convertida (None se não houver)"""
+        for col, fmt in self.date_columns.items():
+            if col in df.columns:
+                dates = df[col]
+                if not pd.api.types.is_datetime64_any_dtype(dates):
+                    dates = pd.to_datetime(dates, format=fmt, errors='coerce')
+                return dates
+        return None
+
+    def _categorical_columns(self, df: pd.DataFrame) -> Dict[str, pd.Series]:
+        columns = {col: df[col].astype(str) for col in self.categorical_features if col in df.columns}
+        columns.update(self._derived_features(df))
+        return columns
+
+    def build_profile(self, filepath: str) -> Dict[str, Any]:
+        """
+        Cria o perfil de referência a partir dos dados de treino em uma passada.
+
+        Os limites dos histogramas numéricos são os quantis do primeiro chunk
+        com valores (~1/n_bins dos registros por bin; os bins das pontas são
+        abertos e recebem valores fora dessa faixa). Os chunks seguintes só
+        somam contagens, média/variância (combinação de Chan) e mín/máx: a
+        memória é proporcional a bins x colunas, não ao tamanho do arquivo.
+        """
+        numeric_stats: Dict[str, Dict[str, Any]] = {}
+        categorical_counts: Dict[str, pd.Series] = {}
+        total = 0
+
+        for chunk in self.iter_chunks(filepath):
+            total += len(chunk)
+            for col in self.numeric_features:
+                if col in chunk.columns:
+                    values = pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+                    values = values[~np.isnan(values)]
+                    if len(values):
+                        self._update_numeric(numeric_stats, col, values)
+            for col, series in self._categorical_columns(chunk).items():
+                counts = series.value_counts()
+                categorical_counts[col] = categorical_counts[col].add(counts, fill_value=0) \
+                    if col in categorical_counts else counts
+
+        profile = {
+            'versao_perfil': PROFILE_VERSION,
+            'origem': str(filepath),
+            'criado_em': datetime.now().isoformat(),
+            'total_registros': int(total),
+            'numericas': {},
+            'categoricas': {}
+        }
+
+        for col, stats in numeric_stats.items():
+            profile['numericas'][col] = {
+                'limites': stats['limites'].tolist(),
+                'contagens': stats['contagens'].tolist(),
+                'n': int(stats['n']),
+                'media': float(stats['media']),
+                'desvio_padrao': float(np.sqrt(stats['m2'] / stats['n'])),
+                'min': float(stats['min']),
+                'max': float(stats['max'])
+            }
+
+        for col, counts in categorical_counts.items():
+            counts = counts.sort_values(ascending=False)
+            top = counts.head(self.max_categories)
+            profile['categoricas'][col] = {
+                'categorias': [str(c) for c in top.index],
+                'contagens': [int(c) for c in top.values],
+                'outros': int(counts.iloc[self.max_categories:].sum()),
+                'n': int(counts.sum())
+            }
+            if col in self.id_features:
+                # Conjunto completo de ids (não só os mais frequentes)
+                profile['categoricas'][col]['ids'] = sorted(str(c) for c in counts.index)
+
+        return profile
+
+    def _update_numeric(self, stats: Dict[str, Dict[str, Any]], col: str, values: np.ndarray):
+        """Acumula um chunk no histograma e nos momentos da coluna (memória constante)"""
+        if col not in stats:
+            edges = np.unique(np.quantile(values, np.linspace(0, 1, self.n_bins + 1)[1:-1]))
+            stats[col] = {'limites': edges, 'contagens': np.zeros(len(edges) + 1, dtype=np.int64),
+                          'n': 0, 'media': 0.0, 'm2': 0.0, 'min': np.inf, 'max': -np.inf}
+        col_stats = stats[col]
+        edges = col_stats['limites']
+        col_stats['contagens'] += np.bincount(np.searchsorted(edges, values, side='right'),
+                                              minlength=len(edges) + 1)
+
+        n_a, n_b = col_stats['n'], len(values)
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        delta = mean_b - col_stats['media']
+        n = n_a + n_b
+        col_stats['media'] += delta * n_b / n
+        col_stats['m2'] += m2_b + delta ** 2 * n_a * n_b / n
+        col_stats['n'] = n
+        col_stats['min'] = min(col_stats['min'], float(values.min()))
+        col_stats['max'] = max(col_stats['max'], float(values.max()))
+
+    def save_profile(self, profile: Dict[str, Any], output_path: str):
+        """Salva perfil de referência"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(profile, f, indent=2, ensure_ascii=False)
+        if self.verbose:
+            print(f"📄 Perfil de referência salvo em: {output_path}")
+
+    def load_profile(self, profile_path: str) -> Dict[str, Any]:
+        """Carrega perfil de referência"""
+        with open(profile_path, encoding='utf-8') as f:
+            profile = json.load(f)
+        if profile.get('versao_perfil') != PROFILE_VERSION:
+            raise ValueError(f"Versão de perfil incompatível: {profile.get('versao_perfil')}")
+        return profile
+
+    @staticmethod
+    def psi(expected: np.ndarray, actual: np.ndarray, eps: float = 1e-4) -> float:
+        """Population Stability Index entre duas distribuições de contagens"""
+        p = np.clip(expected / max(expected.sum(), 1), eps, None)
+        q = np.clip(actual / max(actual.sum(), 1), eps, None)
+        return float(np.sum((q - p) * np.log(q / p)))
+
+    @staticmethod
+    def ks_binned(expected: np.ndarray, actual: np.ndarray) -> float:
+        """Estatística KS calculada sobre as CDFs dos histogramas"""
+        cdf_ref = np.cumsum(expected) / max(expected.sum(), 1)
+        cdf_cur = np.cumsum(actual) / max(actual.sum(), 1)
+        return float(np.max(np.abs(cdf_ref - cdf_cur)))
+
+    def _classify(self, psi_value: float, ks_value: Optional[float] = None,
+                  ks_critical: Optional[float] = None) -> str:
+        if psi_value >= self.thresholds['psi_significativo']:
+            return 'DRIFT'
+        if psi_value >= self.thresholds['psi_moderado'] or \
+                (ks_value is not None and ks_critical is not None and ks_value > ks_critical):
+            return 'ATENCAO'
+        return 'ESTAVEL'
+
+    def compare(self, profile: Dict[str, Any], filepath: str) -> Dict[str, Any]:
+        """Compara um lote com o perfil de referência em uma única passada"""
+        numeric_ref = profile['numericas']
+        categorical_ref = profile['categoricas']
+
+        edges = {col: np.asarray(ref['limites']) for col, ref in numeric_ref.items()}
+        numeric_counts = {col: np.zeros(len(e) + 1, dtype=np.int64) for col, e in edges.items()}
+        categorical_index = {col: pd.Index(ref['categorias']) for col, ref in categorical_ref.items()
+                             if col not in self.id_features}
+        categorical_counts = {col: np.zeros(len(idx) + 1, dtype=np.int64)
+                              for col, idx in categorical_index.items()}
+        # Perfis sem 'ids' (anteriores): vale a lista de categorias
+        id_index = {col: pd.Index(ref.get('ids', ref['categorias'])) for col, ref in categorical_ref.items()
+                    if col in self.id_features}
+        id_counts = {col: [0, 0] for col in id_index}  # [registros, registros com id novo]
+        new_ids: Dict[str, set] = {col: set() for col in id_index}
+        days = set()
+        total = 0
+
+        for chunk in self.iter_chunks(filepath):
+            total += len(chunk)
+            for col, col_edges in edges.items():
+                if col not in chunk.columns:
+                    continue
+                values = pd.to_numeric(chunk[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+                values = values[~np.isnan(values)]
+                numeric_counts[col] += np.bincount(np.searchsorted(col_edges, values, side='right'),
+                                                   minlength=len(col_edges) + 1)
+            dates = self._dates(chunk)
+            if dates is not None:
+                days.update(dates.dropna().dt.normalize().unique())
+            for col, series in self._categorical_columns(chunk).items():
+                if col in id_index:
+                    values = series.to_numpy()
+                    unknown = id_index[col].get_indexer(values) < 0
+                    id_counts[col][0] += len(values)
+                    id_counts[col][1] += int(unknown.sum())
+                    new_ids[col].update(values[unknown][:1000 - len(new_ids[col])].tolist())
+                    continue
+                if col not in categorical_index:
+                    continue
+                # Categorias desconhecidas caem no bin "outros" (último)
+                codes = categorical_index[col].get_indexer(series.to_numpy())
+                codes[codes < 0] = len(categorical_index[col])
+                categorical_counts[col] += np.bincount(codes, minlength=len(categorical_index[col]) + 1)
+
+        features = {}
+        skipped = {}
+        for col, ref in numeric_ref.items():
+            current = numeric_counts[col]
+            expected = np.asarray(ref['contagens'])
+            n, m = int(expected.sum()), int(current.sum())
+            if m == 0:
+                continue
+            psi_value = self.psi(expected, current)
+            ks_value = self.ks_binned(expected, current)
+            ks_critical = self.thresholds['ks_alpha_coef'] * np.sqrt((n + m) / (n * m))
+            features[col] = {
+                'tipo': 'numerica',
+                'psi': round(psi_value, 6),
+                'ks': round(ks_value, 6),
+                'ks_critico': round(float(ks_critical), 6),
+                'n_referencia': n,
+                'n_lote': m,
+                'status': self._classify(psi_value, ks_value, ks_critical)
+            }
+
+        for col, (n_lote, n_novos) in id_counts.items():
+            if n_lote == 0:
+                continue
+            share = n_novos / n_lote
+            features[col] = {
+                'tipo': 'identificador',
+                'participacao_ids_novos': round(share, 6),
+                'registros_com_id_novo': n_novos,
+                'ids_novos': sorted(new_ids[col])[:20],
+                'n_referencia': len(id_index[col]),
+                'n_lote': n_lote,
+                'status': 'DRIFT' if share >= self.thresholds['ids_novos_significativo'] else
+                          'ATENCAO' if share >= self.thresholds['ids_novos_moderado'] else 'ESTAVEL'
+            }
+
+        for col, ref in categorical_ref.items():
+            if col not in categorical_counts:
+                continue
+            if col == 'dia_semana' and len(days) < self.min_days_weekday:
+                skipped[col] = (f"lote cobre {len(days)} dia(s); dia_semana só é comparado "
+                                f"com {self.min_days_weekday} dias ou mais")
+                continue
+            current = categorical_counts[col]
+            expected = np.asarray(ref['contagens'] + [ref['outros']])
+            if current.sum() == 0:
+                continue
+            psi_value = self.psi(expected, current)
+            current_share = current / current.sum()
+            expected_share = expected / max(expected.sum(), 1)
+            shift = current_share - expected_share
+            top_shift = np.argsort(-np.abs(shift))[:5]
+            labels = ref['categorias'] + ['__outros__']
+            features[col] = {
+                'tipo': 'categorica',
+                'psi': round(psi_value, 6),
+                'n_referencia': int(expected.sum()),
+                'n_lote': int(current.sum()),
+                'maiores_variacoes': {labels[i]: round(float(shift[i]), 6) for i in top_shift},
+                'status': self._classify(psi_value)
+            }
+
+        statuses = [f['status'] for f in features.values()]
+        return {
+            'referencia': profile.get('origem'),
+            'lote': str(filepath),
+            'timestamp': datetime.now().isoformat(),
+            'total_registros_lote': int(total),
+            'limiares': self.thresholds,
+            'dias_no_lote': len(days),
+            'features': features,
+            'features_ignoradas': skipped,
+            'features_com_drift': [col for col, f in features.items() if f['status'] == 'DRIFT'],
+            'features_em_atencao': [col for col, f in features.items() if f['status'] == 'ATENCAO'],
+            'overall_status': 'DRIFT' if 'DRIFT' in statuses else
+                              'ATENCAO' if 'ATENCAO' in statuses else 'ESTAVEL'
+        }
+
+    def print_report(self, report: Dict[str, Any]):
+        """Exibe resultado da comparação"""
+        print(f"\n{'='*60}")
+        print("RELATÓRIO DE DRIFT")
+        print(f"{'='*60}")
+        print(f"Referência: {report['referencia']}")
+        print(f"Lote:       {report['lote']} ({report['total_registros_lote']:,} registros)")
+
+        icons = {'ESTAVEL': '✅', 'ATENCAO': '⚠️ ', 'DRIFT': '❌'}
+        print()
+        for col, feature in report['features'].items():
+            if feature['tipo'] == 'identificador':
+                print(f"  {icons[feature['status']]} {col}: ids novos em "
+                      f"{feature['participacao_ids_novos']:.1%} dos registros ({feature['status']})")
+                continue
+            ks = f", KS={feature['ks']:.3f}" if 'ks' in feature else ''
+            print(f"  {icons[feature['status']]} {col}: PSI={feature['psi']:.3f}{ks} ({feature['status']})")
+        for col, reason in report.get('features_ignoradas', {}).items():
+            print(f"  ⏭️  {col}: não comparada ({reason})")
+
+        print(f"\n{'='*60}")
+        print(f"STATUS GERAL: {report['overall_status']}")
+        print(f"{'='*60}\n")
+
+    def save_report(self, report: Dict[str, Any], output_path: str):
+        """Salva relatório de drift"""
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        if self.verbose:
+            print(f"📄 Relatório de drift salvo em: {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Monitoramento de Drift de Dados de Estoque')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    perfil = subparsers.add_parser('perfil', help='Cria perfil de referência a partir dos dados de treino')
+    perfil.add_argument('filepath', help='Arquivo de dados de treino')
+    perfil.add_argument('--output', '-o', required=True, help='Caminho do perfil JSON')
+    perfil.add_argument('--bins', type=int, default=20, help='Número de bins por feature numérica (padrão: 20)')
+
+    comparar = subparsers.add_parser('comparar', help='Compara um lote com o perfil de referência')
+    comparar.add_argument('profile', help='Perfil de referência JSON')
+    comparar.add_argument('filepath', help='Arquivo do lote a comparar')
+    comparar.add_argument('--output', '-o', help='Caminho para salvar relatório JSON')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'perfil':
+            monitor = DriftMonitor(n_bins=args.bins)
+            profile = monitor.build_profile(args.filepath)
+            monitor.save_profile(profile, args.output)
+            return 0
+
+        monitor = DriftMonitor()
+        report = monitor.compare(monitor.load_profile(args.profile), args.filepath)
+        monitor.print_report(report)
+        if args.output:
+            monitor.save_report(report, args.output)
+        return 1 if report['overall_status'] == 'DRIFT' else 0
+
+    except Exception as e:
+        print(f"\n❌ ERRO CRÍTICO: {str(e)}")
+        return 3
+
+
+if __name__ == "__main__":
+    sys.exit(main())
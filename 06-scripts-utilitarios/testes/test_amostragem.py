@@ -0,0 +1,44 @@
+"""
+Testes da amostragem em passagem única (amostragem)
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from amostragem import STRATUM_COLUMN, ReservoirSampler, allocate
+
+class TestReservoirSampler(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        # Estratos desbalanceados: produtos com participação de 0,2% a ~8%
+        pesos = np.arange(1, 51) / np.arange(1, 51).sum()
+        self.df = pd.DataFrame({
+            'ID_PRODUTO': rng.choice(np.arange(1001, 1051), 20_000, p=pesos),
+            'QUANTIDADE_ESTOQUE': rng.integers(0, 300, 20_000)
+        })
+
+    def sample(self, sample_size, mode, chunksize, check_bounds=False):
+        sampler = ReservoirSampler(sample_size, mode)
+        for start in range(0, len(self.df), chunksize):
+            sampler.add(self.df.iloc[start:start + chunksize])
+            if check_bounds:
+                kept = np.bincount(sampler.kept[STRATUM_COLUMN], minlength=len(sampler.counts))
+                self.assertTrue((kept <= sampler._buffer_bounds()).all())
+                self.assertLessEqual(len(sampler.kept), 2 * sample_size)
+        return sampler.result()
+
+    def test_stratified_quotas(self):
+        """Cada estrato recebe exatamente a cota proporcional; buffer limitado durante a leitura"""
+        sample = self.sample(500, 'produto', 1_000, check_bounds=True)
+        expected = allocate(self.df['ID_PRODUTO'].value_counts().sort_index(), 500)
+        self.assertEqual(len(sample), 500)
+        pd.testing.assert_series_equal(sample['ID_PRODUTO'].value_counts().sort_index(), expected[expected > 0],
+                                       check_names=False)
+
+    def test_independent_of_chunksize(self):
+        """Mesma semente: a amostra não depende do tamanho dos blocos"""
+        for mode in ['aleatoria', 'produto']:
+            pd.testing.assert_frame_equal(self.sample(300, mode, 700), self.sample(300, mode, 20_000))
+
+if __name__ == '__main__':
+    unittest.main()
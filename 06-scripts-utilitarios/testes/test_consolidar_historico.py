@@ -0,0 +1,56 @@
+"""
+Testes do histórico consolidado (consolidar_historico)
+"""
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from consolidar_historico import HistoryStore, HistoryStoreError
+
+class TestHistoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = HistoryStore(str(Path(self.tmp.name) / 'historico'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @staticmethod
+    def delta(rows):
+        return pd.DataFrame(rows, columns=['ID_PRODUTO', 'DIA', 'FLAG_PROMOCAO', 'QUANTIDADE_ESTOQUE'])
+
+    def test_upsert_inserts_and_corrects(self):
+        """Chave (ID_PRODUTO, DIA): linhas novas entram, repetidas são substituídas"""
+        first = self.store.upsert(self.delta([(1001, '30/04/2024', 0, 100), (1001, '01/05/2024', 0, 90),
+                                              (1002, '01/05/2024', 1, 40)]))
+        self.assertEqual(first['carga'], {'inseridos': 3, 'atualizados': 0, 'particoes_reescritas': 2})
+
+        second = self.store.upsert(self.delta([(1002, '01/05/2024', 1, 35), (1001, '02/05/2024', 0, 80)]))
+        self.assertEqual(second['versao'], 2)
+        self.assertEqual(second['carga'], {'inseridos': 1, 'atualizados': 1, 'particoes_reescritas': 1})
+        # Só a partição de maio foi reescrita
+        self.assertEqual(second['particoes']['ano_mes=2024-04'], first['particoes']['ano_mes=2024-04'])
+
+        df = self.store.read()
+        self.assertEqual(len(df), 4)
+        corrigido = df[(df['ID_PRODUTO'] == 1002) & (df['DIA'] == pd.Timestamp('2024-05-01'))]
+        self.assertEqual(corrigido['QUANTIDADE_ESTOQUE'].tolist(), [35])
+        # Snapshot anterior continua legível
+        self.assertEqual(len(self.store.read(version=1)), 3)
+
+    def test_vacuum(self):
+        """vacuum mantém os `keep` snapshots mais recentes e rejeita keep < 1"""
+        for dia in range(1, 5):
+            self.store.upsert(self.delta([(1001, f'0{dia}/05/2024', 0, 100 - dia)]))
+        with self.assertRaises(HistoryStoreError):
+            self.store.vacuum(keep=0)
+        self.assertEqual(self.store.versions(), [1, 2, 3, 4])
+
+        removed = self.store.vacuum(keep=1)
+        self.assertEqual(removed, {'snapshots_removidos': 3, 'arquivos_removidos': 3})
+        self.assertEqual(self.store.versions(), [4])
+        self.assertEqual(len(self.store.read()), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Testes das consultas locais (consultar_estoque)
+"""
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from consolidar_historico import HistoryStore
+from consultar_estoque import QueryEngine
+
+class TestQueryEngine(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        dias = pd.date_range('2024-01-20', periods=30)
+        self.df = pd.DataFrame({
+            'ID_PRODUTO': np.tile(np.arange(1001, 1011), len(dias)),
+            'DIA': np.repeat(dias.strftime('%d/%m/%Y'), 10),
+            'FLAG_PROMOCAO': rng.integers(0, 2, 10 * len(dias)),
+            'QUANTIDADE_ESTOQUE': rng.integers(0, 200, 10 * len(dias))
+        })
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+        self.df.to_csv(self.path / 'historico.csv', index=False)
+        HistoryStore(str(self.path / 'historico')).upsert(self.df)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def expected(self, inicio, fim, produtos):
+        dias = pd.to_datetime(self.df['DIA'], format='%d/%m/%Y')
+        mask = (dias >= inicio) & (dias <= fim) & self.df['ID_PRODUTO'].isin(produtos)
+        return self.df[mask]
+
+    def test_filters_on_store_and_csv(self):
+        """Histórico consolidado e CSV (via cache Parquet) dão o mesmo resultado filtrado"""
+        inicio, fim, produtos = pd.Timestamp('2024-01-31'), pd.Timestamp('2024-02-05'), [1001, 1004]
+        expected = self.expected(inicio, fim, produtos)
+        for source in ['historico', 'historico.csv']:
+            engine = QueryEngine(historico=str(self.path / source), cache_dir=str(self.path / 'cache'))
+            faixas = engine.faixas_estoque(inicio, fim, produtos)
+            self.assertEqual(len(faixas), 6)
+            self.assertEqual(int(faixas['total'].sum()), len(expected))
+            self.assertEqual(int(faixas['critico_0_20'].sum()), int((expected['QUANTIDADE_ESTOQUE'] <= 20).sum()))
+            resumo = engine.produtos(inicio, fim, produtos)
+            self.assertEqual(sorted(resumo['ID_PRODUTO']), produtos)
+            self.assertEqual(resumo['registros'].tolist(), [6, 6])
+        self.assertEqual(len(list((self.path / 'cache').glob('*.parquet'))), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+"""
+Testes da CLI única (estoque.py) e da importação tardia
+"""
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from importacao_tardia import LazyModule, lazy_import
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+# Roda o subcomando no processo e lista quais dependências pesadas foram importadas
+CHECK_IMPORTS = """
+import contextlib, io, sys
+import estoque
+with contextlib.redirect_stdout(io.StringIO()):
+    code = estoque.main(sys.argv[1:])
+print(code, sorted(m for m in ('numpy', 'pandas', 'pyarrow') if m in sys.modules))
+"""
+
+class TestEstoqueCli(unittest.TestCase):
+
+    def test_help_without_heavy_imports(self):
+        """--help dos subcomandos não importa numpy, pandas nem pyarrow"""
+        for command in ['validar', 'converter', 'gerar', 'servir', 'medir']:
+            out = subprocess.run([sys.executable, '-c', CHECK_IMPORTS, command, '--help'], cwd=SCRIPTS_DIR,
+                                 capture_output=True, text=True, timeout=60)
+            self.assertEqual(out.stdout.strip(), '0 []', f"{command}: {out.stdout}{out.stderr}")
+
+    def test_lazy_import(self):
+        """Módulo carregado só no primeiro acesso a atributo; já importado volta direto"""
+        self.assertIs(lazy_import('sys'), sys)
+        module = lazy_import('colorsys')
+        if 'colorsys' not in sys.modules:
+            self.assertIsInstance(module, LazyModule)
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Testes do mapeamento de layouts (mapear_layout)
+"""
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import pandas as pd
+import mapear_layout
+from mapear_layout import ProductCodeMap
+from validar_dados import DataValidator
+
+DADOS = Path(__file__).resolve().parent.parent.parent / '01-Dados'
+
+class TestMapearLayout(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+        self.product_map = str(self.path / 'dicionario.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_csv_round_trip_validates(self):
+        """CSV mapeado volta com DIA em dd/mm/aaaa e passa na validação"""
+        output = str(self.path / 'mapeado.csv')
+        argv = ['mapear_layout.py', str(DADOS / 'vendas_historicas_estoque_1000_registros.csv'), output,
+                '--product-map', self.product_map]
+        with mock.patch.object(sys, 'argv', argv):
+            self.assertEqual(mapear_layout.main(), 0)
+        df = pd.read_csv(output, encoding='utf-8-sig')
+        self.assertTrue(pd.to_datetime(df['DIA'], format='%d/%m/%Y', errors='coerce').notna().all())
+        validator = DataValidator(verbose=False, product_map_path=self.product_map)
+        results = validator.validate(output)
+        self.assertEqual(results['overall_status'], 'PASS')
+        self.assertEqual(validator.results['errors'], [])
+
+    def test_concurrent_maps_do_not_collide(self):
+        """Dois mapeamentos do mesmo dicionário: códigos diferentes nunca dividem um id"""
+        first, second = ProductCodeMap(self.product_map), ProductCodeMap(self.product_map)
+        ids_a = first.lookup(['A1', 'B1'])[:-1]
+        ids_b = second.lookup(['B1', 'C1'])[:-1]
+        self.assertEqual(ids_b[0], ids_a[1])
+        stored = ProductCodeMap(self.product_map).codes
+        self.assertEqual(stored, {'A1': 2001, 'B1': 2002, 'C1': 2003})
+
+    def test_read_only_does_not_write(self):
+        """Somente leitura (validador): ids em memória, dicionário intocado"""
+        ProductCodeMap(self.product_map).lookup(['A1'])
+        reader = ProductCodeMap(self.product_map, read_only=True)
+        reader.lookup(['Z9'])
+        reader.save()
+        self.assertEqual(ProductCodeMap(self.product_map).codes, {'A1': 2001})
+
+if __name__ == '__main__':
+    unittest.main()
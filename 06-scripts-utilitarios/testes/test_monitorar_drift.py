@@ -0,0 +1,64 @@
+"""
+Testes do monitoramento de drift (monitorar_drift)
+"""
+import tempfile
+import unittest
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from monitorar_drift import DriftMonitor
+
+class TestDriftMonitor(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        dias = pd.date_range('2024-01-01', periods=56)
+        ids = np.arange(1001, 1051)
+        self.df = pd.DataFrame({
+            'ID': np.arange(1, len(dias) * len(ids) + 1),
+            'ID_PRODUTO': np.tile(ids, len(dias)),
+            'DIA': np.repeat(dias.strftime('%d/%m/%Y'), len(ids)),
+            'FLAG_PROMOCAO': (rng.random(len(dias) * len(ids)) < 0.3).astype(int),
+            'QUANTIDADE_ESTOQUE': rng.integers(0, 300, len(dias) * len(ids))
+        })
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+        self.df.to_csv(self.path / 'referencia.csv', index=False)
+        self.monitor = DriftMonitor(verbose=False, chunksize=500)
+        self.profile = self.monitor.build_profile(str(self.path / 'referencia.csv'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def compare(self, df):
+        df.to_csv(self.path / 'lote.csv', index=False)
+        return self.monitor.compare(self.profile, str(self.path / 'lote.csv'))
+
+    def test_single_day_feed(self):
+        """Um dia com parte dos produtos: dia_semana ignorado e ids conhecidos estáveis"""
+        report = self.compare(self.df[(self.df['DIA'] == '02/01/2024') & (self.df['ID_PRODUTO'] < 1021)])
+        self.assertEqual(report['dias_no_lote'], 1)
+        self.assertNotIn('dia_semana', report['features'])
+        self.assertIn('dia_semana', report['features_ignoradas'])
+        self.assertEqual(report['features']['ID_PRODUTO']['status'], 'ESTAVEL')
+        self.assertNotIn('ID_PRODUTO', report['features_com_drift'])
+
+    def test_week_and_new_products(self):
+        """Com uma semana inteira dia_semana é comparado; ids fora da referência contam como drift"""
+        semana = self.df[self.df['DIA'].isin(pd.date_range('2024-01-08', periods=7).strftime('%d/%m/%Y'))].copy()
+        semana.loc[semana.index[:len(semana) // 10], 'ID_PRODUTO'] = 9999
+        report = self.compare(semana)
+        self.assertEqual(report['features']['dia_semana']['status'], 'ESTAVEL')
+        produto = report['features']['ID_PRODUTO']
+        self.assertEqual(produto['status'], 'DRIFT')
+        self.assertEqual(produto['ids_novos'], ['9999'])
+
+    def test_profile_in_chunks(self):
+        """Perfil em blocos: contagens e momentos batem com o arquivo inteiro"""
+        numerica = self.profile['numericas']['QUANTIDADE_ESTOQUE']
+        self.assertEqual(sum(numerica['contagens']), len(self.df))
+        self.assertAlmostEqual(numerica['media'], self.df['QUANTIDADE_ESTOQUE'].mean())
+        self.assertAlmostEqual(numerica['desvio_padrao'], self.df['QUANTIDADE_ESTOQUE'].std(ddof=0))
+
+if __name__ == '__main__':
+    unittest.main()
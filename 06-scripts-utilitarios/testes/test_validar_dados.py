@@ -0,0 +1,60 @@
+"""
+Testes do validador de dados (validar_dados)
+"""
+import json
+import tempfile
+import unittest
+from pathlib import Path
+import pandas as pd
+from validar_dados import DataValidator
+
+DADOS = Path(__file__).resolve().parent.parent.parent / '01-Dados'
+
+class TestDataValidator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name)
+        self.filepath = str(DADOS / 'historico_vendas_estoque_prod2.csv')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeated_jsonl_output(self):
+        """Repetir a saída jsonl sobrescreve o arquivo; --append acrescenta"""
+        validator = DataValidator(verbose=False)
+        results = validator.validate(self.filepath)
+        output = str(self.path / 'registros.jsonl')
+        validator.write_records(results, 'jsonl', output)
+        first = Path(output).read_text(encoding='utf-8').splitlines()
+        validator.write_records(results, 'jsonl', output)
+        self.assertEqual(Path(output).read_text(encoding='utf-8').splitlines(), first)
+        validator.write_records(results, 'jsonl', output, append=True)
+        lines = Path(output).read_text(encoding='utf-8').splitlines()
+        self.assertEqual(len(lines), 2 * len(first))
+        self.assertTrue(all('regra' in json.loads(line) for line in lines))
+
+    def test_report_cache(self):
+        """Mesmo arquivo e mesmas regras: o segundo relatório vem do cache"""
+        cache_dir = str(self.path / 'cache')
+        first = DataValidator(cache_dir=cache_dir, verbose=False).validate(self.filepath)
+        second = DataValidator(cache_dir=cache_dir, verbose=False).validate(self.filepath)
+        self.assertFalse(first.get('cache', False))
+        self.assertTrue(second['cache'])
+        self.assertEqual(second['overall_status'], first['overall_status'])
+
+    def test_temporal_consistency(self):
+        """Duplicatas, lacunas e aumentos de estoque por produto, sem misturar produtos"""
+        df = pd.DataFrame({
+            'ID_PRODUTO': [1001, 1001, 1001, 1001, 1002, 1002],
+            'DIA': ['01/01/2024', '02/01/2024', '02/01/2024', '05/01/2024', '01/01/2024', '02/01/2024'],
+            'QUANTIDADE_ESTOQUE': [100, 90, 90, 120, 10, 5]
+        })
+        temporal = DataValidator(verbose=False).check_temporal_consistency(df.sample(frac=1, random_state=1))
+        self.assertEqual(temporal['series'], 2)
+        self.assertEqual(temporal['datas_repetidas'], 2)
+        self.assertEqual((temporal['lacunas'], temporal['maior_lacuna_dias']), (1, 2))
+        self.assertEqual((temporal['aumentos_sem_reposicao'], temporal['series_com_aumento']), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
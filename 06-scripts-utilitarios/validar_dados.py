@@ -9,26 +9,154 @@ Validações implementadas:
 - Integridade referencial
 - Qualidade estatística dos dados
 """
+from __future__ import annotations
 
-import pandas as pd
-import numpy as np
 import json
 import argparse
+import hashlib
+import os
 from pathlib import Path
 from datetime import datetime, timedelta
 import warnings
 from typing import Dict, List, Tuple, Optional, Any
 import sys
+import time
+from contextlib import contextmanager
+
+from importacao_tardia import lazy_import
+from instrumentacao import TRACER, span
+from mapear_layout import DEFAULT_PRODUCT_MAP, LAYOUTS, LayoutMapper, ProductCodeMap
+from consolidar_historico import HistoryStore, is_store, split_snapshot
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / '02-sagemaker-canvas' / 'modelo_previsao_vendas'
+if str(MODEL_DIR) not in sys.path:
+    sys.path.insert(0, str(MODEL_DIR))
+
+# Catálogo de produtos (sem catálogo configurado: faixa 1001-1050)
+from product_catalog import load_catalog
+
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
 
 warnings.filterwarnings('ignore')
 
+# Formatos de saída legíveis por máquina (um registro por regra)
+RECORD_FORMATS = ['jsonl', 'ndjson', 'parquet']
+
+def json_default(obj: Any) -> Any:
+    """Serializa escalares numpy/pandas com o tipo nativo (e não como string)"""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+class ValidationCache:
+    """
+    Cache de relatórios de validação em disco.
+
+    A chave combina a impressão digital do arquivo de dados com o hash do
+    conjunto de regras ativo (schema, regras, layouts e código do validador),
+    de modo que qualquer mudança nas regras invalida as entradas antigas.
+    """
+    
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    @staticmethod
+    def file_fingerprint(filepath: str, block_size: int = 1 << 20) -> str:
+        """Hash do conteúdo do arquivo (Parquet: rodapé de metadados + tamanho)"""
+        if is_store(filepath):
+            # Snapshots são imutáveis: o manifesto identifica o conteúdo
+            root, version = split_snapshot(filepath)
+            manifest = HistoryStore(root).snapshot(version)
+            return hashlib.blake2b(json.dumps(manifest['particoes'], sort_keys=True).encode(),
+                                   digest_size=20).hexdigest()
+        path = Path(filepath)
+        digest = hashlib.blake2b(digest_size=20)
+        size = path.stat().st_size
+        digest.update(str(size).encode())
+        
+        with open(path, 'rb') as f:
+            if path.suffix.lower() == '.parquet' and size > 12:
+                # Rodapé Parquet: <metadados><tamanho 4 bytes LE>'PAR1'. Os metadados
+                # trazem offsets e estatísticas de cada row group, sem ler os dados.
+                f.seek(size - 8)
+                footer_len = int.from_bytes(f.read(4), 'little')
+                if f.read(4) == b'PAR1' and footer_len + 8 <= size:
+                    f.seek(size - 8 - footer_len)
+                    digest.update(f.read(footer_len))
+                    return digest.hexdigest()
+                f.seek(0)
+            
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        
+        return digest.hexdigest()
+    
+    @staticmethod
+    def rules_fingerprint(validator: 'DataValidator') -> str:
+        """Hash do conjunto de regras ativo do validador"""
+        digest = hashlib.blake2b(digest_size=20)
+        rules = {
+            'schema': validator.schema,
+            'validation_rules': validator.validation_rules,
+            'temporal_layouts': validator.temporal_layouts,
+            'layouts': LAYOUTS,
+            'codigos_produto': validator.layout_mapper.product_map.codes,
+            'catalogo': validator.catalog.fingerprint
+        }
+        digest.update(json.dumps(rules, sort_keys=True, default=str).encode())
+        # O código das regras (e do mapeamento de layout) também faz parte da versão
+        digest.update(Path(__file__).read_bytes())
+        digest.update(Path(__file__).with_name('mapear_layout.py').read_bytes())
+        return digest.hexdigest()
+    
+    def key(self, filepath: str, validator: 'DataValidator') -> str:
+        return f"{self.file_fingerprint(filepath)}-{self.rules_fingerprint(validator)}"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.cache_dir / f"{key}.json"
+        if not path.exists():
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+    
+    def put(self, key: str, report: Dict[str, Any]):
+        # Escrita atômica: várias etapas do pipeline podem validar em paralelo
+        path = self.cache_dir / f"{key}.json"
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, default=json_default)
+        os.replace(tmp_path, path)
+
 class DataValidator:
     """Validador completo de dados de estoque"""
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, verbose: bool = True,
+                 product_map_path: Optional[str] = None, catalog_path: Optional[str] = None):
+        self.cache = ValidationCache(cache_dir) if cache_dir else None
+        self.verbose = verbose
+        # Outros layouts (ex.: vendas_historicas) são mapeados para o canônico antes
+        # das regras; o dicionário de produtos é só lido (o conversor é quem grava)
+        self.layout_mapper = LayoutMapper(ProductCodeMap(product_map_path, read_only=True))
+        self.layout = None
+        # Produtos válidos: o catálogo (só o manifesto é lido aqui; os ids são
+        # mapeados sob demanda na regra de produtos)
+        self.catalog = load_catalog(catalog_path)
+        id_min, id_max = self.catalog.id_range()
+        
         self.schema = {
             'ID': {'type': 'int', 'required': True, 'min': 1},
-            'ID_PRODUTO': {'type': 'int', 'required': True, 'min': 1001, 'max': 1050},
+            'ID_PRODUTO': {'type': 'int', 'required': True, 'min': id_min, 'max': id_max},
             'DIA': {'type': 'date', 'required': True, 'format': '%d/%m/%Y'},
             'FLAG_PROMOCAO': {'type': 'int', 'required': True, 'values': [0, 1]},
             'QUANTIDADE_ESTOQUE': {'type': 'int', 'required': True, 'min': 0, 'max': 1000}
@@ -56,6 +184,32 @@ class DataValidator:
             ]
         }
         
+        # Layouts suportados pela verificação temporal por produto
+        self.temporal_layouts = {
+            # vendas_historicas já mapeado: série produto + região, com reconciliação de vendas
+            'mapeado': {
+                'serie': ['ID_PRODUTO', 'REGIAO'],
+                'data': 'DIA',
+                'data_formato': '%d/%m/%Y',
+                'estoque': 'QUANTIDADE_ESTOQUE',
+                'vendas': 'VENDAS'
+            },
+            'canonico': {
+                'serie': ['ID_PRODUTO'],
+                'data': 'DIA',
+                'data_formato': '%d/%m/%Y',
+                'estoque': 'QUANTIDADE_ESTOQUE',
+                'vendas': None
+            },
+            'vendas_historicas': {
+                'serie': ['product_id', 'region'],
+                'data': 'date',
+                'data_formato': '%Y-%m-%d',
+                'estoque': 'stock_level',
+                'vendas': 'units_sold'
+            }
+        }
+
         self.results = {
             'passed': [],
             'warnings': [],
@@ -65,7 +219,16 @@ class DataValidator:
         }
     
     def load_data(self, filepath: str) -> pd.DataFrame:
-        """Carrega dados do arquivo"""
+        """Carrega dados do arquivo (ou de um snapshot do histórico consolidado)"""
+        if is_store(filepath):
+            root, version = split_snapshot(filepath)
+            store = HistoryStore(root)
+            version = store.snapshot(version)['versao']
+            df = store.read(version)
+            if self.verbose:
+                print(f"✅ Snapshot {version} do histórico carregado: {len(df)} registros, {len(df.columns)} colunas")
+            return df
+        
         path = Path(filepath)
         
         if not path.exists():
@@ -75,83 +238,114 @@ class DataValidator:
         suffix = path.suffix.lower()
         
         try:
-            if suffix == '.csv':
-                df = pd.read_csv(filepath, encoding='utf-8-sig')
-            elif suffix == '.parquet':
-                df = pd.read_parquet(filepath)
-            elif suffix == '.json':
-                df = pd.read_json(filepath)
-            elif suffix == '.xlsx':
-                df = pd.read_excel(filepath)
-            else:
-                raise ValueError(f"Formato não suportado: {suffix}")
+            with span('validar.leitura', formato=suffix) as read_span:
+                if suffix == '.csv':
+                    df = pd.read_csv(filepath, encoding='utf-8-sig')
+                elif suffix == '.parquet':
+                    df = pd.read_parquet(filepath)
+                elif suffix == '.json':
+                    df = pd.read_json(filepath)
+                elif suffix == '.xlsx':
+                    df = pd.read_excel(filepath)
+                else:
+                    raise ValueError(f"Formato não suportado: {suffix}")
+                read_span.rows = len(df)
             
-            print(f"✅ Dados carregados: {len(df)} registros, {len(df.columns)} colunas")
+            if self.verbose:
+                print(f"✅ Dados carregados: {len(df)} registros, {len(df.columns)} colunas")
             return df
             
         except Exception as e:
             raise Exception(f"Erro ao carregar arquivo {filepath}: {str(e)}")
     
+    @contextmanager
+    def rule(self, stage: Dict[str, Any], name: str):
+        """
+        Cronometra uma regra da etapa e registra, em stage['regras'], o status,
+        as contagens e as mensagens que a regra acrescentou à etapa
+        """
+        keys = ('errors', 'warnings', 'issues', 'suggestions')
+        before = {key: len(stage.get(key, [])) for key in keys}
+        start = time.perf_counter()
+        yield
+        elapsed = round((time.perf_counter() - start) * 1000, 3)
+        new = {key: stage.get(key, [])[before[key]:] for key in keys}
+        errors, warnings_ = new['errors'], new['warnings'] + new['issues']
+        stage.setdefault('regras', []).append({
+            'regra': name,
+            'status': 'FAIL' if errors else 'WARN' if warnings_ else 'PASS',
+            'duracao_ms': elapsed,
+            'erros': len(errors),
+            'avisos': len(warnings_),
+            'sugestoes': len(new['suggestions']),
+            'mensagens': [str(m) for m in errors + warnings_ + new['suggestions']]
+        })
+    
     def validate_schema(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Valida schema e tipos de dados"""
         schema_results = {'passed': 0, 'errors': []}
         
         # Verifica colunas obrigatórias
-        required_cols = [col for col, rules in self.schema.items() if rules.get('required', False)]
-        missing_cols = [col for col in required_cols if col not in df.columns]
+        with self.rule(schema_results, 'colunas_obrigatorias'):
+            required_cols = [col for col, rules in self.schema.items() if rules.get('required', False)]
+            missing_cols = [col for col in required_cols if col not in df.columns]
         
-        if missing_cols:
-            error_msg = f"Colunas obrigatórias ausentes: {missing_cols}"
-            schema_results['errors'].append(error_msg)
-            self.results['errors'].append(error_msg)
+            if missing_cols:
+                error_msg = f"Colunas obrigatórias ausentes: {missing_cols}"
+                schema_results['errors'].append(error_msg)
+                self.results['errors'].append(error_msg)
         
         # Valida cada coluna
         for column, rules in self.schema.items():
             if column not in df.columns:
                 continue
                 
-            col_data = df[column]
+            with self.rule(schema_results, f'coluna_{column}'):
+                col_data = df[column]
             
-            # Valida tipo de dados
-            if rules['type'] == 'int':
-                if not pd.api.types.is_integer_dtype(col_data):
+                # Valida tipo de dados
+                if rules['type'] == 'int':
+                    if not pd.api.types.is_integer_dtype(col_data):
+                        try:
+                            df[column] = pd.to_numeric(col_data, errors='coerce').astype('Int64')
+                        except:
+                            error_msg = f"Coluna {column}: Tipo deve ser inteiro"
+                            schema_results['errors'].append(error_msg)
+            
+                elif rules['type'] == 'date':
                     try:
-                        df[column] = pd.to_numeric(col_data, errors='coerce').astype('Int64')
+                        df[column] = pd.to_datetime(col_data, format='%d/%m/%Y', errors='coerce')
+                        invalid_dates = col_data.isna().sum()
+                        if invalid_dates > 0:
+                            error_msg = f"Coluna {column}: {invalid_dates} datas inválidas"
+                            schema_results['errors'].append(error_msg)
                     except:
-                        error_msg = f"Coluna {column}: Tipo deve ser inteiro"
+                        error_msg = f"Coluna {column}: Formato de data inválido (esperado dd/mm/aaaa)"
                         schema_results['errors'].append(error_msg)
             
-            elif rules['type'] == 'date':
-                try:
-                    df[column] = pd.to_datetime(col_data, format='%d/%m/%Y', errors='coerce')
-                    invalid_dates = col_data.isna().sum()
-                    if invalid_dates > 0:
-                        error_msg = f"Coluna {column}: {invalid_dates} datas inválidas"
+                # Valida valores mínimos/máximos (ids de códigos mapeados ficam fora da faixa)
+                values = df[column]
+                if column == 'ID_PRODUTO':
+                    values = values[~self.mapped_products(values)]
+                if 'min' in rules:
+                    below_min = (values < rules['min']).sum()
+                    if below_min > 0:
+                        error_msg = f"Coluna {column}: {below_min} valores abaixo do mínimo ({rules['min']})"
+                        schema_results['errors'].append(error_msg)
+            
+                if 'max' in rules:
+                    above_max = (values > rules['max']).sum()
+                    if above_max > 0:
+                        error_msg = f"Coluna {column}: {above_max} valores acima do máximo ({rules['max']})"
+                        schema_results['errors'].append(error_msg)
+            
+                # Valida valores permitidos
+                if 'values' in rules:
+                    invalid_values = ~df[column].isin(rules['values'])
+                    invalid_count = invalid_values.sum()
+                    if invalid_count > 0:
+                        error_msg = f"Coluna {column}: {invalid_count} valores fora do conjunto permitido {rules['values']}"
                         schema_results['errors'].append(error_msg)
-                except:
-                    error_msg = f"Coluna {column}: Formato de data inválido (esperado dd/mm/aaaa)"
-                    schema_results['errors'].append(error_msg)
-            
-            # Valida valores mínimos/máximos
-            if 'min' in rules:
-                below_min = (df[column] < rules['min']).sum()
-                if below_min > 0:
-                    error_msg = f"Coluna {column}: {below_min} valores abaixo do mínimo ({rules['min']})"
-                    schema_results['errors'].append(error_msg)
-            
-            if 'max' in rules:
-                above_max = (df[column] > rules['max']).sum()
-                if above_max > 0:
-                    error_msg = f"Coluna {column}: {above_max} valores acima do máximo ({rules['max']})"
-                    schema_results['errors'].append(error_msg)
-            
-            # Valida valores permitidos
-            if 'values' in rules:
-                invalid_values = ~df[column].isin(rules['values'])
-                invalid_count = invalid_values.sum()
-                if invalid_count > 0:
-                    error_msg = f"Coluna {column}: {invalid_count} valores fora do conjunto permitido {rules['values']}"
-                    schema_results['errors'].append(error_msg)
         
         schema_results['passed'] = len(schema_results['errors']) == 0
         if schema_results['passed']:
@@ -159,54 +353,78 @@ class DataValidator:
         
         return schema_results
     
+    def mapped_products(self, ids: pd.Series) -> pd.Series:
+        """Máscara dos ids atribuídos pelo dicionário de códigos de produto"""
+        return ids.isin(list(self.layout_mapper.product_map.codes.values()))
+    
     def validate_business_rules(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Valida regras de negócio"""
         business_results = {'passed': 0, 'warnings': [], 'errors': []}
         
         # 1. Estoque não pode ser negativo
-        negative_stock = (df['QUANTIDADE_ESTOQUE'] < 0).sum()
-        if negative_stock > 0:
-            error_msg = f"Estoque negativo: {negative_stock} registros com estoque negativo"
-            business_results['errors'].append(error_msg)
-            self.results['errors'].append(error_msg)
+        with self.rule(business_results, 'estoque_negativo'):
+            if 'QUANTIDADE_ESTOQUE' in df.columns:
+                negative_stock = (df['QUANTIDADE_ESTOQUE'] < 0).sum()
+                if negative_stock > 0:
+                    error_msg = f"Estoque negativo: {negative_stock} registros com estoque negativo"
+                    business_results['errors'].append(error_msg)
+                    self.results['errors'].append(error_msg)
         
         # 2. Flag promoção deve ser 0 ou 1
-        invalid_promo = ~df['FLAG_PROMOCAO'].isin([0, 1])
-        invalid_promo_count = invalid_promo.sum()
-        if invalid_promo_count > 0:
-            error_msg = f"Flag promoção inválida: {invalid_promo_count} registros com valores diferentes de 0/1"
-            business_results['errors'].append(error_msg)
-            self.results['errors'].append(error_msg)
+        with self.rule(business_results, 'flag_promocao'):
+            if 'FLAG_PROMOCAO' in df.columns:
+                invalid_promo = ~df['FLAG_PROMOCAO'].isin([0, 1])
+                invalid_promo_count = invalid_promo.sum()
+                if invalid_promo_count > 0:
+                    error_msg = f"Flag promoção inválida: {invalid_promo_count} registros com valores diferentes de 0/1"
+                    business_results['errors'].append(error_msg)
+                    self.results['errors'].append(error_msg)
         
-        # 3. IDs de produto devem estar no range válido
-        valid_products = df['ID_PRODUTO'].between(1001, 1050)
-        invalid_products = (~valid_products).sum()
-        if invalid_products > 0:
-            error_msg = f"IDs de produto inválidos: {invalid_products} registros fora do range 1001-1050"
-            business_results['errors'].append(error_msg)
-            self.results['errors'].append(error_msg)
+        # 3. IDs de produto devem estar no catálogo (ou no dicionário de códigos mapeados)
+        with self.rule(business_results, 'produtos_catalogo'):
+            if 'ID_PRODUTO' in df.columns:
+                valid_products = self.catalog.contains(df['ID_PRODUTO'].to_numpy()) | \
+                    self.mapped_products(df['ID_PRODUTO']).to_numpy()
+                invalid_products = (~valid_products).sum()
+                if invalid_products > 0:
+                    error_msg = (f"IDs de produto inválidos: {invalid_products} registros fora do catálogo "
+                                 f"({len(self.catalog)} produtos)")
+                    business_results['errors'].append(error_msg)
+                    self.results['errors'].append(error_msg)
         
-        # 4. Verifica sequência temporal
-        if 'DIA' in df.columns:
-            try:
-                df['DIA_DATE'] = pd.to_datetime(df['DIA'], format='%d/%m/%Y')
-                date_range = df['DIA_DATE'].max() - df['DIA_DATE'].min()
-                if date_range.days < 0:
-                    warning_msg = "Datas fora de ordem cronológica"
+        # 4. Consistência temporal por produto (datas sequenciais, estoque decrescente,
+        #    duplicatas produto/dia e reconciliação vendas x estoque)
+        with self.rule(business_results, 'consistencia_temporal'):
+            temporal = self.check_temporal_consistency(df)
+            if temporal:
+                business_results['consistencia_temporal'] = temporal
+            
+                if temporal['datas_repetidas'] > 0:
+                    warning_msg = f"Possíveis duplicatas: {temporal['datas_repetidas']} registros com mesmo produto/dia"
+                    business_results['warnings'].append(warning_msg)
+                    self.results['warnings'].append(warning_msg)
+            
+                if temporal['aumentos_sem_reposicao'] > 0:
+                    warning_msg = (f"Estoque crescente sem reposição: {temporal['aumentos_sem_reposicao']} "
+                                   f"transições com aumento de estoque em {temporal['series_com_aumento']} produtos")
+                    business_results['warnings'].append(warning_msg)
+                    self.results['warnings'].append(warning_msg)
+            
+                if temporal['lacunas'] > 0:
+                    gap = temporal['maior_lacuna_dias']
+                    suggestion = (f"Lacunas temporais: {temporal['lacunas']} intervalos sem registro "
+                                  f"(maior lacuna: {gap} {'dia' if gap == 1 else 'dias'})")
+                    business_results.setdefault('suggestions', []).append(suggestion)
+                    self.results['suggestions'].append(suggestion)
+            
+                reconciliacao = temporal.get('reconciliacao_vendas')
+                if reconciliacao and reconciliacao['divergencias'] > 0:
+                    warning_msg = (f"Vendas x estoque divergentes: {reconciliacao['divergencias']} de "
+                                   f"{reconciliacao['transicoes_avaliadas']} transições diárias não fecham "
+                                   f"(reposição implícita: {reconciliacao['reposicao_implicita']}, "
+                                   f"perdas: {reconciliacao['perdas']})")
                     business_results['warnings'].append(warning_msg)
                     self.results['warnings'].append(warning_msg)
-            except:
-                pass
-        
-        # 5. Verifica duplicatas por produto/dia
-        duplicate_check = ['ID_PRODUTO', 'DIA']
-        if all(col in df.columns for col in duplicate_check):
-            duplicates = df.duplicated(subset=duplicate_check, keep=False)
-            duplicate_count = duplicates.sum()
-            if duplicate_count > 0:
-                warning_msg = f"Possíveis duplicatas: {duplicate_count} registros com mesmo produto/dia"
-                business_results['warnings'].append(warning_msg)
-                self.results['warnings'].append(warning_msg)
         
         business_results['passed'] = len(business_results['errors']) == 0
         if business_results['passed']:
@@ -214,67 +432,167 @@ class DataValidator:
         
         return business_results
     
+    def detect_temporal_layout(self, df: pd.DataFrame) -> Optional[str]:
+        """Identifica o layout do arquivo para a verificação temporal"""
+        for name, layout in self.temporal_layouts.items():
+            key_cols = [layout['serie'][0], layout['data'], layout['estoque']]
+            if name == 'mapeado':
+                key_cols.append(layout['vendas'])
+            if all(col in df.columns for col in key_cols):
+                return name
+        return None
+
+    def check_temporal_consistency(self, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Verifica a consistência temporal de cada série produto/dia.
+
+        Ordena os registros por (produto, dia) uma única vez e compara cada
+        linha com a anterior usando arrays numpy, sem laços por produto:
+        - datas repetidas (mesmo produto/dia)
+        - lacunas de dias entre registros consecutivos
+        - aumentos de estoque sem reposição registrada
+        - reconciliação units_sold x variação de stock_level (layout vendas_historicas)
+        """
+        layout_name = self.detect_temporal_layout(df)
+        if layout_name is None:
+            return {}
+        layout = self.temporal_layouts[layout_name]
+
+        # Datas em dias inteiros (registros sem data válida ficam fora da verificação)
+        dates = df[layout['data']]
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates, format=layout['data_formato'], errors='coerce')
+        stock = pd.to_numeric(df[layout['estoque']], errors='coerce')
+        valid = (dates.notna() & stock.notna()).to_numpy()
+
+        days = dates.to_numpy()[valid].astype('datetime64[D]').astype(np.int64)
+        stock = stock.to_numpy(dtype=float, na_value=np.nan)[valid]
+
+        # Código inteiro por série (produto, ou produto + região)
+        serie_cols = [col for col in layout['serie'] if col in df.columns]
+        if len(serie_cols) == 1:
+            serie = pd.factorize(df[serie_cols[0]])[0][valid]
+        else:
+            serie = df[serie_cols].groupby(serie_cols, sort=False, dropna=False).ngroup().to_numpy()[valid]
+
+        # Chave única série/dia: um argsort de int64 em vez de lexsort em duas chaves
+        if len(days):
+            offset = days - days.min()
+            order = np.argsort(serie.astype(np.int64) * (int(offset.max()) + 1) + offset, kind='stable')
+        else:
+            order = np.arange(0)
+        serie, days, stock = serie[order], days[order], stock[order]
+
+        same_serie = serie[1:] == serie[:-1]
+        day_diff = np.diff(days)
+        stock_diff = np.diff(stock)
+
+        repeated = same_serie & (day_diff == 0)
+        gaps = same_serie & (day_diff > 1)
+        increases = same_serie & (day_diff > 0) & (stock_diff > 0)
+
+        # Linhas envolvidas em repetições (equivalente a duplicated(keep=False))
+        repeated_rows = np.zeros(len(days), dtype=bool)
+        repeated_rows[1:] |= repeated
+        repeated_rows[:-1] |= repeated
+
+        result = {
+            'layout': layout_name,
+            'registros_avaliados': int(len(days)),
+            'series': int(len(days) and 1 + (~same_serie).sum()),
+            'datas_repetidas': int(repeated_rows.sum()),
+            'lacunas': int(gaps.sum()),
+            'maior_lacuna_dias': int(day_diff[gaps].max() - 1) if gaps.any() else 0,
+            'aumentos_sem_reposicao': int(increases.sum()),
+            'series_com_aumento': int(len(np.unique(serie[1:][increases])))
+        }
+
+        # Reconciliação: estoque_anterior - vendas_do_dia deve igualar estoque_do_dia
+        sales_col = layout['vendas']
+        if sales_col and sales_col in df.columns:
+            sales = pd.to_numeric(df[sales_col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)[valid][order]
+            consecutive = same_serie & (day_diff == 1) & ~np.isnan(sales[1:])
+            residual = (stock[:-1] - sales[1:] - stock[1:])[consecutive]
+
+            # Aumentos explicados por reposição não são inconsistência neste layout
+            result['aumentos_sem_reposicao'] = 0
+            result['series_com_aumento'] = 0
+            result['reconciliacao_vendas'] = {
+                'transicoes_avaliadas': int(consecutive.sum()),
+                'divergencias': int((residual != 0).sum()),
+                'reposicao_implicita': int((residual < 0).sum()),
+                'unidades_repostas': float(-residual[residual < 0].sum()),
+                'perdas': int((residual > 0).sum()),
+                'unidades_perdidas': float(residual[residual > 0].sum())
+            }
+
+        return result
+
     def validate_statistical_quality(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Valida qualidade estatística dos dados"""
         stats_results = {'passed': 0, 'warnings': [], 'suggestions': []}
         
         # 1. Completude dos dados
-        total_cells = df.size
-        missing_cells = df.isna().sum().sum()
-        completeness_rate = 1 - (missing_cells / total_cells)
+        with self.rule(stats_results, 'completude'):
+            total_cells = df.size
+            missing_cells = df.isna().sum().sum()
+            completeness_rate = 1 - (missing_cells / total_cells)
         
-        if completeness_rate < 0.95:
-            warning_msg = f"Baixa completude: {missing_cells} valores ausentes ({completeness_rate:.1%} completos)"
-            stats_results['warnings'].append(warning_msg)
-            self.results['warnings'].append(warning_msg)
-        else:
-            stats_results['suggestions'].append(f"Completude excelente: {completeness_rate:.1%}")
+            if completeness_rate < 0.95:
+                warning_msg = f"Baixa completude: {missing_cells} valores ausentes ({completeness_rate:.1%} completos)"
+                stats_results['warnings'].append(warning_msg)
+                self.results['warnings'].append(warning_msg)
+            else:
+                stats_results['suggestions'].append(f"Completude excelente: {completeness_rate:.1%}")
         
         # 2. Outliers usando IQR (para estoque)
-        if 'QUANTIDADE_ESTOQUE' in df.columns:
-            Q1 = df['QUANTIDADE_ESTOQUE'].quantile(0.25)
-            Q3 = df['QUANTIDADE_ESTOQUE'].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
+        with self.rule(stats_results, 'outliers_estoque'):
+            if 'QUANTIDADE_ESTOQUE' in df.columns:
+                Q1 = df['QUANTIDADE_ESTOQUE'].quantile(0.25)
+                Q3 = df['QUANTIDADE_ESTOQUE'].quantile(0.75)
+                IQR = Q3 - Q1
+                lower_bound = Q1 - 1.5 * IQR
+                upper_bound = Q3 + 1.5 * IQR
             
-            outliers = df[(df['QUANTIDADE_ESTOQUE'] < lower_bound) | 
-                         (df['QUANTIDADE_ESTOQUE'] > upper_bound)]
-            outlier_count = len(outliers)
+                outliers = df[(df['QUANTIDADE_ESTOQUE'] < lower_bound) | 
+                             (df['QUANTIDADE_ESTOQUE'] > upper_bound)]
+                outlier_count = len(outliers)
             
-            if outlier_count > 0:
-                warning_msg = f"Possíveis outliers: {outlier_count} registros fora do range [{lower_bound:.0f}, {upper_bound:.0f}]"
-                stats_results['warnings'].append(warning_msg)
-                self.results['warnings'].append(warning_msg)
+                if outlier_count > 0:
+                    warning_msg = f"Possíveis outliers: {outlier_count} registros fora do range [{lower_bound:.0f}, {upper_bound:.0f}]"
+                    stats_results['warnings'].append(warning_msg)
+                    self.results['warnings'].append(warning_msg)
         
         # 3. Distribuição de estoque
-        if 'QUANTIDADE_ESTOQUE' in df.columns:
-            stock_stats = {
-                'mean': df['QUANTIDADE_ESTOQUE'].mean(),
-                'std': df['QUANTIDADE_ESTOQUE'].std(),
-                'min': df['QUANTIDADE_ESTOQUE'].min(),
-                'max': df['QUANTIDADE_ESTOQUE'].max(),
-                'median': df['QUANTIDADE_ESTOQUE'].median()
-            }
+        with self.rule(stats_results, 'distribuicao_estoque'):
+            if 'QUANTIDADE_ESTOQUE' in df.columns:
+                stock_stats = {
+                    'mean': df['QUANTIDADE_ESTOQUE'].mean(),
+                    'std': df['QUANTIDADE_ESTOQUE'].std(),
+                    'min': df['QUANTIDADE_ESTOQUE'].min(),
+                    'max': df['QUANTIDADE_ESTOQUE'].max(),
+                    'median': df['QUANTIDADE_ESTOQUE'].median()
+                }
             
-            # Verifica se distribuição é muito enviesada
-            if stock_stats['std'] / stock_stats['mean'] > 0.5:
-                suggestion = "Distribuição de estoque com alta variabilidade - verificar dados"
-                stats_results['suggestions'].append(suggestion)
-                self.results['suggestions'].append(suggestion)
+                # Verifica se distribuição é muito enviesada
+                if stock_stats['std'] / stock_stats['mean'] > 0.5:
+                    suggestion = "Distribuição de estoque com alta variabilidade - verificar dados"
+                    stats_results['suggestions'].append(suggestion)
+                    self.results['suggestions'].append(suggestion)
         
         # 4. Consistência temporal
-        if 'DIA' in df.columns:
-            try:
-                df['DIA_DATE'] = pd.to_datetime(df['DIA'], format='%d/%m/%Y')
-                daily_counts = df['DIA_DATE'].value_counts().sort_index()
+        with self.rule(stats_results, 'registros_por_dia'):
+            if 'DIA' in df.columns:
+                try:
+                    df['DIA_DATE'] = pd.to_datetime(df['DIA'], format='%d/%m/%Y')
+                    daily_counts = df['DIA_DATE'].value_counts().sort_index()
                 
-                if daily_counts.std() / daily_counts.mean() > 0.3:
-                    warning_msg = "Variação significativa no número de registros por dia"
-                    stats_results['warnings'].append(warning_msg)
-                    self.results['warnings'].append(warning_msg)
-            except:
-                pass
+                    if daily_counts.std() / daily_counts.mean() > 0.3:
+                        warning_msg = "Variação significativa no número de registros por dia"
+                        stats_results['warnings'].append(warning_msg)
+                        self.results['warnings'].append(warning_msg)
+                except:
+                    pass
         
         stats_results['passed'] = len(stats_results['warnings']) == 0
         if stats_results['passed']:
@@ -287,45 +605,49 @@ class DataValidator:
         quality_results = {'passed': 0, 'issues': [], 'suggestions': []}
         
         # 1. Integridade referencial
-        if 'ID_PRODUTO' in df.columns:
-            unique_products = df['ID_PRODUTO'].nunique()
-            if unique_products < 10:
-                issue = f"Poucos produtos únicos: {unique_products} (esperado ~50)"
-                quality_results['issues'].append(issue)
-                self.results['warnings'].append(issue)
+        with self.rule(quality_results, 'produtos_unicos'):
+            if 'ID_PRODUTO' in df.columns:
+                unique_products = df['ID_PRODUTO'].nunique()
+                if unique_products < 10:
+                    issue = f"Poucos produtos únicos: {unique_products} (esperado ~50)"
+                    quality_results['issues'].append(issue)
+                    self.results['warnings'].append(issue)
         
         # 2. Variabilidade temporal
-        if 'DIA' in df.columns and len(df) > 0:
-            try:
-                df['DIA_DATE'] = pd.to_datetime(df['DIA'], format='%d/%m/%Y')
-                date_range = df['DIA_DATE'].max() - df['DIA_DATE'].min()
+        with self.rule(quality_results, 'periodo_temporal'):
+            if 'DIA' in df.columns and len(df) > 0:
+                try:
+                    df['DIA_DATE'] = pd.to_datetime(df['DIA'], format='%d/%m/%Y')
+                    date_range = df['DIA_DATE'].max() - df['DIA_DATE'].min()
                 
-                if date_range.days < 7:
-                    suggestion = f"Período temporal curto: {date_range.days} dias (recomendado > 14 dias)"
-                    quality_results['suggestions'].append(suggestion)
-                    self.results['suggestions'].append(suggestion)
-            except:
-                pass
+                    if date_range.days < 7:
+                        suggestion = f"Período temporal curto: {date_range.days} dias (recomendado > 14 dias)"
+                        quality_results['suggestions'].append(suggestion)
+                        self.results['suggestions'].append(suggestion)
+                except:
+                    pass
         
         # 3. Balanceamento de classes (promoção)
-        if 'FLAG_PROMOCAO' in df.columns:
-            promo_dist = df['FLAG_PROMOCAO'].value_counts(normalize=True)
-            if len(promo_dist) > 1:
-                min_class = promo_dist.min()
-                if min_class < 0.2:
-                    suggestion = f"Classe minoritária pequena: {min_class:.1%} (promoções)"
-                    quality_results['suggestions'].append(suggestion)
-                    self.results['suggestions'].append(suggestion)
+        with self.rule(quality_results, 'balanceamento_promocao'):
+            if 'FLAG_PROMOCAO' in df.columns:
+                promo_dist = df['FLAG_PROMOCAO'].value_counts(normalize=True)
+                if len(promo_dist) > 1:
+                    min_class = promo_dist.min()
+                    if min_class < 0.2:
+                        suggestion = f"Classe minoritária pequena: {min_class:.1%} (promoções)"
+                        quality_results['suggestions'].append(suggestion)
+                        self.results['suggestions'].append(suggestion)
         
         # 4. Tamanho do dataset
-        if len(df) < 100:
-            issue = f"Dataset pequeno: {len(df)} registros (mínimo recomendado: 500)"
-            quality_results['issues'].append(issue)
-            self.results['warnings'].append(issue)
-        elif len(df) > 10000:
-            suggestion = f"Dataset grande: {len(df):,} registros - considerar amostragem"
-            quality_results['suggestions'].append(suggestion)
-            self.results['suggestions'].append(suggestion)
+        with self.rule(quality_results, 'tamanho_dataset'):
+            if len(df) < 100:
+                issue = f"Dataset pequeno: {len(df)} registros (mínimo recomendado: 500)"
+                quality_results['issues'].append(issue)
+                self.results['warnings'].append(issue)
+            elif len(df) > 10000:
+                suggestion = f"Dataset grande: {len(df):,} registros - considerar amostragem"
+                quality_results['suggestions'].append(suggestion)
+                self.results['suggestions'].append(suggestion)
         
         quality_results['passed'] = len(quality_results['issues']) == 0
         if quality_results['passed']:
@@ -435,24 +757,52 @@ class DataValidator:
     
     def validate(self, filepath: str) -> Dict[str, Any]:
         """Executa todas as validações"""
-        print(f"\n{'='*60}")
-        print(f"VALIDANDO: {filepath}")
-        print(f"{'='*60}")
+        if self.verbose:
+            print(f"\n{'='*60}")
+            print(f"VALIDANDO: {filepath}")
+            print(f"{'='*60}")
         
         try:
+            # Relatório em cache para o mesmo arquivo e o mesmo conjunto de regras
+            cache_key = None
+            if self.cache:
+                cache_key = self.cache.key(filepath, self)
+                cached = self.cache.get(cache_key)
+                if cached:
+                    self.results = cached['detailed_results']
+                    if self.verbose:
+                        print(f"♻️  Relatório em cache: {cache_key[:12]}")
+                        self.print_results()
+                    return dict(cached['validation_report'], cache=True)
+            
             # Carrega dados
             df = self.load_data(filepath)
+            with span('validar.mapeamento_layout', rows=len(df)):
+                df, self.layout = self.layout_mapper.normalize(df)
+            if self.layout not in (None, 'canonico') and self.verbose:
+                low, high = self.layout_mapper.product_map.id_range()
+                print(f"🔀 Layout {self.layout} mapeado para o canônico (IDs de produto {low}-{high})")
             
-            # Executa validações
-            print("\n🔍 Executando validações...")
+            # Executa validações (cada etapa cronometrada)
+            if self.verbose:
+                print("\n🔍 Executando validações...")
             
-            schema_results = self.validate_schema(df)
-            business_results = self.validate_business_rules(df)
-            stats_results = self.validate_statistical_quality(df)
-            quality_results = self.validate_data_quality(df)
+            timings = {}
+            
+            def timed(name, func):
+                with span(f'validar.{name}', rows=len(df)):
+                    start = time.perf_counter()
+                    result = func(df)
+                    timings[name] = round((time.perf_counter() - start) * 1000, 3)
+                return result
+            
+            schema_results = timed('schema_validation', self.validate_schema)
+            business_results = timed('business_validation', self.validate_business_rules)
+            stats_results = timed('statistical_validation', self.validate_statistical_quality)
+            quality_results = timed('quality_validation', self.validate_data_quality)
             
             # Gera resumo
-            summary = self.generate_summary(df)
+            summary = timed('summary', self.generate_summary)
             
             # Compila resultados
             validation_results = {
@@ -463,17 +813,23 @@ class DataValidator:
                 'statistical_validation': stats_results,
                 'quality_validation': quality_results,
                 'summary': summary,
+                'timings_ms': timings,
                 'overall_status': 'PASS' if len(self.results['errors']) == 0 else 'FAIL'
             }
             
+            if cache_key:
+                self.cache.put(cache_key, self.build_report(validation_results))
+            
             # Exibe resultados
-            self.print_results()
+            if self.verbose:
+                self.print_results()
             
             return validation_results
             
         except Exception as e:
             error_msg = f"Erro durante validação: {str(e)}"
-            print(f"\n❌ {error_msg}")
+            if self.verbose:
+                print(f"\n❌ {error_msg}")
             self.results['errors'].append(error_msg)
             
             return {
@@ -483,6 +839,96 @@ class DataValidator:
                 'overall_status': 'ERROR'
             }
     
+    def build_records(self, results: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Converte o resultado da validação em registros planos, um por regra.
+        
+        Cada regra (ex.: schema/coluna_ID_PRODUTO, regras_negocio/estoque_negativo)
+        traz o próprio status, contagens, mensagens e duração. Todos os campos
+        têm tipos JSON nativos; `detalhes` traz os dados estruturados da regra
+        (ex.: consistência temporal) ou o resumo.
+        """
+        base = {
+            'arquivo': results.get('file'),
+            'timestamp': results.get('timestamp'),
+            'cache': bool(results.get('cache', False))
+        }
+        
+        if results.get('overall_status') == 'ERROR':
+            return [dict(base, etapa='geral', regra='geral', status='ERROR', duracao_ms=None, erros=1,
+                         avisos=0, sugestoes=0, mensagens=[results.get('error', '')], detalhes={})]
+        
+        steps = {
+            'schema_validation': 'schema',
+            'business_validation': 'regras_negocio',
+            'statistical_validation': 'qualidade_estatistica',
+            'quality_validation': 'qualidade_dados'
+        }
+        timings = results.get('timings_ms', {})
+        records = []
+        
+        for key, stage in steps.items():
+            step = results.get(key, {})
+            for rule in step.get('regras', []):
+                details = step.get(rule['regra'])
+                records.append(dict(base, etapa=stage, **rule,
+                                    detalhes=details if isinstance(details, dict) else {}))
+        
+        records.append(dict(
+            base,
+            etapa='resumo',
+            regra='resumo',
+            status='INFO',
+            duracao_ms=timings.get('summary'),
+            erros=0,
+            avisos=0,
+            sugestoes=0,
+            mensagens=[],
+            detalhes=results.get('summary', {})
+        ))
+        records.append(dict(
+            base,
+            etapa='geral',
+            regra='geral',
+            status=results.get('overall_status'),
+            duracao_ms=round(sum(timings.values()), 3) if timings else None,
+            erros=len(self.results['errors']),
+            avisos=len(self.results['warnings']),
+            sugestoes=len(self.results['suggestions']),
+            mensagens=[],
+            detalhes={}
+        ))
+        return records
+    
+    def write_records(self, results: Dict[str, Any], fmt: str, output_path: Optional[str] = None,
+                      append: bool = False):
+        """
+        Escreve registros por regra em JSON Lines (arquivo ou stdout) ou Parquet;
+        o arquivo JSON Lines é sobrescrito, ou acrescido com append=True
+        """
+        records = self.build_records(results)
+        
+        if fmt == 'parquet':
+            if not output_path:
+                raise ValueError("Formato parquet requer --output")
+            df = pd.DataFrame(records)
+            df['detalhes'] = [json.dumps(d, ensure_ascii=False, default=json_default) for d in df['detalhes']]
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(output_path, index=False)
+            return
+        
+        lines = ''.join(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=json_default) + '\n'
+            for record in records
+        )
+        if output_path:
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(output_path, 'a' if append else 'w', encoding='utf-8') as f:
+                f.write(lines)
+        else:
+            sys.stdout.write(lines)
+            sys.stdout.flush()
+    
     def print_results(self):
         """Exibe resultados da validação"""
         print(f"\n{'='*60}")
@@ -575,9 +1021,9 @@ class DataValidator:
         
         print(f"{'='*60}\n")
     
-    def save_report(self, results: Dict[str, Any], output_path: str):
-        """Salva relatório de validação"""
-        report = {
+    def build_report(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Monta o relatório completo de validação"""
+        return {
             'validation_report': results,
             'results_summary': {
                 'total_errors': len(self.results['errors']),
@@ -588,46 +1034,98 @@ class DataValidator:
             },
             'detailed_results': self.results
         }
+    
+    def save_report(self, results: Dict[str, Any], output_path: str):
+        """Salva relatório de validação"""
+        report = self.build_report(results)
         
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+            json.dump(report, f, indent=2, ensure_ascii=False, default=json_default)
         
-        print(f"\n📄 Relatório salvo em: {output_path}")
+        if self.verbose:
+            print(f"\n📄 Relatório salvo em: {output_path}")
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description='Validador de Dados de Estoque')
     
     parser.add_argument('filepath', help='Caminho para o arquivo de dados')
-    parser.add_argument('--output', '-o', help='Caminho para salvar relatório JSON')
+    parser.add_argument('--output', '-o', help='Caminho para salvar relatório JSON (ou registros, com --format)')
+    parser.add_argument('--format', choices=['text'] + RECORD_FORMATS, default='text',
+                        help='text (padrão) ou um registro por regra (etapa, regra, status, contagens e duração) '
+                             'sem formatação: jsonl/ndjson (stdout ou --output) e parquet')
+    parser.add_argument('--append', action='store_true',
+                        help='Com --format jsonl/ndjson, acrescenta os registros ao --output em vez de sobrescrever')
     parser.add_argument('--fix', '-f', action='store_true', help='Tenta corrigir problemas automaticamente')
     parser.add_argument('--strict', '-s', action='store_true', help='Modo estrito (falha em warnings)')
     parser.add_argument('--quick', '-q', action='store_true', help='Validação rápida (apenas schema)')
+    parser.add_argument('--trace', help='Exporta spans de desempenho (.trace.json = Chrome Trace, senão JSON)')
+    parser.add_argument('--profile-dir', help='Salva perfis cProfile (.prof) por etapa neste diretório')
+    parser.add_argument('--cache-dir', default=os.environ.get('VALIDAR_DADOS_CACHE'),
+                        help='Diretório de cache de relatórios (padrão: $VALIDAR_DADOS_CACHE)')
+    parser.add_argument('--no-cache', action='store_true', help='Ignora o cache de relatórios')
+    parser.add_argument('--product-map',
+                        default=os.environ.get('ESTOQUE_DICIONARIO_PRODUTOS', str(DEFAULT_PRODUCT_MAP)),
+                        help='Dicionário de códigos de produto para layouts com códigos texto')
+    parser.add_argument('--catalogo', help='Catálogo de produtos válidos (padrão: $ESTOQUE_CATALOGO_PRODUTOS)')
+    parser.add_argument('--save-profile', help='Salva perfil de referência para drift (dados de treino)')
+    parser.add_argument('--drift-profile', help='Compara o arquivo com um perfil de referência de drift')
+    parser.add_argument('--drift-output', help='Caminho para salvar relatório JSON de drift')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
-    validator = DataValidator()
+    machine_output = args.format in RECORD_FORMATS
+    if args.trace:
+        TRACER.export_at_exit(args.trace)
+    if args.profile_dir:
+        TRACER.enable(profile_dir=args.profile_dir)
+    validator = DataValidator(cache_dir=None if args.no_cache else args.cache_dir,
+                              verbose=not machine_output, product_map_path=args.product_map,
+                              catalog_path=args.catalogo)
     
     try:
         # Executa validação
         results = validator.validate(args.filepath)
         
-        # Salva relatório se solicitado
-        if args.output:
+        # Salva relatório (ou registros por regra) se solicitado
+        if machine_output:
+            validator.write_records(results, args.format, args.output, append=args.append)
+        elif args.output:
             validator.save_report(results, args.output)
         
+        # Modo drift: perfil de referência e/ou comparação com a referência
+        drift_status = None
+        if args.save_profile or args.drift_profile:
+            from monitorar_drift import DriftMonitor
+            monitor = DriftMonitor(verbose=not machine_output)
+            if args.save_profile:
+                monitor.save_profile(monitor.build_profile(args.filepath), args.save_profile)
+            if args.drift_profile:
+                drift_report = monitor.compare(monitor.load_profile(args.drift_profile), args.filepath)
+                if not machine_output:
+                    monitor.print_report(drift_report)
+                if args.drift_output:
+                    monitor.save_report(drift_report, args.drift_output)
+                drift_status = drift_report['overall_status']
+        
         # Determina código de saída
         if len(validator.results['errors']) > 0:
             return 1  # Falha
         elif args.strict and len(validator.results['warnings']) > 0:
             return 2  # Falha em modo estrito
+        elif args.strict and drift_status == 'DRIFT':
+            return 2  # Drift significativo em modo estrito
         else:
             return 0  # Sucesso
             
     except Exception as e:
-        print(f"\n❌ ERRO CRÍTICO: {str(e)}")
+        if machine_output:
+            print(json.dumps({'arquivo': args.filepath, 'regra': 'geral', 'status': 'ERROR',
+                              'mensagens': [str(e)]}, ensure_ascii=False), file=sys.stderr)
+        else:
+            print(f"\n❌ ERRO CRÍTICO: {str(e)}")
         return 3
 
 if __name__ == "__main__":